@@ -1,7 +1,5 @@
 import datetime
-import mimetypes
 import os
-from urllib.parse import urlparse
 
 from django.shortcuts import get_object_or_404
 import pandas as pd
@@ -17,7 +15,6 @@ from django.template.loader import get_template, render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.html import format_html
-from weasyprint import CSS, HTML, default_url_fetcher
 
 from account.models import (
     EmployeeSalary,
@@ -28,6 +25,7 @@ from account.models import (
     TDSChallan,
 )
 from config.admin.utils import simple_request_filter
+from config.utils.pdf_render import A4_PAGE, pdf_response, render_pdf
 from employee.admin.employee._forms import DailyExpenseFilterForm
 from employee.models import Employee
 from inventory_management.models import InventoryTransaction
@@ -644,13 +642,7 @@ class ExpenseAdmin(admin.ModelAdmin):
         file_name_date = f"{month}/{year}"
         file_name = f"{file_name_date}_ME.pdf"
 
-        # Generate PDF
-        html = HTML(string=html_content)
-        pdf_file = html.write_pdf()
-        response = HttpResponse(pdf_file, content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{file_name}"'
-
-        return response
+        return pdf_response(render_pdf(html_content), file_name)
 
     @admin.action(description="Print Voucher (Attachment)")
     def print_voucher_attachment(self, request, queryset):
@@ -679,28 +671,11 @@ class ExpenseAdmin(admin.ModelAdmin):
             "pdf/monthly_expense_attachment.html", context
         )
 
-        def custom_fetcher(url, *args, **kwargs):
-            parsed = urlparse(url)
-            if parsed.path.startswith(settings.MEDIA_URL):
-                path = parsed.path.replace(
-                    settings.MEDIA_URL, settings.MEDIA_ROOT + "/", 1
-                )
-                mime, enc = mimetypes.guess_type(path)
-                return {
-                    "file_obj": open(path, "rb"),
-                    "mime_type": mime,
-                    "encoding": enc,
-                    "filename": path.split("/")[-1],
-                }
-            return default_url_fetcher(url, *args, **kwargs)
-
-        html = HTML(
-            string=html_str,
+        pdf_bytes = render_pdf(
+            html_str,
             base_url=request.build_absolute_uri("/"),
-            url_fetcher=custom_fetcher,
+            stylesheets=[A4_PAGE],
         )
-        css = CSS(string="@page { size: A4; margin: 1cm }")
-        pdf_bytes = html.write_pdf(stylesheets=[css])
         month = monthly_journal.date.strftime("%B")
         year = monthly_journal.date.strftime("%Y")
         file_name = f"{month}/{year}"
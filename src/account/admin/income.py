@@ -13,6 +13,7 @@ from django.template.loader import get_template
 import requests
 from account.models import Income
 from account.services.balance import BalanceSummery
+from account.services.ledger import schedule_queryset_refresh
 
 import config.settings
 from config.settings import STATIC_ROOT
@@ -201,11 +202,13 @@ class IncomeAdmin(AdminConfirmMixin, admin.ModelAdmin):
 
     @admin.action()
     def approve_selected(self, request, queryset):
+        schedule_queryset_refresh(queryset)
         queryset.update(status="approved", is_send_invoice_email="yes")
         # self.message_user(request, f'Status has been updated to approved for {len(queryset)} items', messages.SUCCESS)
 
     @admin.action()
     def pending_selected(self, request, queryset):
+        schedule_queryset_refresh(queryset)
         queryset.update(status="pending")
         # self.message_user(request, f'Status has been updated to pending for {len(queryset)} items', messages.SUCCESS)
 
@@ -233,6 +236,7 @@ class IncomeAdmin(AdminConfirmMixin, admin.ModelAdmin):
 
     @admin.action()
     def hold_selected(self, request, queryset):
+        schedule_queryset_refresh(queryset)
         queryset.update(status="hold")
         self.message_user(request, f'Status has been updated to hold for {len(queryset)} items', messages.SUCCESS)
 
@@ -1,6 +1,7 @@
 from typing import Any
 from django.contrib import admin
 from account.models import AccountJournal, Expense, MonthlyJournal, DailyPaymentVoucher
+from account.services.vouchers import vouchers_pdf_response
 from django import forms
 from django.utils.html import format_html
 from django.db.models import Sum
@@ -93,6 +94,7 @@ class DailyPaymentVoucherAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     ordering = ['-date']
     form = DailyPaymentVoucherForm
+    actions = ['print_payment_vouchers', 'print_journal_vouchers']
     
     
     def has_module_permission(self, request):
@@ -117,6 +119,14 @@ class DailyPaymentVoucherAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         return queryset.filter(type='daily')
+
+    @admin.action(description='Print Payment Vouchers')
+    def print_payment_vouchers(self, request, queryset):
+        return vouchers_pdf_response(queryset.order_by('date'), 'PV')
+
+    @admin.action(description='Print Journal Vouchers')
+    def print_journal_vouchers(self, request, queryset):
+        return vouchers_pdf_response(queryset.order_by('date'), 'JV')
     
     def save_model(self, request, obj, form, change):
         obj.type = 'daily'
@@ -1,16 +1,10 @@
-import math
-from math import floor
-
 from django.conf import settings
 from django.contrib import admin, messages
-from django.db.models import Sum
-from django.http import HttpResponse
 from openpyxl import Workbook
-from openpyxl.writer.excel import save_virtual_workbook
 
 from account.models import SalaryDisbursement
+from account.services.salary_export import SalarySheetExport, tax_loan_rows
 from config.utils.pdf import PDF
-from employee.models.bank_account import BankAccount
 
 
 class SalarySheetAction(admin.ModelAdmin):
@@ -46,31 +40,13 @@ class SalarySheetAction(admin.ModelAdmin):
 
     @admin.action(description="Export Tax Loan List")
     def export_tax_loan_list(self, request, queryset, *args, **kwargs):
-        salary_sheet = queryset.first()
-        employees = salary_sheet.employeesalary_set.filter(employee__active=True)
-        employee_list = []
-        for employee in employees:
-            if tax_loan := employee.employee.loan_set.filter(
-                start_date__month=salary_sheet.date.month,
-                end_date__year=salary_sheet.date.year,
-                loan_type="tds",
-            ):
-                loan_amount = tax_loan.aggregate(total=Sum("emi"))
-                employee_list.append(
-                    {
-                        "loan": loan_amount.get("total", 0),
-                        "id": employee.employee.employee_id,
-                        "name": employee.employee.full_name,
-                        "designation": employee.employee.designation.title,
-                    }
-                )
+        employee_list = tax_loan_rows(queryset.first())
         if len(employee_list) == 0:
             messages.error(request, "No Tax Loan Found")
             return None
 
-        wb = Workbook()
-        work_sheet = wb.active
-        work_sheet.title = "Tax Loan Employee List"
+        wb = Workbook(write_only=True)
+        work_sheet = wb.create_sheet(title="Tax Loan Employee List")
 
         work_sheet.append(
             ["SL No", "Name Of Employee", "Employee ID", "Designation", "TDS"]
@@ -87,11 +63,7 @@ class SalarySheetAction(admin.ModelAdmin):
                 ]
             )
 
-        response = HttpResponse(
-            content=save_virtual_workbook(wb), content_type="application/ms-excel"
-        )
-        response["Content-Disposition"] = "attachment; filename=City_Bank_npsb.xlsx"
-        return response
+        return SalarySheetExport.response(wb, "City_Bank_npsb.xlsx")
 
     @admin.action(description="Export in Excel")
     def export_excel(self, request, queryset):
@@ -174,147 +146,15 @@ class SalarySheetAction(admin.ModelAdmin):
 
     @admin.action(description="Export City Bank NPSB(Excel)")
     def export_city_bank_npsb_excel(self, request, queryset):
-        wb = Workbook()
-        work_sheet = wb.active
-        work_sheet.title = "NPSB Export"
-
-        # Add headers including 'Total Salary' at the end
-        work_sheet.append(
-            [
-                "SL No",
-                "Name",
-                "A/C No.",
-                "Amount in Tk.",
-            ]
-        )
-        salary_sheets = queryset
-
-        total = 0
-        salary_data = []
-        for sheet in salary_sheets:
-            employee_salaries = sheet.employeesalary_set.all()
-            for emp_salary in employee_salaries:
-                employee_bank = BankAccount.objects.filter(
-                    employee=emp_salary.employee, default=True, is_approved=True
-                ).first()
-                if emp_salary.gross_salary <= 0 or not employee_bank:
-                    continue
-                gross_salary = emp_salary.gross_salary or 0.0
-                salary_data.append(
-                    {
-                        "sheet_date": sheet.date,
-                        "name": emp_salary.employee.full_name,
-                        "account_number": (
-                            employee_bank.account_number if employee_bank else "-"
-                        ),
-                        "gross_salary": math.ceil(gross_salary),
-                    }
-                )
-                total += math.ceil(gross_salary)
-
-        for index, data in enumerate(salary_data, start=1):
-            work_sheet.append(
-                [
-                    index,
-                    data["name"],
-                    data["account_number"],
-                    data["gross_salary"],
-                ]
-            )
-
-        work_sheet.append(
-            [
-                "",
-                "",
-                "Total",
-                f"{int(total)}",
-            ]
-        )
-
-        response = HttpResponse(
-            content=save_virtual_workbook(wb), content_type="application/ms-excel"
-        )
-        response["Content-Disposition"] = "attachment; filename=City_Bank_npsb.xlsx"
-        return response
+        return SalarySheetExport(queryset).npsb_excel()
 
     @admin.action(description="Export City Live Excel")
     def export_city_live_excel(self, request, queryset):
-        wb = Workbook()
-        work_sheet = wb.active
-        work_sheet.title = "City Live Export"
-        work_sheet.append(
-            [
-                "Reason",
-                "Sender Account No",
-                "Receiving Bank Routing No",
-                "Beneficiary Bank Account  No",
-                "Account Type",
-                "Amount",
-                "Receiver ID",	
-                "Receiver Name",
-                "Remarks",
-                "Receiver Mobile Number",
-                "Receiver Email Address",
-            ]
-        )
-
-        for salary_sheet in queryset:
-
-            for employee_salary in salary_sheet.employeesalary_set.all():
-
-                bank_account = employee_salary.employee.bankaccount_set.filter(
-                    default=True, is_approved=True
-                ).last()
-                if bank_account:
-                    work_sheet.append(
-                        [
-                            "",
-                            "",
-                            "",
-                            bank_account.account_number,
-                            "",
-                            str(int(employee_salary.gross_salary)),
-                            "",
-                            employee_salary.employee.full_name,
-                            "",
-                            "",
-                            "",
-                        ]
-                    )
-
-        response = HttpResponse(
-            content=save_virtual_workbook(wb), content_type="application/ms-excel"
-        )
-        response["Content-Disposition"] = "attachment; filename=City_Live.xlsx"
-        return response
+        return SalarySheetExport(queryset).city_live_excel()
     
     @admin.action(description="Export City Bank NPSB")
     def export_city_bank_npsb(self, request, queryset):
-
-        salary_sheets = queryset
-
-        salary_data = []
-        for sheet in salary_sheets:
-            employee_salaries = sheet.employeesalary_set.all()
-            total = 0
-            for emp_salary in employee_salaries:
-                employee_bank = BankAccount.objects.filter(
-                    employee=emp_salary.employee, default=True, is_approved=True
-                ).first()
-                if emp_salary.gross_salary <= 0 or not employee_bank:
-                    continue
-                gross_salary = emp_salary.gross_salary or 0.0
-                salary_data.append(
-                    {
-                        "sheet_date": sheet.date,
-                        "name": emp_salary.employee.full_name,
-                        "account_number": (
-                            employee_bank.account_number if employee_bank else "-"
-                        ),
-                        "gross_salary": math.ceil(gross_salary),
-                    }
-                )
-                total += math.ceil(gross_salary)
+        salary_data, sheet, total = SalarySheetExport(queryset).npsb()
         pdf = PDF(
             template_path="admin/city_bank_npsb.html",
             context={
@@ -441,132 +281,7 @@ class SalarySheetAction(admin.ModelAdmin):
         @param query_filter:
         @return:
         """
-        wb = Workbook()
-        work_sheets = {}
-        for salary_sheet in queryset:
-            salary_sheet.total_value = 0
-            work_sheet = wb.create_sheet(title=str(salary_sheet.date))
-            work_sheet.append(
-                [
-                    "name",
-                    "Net Salary",
-                    "Overtime",
-                    "Project Bonus",
-                    "Leave Bonus",
-                    "Festival Bonus",
-                    "Food Allowance",
-                    "Tax Loan",
-                    "Salary Loan",
-                    "Late Fine",
-                    "Gross Salary",
-                    "Bank Name",
-                    "Bank Number",
-                ]
-            )
-            employee_salaries = salary_sheet.employeesalary_set
-            if query_filter is not None:
-                employee_salaries = salary_sheet.employeesalary_set.filter(
-                    query_filter
-                ).all()
-            for employee_salary in employee_salaries.all():
-                # if employee_salary.employee.
-                salary_sheet.total_value += floor(employee_salary.gross_salary)
-                bank_account = employee_salary.employee.bankaccount_set.filter(
-                    default=True
-                ).first()
-                work_sheet.append(
-                    [
-                        employee_salary.employee.full_name,
-                        employee_salary.net_salary,
-                        employee_salary.overtime,
-                        employee_salary.project_bonus,
-                        employee_salary.leave_bonus,
-                        employee_salary.festival_bonus,
-                        abs(employee_salary.food_allowance),
-                        abs(employee_salary.tax_loan_total),
-                        abs(employee_salary.salary_loan_total),
-                        abs(employee_salary.current_month_late_fee),
-                        floor(employee_salary.gross_salary),
-                        bank_account.bank.name if bank_account else "",
-                        bank_account.account_number if bank_account else "",
-                    ]
-                )
-            work_sheet.append(["", "", "", "", "", "Total", salary_sheet.total_value])
-            work_sheets[str(salary_sheet.id)] = work_sheet
-        wb.remove(wb["Sheet"])
-        response = HttpResponse(
-            content=save_virtual_workbook(wb), content_type="application/ms-excel"
-        )
-        response["Content-Disposition"] = "attachment; filename=SalarySheet.xlsx"
-        return response
+        return SalarySheetExport(queryset, query_filter).salary_sheet_excel()
 
     def export_in_xl_bankasia(self, queryset, query_filter=None):
-        wb = Workbook()
-        work_sheets = {}
-        for salary_sheet in queryset:
-
-            salary_sheet.total_value = 0
-
-            work_sheet = wb.create_sheet(title=str(salary_sheet.date))
-
-            work_sheet.append(
-                [
-                    "Employee Name",
-                    "Account Number",
-                    "Dr./Cr.",
-                    "Transaction Amount",
-                    "Chqser",
-                    "Chqnum",
-                    "Chqdat",
-                    "Remarks",
-                ]
-            )
-
-            work_sheet.append(
-                [
-                    settings.COMPANY_ACCOUNT_NAME,
-                    settings.COMPANY_ACCOUNT_NO,
-                    "D",
-                    "0",
-                    "",
-                    "",
-                    "",
-                    f'Salary of {salary_sheet.date.strftime("%b, %Y")}',
-                ]
-            )
-
-            employee_festival_bonuses = salary_sheet.employeesalary_set
-            if query_filter is not None:
-                employee_festival_bonuses = salary_sheet.employeesalary_set.filter(
-                    query_filter
-                ).all()
-
-            for employee_salary in employee_festival_bonuses.all():
-
-                salary_sheet.total_value += floor(employee_salary.gross_salary)
-                bank_account = employee_salary.employee.bankaccount_set.filter(
-                    is_approved=True, bank__id=11
-                ).last()
-                if not bank_account:
-                    continue
-                work_sheet.append(
-                    [
-                        employee_salary.employee.full_name,
-                        bank_account.account_number if bank_account else "-",
-                        "C",
-                        floor(employee_salary.gross_salary),
-                        "",
-                        "",
-                        "",
-                        f'Salary of {salary_sheet.date.strftime("%b, %Y")}',
-                    ]
-                )
-
-            work_sheet["D2"] = salary_sheet.total_value
-            work_sheets[str(salary_sheet.id)] = work_sheet
-        wb.remove(wb["Sheet"])
-        response = HttpResponse(
-            content=save_virtual_workbook(wb), content_type="application/ms-excel"
-        )
-        response["Content-Disposition"] = "attachment; filename=SalarySheet.xlsx"
-        return response
+        return SalarySheetExport(queryset, query_filter).bank_asia_excel()
@@ -1,29 +1,28 @@
-import calendar
-from datetime import datetime
 from decimal import Decimal
 from math import floor
 
-import openpyxl
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
 from django.contrib.humanize.templatetags.humanize import intcomma
 from django.db.models import Count, Sum
 from django.db.models.functions import Abs
-from django.http import HttpResponse
+from django.http import JsonResponse
+from django.urls import path
 from django.utils.html import format_html
 from num2words import num2words
 
 from account.admin.salary.actions import SalarySheetAction
 from account.models import (
     EmployeeSalary,
-    Loan,
     SalaryReport,
     SalarySheet,
+    SalarySheetGeneration,
     TDSChallan,
 )
-from account.repository.SalarySheetRepository import SalarySheetRepository
+from account.services.salary_export import late_fee, with_deductions
+from account.services.salary_report import SalaryReportBuilder
+from account.tasks import start_salary_sheet_generation
 from config.utils.pdf import PDF
-from employee.models import Employee
-from employee.models.employee import LateAttendanceFine
 from django.db.models import (
     Sum, Q, Case, When, IntegerField, Value, F,
     OuterRef, Subquery, Count
@@ -99,13 +98,7 @@ class EmployeeSalaryInline(admin.TabularInline):
     formatted_gross_salary.short_description = "Gross Bonus"
 
     def get_tax_loan(self, obj):
-        salary_loan = obj.employee.loan_set.filter(
-            start_date__month=obj.salary_sheet.date.month,
-            end_date__year=obj.salary_sheet.date.year,
-            loan_type="tds",
-        )
-        loan_amount = salary_loan.aggregate(Sum("emi"))
-        return int(loan_amount["emi__sum"]) if loan_amount["emi__sum"] else 0
+        return int(obj.tax_loan_emi) if obj.tax_loan_emi else 0
 
     get_tax_loan.short_description = "Tax Loan"
 
@@ -126,24 +119,7 @@ class EmployeeSalaryInline(admin.TabularInline):
     #             ).aggregate(fine=Sum('total_late_attendance_fine'))
     #     return int(fine.get('fine', 0)) if fine.get('fine') else 0
     def get_late_fine(self, obj):
-        late_count = LateAttendanceFine.objects.filter(
-            employee=obj.employee,
-            month=obj.salary_sheet.date.month,
-            year=obj.salary_sheet.date.year,
-            is_consider=False
-        ).count()
-
-        total_fine = 0.00
-        if late_count > 3:
-            # Apply 80 BDT for 4th to 6th late entries
-            late_entries_4_to_6 = min(late_count, 6) - 3
-            if late_entries_4_to_6 > 0:
-                total_fine += late_entries_4_to_6 * 80.00
-            # Apply 500 BDT for 7th and subsequent late entries
-            if late_count > 6:
-                late_entries_7_and_above = late_count - 6
-                total_fine += late_entries_7_and_above * 500.00
-
+        total_fine = late_fee(obj.late_fine_count)
         return int(total_fine) if total_fine > 0 else 0
 
     get_late_fine.short_description = "Late Fine"
@@ -157,22 +133,7 @@ class EmployeeSalaryInline(admin.TabularInline):
     #     loan_amount = salary_loan.aggregate(Sum("emi"))
     #     return int(loan_amount["emi__sum"]) if loan_amount["emi__sum"] else 0
     def get_salary_loan(self, obj):
-        salary_date = obj.salary_sheet.date
-        salary_month_start = datetime(
-            salary_date.year, salary_date.month, 1
-        ).date()
-        salary_month_end = datetime(
-            salary_date.year,
-            salary_date.month,
-            calendar.monthrange(salary_date.year, salary_date.month)[1],
-        ).date()
-
-        loan_amount = obj.employee.loan_set.filter(
-            start_date__lte=salary_month_end,
-            end_date__gte=salary_month_start,
-            loan_type="salary",
-        ).aggregate(Sum("emi"))
-        return int(loan_amount["emi__sum"]) if loan_amount["emi__sum"] else 0
+        return int(obj.salary_loan_emi) if obj.salary_loan_emi else 0
 
     get_salary_loan.short_description = "Salary Loan"
 
@@ -197,18 +158,35 @@ class EmployeeSalaryInline(admin.TabularInline):
     def has_add_permission(self, request, obj):
         return False
 
+    @staticmethod
+    def with_deductions(qs, date):
+        """
+        Annotate the rows of the salary sheet dated date with the values behind
+        get_tax_loan, get_salary_loan and get_late_fine, the inline renders in a
+        constant number of queries whatever the headcount. The inline counts
+        the TDS loans started in the month and the fines not considered.
+        """
+        return with_deductions(
+            qs,
+            date,
+            tds_filter=Q(start_date__month=date.month, end_date__year=date.year),
+            late_fine_filter=Q(is_consider=False),
+        )
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
 
         # Filter by the current SalarySheet
-        salary_sheet_id = (
+        salary_sheet_id, salary_sheet_date = (
             self.parent_model.objects.filter(
                 id=request.resolver_match.kwargs.get("object_id")
             )
-            .values_list("id", flat=True)
+            .values_list("id", "date")
             .first()
-        )
-        qs = qs.filter(salary_sheet_id=salary_sheet_id)
+        ) or (None, None)
+        qs = qs.filter(salary_sheet_id=salary_sheet_id).select_related("employee")
+        if salary_sheet_date is not None:
+            qs = self.with_deductions(qs, salary_sheet_date)
 
         # Calculate totals
         self.total_values = qs.aggregate(
@@ -227,11 +205,16 @@ class EmployeeSalaryInline(admin.TabularInline):
         total_tax_loan = Decimal("0.00")
         total_salary_loan = Decimal("0.00")
 
-        # Calculate custom total for late fines manually
-        for obj in qs:
-            total_late_fine += Decimal(self.get_late_fine(obj))
-            total_tax_loan += Decimal(self.get_tax_loan(obj))
-            total_salary_loan += Decimal(self.get_salary_loan(obj))
+        # Calculate custom total for late fines manually, from one query
+        deductions = (
+            qs.values_list("late_fine_count", "tax_loan_emi", "salary_loan_emi")
+            if salary_sheet_date is not None
+            else []
+        )
+        for late_fine_count, tax_loan_emi, salary_loan_emi in deductions:
+            total_late_fine += Decimal(int(late_fee(late_fine_count)))
+            total_tax_loan += Decimal(int(tax_loan_emi))
+            total_salary_loan += Decimal(int(salary_loan_emi))
 
         self.total_values["total_late_fine"] = total_late_fine
         self.total_values["total_tax_loan"] = total_tax_loan
@@ -323,14 +306,45 @@ class SalarySheetAdmin(SalarySheetAction, admin.ModelAdmin):
     change_form_template = "admin/salary_sheet.html"
 
     def save_model(self, request, salary_sheet, form, change):
-        # TODO : add festival bonus
-        salary = SalarySheetRepository(request.POST["date"])
-        if (
+        festival_bonus = (
             "festival_bonus" in request.POST
             and request.POST["festival_bonus"] == "on"
-        ):
-            salary.festival_bonus = True
-        salary.save()
+        )
+        generation = start_salary_sheet_generation(
+            request.POST["date"], festival_bonus=festival_bonus
+        )
+        salary_sheet.pk = generation.salary_sheet_id
+        self.message_user(
+            request,
+            f"Salary sheet generation has been started for "
+            f"{generation.total_employees} employees, "
+            f"open the salary sheet to follow the progress.",
+            messages.INFO,
+        )
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                "<int:object_id>/generation-progress/",
+                self.admin_site.admin_view(self.generation_progress_view),
+                name="account_salarysheet_generation_progress",
+            ),
+        ]
+        return my_urls + urls
+
+    def generation_progress_view(self, request, object_id, *args, **kwargs):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        generation = (
+            SalarySheetGeneration.objects.filter(salary_sheet_id=object_id)
+            .exclude(status="cancelled")
+            .order_by("-id")
+            .first()
+        )
+        if generation is None:
+            return JsonResponse({"status": None, "progress": 100})
+        return JsonResponse(generation.as_dict())
 
     def get_list_display(self, request):
         list_display = list(super().get_list_display(request))
@@ -623,126 +637,10 @@ class SalaryReportAdmin(admin.ModelAdmin):
         start_date = salary_report.start_date
         end_date = salary_report.end_date
 
-        employees = Employee.objects.filter(
-            joining_date__lte=start_date
-        ).exclude(salaryhistory__isnull=True)
-
-        employee_salary_data = []
-        total_employee_salary = 0
-
-        # Initialize total counters for all fields
-        totals = {
-            "gross_salary": 0,
-            "basic_salary": 0,
-            "house_allowance": 0,
-            "conveyance": 0,
-            "medical_allowance": 0,
-            "project_bonus": 0,
-            "overtime": 0,
-            "festival_bonus": 0,
-            "food_allowance": 0,
-            "leave_bonus": 0,
-            "tds": 0,
-            "salary_loan": 0,
-            "late_fine": 0,
-        }
-
-        for employee in employees:
-            employee_salarys = EmployeeSalary.objects.filter(
-                employee=employee,
-                salary_sheet__date__range=[start_date, end_date],
-            )
-
-            total_gross_salary = 0
-            total_basic_salary = 0
-            total_house_allowance = 0
-            total_conveyance = 0
-            total_medical_allowance = 0
-            total_project_bonus = 0
-            total_overtime = 0
-            total_festival_bonus = 0
-            total_food_allowance = 0
-            total_leave_bonus = 0
-            total_tds = 0
-
-            for emp_salary in employee_salarys:
-                net_salary = emp_salary.net_salary
-                gross_salary = emp_salary.gross_salary
-                total_employee_salary += gross_salary
-                total_gross_salary += gross_salary
-                total_basic_salary += net_salary * 0.55
-                total_house_allowance += net_salary * 0.20
-                total_conveyance += net_salary * 0.15
-                total_medical_allowance += net_salary * 0.10
-                total_project_bonus += emp_salary.project_bonus
-                total_overtime += emp_salary.overtime
-                total_festival_bonus += emp_salary.festival_bonus
-                total_food_allowance += emp_salary.food_allowance
-                total_tds += emp_salary.loan_emi
-                total_leave_bonus += emp_salary.leave_bonus
-
-            total_salary_emi = (
-                Loan.objects.filter(
-                    employee=employee,
-                    loan_type="salary",
-                    created_at__range=[start_date, end_date],
-                ).aggregate(total_emi=Sum("emi"))["total_emi"]
-                or 0
-            )
-
-            total_late_fine = (
-                LateAttendanceFine.objects.filter(
-                    employee=employee, date__range=[start_date, end_date]
-                ).aggregate(late_fine=Sum("total_late_attendance_fine"))[
-                    "late_fine"
-                ]
-                or 0
-            )
-
-            # Only add to employee_salary_data if total_gross_salary is not zero
-            if total_gross_salary > 0:
-                # Add individual totals to the overall totals
-                totals["gross_salary"] += total_gross_salary
-                totals["basic_salary"] += total_basic_salary
-                totals["house_allowance"] += total_house_allowance
-                totals["conveyance"] += total_conveyance
-                totals["medical_allowance"] += total_medical_allowance
-                totals["project_bonus"] += total_project_bonus
-                totals["overtime"] += total_overtime
-                totals["festival_bonus"] += total_festival_bonus
-                totals["food_allowance"] += total_food_allowance
-                totals["leave_bonus"] += total_leave_bonus
-                totals["tds"] += total_tds
-                totals["salary_loan"] += total_salary_emi
-                totals["late_fine"] += total_late_fine
-
-                employee_salary_data.append(
-                    {
-                        "index": len(employee_salary_data) + 1,
-                        "name": employee.full_name,
-                        "designation": employee.designation.title,
-                        "gross_salary": total_gross_salary,
-                        "basic_salary": total_basic_salary,
-                        "house_allowance": total_house_allowance,
-                        "conveyance": total_conveyance,
-                        "medical_allowance": total_medical_allowance,
-                        "project_bonus": total_project_bonus,
-                        "overtime": total_overtime,
-                        "festival_bonus": total_festival_bonus,
-                        "leave_bonus": total_leave_bonus,
-                        "food_allowance": total_food_allowance,
-                        "tds": total_tds,
-                        "salary_loan": total_salary_emi,
-                        "late_fine": total_late_fine,
-                    }
-                )
-
         extra_context = extra_context or {}
         extra_context["start_date"] = start_date
         extra_context["end_date"] = end_date
-        extra_context["total_employee_salary"] = total_employee_salary
-        extra_context["employee_salary_data"] = employee_salary_data
-        extra_context["totals"] = totals
+        extra_context.update(SalaryReportBuilder(start_date, end_date).get())
 
         return super().change_view(request, object_id, form_url, extra_context)
 
@@ -756,166 +654,6 @@ class SalaryReportAdmin(admin.ModelAdmin):
             return
 
         salary_report = queryset.first()
-        start_date = salary_report.start_date
-        end_date = salary_report.end_date
-
-        # employees = Employee.objects.filter(
-        #     active=True, joining_date__lte=start_date
-        # ).exclude(salaryhistory__isnull=True)
-
-        employees = Employee.objects.filter(
-            joining_date__lte=start_date
-        ).exclude(salaryhistory__isnull=True)
-
-        employee_salary_data = []
-
-        for employee in employees:
-            employee_salarys = EmployeeSalary.objects.filter(
-                employee=employee,
-                salary_sheet__date__range=[start_date, end_date],
-            )
-
-            total_gross_salary = 0
-            total_basic_salary = 0
-            total_house_allowance = 0
-            total_conveyance = 0
-            total_medical_allowance = 0
-            total_project_bonus = 0
-            total_overtime = 0
-            total_festival_bonus = 0
-            total_food_allowance = 0
-            total_leave_bonus = 0
-            total_tds = 0
-
-            for emp_salary in employee_salarys:
-                net_salary = emp_salary.net_salary
-                gross_salary = emp_salary.gross_salary
-
-                total_gross_salary += gross_salary
-                total_basic_salary += net_salary * 0.55
-                total_house_allowance += net_salary * 0.20
-                total_conveyance += net_salary * 0.15
-                total_medical_allowance += net_salary * 0.10
-                total_project_bonus += emp_salary.project_bonus
-                total_overtime += emp_salary.overtime
-                total_festival_bonus += emp_salary.festival_bonus
-                total_food_allowance += emp_salary.food_allowance
-                total_tds += emp_salary.loan_emi
-                total_leave_bonus += emp_salary.leave_bonus
-
-            # Only process if total_gross_salary is not zero
-            if total_gross_salary > 0:
-                loans = Loan.objects.filter(
-                    employee=employee,
-                    loan_type="tds",
-                    created_at__range=[start_date, end_date],
-                ).values_list("tax_calan_no", flat=True)
-
-                loan_list = [loan for loan in loans if loan is not None]
-                tressury_challn_no = ",<br>".join(loan_list)
-
-                total_salary_emi = (
-                    Loan.objects.filter(
-                        employee=employee,
-                        loan_type="salary",
-                        created_at__range=[start_date, end_date],
-                    ).aggregate(total_emi=Sum("emi"))["total_emi"]
-                    or 0
-                )
-
-                total_late_fine = (
-                    LateAttendanceFine.objects.filter(
-                        employee=employee, date__range=[start_date, end_date]
-                    ).aggregate(late_fine=Sum("total_late_attendance_fine"))[
-                        "late_fine"
-                    ]
-                    or 0
-                )
-
-                tin = employee.tax_info or ""
-
-                employee_salary_data.append(
-                    {
-                        "index": len(employee_salary_data) + 1,
-                        "name": employee.full_name,
-                        "designation": employee.designation.title,
-                        "tin": tin,
-                        "gross_salary": total_gross_salary,
-                        "basic_salary": total_basic_salary,
-                        "house_allowance": total_house_allowance,
-                        "conveyance": total_conveyance,
-                        "medical_allowance": total_medical_allowance,
-                        "project_bonus": total_project_bonus,
-                        "overtime": total_overtime,
-                        "festival_bonus": total_festival_bonus,
-                        "leave_bonus": total_leave_bonus,
-                        "food_allowance": total_food_allowance,
-                        "tds": total_tds,
-                        "salary_loan": total_salary_emi,
-                        "late_fine": total_late_fine,
-                        "chalan_no": tressury_challn_no,
-                    }
-                )
-
-        # Generate Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Salary Report"
-
-        # Headers for Excel sheet
-        headers = [
-            "SL No",
-            "Name of Employee",
-            "Designation",
-            "TIN",
-            "Total Salary",
-            "Basic (55%)",
-            "House Allowance (20%)",
-            "Conveyance (15%)",
-            "Medical Allowance (10%)",
-            "Project Bonus",
-            "Overtime",
-            "Festival Bonus",
-            "Leave Bonus",
-            "Food Allowance",
-            "TDS",
-            "Salary Loan EMI",
-            "Late Fine",
-            "Treasury Challan No",
-        ]
-        ws.append(headers)
-
-        # Populate Excel rows
-        for data in employee_salary_data:
-            ws.append(
-                [
-                    data["index"],
-                    data["name"],
-                    data["designation"],
-                    data["tin"],
-                    data["gross_salary"],
-                    data["basic_salary"],
-                    data["house_allowance"],
-                    data["conveyance"],
-                    data["medical_allowance"],
-                    data["project_bonus"],
-                    data["overtime"],
-                    data["festival_bonus"],
-                    data["leave_bonus"],
-                    data["food_allowance"],
-                    data["tds"],
-                    data["salary_loan"],
-                    data["late_fine"],
-                    data["chalan_no"],
-                ]
-            )
-
-        # Save workbook to HTTP response
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        response["Content-Disposition"] = (
-            f"attachment; filename=Salary_Report_{start_date}_to_{end_date}.xlsx"
-        )
-        wb.save(response)
-        return response
+        return SalaryReportBuilder(
+            salary_report.start_date, salary_report.end_date
+        ).excel_response()
@@ -0,0 +1,120 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management import BaseCommand
+from django.db import connection, reset_queries
+from django.utils import timezone
+
+from account.models import SalarySheet
+from account.repository.SalarySheetRepository import EmployeeTaxLoanRepository
+from account.services.tax import IncomeTaxCalculator, calculate_monthly_tds
+from employee.models import Employee, SalaryHistory
+
+
+class Command(BaseCommand):
+    help = "Compare the batch income tax calculator with EmployeeTaxLoanRepository (parity and speed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=5000, help="Synthetic payroll size")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--live",
+            action="store_true",
+            help="Use the active employees of the database instead of a synthetic payroll",
+        )
+
+    def handle(self, *args, **options):
+        if options["live"]:
+            self.benchmark_live()
+        else:
+            self.benchmark_synthetic(options["size"], options["seed"])
+
+    def benchmark_synthetic(self, size, seed):
+        rand = random.Random(seed)
+        date = timezone.now().date().strftime("%Y-%m-%d")
+        salary_sheet = SalarySheet(date=timezone.now().date())
+        monthly_gross = [float(rand.randrange(15000, 600000, 50)) for _ in range(size)]
+        genders = [rand.choice(["male", "female", "other"]) for _ in range(size)]
+        investments = [Decimal(rand.choice([0, 0, 50000, 250000])) for _ in range(size)]
+        vehicle_taxes = [Decimal(rand.choice([0, 0, 0, 25000, 50000])) for _ in range(size)]
+
+        started = time.perf_counter()
+        expected = [
+            EmployeeTaxLoanRepository(
+                employee=Employee(gender=gender),
+                date=date,
+                salary_sheet=salary_sheet,
+                current_salary=SalaryHistory(payable_salary=gross),
+                total_investment=investment,
+                total_vehicle_rebate=vehicle_tax,
+            ).calculate_tax_loan()
+            for gross, gender, investment, vehicle_tax in zip(
+                monthly_gross, genders, investments, vehicle_taxes
+            )
+        ]
+        per_object = time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = IncomeTaxCalculator(
+            monthly_gross, genders, investments, vehicle_taxes
+        ).calculate()["monthly_tds"]
+        batch = time.perf_counter() - started
+
+        self.report(size, expected, actual, per_object, batch)
+
+    def benchmark_live(self):
+        date = timezone.now().date().strftime("%Y-%m-%d")
+        employees = list(
+            Employee.objects.filter(active=True, tax_eligible=True).exclude(
+                salaryhistory__isnull=True
+            )
+        )
+
+        reset_queries()
+        started = time.perf_counter()
+        expected = [
+            EmployeeTaxLoanRepository(employee=employee, date=date).calculate_tax_loan()
+            for employee in employees
+        ]
+        per_object = time.perf_counter() - started
+        per_object_queries = len(connection.queries)
+
+        reset_queries()
+        started = time.perf_counter()
+        salary_sheet_date = timezone.now().date().replace(day=1)
+        payable_salaries = {}
+        for history in SalaryHistory.objects.filter(
+            employee__in=employees, active_from__lte=salary_sheet_date
+        ).order_by("id"):
+            payable_salaries[history.employee_id] = history.payable_salary
+        for history in SalaryHistory.objects.filter(employee__in=employees).order_by("id"):
+            payable_salaries.setdefault(history.employee_id, history.payable_salary)
+        monthly_tds = calculate_monthly_tds(employees, payable_salaries)
+        actual = [monthly_tds[employee.id] for employee in employees]
+        batch = time.perf_counter() - started
+        batch_queries = len(connection.queries)
+
+        self.report(len(employees), expected, actual, per_object, batch)
+        self.stdout.write(
+            f"Queries: per object {per_object_queries} (needs DEBUG=True), batch {batch_queries}"
+        )
+
+    def report(self, size, expected, actual, per_object, batch):
+        mismatches = [
+            index for index, (left, right) in enumerate(zip(expected, actual)) if left != right
+        ]
+        self.stdout.write(f"Employees: {size}")
+        self.stdout.write(f"Per object: {per_object:.4f}s")
+        self.stdout.write(f"Batch: {batch:.4f}s")
+        if batch:
+            self.stdout.write(f"Speedup: {per_object / batch:.1f}x")
+        if mismatches:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"{len(mismatches)} mismatches, first at index {mismatches[0]}: "
+                    f"{expected[mismatches[0]]} != {actual[mismatches[0]]}"
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Parity: all monthly TDS values match"))
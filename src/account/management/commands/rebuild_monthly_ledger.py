@@ -0,0 +1,27 @@
+from dateutil.relativedelta import relativedelta
+from django.core.management import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from account.services.ledger import rebuild_monthly_ledgers
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly profit and loss ledger (backfill or repair)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=24, help="Months back from today")
+        parser.add_argument("--from", dest="from_date", help="Start date, YYYY-MM-DD")
+        parser.add_argument("--to", dest="to_date", help="End date, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        end_date = parse_date(options["to_date"] or "") or timezone.now().date()
+        start_date = parse_date(options["from_date"] or "") or (
+            end_date - relativedelta(months=options["months"])
+        )
+        refreshed = rebuild_monthly_ledgers(start_date, end_date)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {refreshed} monthly ledgers from {start_date} to {end_date}"
+            )
+        )
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.8 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django_userforeignkey.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('account', '0171_delete_beftn'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalarySheetGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('festival_bonus', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', '⌛ Pending'), ('running', '⏳ Running'), ('completed', '✔ Completed'), ('failed', '⛔ Failed'), ('cancelled', '✖ Cancelled')], default='pending', max_length=20)),
+                ('employee_ids', models.JSONField(default=list)),
+                ('chunk_size', models.PositiveIntegerField(default=50)),
+                ('processed_chunks', models.PositiveIntegerField(default=0)),
+                ('processed_employees', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', django_userforeignkey.models.fields.UserForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='account_salarysheetgeneration_related', to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+                ('salary_sheet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='account.salarysheet')),
+            ],
+            options={
+                'verbose_name': 'Salary Sheet Generation',
+                'verbose_name_plural': 'Salary Sheet Generations',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0172_salarysheetgeneration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField(help_text='First day of the month', unique=True)),
+                ('salary', models.FloatField(default=0.0)),
+                ('expense', models.FloatField(default=0.0)),
+                ('loan_expense', models.FloatField(default=0.0)),
+                ('income', models.FloatField(default=0.0, help_text='Approved income')),
+                ('pending_income', models.FloatField(default=0.0)),
+                ('hold_income', models.FloatField(default=0.0)),
+                ('profit_share_paid', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name': 'Monthly Ledger',
+                'verbose_name_plural': 'Monthly Ledgers',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+RESUME_TASK = "account.tasks.resume_salary_sheet_generation"
+
+
+def add_schedule(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func=RESUME_TASK,
+        defaults={
+            "name": "Resume salary sheet generation",
+            "schedule_type": "I",
+            "minutes": 5,
+            "repeats": -1,
+        },
+    )
+
+
+def remove_schedule(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(func=RESUME_TASK).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0173_monthlyledger'),
+        ('django_q', '0013_task_attempt_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_schedule, remove_schedule),
+    ]
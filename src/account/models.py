@@ -458,6 +458,29 @@ class LoanPayment(TimeStampMixin, AuthorMixin):
     note = models.TextField(null=True, blank=True)
 
 
+class MonthlyLedger(TimeStampMixin):
+    """
+    Profit and loss figures of a month
+
+    Rolled up from SalarySheet, Expense, LoanPayment, Income and ProfitShare rows
+    by account.services.ledger, the balance summary reads it instead of the
+    source tables.
+    """
+
+    month = models.DateField(unique=True, help_text="First day of the month")
+    salary = models.FloatField(default=0.0)
+    expense = models.FloatField(default=0.0)
+    loan_expense = models.FloatField(default=0.0)
+    income = models.FloatField(default=0.0, help_text="Approved income")
+    pending_income = models.FloatField(default=0.0)
+    hold_income = models.FloatField(default=0.0)
+    profit_share_paid = models.FloatField(default=0.0)
+
+    class Meta:
+        verbose_name = "Monthly Ledger"
+        verbose_name_plural = "Monthly Ledgers"
+
+
 class Invoice(TimeStampMixin, AuthorMixin):
     serial_no = models.IntegerField()
     client = models.ForeignKey(Client, on_delete=models.RESTRICT)
@@ -558,6 +581,76 @@ class SalarySheetTaxLoan(models.Model):
         verbose_name_plural = "Salary Sheet Tax Loans"
 
 
+class SalarySheetGeneration(TimeStampMixin, AuthorMixin):
+    """Background salary sheet generation job
+
+    Employees are processed in chunks by account.tasks.generate_salary_sheet,
+    processed_chunks is the checkpoint a crashed job resumes from.
+    """
+
+    STATUS_CHOICE = (
+        ("pending", "⌛ Pending"),
+        ("running", "⏳ Running"),
+        ("completed", "✔ Completed"),
+        ("failed", "⛔ Failed"),
+        ("cancelled", "✖ Cancelled"),
+    )
+    salary_sheet = models.ForeignKey(SalarySheet, on_delete=models.CASCADE)
+    festival_bonus = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICE, default="pending"
+    )
+    employee_ids = models.JSONField(default=list)
+    chunk_size = models.PositiveIntegerField(default=50)
+    processed_chunks = models.PositiveIntegerField(default=0)
+    processed_employees = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def total_employees(self):
+        return len(self.employee_ids)
+
+    @property
+    def total_chunks(self):
+        return -(-self.total_employees // self.chunk_size)
+
+    @property
+    def is_finished(self):
+        return self.processed_chunks >= self.total_chunks
+
+    @property
+    def progress(self):
+        if not self.total_employees:
+            return 100
+        return floor(self.processed_employees * 100 / self.total_employees)
+
+    def get_chunk(self, index):
+        return self.employee_ids[
+            index * self.chunk_size : (index + 1) * self.chunk_size
+        ]
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "processed_employees": self.processed_employees,
+            "total_employees": self.total_employees,
+            "processed_chunks": self.processed_chunks,
+            "total_chunks": self.total_chunks,
+            "error": self.error,
+            "finished_at": self.finished_at,
+        }
+
+    def __str__(self):
+        return f"{self.salary_sheet} - {self.status}"
+
+    class Meta:
+        verbose_name = "Salary Sheet Generation"
+        verbose_name_plural = "Salary Sheet Generations"
+
+
 @receiver(pre_delete, sender=SalarySheet)
 @transaction.atomic
 def delete_related_loans(sender, instance, **kwargs):
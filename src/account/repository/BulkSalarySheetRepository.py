@@ -0,0 +1,668 @@
+import calendar
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from account.models import (
+    EmployeeSalary,
+    Loan,
+    LoanPayment,
+    SalarySheet,
+    SalarySheetTaxLoan,
+)
+from account.services.ledger import schedule_ledger_refresh
+from account.services.salary_report import invalidate_salary_reports
+from account.services.tax import calculate_monthly_tds
+from employee.models import Employee, Leave, Overtime, Resignation, SalaryHistory
+from employee.models.config import Config
+from employee.models.employee import LateAttendanceFine
+from project_management.models import CodeReview, EmployeeProjectHour, ProjectHour
+
+TDS_WITNESS_EMPLOYEE_ID = 30
+
+
+class BulkSalarySheetRepository:
+    """Set based salary sheet generator
+
+    Produces the same EmployeeSalary rows as SalarySheetRepository but loads
+    every input of the month in a fixed number of grouped queries, computes
+    the components in memory and writes them with bulk_create / bulk_update
+    inside a single transaction.
+    """
+
+    def __init__(self, date, festival_bonus=False, employee_ids=None):
+        self.date = date
+        self.festival_bonus = festival_bonus
+        self.employee_ids = employee_ids
+        self.salary_sheet = None
+
+    def save(self):
+        """Generate and Save Salary Sheet
+
+        @return SalarySheet:
+        """
+        salary_date = datetime.strptime(self.date, "%Y-%m-%d").date()
+        with transaction.atomic():
+            self.salary_sheet = self.get_or_create_sheet(salary_date)
+            self.generate(self.get_employees(salary_date))
+        return self.salary_sheet
+
+    def get_or_create_sheet(self, salary_date):
+        salary_sheet, created = SalarySheet.objects.get_or_create(
+            date__month=salary_date.month,
+            date__year=salary_date.year,
+            defaults={"date": salary_date},
+        )
+        salary_sheet.festival_bonus = self.festival_bonus
+        salary_sheet.save()
+        self.salary_sheet = salary_sheet
+        return salary_sheet
+
+    def get_employees(self, salary_date):
+        """All eligible employee for salary, optionally limited to employee_ids"""
+        employees = (
+            Employee.objects.filter(active=True, joining_date__lte=salary_date)
+            .exclude(salaryhistory__isnull=True)
+            .select_related("leave_management", "pay_scale")
+        )
+        if self.employee_ids is not None:
+            employees = employees.filter(id__in=self.employee_ids)
+        return employees
+
+    def generate(self, employees):
+        """Calculate and write the salary of the given employees
+
+        @param employees: iterable of Employee (leave_management and pay_scale selected)
+        @return list: saved EmployeeSalary objects
+        """
+        employees = list(employees)
+        if not employees:
+            return []
+
+        salary_sheet = self.salary_sheet
+        context = self.__load_context(salary_sheet, employees)
+
+        self.__create_tax_loans(salary_sheet, employees, context)
+        context["tds_emi"] = self.__post_tds_loan_payments(salary_sheet, employees)
+
+        existing_salaries = {
+            employee_salary.employee_id: employee_salary
+            for employee_salary in EmployeeSalary.objects.filter(
+                salary_sheet=salary_sheet,
+                employee_id__in=context["employee_ids"],
+            )
+        }
+        to_create, to_update = [], []
+        now = timezone.now()
+        for employee in employees:
+            employee_salary = existing_salaries.get(employee.id)
+            if employee_salary is None:
+                employee_salary = EmployeeSalary(
+                    employee=employee, salary_sheet=salary_sheet
+                )
+                to_create.append(employee_salary)
+            else:
+                employee_salary.updated_at = now
+                to_update.append(employee_salary)
+            self.__calculate_employee_salary(
+                employee_salary, salary_sheet, employee, context
+            )
+
+        EmployeeSalary.objects.bulk_create(to_create, batch_size=500)
+        EmployeeSalary.objects.bulk_update(
+            to_update,
+            [
+                "net_salary",
+                "overtime",
+                "leave_bonus",
+                "project_bonus",
+                "code_quality_bonus",
+                "festival_bonus",
+                "food_allowance",
+                "device_allowance",
+                "loan_emi",
+                "provident_fund",
+                "gross_salary",
+                "updated_at",
+            ],
+            batch_size=500,
+        )
+        # bulk writes skip the signals the salary report cache and ledger listen to
+        transaction.on_commit(invalidate_salary_reports)
+        schedule_ledger_refresh([salary_sheet.date])
+        return to_create + to_update
+
+    # ------------------------------------------------------------------
+    # Prefetch
+    # ------------------------------------------------------------------
+    def __load_context(self, salary_sheet: SalarySheet, employees):
+        date = salary_sheet.date
+        month, year = date.month, date.year
+        month_start = date.replace(day=1)
+        month_end = date.replace(day=calendar.monthrange(year, month)[1])
+        employee_ids = [employee.id for employee in employees]
+        context = {"employee_ids": employee_ids}
+
+        # salary history: the one active at the start of month, fallback to latest
+        month_salary, latest_salary = {}, {}
+        for history in SalaryHistory.objects.filter(
+            employee_id__in=employee_ids
+        ).order_by("id"):
+            latest_salary[history.employee_id] = history
+            if history.active_from <= month_start:
+                month_salary[history.employee_id] = history
+        context["salary"] = {
+            employee_id: month_salary.get(employee_id, latest_salary.get(employee_id))
+            for employee_id in employee_ids
+        }
+
+        # approved resignations, first by id wins just like queryset.first()
+        first_resignation, month_resignation = {}, {}
+        for resignation in Resignation.objects.filter(
+            employee_id__in=employee_ids, status="approved"
+        ).order_by("id"):
+            first_resignation.setdefault(resignation.employee_id, resignation)
+            if resignation.date <= date:
+                month_resignation.setdefault(resignation.employee_id, resignation)
+        context["resignation_date"] = {
+            employee_id: resignation.date
+            for employee_id, resignation in first_resignation.items()
+        }
+        context["resigned"] = month_resignation
+
+        context["overtime"] = self.__group(
+            Overtime.objects.filter(
+                employee_id__in=employee_ids,
+                date__month=month,
+                date__year=year,
+                status="approved",
+            ),
+            "employee_id",
+            total=Count("id"),
+        )
+
+        month_leaves = Leave.objects.filter(
+            employee_id__in=employee_ids,
+            start_date__month=month,
+            start_date__year=year,
+            end_date__year=year,
+            end_date__month=month,
+            status="approved",
+        )
+        non_paid = month_leaves.filter(
+            leave_type__in=["non_paid", "half_day_non_paid"]
+        ).values("employee_id").order_by().annotate(
+            non_paid_count=Count("id", filter=Q(leave_type="non_paid")),
+            half_day_count=Count("id", filter=Q(leave_type="half_day_non_paid")),
+            non_paid_total=Sum("total_leave", filter=Q(leave_type="non_paid")),
+        )
+        context["non_paid_days"], context["non_paid_total"] = {}, {}
+        for row in non_paid:
+            context["non_paid_days"][row["employee_id"]] = (
+                row["non_paid_count"] * 1.0 + row["half_day_count"] * 0.5
+            )
+            context["non_paid_total"][row["employee_id"]] = row["non_paid_total"]
+
+        leave_passed = defaultdict(dict)
+        for row in (
+            Leave.objects.filter(
+                employee_id__in=employee_ids, end_date__year=year, status="approved"
+            )
+            .values("employee_id", "leave_type")
+            .order_by()
+            .annotate(total=Coalesce(Sum("total_leave"), 0.0))
+        ):
+            leave_passed[row["employee_id"]][row["leave_type"]] = row["total"]
+        context["leave_passed"] = leave_passed
+
+        context["project_hours"] = self.__group(
+            EmployeeProjectHour.objects.filter(
+                employee_id__in=employee_ids,
+                project_hour__date__month=month,
+                project_hour__date__year=year,
+            ),
+            "employee_id",
+            total=Coalesce(Sum("hours"), 0.0),
+        )
+        context["hours_as_lead"] = self.__group(
+            EmployeeProjectHour.objects.filter(
+                employee_id__in=employee_ids,
+                project_hour__date__month=month,
+                project_hour__date__year=year,
+                project_hour__manager_id=F("employee_id"),
+            ),
+            "employee_id",
+            total=Coalesce(Sum("hours"), 0.0),
+        )
+        context["lead_project_hours"] = self.__group(
+            ProjectHour.objects.filter(
+                manager_id__in=employee_ids,
+                date__month=month,
+                date__year=year,
+                payable=True,
+            ),
+            "manager_id",
+            total=Coalesce(Sum("hours"), 0.0),
+        )
+
+        manager_review_points = defaultdict(float)
+        for review in (
+            CodeReview.objects.filter(
+                manager_id__in=employee_ids,
+                created_at__month=month,
+                created_at__year=year,
+            )
+            .values("manager_id", "employee")
+            .order_by()
+            .annotate(Sum("avg_rating"), Count("id"))
+        ):
+            manager_review_points[review["manager_id"]] += (
+                review.get("avg_rating__sum") / review.get("id__count") / 2
+            )
+        context["manager_review_points"] = manager_review_points
+        context["code_review_avg"] = self.__group(
+            CodeReview.objects.filter(
+                employee_id__in=employee_ids,
+                created_at__month=month,
+                created_at__year=year,
+            ),
+            "employee_id",
+            total=Coalesce(Avg("avg_rating"), 0.0),
+        )
+        config = Config.objects.first()
+        qc_ratio = config.qc_bonus_amount if config else None
+        context["qc_ratio"] = qc_ratio if qc_ratio else 0
+
+        context["late_count"] = self.__group(
+            LateAttendanceFine.objects.filter(
+                employee_id__in=employee_ids,
+                month=month,
+                year=year,
+                is_consider=False,
+            ),
+            "employee_id",
+            total=Count("id"),
+        )
+        context["salary_loan"] = self.__group(
+            Loan.objects.filter(
+                employee_id__in=employee_ids,
+                start_date__lte=month_end,
+                end_date__gte=month_start,
+                loan_type="salary",
+            ),
+            "employee_id",
+            total=Sum("emi"),
+        )
+        return context
+
+    @staticmethod
+    def __group(queryset, key, total):
+        """Run one grouped query and return {key: total}"""
+        return {
+            row[key]: row["total"]
+            for row in queryset.values(key).order_by().annotate(total=total)
+        }
+
+    # ------------------------------------------------------------------
+    # Loans
+    # ------------------------------------------------------------------
+    def __create_tax_loans(self, salary_sheet: SalarySheet, employees, context):
+        """Create the monthly TDS loan for every tax eligible employee who
+        does not have one on this salary sheet yet"""
+        already_taxed = set(
+            SalarySheetTaxLoan.objects.filter(
+                salarysheet=salary_sheet,
+                loan__employee_id__in=context["employee_ids"],
+            ).values_list("loan__employee_id", flat=True)
+        )
+        tax_employees = [
+            employee
+            for employee in employees
+            if employee.tax_eligible and employee.id not in already_taxed
+        ]
+        if not tax_employees:
+            return
+
+        monthly_tds = calculate_monthly_tds(
+            tax_employees,
+            {
+                employee.id: context["salary"][employee.id].payable_salary
+                for employee in tax_employees
+            },
+        )
+
+        loans = []
+        witness = None
+        for employee in tax_employees:
+            monthly_tax = monthly_tds[employee.id]
+            if monthly_tax > 0:
+                if witness is None:
+                    witness = Employee.objects.filter(
+                        id=TDS_WITNESS_EMPLOYEE_ID
+                    ).first()
+                loans.append(
+                    Loan(
+                        employee=employee,
+                        witness=witness,
+                        loan_amount=monthly_tax,
+                        emi=monthly_tax,
+                        effective_date=timezone.now(),
+                        start_date=salary_sheet.date,
+                        end_date=salary_sheet.date,
+                        tenor=1,
+                        payment_method="salary",
+                        loan_type="tds",
+                    )
+                )
+        if not loans:
+            return
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            Loan.objects.bulk_create(loans, batch_size=500)
+        else:
+            # MySQL does not return primary keys from bulk_create and reading
+            # them back could pick up loans written by another transaction
+            for loan in loans:
+                loan.save()
+        SalarySheetTaxLoan.objects.bulk_create(
+            [
+                SalarySheetTaxLoan(salarysheet=salary_sheet, loan_id=loan.id)
+                for loan in loans
+            ],
+            batch_size=500,
+        )
+
+    def __post_tds_loan_payments(self, salary_sheet: SalarySheet, employees):
+        """Insert the automated loan payment of every running TDS loan and
+        return the EMI total per employee"""
+        salary_date = salary_sheet.date
+        note = f"This payment has been made automated when salary sheet generated at {salary_date}"
+        tds_loans = list(
+            Loan.objects.filter(
+                employee_id__in=[employee.id for employee in employees],
+                start_date__lte=salary_date,
+                end_date__gte=salary_date,
+                loan_type="tds",
+            ).only("id", "employee_id", "emi")
+        )
+        paid = set(
+            LoanPayment.objects.filter(
+                loan_id__in=[loan.id for loan in tds_loans],
+                note=note,
+                payment_date=salary_date,
+            ).values_list("loan_id", "payment_amount")
+        )
+        LoanPayment.objects.bulk_create(
+            [
+                LoanPayment(
+                    loan_id=loan.id,
+                    payment_amount=loan.emi,
+                    note=note,
+                    payment_date=salary_date,
+                )
+                for loan in tds_loans
+                if (loan.id, loan.emi) not in paid
+            ],
+            batch_size=500,
+        )
+        emi = defaultdict(float)
+        for loan in tds_loans:
+            emi[loan.employee_id] += loan.emi
+        return emi
+
+    # ------------------------------------------------------------------
+    # Components, mirrors SalarySheetRepository
+    # ------------------------------------------------------------------
+    def __calculate_employee_salary(
+        self, employee_salary, salary_sheet: SalarySheet, employee: Employee, context
+    ):
+        current_salary = context["salary"][employee.id]
+        payable_salary = current_salary.payable_salary
+        date = salary_sheet.date
+        days_in_month = calendar.monthrange(date.year, date.month)[1]
+
+        employee_salary.net_salary = self.__calculate_net_salary(
+            date, employee, payable_salary, context["resigned"].get(employee.id)
+        )
+        employee_salary.overtime = (payable_salary / 15) * context["overtime"].get(
+            employee.id, 0
+        )
+        employee_salary.leave_bonus = (
+            self.__calculate_non_paid_leave(
+                payable_salary, days_in_month, context["non_paid_days"].get(employee.id)
+            )
+            + self.__calculate_leave_in_cash(date, employee, payable_salary, context)
+            + self.__resignation_employee_non_paid_leave(
+                date, employee, payable_salary, context
+            )
+        )
+        employee_salary.project_bonus = self.__calculate_project_bonus(
+            employee, context
+        )
+        employee_salary.code_quality_bonus = round(
+            (
+                (context["manager_review_points"].get(employee.id, 0) if employee.manager else 0)
+                + context["code_review_avg"].get(employee.id, 0.0)
+            )
+            * context["qc_ratio"],
+            2,
+        )
+        employee_salary.festival_bonus = self.__calculate_festival_bonus(
+            date, employee, payable_salary
+        )
+        employee_salary.food_allowance = self.__calculate_food_allowance(
+            date, employee, context
+        )
+        employee_salary.device_allowance = 2500.0 if employee.device_allowance else 0.0
+        employee_salary.provident_fund = 0.0
+
+        tds_emi = context["tds_emi"].get(employee.id)
+        employee_salary.loan_emi = -tds_emi if tds_emi else 0.0
+
+        late_count = context["late_count"].get(employee.id, 0)
+        total_fine = 0.00
+        if late_count > 3:
+            total_fine += (min(late_count, 6) - 3) * 80.00
+            if late_count > 6:
+                total_fine += (late_count - 6) * 500.00
+        total_fine = -float(total_fine) if total_fine > 0 else 0.00
+
+        salary_loan = context["salary_loan"].get(employee.id)
+        salary_loans = -salary_loan if salary_loan else 0
+
+        employee_salary.gross_salary = (
+            employee_salary.net_salary
+            + employee_salary.overtime
+            + employee_salary.festival_bonus
+            + employee_salary.food_allowance
+            + employee_salary.leave_bonus
+            + employee_salary.project_bonus
+            + employee_salary.code_quality_bonus
+            + employee_salary.loan_emi
+            + employee_salary.provident_fund
+            + total_fine
+            + salary_loans
+        )
+        return employee_salary
+
+    @staticmethod
+    def __calculate_net_salary(date, employee: Employee, payable_salary, resigned):
+        working_days = calendar.monthrange(date.year, date.month)[1]
+        working_days_after_join, working_days_after_resign = 0, 0
+        if employee.joining_date.strftime("%Y-%m") == date.strftime("%Y-%m"):
+            working_days_after_join = (working_days + 1) - employee.joining_date.day
+        if resigned:
+            working_days_after_resign = working_days - resigned.date.day
+        if employee.joining_date.strftime("%Y-%m") < date.strftime("%Y-%m") and resigned:
+            working_days_after_join = working_days
+        payable_days = working_days_after_join - working_days_after_resign
+        if payable_days == 0:
+            return int(payable_salary)
+        return int((payable_salary / working_days) * payable_days)
+
+    @staticmethod
+    def __calculate_non_paid_leave(payable_salary, days_in_month, equivalent_full_days):
+        if equivalent_full_days:
+            return -(payable_salary / days_in_month) * equivalent_full_days
+        return 0
+
+    @staticmethod
+    def __leave_passed(context, employee: Employee, leave_type: str):
+        """Same as Employee.leave_passed for the salary sheet year"""
+        passed = context["leave_passed"].get(employee.id, {})
+        half_day = 0.0
+        if leave_type == "casual":
+            half_day = passed.get("half_day", 0.0) * 0.5
+        elif leave_type == "medical":
+            half_day = passed.get("half_day_medical", 0.0) * 0.5
+        return half_day + passed.get(leave_type, 0.0)
+
+    @staticmethod
+    def __leave_available_leaveincash(
+        employee: Employee, leave_type: str, year_end, resignation_date
+    ):
+        """Same as Employee.leave_available_leaveincash with a preloaded resignation date"""
+        available_leave = 0
+        get_leave_by_type = getattr(employee.leave_management, leave_type)
+
+        if employee.leave_in_cash_eligibility and employee.permanent_date:
+            if resignation_date:
+                total_days_of_permanent = (resignation_date - employee.joining_date).days
+            else:
+                total_days_of_permanent = (year_end - employee.joining_date).days
+
+            month_of_permanent = round(total_days_of_permanent / 30)
+            if month_of_permanent < 12:
+                available_leave = (month_of_permanent * get_leave_by_type) / 12
+            else:
+                available_leave = get_leave_by_type
+
+            decimal_number = available_leave - int(available_leave)
+            if decimal_number < 0.50:
+                return float("{:.2f}".format(round(available_leave)))
+            return math.floor(available_leave) + 0.50
+
+        return round(available_leave)
+
+    def __calculate_leave_in_cash(self, date, employee: Employee, payable_salary, context):
+        if not (
+            date.month == 12
+            and employee.leave_in_cash_eligibility
+            and employee.permanent_date is not None
+        ):
+            return 0
+        one_day_salary = payable_salary / calendar.monthrange(date.year, date.month)[1]
+        payable_casual_leave = self.__leave_available_leaveincash(
+            employee, "casual_leave", date, context["resignation_date"].get(employee.id)
+        ) - self.__leave_passed(context, employee, "casual")
+        return (
+            (payable_casual_leave * employee.pay_scale.leave_in_cash_casual) / 100
+        ) * one_day_salary
+
+    def __resignation_employee_non_paid_leave(
+        self, date, employee: Employee, payable_salary, context
+    ):
+        resignation_date = context["resignation_date"].get(employee.id)
+        if not resignation_date:
+            return 0
+        one_day_salary = payable_salary / 30
+        medical_non_paid_amount = 0
+        casual_non_paid_amount = 0
+        available_medical_leave = self.__leave_available_leaveincash(
+            employee, "medical_leave", date, resignation_date
+        )
+        passed_medical_leave = self.__leave_passed(context, employee, "medical")
+        if passed_medical_leave > available_medical_leave:
+            medical_non_paid_amount = (
+                available_medical_leave - passed_medical_leave
+            ) * one_day_salary
+
+        available_casual_leave = self.__leave_available_leaveincash(
+            employee, "casual_leave", date, resignation_date
+        )
+        passed_casual_leave = self.__leave_passed(context, employee, "casual")
+        if passed_casual_leave > available_casual_leave:
+            casual_non_paid_amount = (
+                available_casual_leave - passed_casual_leave
+            ) * one_day_salary
+
+        return medical_non_paid_amount + casual_non_paid_amount
+
+    @staticmethod
+    def __calculate_project_bonus(employee: Employee, context):
+        project_hours_amount = 0
+        project_hours_amount += context["project_hours"].get(employee.id, 0.0) * 10
+        if employee.manager or employee.lead:
+            project_hours_amount += (
+                context["lead_project_hours"].get(employee.id, 0.0)
+                - context["hours_as_lead"].get(employee.id, 0.0)
+            ) * 10
+        return project_hours_amount
+
+    def __calculate_festival_bonus(self, date, employee: Employee, payable_salary):
+        """See SalarySheetRepository.__calculate_festival_bonus for the policy"""
+        if not self.festival_bonus or not employee.permanent_date:
+            return 0
+
+        basic_salary = (payable_salary * 55) / 100
+        joining_date = employee.joining_date
+        if joining_date < datetime(2024, 1, 1).date():
+            if joining_date + timedelta(days=180) < date:
+                return basic_salary
+            for days, percent in ((150, 75), (120, 50), (90, 25), (60, 10), (30, 5)):
+                if joining_date + timedelta(days=days) <= date:
+                    return round((basic_salary * percent) / 100, 2)
+            return 0
+
+        delta = relativedelta(date, joining_date)
+        days_since_joining = ((delta.years * 12 + delta.months) * 30) + delta.days
+        if days_since_joining < 90:
+            return 0
+        for days, percent in ((150, 20), (210, 40), (270, 60), (330, 80), (360, 90)):
+            if days_since_joining < days:
+                return round((basic_salary * percent) / 100, 2)
+        return basic_salary
+
+    @staticmethod
+    def __calculate_food_allowance(date, employee: Employee, context):
+        if not employee.lunch_allowance:
+            return 0.0
+
+        resigned = context["resigned"].get(employee.id)
+        total_non_paid_leave = context["non_paid_total"].get(employee.id)
+
+        if (
+            employee.joining_date.year == date.year
+            and employee.joining_date.month == date.month
+        ):
+            last_day_of_month = timezone.datetime(date.year, date.month, 1) + timedelta(
+                days=32
+            )
+            last_day_of_month = last_day_of_month.replace(day=1) - timedelta(days=1)
+            joining_datetime = timezone.datetime(
+                employee.joining_date.year,
+                employee.joining_date.month,
+                employee.joining_date.day,
+            )
+            days_count = (last_day_of_month - joining_datetime).days + 1
+            if total_non_paid_leave:
+                days_count += total_non_paid_leave
+            return min(days_count * 100, 3000)
+        elif resigned:
+            first_day_of_month = timezone.datetime(date.year, date.month, 1)
+            days_count = (resigned.date - first_day_of_month.date()).days + 1
+            if total_non_paid_leave:
+                days_count -= total_non_paid_leave
+            return min(days_count * 100, 3000)
+        else:
+            if not total_non_paid_leave:
+                return 3000
+            if total_non_paid_leave > 30:
+                return 0.00
+            return 3000 - (total_non_paid_leave * 100)
@@ -44,25 +44,44 @@ class EmployeeTaxLoanRepository:
     __salary_sheet = SalarySheet()
     __employee_current_salary = SalaryHistory()
 
-    def __init__(self, employee: Employee, date):
+    def __init__(
+        self,
+        employee: Employee,
+        date,
+        salary_sheet: SalarySheet = None,
+        current_salary: SalaryHistory = None,
+        total_investment: Decimal = None,
+        total_vehicle_rebate: Decimal = None,
+    ):
+        """
+        salary_sheet, current_salary, total_investment and total_vehicle_rebate
+        can be passed in when they are already loaded (i.e. bulk salary sheet
+        generation), otherwise they are fetched from database
+        """
         self.date = date
         self.salary_date = datetime.strptime(self.date, "%Y-%m-%d").date()
         self.salary_sheet = self.__salary_sheet
-        self.__salary_sheet, created = SalarySheet.objects.get_or_create(
-            date__month=self.salary_date.month,
-            date__year=self.salary_date.year,
-            defaults={"date": self.salary_date},
-        )
+        if salary_sheet is None:
+            salary_sheet, created = SalarySheet.objects.get_or_create(
+                date__month=self.salary_date.month,
+                date__year=self.salary_date.year,
+                defaults={"date": self.salary_date},
+            )
+        self.__salary_sheet = salary_sheet
         self.employee = employee
-        self.__employee_current_salary = employee.salaryhistory_set.filter(
-            active_from__lte=self.__salary_sheet.date.replace(day=1)
-        ).last()
-        if self.__employee_current_salary is None:
-            self.__employee_current_salary = self.employee.current_salary
+        if current_salary is None:
+            current_salary = employee.salaryhistory_set.filter(
+                active_from__lte=self.__salary_sheet.date.replace(day=1)
+            ).last()
+        if current_salary is None:
+            current_salary = self.employee.current_salary
+        self.__employee_current_salary = current_salary
         self.monthly_pay_amount = self.__employee_current_salary.payable_salary
         self.fiscal_start_date, self.fiscal_end_date = (
             get_fiscal_year_dates()
         )  # default 7th month if need adjust
+        self.__total_investment = total_investment
+        self.__total_vehicle_rebate = total_vehicle_rebate
 
     def calculate_tax_loan(self):
         taxable_income = self.get_yearly_gross_income() - self.get_exemption()
@@ -267,15 +286,18 @@ class EmployeeTaxLoanRepository:
         C. Maximum Limit = 1000000
         Allowable investment Allowance (Lower of A, B & C)
         """
-        total_investment = InvestmentAllowance.objects.filter(
-            employee=self.employee,
-            created_at__date__gte=self.fiscal_start_date,
-            created_at__date__lte=self.fiscal_end_date,
-        ).aggregate(
-            total_allowance=Coalesce(
-                Sum("amount"), Value(0.0), output_field=DecimalField()
+        if self.__total_investment is not None:
+            total_investment = {"total_allowance": self.__total_investment}
+        else:
+            total_investment = InvestmentAllowance.objects.filter(
+                employee=self.employee,
+                created_at__date__gte=self.fiscal_start_date,
+                created_at__date__lte=self.fiscal_end_date,
+            ).aggregate(
+                total_allowance=Coalesce(
+                    Sum("amount"), Value(0.0), output_field=DecimalField()
+                )
             )
-        )
         percentage_actual_invest = total_investment.get("total_allowance", 0) * Decimal(
             0.15
         )
@@ -285,6 +307,8 @@ class EmployeeTaxLoanRepository:
         return min([percentage_actual_invest, percentage_net_taxable_income, 1000000])
 
     def get_tax_for_vehicle(self):
+        if self.__total_vehicle_rebate is not None:
+            return self.__total_vehicle_rebate
         total = VehicleRebate.objects.filter(
             employee=self.employee,
             created_at__date__gte=self.fiscal_start_date,
@@ -954,27 +978,13 @@ class SalarySheetRepository:
     def __calculate_provident_fund(
         self, employee: Employee, salary_date: datetime.date
     ):
-        """Calculate provident fund amount if have any"""
-        return 0.0
-        if not employee.pf_eligibility:
-            return 0.0
-
-        pf_account = employee.pf_account
-        monthly_amount = 0
-        note = f"This payment has been made automated when salary sheet generated at {salary_date}"
-        basic_salary = (
-            employee.pay_scale.basic * self.__employee_current_salary.payable_salary
-        ) / 100
-        monthly_amount = (basic_salary * pf_account.scale) / 100
-
-        monthly_entry = employee.pf_account.monthlyentry_set.create(
-            tranx_date=salary_date,
-            amount=monthly_amount,
-            basic_salary=basic_salary,
-            note=note,
-        )
+        """Calculate provident fund amount if have any
 
-        return -monthly_amount if monthly_amount else 0.0
+        The deduction is disabled, the monthly entries of every eligible
+        account are posted in bulk by
+        provident_fund.services.posting.post_monthly_contributions
+        """
+        return 0.0
 
     # def __calculate_late_entry_fine(
     #     self, employee: Employee, salary_date: datetime.date
@@ -1,10 +1,9 @@
-from datetime import datetime, timedelta, date
+from datetime import timedelta, date
 
 from dateutil.relativedelta import relativedelta
-from django.db.models import Sum, Value
-from django.db.models.functions import Coalesce
 
-from account.models import SalarySheet, Expense, Income, ProfitShare, LoanPayment
+from account.models import MonthlyLedger
+from account.services.ledger import month_start, monthly_ledgers
 
 
 class BalanceSummery:
@@ -13,33 +12,24 @@ class BalanceSummery:
         context = {}
         end_date = date.today()
         start_date = end_date - timedelta(days=356)
+        ledgers = monthly_ledgers(start_date, end_date + relativedelta(months=1))
         result = []
         while start_date < end_date + relativedelta(months=1):
-            result.append(self._get_pl(start_date))
+            ledger = ledgers.get(month_start(start_date)) or MonthlyLedger()
+            result.append(self._get_pl(start_date, ledger))
             start_date += relativedelta(months=1)
         context['month_list'] = result[::-1]
         context['start_date'] = start_date
         context['end_date'] = end_date
-        print(result)
         return context
 
-    def _get_pl(self, date: date):
-        filter = {
-            'date__month': date.month,
-            'date__year': date.year
-        }
-        salary = SalarySheet.objects.filter(**filter).first()
-        salary = salary.total if salary else 0
-        expense = self.__sum_total(Expense.objects.filter(**filter).all(), 'amount')
-        loan_expense = self.__sum_total(
-            LoanPayment.objects.filter(payment_date__month=date.month, payment_date__year=date.year).all(),
-            'payment_amount')
-        income = self.__sum_total(Income.objects.filter(**filter).filter(status='approved').all(), 'payment')
-        pending_income = self.__sum_total(Income.objects.filter(**filter).filter(status='pending').all(), 'payment')
+    def _get_pl(self, date: date, ledger: MonthlyLedger):
+        expense = ledger.expense
+        loan_expense = ledger.loan_expense
+        salary = ledger.salary
+        income = ledger.income
         profit_share_with_rifat = ((income - (expense + salary + loan_expense)) * 25) / 100
-        payment_done = ProfitShare.objects.filter(**filter).filter(user_id=1).aggregate(
-            monthly_payment_amount=Coalesce(Sum('payment_amount'), Value(0.0))
-        )['monthly_payment_amount']
+        payment_done = ledger.profit_share_paid
 
         return {
             'expense': expense,
@@ -48,14 +38,8 @@ class BalanceSummery:
             'income': income,
             'date': date,
             'pl': income - (expense + salary + loan_expense),
-            'pending_income': pending_income,
+            'pending_income': ledger.pending_income,
             'rifat': profit_share_with_rifat,
             'payment': payment_done,
             'due': profit_share_with_rifat - payment_done
         }
-
-    def __sum_total(self, queryset, column):
-        total = queryset.aggregate(total=Sum(column))['total']
-        if total is None:
-            return 0
-        return total
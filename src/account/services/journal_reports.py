@@ -0,0 +1,283 @@
+"""
+Excel reports of an account journal
+
+The expenses of the journal month are read once and pivoted by day and expense
+group for every report, workbooks are written as native xlsx.
+"""
+from collections import OrderedDict, defaultdict
+from itertools import zip_longest
+
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.writer.excel import save_virtual_workbook
+
+from account.models import AccountJournal, Expense, Income
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+BOLD = Font(bold=True)
+
+
+def xlsx_response(wb, filename):
+    response = HttpResponse(
+        content=save_virtual_workbook(wb), content_type=XLSX_CONTENT_TYPE
+    )
+    response["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
+
+
+def _bold(work_sheet, values):
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(work_sheet, value=value)
+        cell.font = BOLD
+        cells.append(cell)
+    return cells
+
+
+def _by_account_code(group):
+    # null account codes first, as MySQL orders them
+    return group["account_code"] is not None, group["account_code"] or 0
+
+
+class JournalReports:
+    """
+    Account journal, group costs and balance sheet workbooks of a journal month
+
+    Expenses of the month are fetched in one query with a flag telling whether
+    the journal holds them, each report is pivoted from these rows.
+    """
+
+    def __init__(self, journal: AccountJournal):
+        self.journal = journal
+        self.month = journal.date
+        journal_expenses = AccountJournal.expenses.through.objects.filter(
+            accountjournal_id=journal.id, expense_id=OuterRef("pk")
+        )
+        self.rows = list(
+            Expense.objects.filter(
+                date__year=self.month.year, date__month=self.month.month
+            )
+            .annotate(in_journal=Exists(journal_expenses))
+            .order_by("date", "id")
+            .values_list(
+                "date",
+                "amount",
+                "note",
+                "add_to_balance_sheet",
+                "is_approved",
+                "in_journal",
+                "expanse_group_id",
+                "expanse_group__account_code",
+                "expanse_group__title",
+                "expanse_group__vds_rate",
+                "expanse_group__tds_rate",
+                named=True,
+            )
+        )
+
+    @staticmethod
+    def __group(groups, row):
+        group = groups.get(row.expanse_group_id)
+        if group is None:
+            group = groups[row.expanse_group_id] = {
+                "account_code": row.expanse_group__account_code,
+                "title": row.expanse_group__title,
+                "vds_rate": row.expanse_group__vds_rate,
+                "tds_rate": row.expanse_group__tds_rate,
+                "amount": 0,
+            }
+        group["amount"] += row.amount
+        return group
+
+    def daily_expenses(self):
+        """
+        Checked balance sheet expenses of the journal per day and expense group
+
+        Every day holding a journal expense is listed, the notes are those of
+        every expense of the group on the day.
+
+        @return list of tuple(date, list of group dict)
+        """
+        days = OrderedDict()
+        notes = defaultdict(list)
+        for row in self.rows:
+            if row.note:
+                notes[(row.date, row.expanse_group_id)].append(row.note)
+            if not row.in_journal:
+                continue
+            groups = days.setdefault(row.date, OrderedDict())
+            if row.add_to_balance_sheet and row.is_approved:
+                self.__group(groups, row)
+
+        daily_expenses = []
+        for day, groups in days.items():
+            for group_id, group in groups.items():
+                group["notes"] = ", ".join(notes[(day, group_id)])
+            daily_expenses.append(
+                (day, sorted(groups.values(), key=_by_account_code))
+            )
+        return daily_expenses
+
+    def group_costs(self):
+        """Balance sheet expenses of the journal per expense group with VDS and TDS"""
+        groups = OrderedDict()
+        for row in self.rows:
+            if row.in_journal and row.add_to_balance_sheet:
+                self.__group(groups, row)
+        for group in groups.values():
+            group["vds_amount"] = float(group["vds_rate"]) * group["amount"] / 100
+            group["tds_amount"] = float(group["tds_rate"]) * group["amount"] / 100
+        return sorted(groups.values(), key=_by_account_code)
+
+    def balance_expenses(self):
+        """Checked balance sheet expenses of the month per expense group title"""
+        titles = OrderedDict()
+        for row in self.rows:
+            if row.add_to_balance_sheet and row.is_approved:
+                title = row.expanse_group__title
+                titles[title] = titles.get(title, 0) + row.amount
+        return sorted(titles.items())
+
+    def incomes(self):
+        return list(
+            Income.objects.filter(
+                add_to_balance_sheet=True,
+                status="approved",
+                date__year=self.month.year,
+                date__month=self.month.month,
+            )
+            .order_by("date")
+            .values_list("date", "project__title", "payment")
+        )
+
+    def account_journal_excel(self):
+        wb = Workbook(write_only=True)
+        work_sheet = wb.create_sheet(title="Account Journal")
+        work_sheet.append(
+            _bold(work_sheet, ["Date", "Account code", "Head", "BDT", "", "Detail"])
+        )
+        work_sheet.append(_bold(work_sheet, ["", "", "", "Debit", "Credit", ""]))
+        for day, groups in self.daily_expenses():
+            daily_sum = sum(group["amount"] for group in groups)
+            for index, group in enumerate(groups):
+                work_sheet.append(
+                    [
+                        day if index == 0 else None,
+                        group["account_code"],
+                        group["title"],
+                        group["amount"],
+                        None,
+                        group["notes"],
+                    ]
+                )
+            work_sheet.append([])
+            work_sheet.append([])
+            work_sheet.append([None, None, "Cash in hand", None, daily_sum])
+            work_sheet.append(
+                [None, None] + _bold(work_sheet, ["Total", daily_sum, daily_sum])
+            )
+            work_sheet.append([])
+        return xlsx_response(wb, f"account-journal-{timezone.now().date()}.xlsx")
+
+    def group_costs_excel(self):
+        groups = self.group_costs()
+        total = sum(group["amount"] for group in groups)
+        wb = Workbook(write_only=True)
+        work_sheet = wb.create_sheet(title="Costs By Expense Group")
+        work_sheet.append(
+            _bold(
+                work_sheet,
+                [
+                    "Head",
+                    "Debit",
+                    "Credit",
+                    "VDS Rate",
+                    "VDS Amount",
+                    "TDS Rate",
+                    "TDS Amount",
+                ],
+            )
+        )
+        work_sheet.append(_bold(work_sheet, ["Cash in hand", None, total]))
+        for group in groups:
+            work_sheet.append(
+                [
+                    group["title"],
+                    group["amount"],
+                    None,
+                    f'{group["vds_rate"]}%',
+                    group["vds_amount"],
+                    f'{group["tds_rate"]}%',
+                    group["tds_amount"],
+                ]
+            )
+        work_sheet.append(
+            _bold(
+                work_sheet,
+                [
+                    "Total",
+                    total,
+                    total,
+                    None,
+                    sum(group["vds_amount"] for group in groups),
+                    None,
+                    sum(group["tds_amount"] for group in groups),
+                ],
+            )
+        )
+        return xlsx_response(wb, f"account-journal-{timezone.now().date()}.xlsx")
+
+    def balance_sheet_excel(self):
+        expenses = self.balance_expenses()
+        incomes = self.incomes()
+        total_expense = sum(amount for _, amount in expenses)
+        total_income = sum(payment for _, _, payment in incomes)
+        if total_income > total_expense:
+            result = "Profit"
+        elif total_income < total_expense:
+            result = "Loss"
+        else:
+            result = "Balance Equal"
+
+        wb = Workbook(write_only=True)
+        work_sheet = wb.create_sheet(title="Income Statement")
+        for title in (
+            "MEDIUSWARE LTD.",
+            "MOHAMMADPUR,RING ROAD,HOUSE 18/5, DHAKA -1207",
+            f'INCOME AND EXPENDITURE SUMMARY OF {self.month.strftime("%B %Y")}',
+        ):
+            work_sheet.append(_bold(work_sheet, [title]))
+        work_sheet.append([])
+        work_sheet.append(_bold(work_sheet, ["INCOME"] + [None] * 7 + ["EXPENDITURE"]))
+        work_sheet.append(
+            _bold(
+                work_sheet,
+                ["SL NO", "DATE", "INCOME TYPE (Services)", "AMOUNT (BDT)"]
+                + [None] * 4
+                + ["SL NO", "EXPENDITURE TYPE", "AMOUNT (BDT)"],
+            )
+        )
+        for index, (income, expense) in enumerate(
+            zip_longest(incomes, expenses), start=1
+        ):
+            work_sheet.append(
+                (list((index,) + income) if income else [None] * 4)
+                + [None] * 4
+                + (list((index,) + expense) if expense else [None] * 3)
+            )
+        work_sheet.append(
+            _bold(
+                work_sheet,
+                ["TOTAL INCOME", None, None, total_income]
+                + [None] * 4
+                + ["TOTAL EXPENDITURE", None, total_expense],
+            )
+        )
+        work_sheet.append(
+            [None] * 9 + _bold(work_sheet, [result, total_income - total_expense])
+        )
+        return xlsx_response(wb, f"income-statement-{timezone.now().date()}.xlsx")
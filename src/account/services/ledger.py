@@ -0,0 +1,301 @@
+"""
+Monthly profit and loss rollup
+
+One MonthlyLedger row per month holds the salary, expense, loan expense,
+income by status and profit share paid of the month. Rows are recomputed
+from the source tables after a transaction writing them commits, a month is
+recomputed once per transaction whatever the number of rows written.
+"""
+import datetime
+import threading
+from collections import defaultdict
+from math import floor
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from account.models import (
+    EmployeeSalary,
+    Expense,
+    Income,
+    LoanPayment,
+    MonthlyLedger,
+    ProfitShare,
+    SalarySheet,
+)
+
+# the profit share of the balance summary is paid to this user
+PROFIT_SHARE_USER_ID = 1
+
+LEDGER_FIELDS = (
+    "salary",
+    "expense",
+    "loan_expense",
+    "income",
+    "pending_income",
+    "hold_income",
+    "profit_share_paid",
+)
+INCOME_FIELDS = {
+    "approved": "income",
+    "pending": "pending_income",
+    "hold": "hold_income",
+}
+
+_pending = threading.local()
+
+
+def month_start(day):
+    return datetime.date(day.year, day.month, 1)
+
+
+def _month_end(month):
+    return month + relativedelta(months=1) - datetime.timedelta(days=1)
+
+
+def _by_month(queryset, date_field, column):
+    return dict(
+        queryset.annotate(month=TruncMonth(date_field))
+        .order_by()
+        .values("month")
+        .annotate(total=Sum(column))
+        .values_list("month", "total")
+    )
+
+
+def _salaries(period):
+    """Total of the first salary sheet of every month, as SalarySheet.total"""
+    sheet_months = {}
+    for sheet_id, date in (
+        SalarySheet.objects.filter(date__range=period)
+        .order_by("id")
+        .values_list("id", "date")
+    ):
+        sheet_months.setdefault(month_start(date), sheet_id)
+    totals = dict(
+        EmployeeSalary.objects.filter(salary_sheet_id__in=sheet_months.values())
+        .order_by()
+        .values("salary_sheet_id")
+        .annotate(total=Sum("gross_salary"))
+        .values_list("salary_sheet_id", "total")
+    )
+    return {
+        month: floor(totals.get(sheet_id) or 0)
+        for month, sheet_id in sheet_months.items()
+    }
+
+
+@transaction.atomic
+def refresh_monthly_ledgers(days):
+    """
+    Recompute the ledger rows of the months of the given dates, a fixed number
+    of queries whatever the number of months
+
+    @return list of MonthlyLedger in month order
+    """
+    months = sorted({month_start(day) for day in days if day})
+    if not months:
+        return []
+    period = [months[0], _month_end(months[-1])]
+
+    figures = defaultdict(dict)
+    for month, total in _salaries(period).items():
+        figures[month]["salary"] = total
+    for field, totals in (
+        (
+            "expense",
+            _by_month(Expense.objects.filter(date__range=period), "date", "amount"),
+        ),
+        (
+            "loan_expense",
+            _by_month(
+                LoanPayment.objects.filter(payment_date__range=period),
+                "payment_date",
+                "payment_amount",
+            ),
+        ),
+        (
+            "profit_share_paid",
+            _by_month(
+                ProfitShare.objects.filter(
+                    date__range=period, user_id=PROFIT_SHARE_USER_ID
+                ),
+                "date",
+                "payment_amount",
+            ),
+        ),
+    ):
+        for month, total in totals.items():
+            figures[month][field] = total
+    for month, status, total in (
+        Income.objects.filter(date__range=period, status__in=INCOME_FIELDS)
+        .annotate(month=TruncMonth("date"))
+        .order_by()
+        .values("month", "status")
+        .annotate(total=Sum("payment"))
+        .values_list("month", "status", "total")
+    ):
+        figures[month][INCOME_FIELDS[status]] = total
+
+    existing = {
+        ledger.month: ledger
+        for ledger in MonthlyLedger.objects.filter(month__in=months)
+    }
+    now = timezone.now()
+    ledgers, to_create, to_update = [], [], []
+    for month in months:
+        ledger = existing.get(month)
+        if ledger is None:
+            ledger = MonthlyLedger(month=month)
+            to_create.append(ledger)
+        else:
+            ledger.updated_at = now
+            to_update.append(ledger)
+        for field in LEDGER_FIELDS:
+            setattr(ledger, field, figures[month].get(field) or 0.0)
+        ledgers.append(ledger)
+
+    # a concurrent refresh may have created the month, its figures are as fresh
+    MonthlyLedger.objects.bulk_create(to_create, ignore_conflicts=True)
+    MonthlyLedger.objects.bulk_update(
+        to_update, list(LEDGER_FIELDS) + ["updated_at"], batch_size=500
+    )
+    return ledgers
+
+
+def rebuild_monthly_ledgers(start_date, end_date):
+    """
+    Recompute every month between start_date and end_date (inclusive)
+
+    @return int: number of months refreshed
+    """
+    months = []
+    month = month_start(start_date)
+    while month <= end_date:
+        months.append(month)
+        month += relativedelta(months=1)
+    return len(refresh_monthly_ledgers(months))
+
+
+def monthly_ledgers(start_date, end_date):
+    """
+    Ledger rows of every month between start_date and end_date, missing months
+    are rolled up on the way
+
+    @return dict: {first day of the month: MonthlyLedger}
+    """
+    ledgers = {
+        ledger.month: ledger
+        for ledger in MonthlyLedger.objects.filter(
+            month__gte=month_start(start_date), month__lte=end_date
+        )
+    }
+    missing = []
+    month = month_start(start_date)
+    while month <= end_date:
+        if month not in ledgers:
+            missing.append(month)
+        month += relativedelta(months=1)
+    for ledger in refresh_monthly_ledgers(missing):
+        ledgers[ledger.month] = ledger
+    return ledgers
+
+
+def _flush():
+    months = getattr(_pending, "months", set())
+    _pending.months = set()
+    if months:
+        refresh_monthly_ledgers(months)
+
+
+def schedule_ledger_refresh(days):
+    """
+    Refresh the months of the given dates once the current transaction commits
+
+    Bulk writes skip the signals below, their callers schedule the refresh.
+    """
+    if not hasattr(_pending, "months"):
+        _pending.months = set()
+    _pending.months.update(month_start(day) for day in days if day)
+    transaction.on_commit(_flush)
+
+
+def schedule_queryset_refresh(queryset, date_field="date"):
+    """Schedule the months of the rows of queryset, before a queryset.update"""
+    schedule_ledger_refresh(queryset.dates(date_field, "month"))
+
+
+LEDGER_DATE_FIELDS = {
+    Expense: "date",
+    Income: "date",
+    SalarySheet: "date",
+    ProfitShare: "date",
+    LoanPayment: "payment_date",
+}
+
+
+def _ledger_dates(sender, instance):
+    if sender is EmployeeSalary:
+        return [
+            SalarySheet.objects.filter(id=instance.salary_sheet_id)
+            .values_list("date", flat=True)
+            .first()
+        ]
+    return [getattr(instance, LEDGER_DATE_FIELDS[sender])]
+
+
+@receiver(pre_save, sender=Expense, dispatch_uid="monthly_ledger_expense_pre_save")
+@receiver(pre_save, sender=Income, dispatch_uid="monthly_ledger_income_pre_save")
+@receiver(pre_save, sender=SalarySheet, dispatch_uid="monthly_ledger_sheet_pre_save")
+@receiver(
+    pre_save, sender=ProfitShare, dispatch_uid="monthly_ledger_profit_share_pre_save"
+)
+@receiver(
+    pre_save, sender=LoanPayment, dispatch_uid="monthly_ledger_loan_payment_pre_save"
+)
+def refresh_previous_ledger(sender, instance, **kwargs):
+    # a changed date moves the row out of its previous month
+    if instance.pk is None or kwargs.get("raw"):
+        return
+    previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list(LEDGER_DATE_FIELDS[sender], flat=True)
+        .first()
+    )
+    if previous and month_start(previous) != month_start(
+        getattr(instance, LEDGER_DATE_FIELDS[sender])
+    ):
+        schedule_ledger_refresh([previous])
+
+
+@receiver(post_save, sender=Expense, dispatch_uid="monthly_ledger_expense_save")
+@receiver(post_delete, sender=Expense, dispatch_uid="monthly_ledger_expense_delete")
+@receiver(post_save, sender=Income, dispatch_uid="monthly_ledger_income_save")
+@receiver(post_delete, sender=Income, dispatch_uid="monthly_ledger_income_delete")
+@receiver(post_save, sender=SalarySheet, dispatch_uid="monthly_ledger_sheet_save")
+@receiver(post_delete, sender=SalarySheet, dispatch_uid="monthly_ledger_sheet_delete")
+@receiver(post_save, sender=EmployeeSalary, dispatch_uid="monthly_ledger_salary_save")
+@receiver(
+    post_delete, sender=EmployeeSalary, dispatch_uid="monthly_ledger_salary_delete"
+)
+@receiver(
+    post_save, sender=ProfitShare, dispatch_uid="monthly_ledger_profit_share_save"
+)
+@receiver(
+    post_delete, sender=ProfitShare, dispatch_uid="monthly_ledger_profit_share_delete"
+)
+@receiver(
+    post_save, sender=LoanPayment, dispatch_uid="monthly_ledger_loan_payment_save"
+)
+@receiver(
+    post_delete, sender=LoanPayment, dispatch_uid="monthly_ledger_loan_payment_delete"
+)
+def refresh_ledger(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    schedule_ledger_refresh(_ledger_dates(sender, instance))
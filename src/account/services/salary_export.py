@@ -0,0 +1,395 @@
+import calendar
+import datetime
+import math
+from math import floor
+
+from django.conf import settings
+from django.db.models import (
+    Count,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse
+from openpyxl import Workbook
+from openpyxl.writer.excel import save_virtual_workbook
+
+from account.models import Loan
+from employee.models.bank_account import BankAccount
+from employee.models.employee import LateAttendanceFine
+
+BANK_ASIA_ID = 11
+
+ROW_FIELDS = (
+    "id",
+    "employee_id",
+    "full_name",
+    "net_salary",
+    "overtime",
+    "project_bonus",
+    "leave_bonus",
+    "festival_bonus",
+    "food_allowance",
+    "gross_salary",
+    "bank_name",
+    "account_number",
+    "approved_account_number",
+    "city_live_account_number",
+    "bank_asia_account_number",
+    "tax_loan_emi",
+    "salary_loan_emi",
+    "late_fine_count",
+)
+
+
+def employee_total(queryset, field, function=Sum, output_field=None):
+    output_field = output_field or FloatField()
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values("employee_id")
+            .annotate(total=function(field))
+            .values("total"),
+            output_field=output_field,
+        ),
+        Value(0, output_field=output_field),
+    )
+
+
+def _bank_account(field, last=False, **filters):
+    accounts = BankAccount.objects.filter(employee_id=OuterRef("employee_id"), **filters)
+    return Subquery(accounts.order_by("-id" if last else "id").values(field)[:1])
+
+
+def month_bounds(date):
+    return (
+        datetime.date(date.year, date.month, 1),
+        datetime.date(date.year, date.month, calendar.monthrange(date.year, date.month)[1]),
+    )
+
+
+def late_fee(late_count):
+    """Same tiers as EmployeeSalary.current_month_late_fee, as a positive amount"""
+    total_fine = 0.00
+    if late_count > 3:
+        total_fine += (min(late_count, 6) - 3) * 80.00
+        if late_count > 6:
+            total_fine += (late_count - 6) * 500.00
+    return total_fine
+
+
+def with_deductions(queryset, date, tds_filter=None, late_fine_filter=None):
+    """
+    Annotate EmployeeSalary rows of a sheet dated date with tax_loan_emi,
+    salary_loan_emi and late_fine_count, the values behind tax_loan_total,
+    salary_loan_total and current_month_late_fee
+
+    @param tds_filter: Q of the TDS loans counted, default the loans running at date
+    @param late_fine_filter: Q narrowing the late fines of the month counted
+    """
+    month_start, month_end = month_bounds(date)
+    if tds_filter is None:
+        tds_filter = Q(start_date__lte=date, end_date__gte=date)
+    late_fines = LateAttendanceFine.objects.filter(
+        employee_id=OuterRef("employee_id"),
+        month=date.month,
+        year=date.year,
+    )
+    if late_fine_filter is not None:
+        late_fines = late_fines.filter(late_fine_filter)
+    loans = Loan.objects.filter(employee_id=OuterRef("employee_id"))
+    return queryset.annotate(
+        tax_loan_emi=employee_total(
+            loans.filter(tds_filter, loan_type="tds"),
+            "emi",
+        ),
+        salary_loan_emi=employee_total(
+            loans.filter(
+                start_date__lte=month_end,
+                end_date__gte=month_start,
+                loan_type="salary",
+            ),
+            "emi",
+        ),
+        late_fine_count=employee_total(
+            late_fines,
+            "id",
+            function=Count,
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def salary_rows(salary_sheet, query_filter=None):
+    """
+    Every employee salary of the sheet with bank accounts and deductions, one query
+
+    @param query_filter: optional filter argument, e.g. ("employee__in", employees)
+    @return list of dict with ROW_FIELDS keys
+    """
+    employee_salaries = salary_sheet.employeesalary_set.all()
+    if query_filter is not None:
+        employee_salaries = employee_salaries.filter(query_filter)
+    employee_salaries = with_deductions(employee_salaries, salary_sheet.date).annotate(
+        full_name=F("employee__full_name"),
+        bank_name=_bank_account("bank__name", default=True),
+        account_number=_bank_account("account_number", default=True),
+        approved_account_number=_bank_account(
+            "account_number", default=True, is_approved=True
+        ),
+        # City Live pays the most recently added approved default account
+        city_live_account_number=_bank_account(
+            "account_number", last=True, default=True, is_approved=True
+        ),
+        bank_asia_account_number=_bank_account(
+            "account_number", last=True, is_approved=True, bank_id=BANK_ASIA_ID
+        ),
+    )
+    return list(employee_salaries.values(*ROW_FIELDS))
+
+
+def _sheet_writer(wb, salary_sheet, rows):
+    work_sheet = wb.create_sheet(title=str(salary_sheet.date))
+    work_sheet.append(
+        [
+            "name",
+            "Net Salary",
+            "Overtime",
+            "Project Bonus",
+            "Leave Bonus",
+            "Festival Bonus",
+            "Food Allowance",
+            "Tax Loan",
+            "Salary Loan",
+            "Late Fine",
+            "Gross Salary",
+            "Bank Name",
+            "Bank Number",
+        ]
+    )
+    total_value = 0
+    for row in rows:
+        total_value += floor(row["gross_salary"])
+        work_sheet.append(
+            [
+                row["full_name"],
+                row["net_salary"],
+                row["overtime"],
+                row["project_bonus"],
+                row["leave_bonus"],
+                row["festival_bonus"],
+                abs(row["food_allowance"]),
+                abs(row["tax_loan_emi"]),
+                abs(row["salary_loan_emi"]),
+                late_fee(row["late_fine_count"]),
+                floor(row["gross_salary"]),
+                row["bank_name"] or "",
+                row["account_number"] or "",
+            ]
+        )
+    work_sheet.append(["", "", "", "", "", "Total", total_value])
+
+
+def _bank_asia_writer(wb, salary_sheet, rows):
+    remarks = f'Salary of {salary_sheet.date.strftime("%b, %Y")}'
+    work_sheet = wb.create_sheet(title=str(salary_sheet.date))
+    work_sheet.append(
+        [
+            "Employee Name",
+            "Account Number",
+            "Dr./Cr.",
+            "Transaction Amount",
+            "Chqser",
+            "Chqnum",
+            "Chqdat",
+            "Remarks",
+        ]
+    )
+    # the debit row carries the sheet total, employees without an account included
+    work_sheet.append(
+        [
+            settings.COMPANY_ACCOUNT_NAME,
+            settings.COMPANY_ACCOUNT_NO,
+            "D",
+            sum(floor(row["gross_salary"]) for row in rows),
+            "",
+            "",
+            "",
+            remarks,
+        ]
+    )
+    for row in rows:
+        if not row["bank_asia_account_number"]:
+            continue
+        work_sheet.append(
+            [
+                row["full_name"],
+                row["bank_asia_account_number"],
+                "C",
+                floor(row["gross_salary"]),
+                "",
+                "",
+                "",
+                remarks,
+            ]
+        )
+
+
+def npsb_rows(salary_sheet, rows):
+    """Rows paid through NPSB: positive salary and an approved default account"""
+    return [
+        {
+            "sheet_date": salary_sheet.date,
+            "name": row["full_name"],
+            "account_number": row["approved_account_number"],
+            "gross_salary": math.ceil(row["gross_salary"] or 0.0),
+        }
+        for row in rows
+        if row["gross_salary"] > 0 and row["approved_account_number"]
+    ]
+
+
+class SalarySheetExport:
+    """
+    Salary sheet exports, every format is written from the same salary_rows stream
+
+    Each sheet costs one query whatever the number of employees, workbooks are
+    write-only.
+    """
+
+    def __init__(self, queryset, query_filter=None):
+        self.queryset = queryset
+        self.query_filter = query_filter
+
+    def sheets(self):
+        for salary_sheet in self.queryset:
+            yield salary_sheet, salary_rows(salary_sheet, self.query_filter)
+
+    @staticmethod
+    def response(wb, filename):
+        response = HttpResponse(
+            content=save_virtual_workbook(wb), content_type="application/ms-excel"
+        )
+        response["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
+
+    def salary_sheet_excel(self):
+        wb = Workbook(write_only=True)
+        for salary_sheet, rows in self.sheets():
+            _sheet_writer(wb, salary_sheet, rows)
+        return self.response(wb, "SalarySheet.xlsx")
+
+    def bank_asia_excel(self):
+        wb = Workbook(write_only=True)
+        for salary_sheet, rows in self.sheets():
+            _bank_asia_writer(wb, salary_sheet, rows)
+        return self.response(wb, "SalarySheet.xlsx")
+
+    def npsb(self):
+        """
+        @return tuple(list of npsb row dict, last salary sheet, its total)
+        """
+        salary_data = []
+        last_sheet = None
+        total = 0
+        for salary_sheet, rows in self.sheets():
+            sheet_data = npsb_rows(salary_sheet, rows)
+            salary_data.extend(sheet_data)
+            last_sheet = salary_sheet
+            total = sum(data["gross_salary"] for data in sheet_data)
+        return salary_data, last_sheet, total
+
+    def npsb_excel(self):
+        wb = Workbook(write_only=True)
+        work_sheet = wb.create_sheet(title="NPSB Export")
+        work_sheet.append(["SL No", "Name", "A/C No.", "Amount in Tk."])
+        total = 0
+        index = 0
+        for salary_sheet, rows in self.sheets():
+            for data in npsb_rows(salary_sheet, rows):
+                index += 1
+                total += data["gross_salary"]
+                work_sheet.append(
+                    [index, data["name"], data["account_number"], data["gross_salary"]]
+                )
+        work_sheet.append(["", "", "Total", f"{int(total)}"])
+        return self.response(wb, "City_Bank_npsb.xlsx")
+
+    def city_live_excel(self):
+        wb = Workbook(write_only=True)
+        work_sheet = wb.create_sheet(title="City Live Export")
+        work_sheet.append(
+            [
+                "Reason",
+                "Sender Account No",
+                "Receiving Bank Routing No",
+                "Beneficiary Bank Account  No",
+                "Account Type",
+                "Amount",
+                "Receiver ID",
+                "Receiver Name",
+                "Remarks",
+                "Receiver Mobile Number",
+                "Receiver Email Address",
+            ]
+        )
+        for _, rows in self.sheets():
+            for row in rows:
+                if not row["city_live_account_number"]:
+                    continue
+                work_sheet.append(
+                    [
+                        "",
+                        "",
+                        "",
+                        row["city_live_account_number"],
+                        "",
+                        str(int(row["gross_salary"])),
+                        "",
+                        row["full_name"],
+                        "",
+                        "",
+                        "",
+                    ]
+                )
+        return self.response(wb, "City_Live.xlsx")
+
+
+def tax_loan_rows(salary_sheet):
+    """Active employees of the sheet with a tds loan starting in its month, one query"""
+    date = salary_sheet.date
+    employee_salaries = (
+        salary_sheet.employeesalary_set.filter(employee__active=True)
+        .annotate(
+            loan=Subquery(
+                Loan.objects.filter(
+                    employee_id=OuterRef("employee_id"),
+                    start_date__month=date.month,
+                    end_date__year=date.year,
+                    loan_type="tds",
+                )
+                .order_by()
+                .values("employee_id")
+                .annotate(total=Sum("emi"))
+                .values("total"),
+                output_field=FloatField(),
+            ),
+        )
+        .filter(loan__isnull=False)
+        .values_list(
+            "loan",
+            "employee__employee_id",
+            "employee__full_name",
+            "employee__designation__title",
+        )
+    )
+    return [
+        {"loan": loan, "id": employee_id, "name": name, "designation": designation}
+        for loan, employee_id, name, designation in employee_salaries
+    ]
@@ -0,0 +1,227 @@
+"""
+Salary report of a period, built from grouped queries and cached
+
+A finished report is cached under (start_date, end_date, data version), the
+version is bumped whenever salaries, salary sheets, loans, late fines or
+employees change so a cached report is never stale.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from openpyxl import Workbook
+from openpyxl.writer.excel import save_virtual_workbook
+
+from account.models import EmployeeSalary, Loan, SalarySheet
+from employee.models import Employee
+from employee.models.employee import LateAttendanceFine
+
+VERSION_KEY = "salary_report:version"
+REPORT_TIMEOUT = 60 * 60 * 24 * 7
+
+# salary component: share of the net salary
+NET_SALARY_SPLITS = {
+    "basic_salary": 0.55,
+    "house_allowance": 0.20,
+    "conveyance": 0.15,
+    "medical_allowance": 0.10,
+}
+SALARY_COMPONENTS = {
+    "gross_salary": "gross_salary",
+    "project_bonus": "project_bonus",
+    "overtime": "overtime",
+    "festival_bonus": "festival_bonus",
+    "food_allowance": "food_allowance",
+    "leave_bonus": "leave_bonus",
+    "tds": "loan_emi",
+}
+TOTAL_FIELDS = (
+    "gross_salary",
+    "basic_salary",
+    "house_allowance",
+    "conveyance",
+    "medical_allowance",
+    "project_bonus",
+    "overtime",
+    "festival_bonus",
+    "food_allowance",
+    "leave_bonus",
+    "tds",
+    "salary_loan",
+    "late_fine",
+)
+EXCEL_COLUMNS = (
+    ("SL No", "index"),
+    ("Name of Employee", "name"),
+    ("Designation", "designation"),
+    ("TIN", "tin"),
+    ("Total Salary", "gross_salary"),
+    ("Basic (55%)", "basic_salary"),
+    ("House Allowance (20%)", "house_allowance"),
+    ("Conveyance (15%)", "conveyance"),
+    ("Medical Allowance (10%)", "medical_allowance"),
+    ("Project Bonus", "project_bonus"),
+    ("Overtime", "overtime"),
+    ("Festival Bonus", "festival_bonus"),
+    ("Leave Bonus", "leave_bonus"),
+    ("Food Allowance", "food_allowance"),
+    ("TDS", "tds"),
+    ("Salary Loan EMI", "salary_loan"),
+    ("Late Fine", "late_fine"),
+    ("Treasury Challan No", "chalan_no"),
+)
+
+
+def data_version():
+    return cache.get_or_set(VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_salary_reports():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, timeout=None)
+
+
+class SalaryReportBuilder:
+    """
+    Per employee salary totals between start_date and end_date in 5 queries
+
+    Employees joined on or before start_date with a salary history are listed
+    when their gross salary in the period is positive.
+    """
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+
+    @property
+    def cache_key(self):
+        return f"salary_report:{self.start_date}:{self.end_date}:v{data_version()}"
+
+    def get(self):
+        """
+        @return dict: employee_salary_data, totals and total_employee_salary
+        """
+        key = self.cache_key
+        report = cache.get(key)
+        if report is None:
+            report = self.build()
+            cache.set(key, report, timeout=REPORT_TIMEOUT)
+        return report
+
+    def __group(self, queryset, total):
+        return dict(
+            queryset.order_by()
+            .values("employee_id")
+            .annotate(total=total)
+            .values_list("employee_id", "total")
+        )
+
+    def build(self):
+        period = [self.start_date, self.end_date]
+        employees = (
+            Employee.objects.filter(joining_date__lte=self.start_date)
+            .exclude(salaryhistory__isnull=True)
+            .values_list("id", "full_name", "designation__title", "tax_info")
+        )
+
+        salaries = {
+            row.pop("employee_id"): row
+            for row in EmployeeSalary.objects.filter(salary_sheet__date__range=period)
+            .order_by()
+            .values("employee_id")
+            .annotate(
+                net_salary=Sum("net_salary"),
+                **{
+                    component: Sum(field)
+                    for component, field in SALARY_COMPONENTS.items()
+                },
+            )
+        }
+        loans = Loan.objects.filter(created_at__range=period)
+        salary_loans = self.__group(loans.filter(loan_type="salary"), Sum("emi"))
+        late_fines = self.__group(
+            LateAttendanceFine.objects.filter(date__range=period),
+            Sum("total_late_attendance_fine"),
+        )
+        challans = defaultdict(list)
+        for employee_id, tax_calan_no in (
+            loans.filter(loan_type="tds", tax_calan_no__isnull=False)
+            .order_by("id")
+            .values_list("employee_id", "tax_calan_no")
+        ):
+            challans[employee_id].append(tax_calan_no)
+
+        employee_salary_data = []
+        totals = dict.fromkeys(TOTAL_FIELDS, 0)
+        total_employee_salary = 0
+        for employee_id, full_name, designation, tax_info in employees:
+            salary = salaries.get(employee_id)
+            if salary is None:
+                continue
+            total_employee_salary += salary["gross_salary"] or 0
+            if not salary["gross_salary"] or salary["gross_salary"] <= 0:
+                continue
+
+            data = {
+                "index": len(employee_salary_data) + 1,
+                "name": full_name,
+                "designation": designation,
+                "tin": tax_info or "",
+                "salary_loan": salary_loans.get(employee_id) or 0,
+                "late_fine": late_fines.get(employee_id) or 0,
+                "chalan_no": ",<br>".join(challans.get(employee_id, [])),
+            }
+            for component in SALARY_COMPONENTS:
+                data[component] = salary[component] or 0
+            for component, share in NET_SALARY_SPLITS.items():
+                data[component] = (salary["net_salary"] or 0) * share
+            for field in TOTAL_FIELDS:
+                totals[field] += data[field]
+            employee_salary_data.append(data)
+
+        return {
+            "employee_salary_data": employee_salary_data,
+            "totals": totals,
+            "total_employee_salary": total_employee_salary,
+        }
+
+    def excel_response(self):
+        report = self.get()
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title="Salary Report")
+        ws.append([header for header, _ in EXCEL_COLUMNS])
+        for data in report["employee_salary_data"]:
+            ws.append([data[field] for _, field in EXCEL_COLUMNS])
+
+        response = HttpResponse(
+            content=save_virtual_workbook(wb),
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        response["Content-Disposition"] = (
+            f"attachment; filename=Salary_Report_{self.start_date}_to_{self.end_date}.xlsx"
+        )
+        return response
+
+
+@receiver(post_save, sender=EmployeeSalary, dispatch_uid="salary_report_salary_save")
+@receiver(post_delete, sender=EmployeeSalary, dispatch_uid="salary_report_salary_delete")
+@receiver(post_save, sender=SalarySheet, dispatch_uid="salary_report_sheet_save")
+@receiver(post_delete, sender=SalarySheet, dispatch_uid="salary_report_sheet_delete")
+@receiver(post_save, sender=Loan, dispatch_uid="salary_report_loan_save")
+@receiver(post_delete, sender=Loan, dispatch_uid="salary_report_loan_delete")
+@receiver(
+    post_save, sender=LateAttendanceFine, dispatch_uid="salary_report_late_fine_save"
+)
+@receiver(
+    post_delete, sender=LateAttendanceFine, dispatch_uid="salary_report_late_fine_delete"
+)
+@receiver(post_save, sender=Employee, dispatch_uid="salary_report_employee_save")
+@receiver(post_delete, sender=Employee, dispatch_uid="salary_report_employee_delete")
+def invalidate_salary_report(sender, **kwargs):
+    transaction.on_commit(invalidate_salary_reports)
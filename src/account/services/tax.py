@@ -0,0 +1,195 @@
+import math
+from bisect import bisect_left
+from decimal import Decimal
+from itertools import accumulate
+
+from django.db.models import Sum
+
+from account.models import InvestmentAllowance, VehicleRebate
+from account.repository.SalarySheetRepository import get_fiscal_year_dates
+
+# (bracket amount, rate) in the same order EmployeeTaxLoanRepository applies them
+TAX_BRACKETS = {
+    "male": [
+        (350000, 0.00),
+        (100000, 0.05),
+        (400000, 0.10),
+        (500000, 0.15),
+        (500000, 0.15),
+        (2000000, 0.25),
+    ],
+    "female": [
+        (400000, 0.00),
+        (100000, 0.05),
+        (400000, 0.10),
+        (500000, 0.15),
+        (500000, 0.15),
+        (2000000, 0.25),
+    ],
+}
+TOP_RATE = 0.30
+TAX_FREE_INCOME = {"male": 350000, "female": 400000}
+MAX_EXEMPTION = 450000
+MAX_INVESTMENT_REBATE = 1000000
+MINIMUM_TAX = 5000
+
+
+class BracketTable:
+    """Cumulative bracket table
+
+    tax(income) = base[k] + (income - lower[k]) * rate[k] where k is the first
+    bracket whose upper bound covers the income, so the whole payroll is taxed
+    with one lookup per employee instead of walking the brackets.
+    """
+
+    def __init__(self, brackets, top_rate=TOP_RATE):
+        amounts = [amount for amount, rate in brackets]
+        self.rates = [rate for amount, rate in brackets] + [top_rate]
+        self.upper = list(accumulate(amounts))
+        self.lower = [0] + self.upper
+        # same float summation order as the sequential bracket walk
+        self.base = list(
+            accumulate(
+                (amount * rate for amount, rate in brackets), initial=0
+            )
+        )
+
+    def tax(self, incomes):
+        taxes = []
+        for income in incomes:
+            k = bisect_left(self.upper, income)
+            taxes.append(self.base[k] + (income - self.lower[k]) * self.rates[k])
+        return taxes
+
+
+BRACKET_TABLES = {
+    gender: BracketTable(brackets) for gender, brackets in TAX_BRACKETS.items()
+}
+
+
+class IncomeTaxCalculator:
+    """Batch income tax and TDS calculator
+
+    Every input is a column with one value per employee, results are returned
+    as columns of the same length. The rules are the ones of
+    EmployeeTaxLoanRepository.calculate_tax_loan.
+    """
+
+    def __init__(self, monthly_gross, genders, investments=None, vehicle_taxes=None):
+        size = len(monthly_gross)
+        self.monthly_gross = list(monthly_gross)
+        self.genders = list(genders)
+        self.investments = list(investments or [Decimal(0)] * size)
+        self.vehicle_taxes = list(vehicle_taxes or [Decimal(0)] * size)
+
+    def calculate(self):
+        yearly_gross = [
+            (monthly * 12) + 2 * (monthly * 0.55) for monthly in self.monthly_gross
+        ]
+        exemption = [min(gross / 3, MAX_EXEMPTION) for gross in yearly_gross]
+        taxable_income = [
+            gross - exempted for gross, exempted in zip(yearly_gross, exemption)
+        ]
+        rebate = [
+            min(
+                [
+                    investment * Decimal(0.15),
+                    taxable * 0.03,
+                    MAX_INVESTMENT_REBATE,
+                ]
+            )
+            for investment, taxable in zip(self.investments, taxable_income)
+        ]
+
+        # tax every gender group with its own bracket table
+        income_tax = [0.0] * len(taxable_income)
+        for gender, table in BRACKET_TABLES.items():
+            indexes = [
+                index
+                for index, employee_gender in enumerate(self.genders)
+                if (employee_gender == "female") == (gender == "female")
+            ]
+            taxes = table.tax([taxable_income[index] for index in indexes])
+            for index, tax in zip(indexes, taxes):
+                income_tax[index] = tax
+
+        yearly_tax, monthly_tds = [], []
+        for gender, taxable, tax, rebated, vehicle_tax in zip(
+            self.genders, taxable_income, income_tax, rebate, self.vehicle_taxes
+        ):
+            yearly, monthly = self.__apply_rebates(
+                gender, taxable, tax, rebated, vehicle_tax
+            )
+            yearly_tax.append(yearly)
+            monthly_tds.append(monthly)
+
+        return {
+            "yearly_gross": yearly_gross,
+            "exemption": exemption,
+            "taxable_income": taxable_income,
+            "income_tax": income_tax,
+            "rebate": rebate,
+            "yearly_tax": yearly_tax,
+            "monthly_tds": monthly_tds,
+        }
+
+    @staticmethod
+    def __apply_rebates(gender, taxable_income, income_tax, rebate, vehicle_tax):
+        if taxable_income <= TAX_FREE_INCOME.get(gender, 0):
+            return 0, 0
+        tax = Decimal(income_tax)
+        if rebate > 0:
+            tax -= Decimal(rebate)
+        if vehicle_tax and tax < vehicle_tax:
+            return 0, 0
+        elif vehicle_tax and tax > vehicle_tax:
+            tax -= vehicle_tax
+            return tax, math.ceil(tax / 12)
+        yearly_tax = MINIMUM_TAX if tax <= MINIMUM_TAX else tax
+        return yearly_tax, math.ceil(yearly_tax / 12)
+
+
+def load_tax_documents(employee_ids):
+    """Investment allowance and vehicle rebate total per employee for the running fiscal year
+
+    @return tuple(dict, dict): ({employee_id: investment}, {employee_id: vehicle tax})
+    """
+    fiscal_start_date, fiscal_end_date = get_fiscal_year_dates()
+    totals = []
+    for model in (InvestmentAllowance, VehicleRebate):
+        totals.append(
+            {
+                row["employee_id"]: row["total"]
+                for row in model.objects.filter(
+                    employee_id__in=employee_ids,
+                    created_at__date__gte=fiscal_start_date,
+                    created_at__date__lte=fiscal_end_date,
+                )
+                .values("employee_id")
+                .order_by()
+                .annotate(total=Sum("amount"))
+            }
+        )
+    return totals[0], totals[1]
+
+
+def calculate_monthly_tds(employees, payable_salaries):
+    """Monthly TDS of every employee in 3 queries
+
+    @param employees: list of Employee
+    @param payable_salaries: {employee_id: monthly payable salary}
+    @return dict: {employee_id: monthly tds}
+    """
+    employee_ids = [employee.id for employee in employees]
+    investments, vehicle_taxes = load_tax_documents(employee_ids)
+    result = IncomeTaxCalculator(
+        monthly_gross=[payable_salaries[employee_id] for employee_id in employee_ids],
+        genders=[employee.gender for employee in employees],
+        investments=[
+            investments.get(employee_id) or Decimal(0) for employee_id in employee_ids
+        ],
+        vehicle_taxes=[
+            vehicle_taxes.get(employee_id) or Decimal(0) for employee_id in employee_ids
+        ],
+    ).calculate()
+    return dict(zip(employee_ids, result["monthly_tds"]))
@@ -0,0 +1,71 @@
+"""
+Payment and journal voucher PDFs of daily account journals
+
+A voucher is rendered alone or many at once, the batch is rendered in
+parallel by config.utils.pdf_render and joined into one document.
+"""
+from django.db.models import Sum
+from django.template.loader import get_template
+from django.utils import timezone
+
+from account.models import Expense
+from config.utils.pdf_render import pdf_response, render_many
+
+VOUCHER_TEMPLATES = {
+    "PV": "pdf/payment_voucher.html",
+    "JV": "pdf/journal_voucher.html",
+}
+
+
+def voucher_html(voucher, voucher_type, template_name=None):
+    """
+    @param voucher_type: PV or JV
+    @return str: the rendered voucher template
+    """
+    expenses = (
+        voucher.expenses.values(
+            "expanse_group__account_code", "expanse_group__title"
+        )
+        .annotate(expense_amount=Sum("amount"))
+        .order_by("expanse_group__account_code")
+        .values(
+            "expanse_group__account_code",
+            "expanse_group__title",
+            "expense_amount",
+        )
+        .exclude(add_to_balance_sheet=False)
+    )
+
+    # Generate voucher number
+    index_of_id = 1
+    pv_no = f'{voucher.date.strftime("%m%y")}/{voucher_type}00{index_of_id}'
+
+    # Get all notes for daily expense
+    expense_note = ", ".join(
+        note
+        for note in Expense.objects.filter(date=voucher.date).values_list(
+            "note", flat=True
+        )
+        if note
+    )
+
+    template = get_template(template_name or VOUCHER_TEMPLATES[voucher_type])
+    return template.render(
+        {
+            "voucher": voucher,
+            "expenses": list(expenses),
+            "pv_no": pv_no,
+            "expense_note": expense_note,
+        }
+    )
+
+
+def vouchers_pdf_response(vouchers, voucher_type, template_name=None):
+    """One PDF of the vouchers of the given type, one voucher after another"""
+    content = render_many(
+        (voucher_html(voucher, voucher_type, template_name), None, ())
+        for voucher in vouchers
+    )
+    return pdf_response(
+        content, f"{voucher_type.lower()}-voucher-{timezone.now()}.pdf"
+    )
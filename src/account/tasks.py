@@ -8,11 +8,17 @@ from provident_fund.models import Account
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from datetime import datetime, timedelta
-from .models import Expense, Income
+from .models import Expense, Income, SalarySheetGeneration
+from account.repository.BulkSalarySheetRepository import BulkSalarySheetRepository
 from project_management.models import ProjectHour, Client
 from config.settings import STATIC_ROOT
 from config.utils.pdf import PDF
+from config.utils.mail import MailPipeline, send_emails
 from django.db.models import Sum
+from django.db import transaction
+from django_q.tasks import async_task
+import time
+import traceback
 
 
 # Seed pf account
@@ -24,20 +30,32 @@ def create_all_pfaccount():
 
     maturity_date = starting_date_of_pf_account + relativedelta(years=2)
 
-    employees = Employee.objects.filter(active=True, pf_eligibility=True)
-    accounts = list()
-
-    for employee in employees:
-        accounts.append(
+    # one query for the eligible employees without an account, a OneToOne
+    # conflict of an account created meanwhile is skipped
+    employees = Employee.objects.filter(
+        active=True, pf_eligibility=True, pf_account__isnull=True
+    ).values_list("id", flat=True)
+    Account.objects.bulk_create(
+        [
             Account(
-                employee=employee,
+                employee_id=employee_id,
                 start_date=starting_date_of_pf_account,
                 maturity_date=maturity_date,
                 scale=10.0,
             )
-        )
+            for employee_id in employees
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
 
-    Account.objects.bulk_create(accounts)
+def post_provident_fund_entries():
+    """Post the provident fund contributions of the last month"""
+    from provident_fund.services.posting import post_monthly_contributions
+
+    last_month = timezone.now().date().replace(day=1) - relativedelta(days=1)
+    post_monthly_contributions(last_month)
 
 
 def turn_off_all_employee_pf_eligibility():
@@ -84,13 +102,13 @@ def send_income_email_to_clients():
     today = datetime.today().date()
     clients = Client.objects.filter(clientinvoicedate__invoice_date=today).distinct()
 
+    client_incomes = []
     for client in clients:
         incomes = Income.objects.filter(
             is_send_clients=False, project__client=client
         ).select_related("project__client")
         pdf_file = generate_attachment(incomes)
 
-        # Send email
         email = EmailMessage(
             subject="Income Invoice",
             body="Please find the attached income invoice.",
@@ -100,10 +118,16 @@ def send_income_email_to_clients():
         )
 
         email.attach("Income_Invoice.pdf", pdf_file.create(), "application/pdf")
-        email.send()
+        client_incomes.append((email, incomes))
+
+    # Send every invoice over one connection
+    pipeline = MailPipeline("income_invoice")
+    pipeline.send([email for email, _ in client_incomes])
 
-        # Update is_send_clients to True after sending the email
-        incomes.update(is_send_clients=True)
+    # Update is_send_clients to True after sending the email
+    for email, incomes in client_incomes:
+        if any(email is sent for sent in pipeline.sent):
+            incomes.update(is_send_clients=True)
 
 
 def generate_and_send_monthly_expense():
@@ -145,4 +169,132 @@ def generate_and_send_monthly_expense():
             email.attach(file_path.split("/")[-1], response.content, "application/pdf")
         else:
             email.attach_file(file_path, "application/pdf")
-    email.send()
+    send_emails([email], category="monthly_expense_report")
+
+
+# Salary sheet generation
+SALARY_SHEET_CHUNK_SIZE = 50
+# Q_CLUSTER timeout is 60 seconds, leave room for the last chunk
+SALARY_SHEET_TASK_TIME_BUDGET = 40
+SALARY_SHEET_STALE_AFTER = timedelta(minutes=5)
+
+
+def start_salary_sheet_generation(date, festival_bonus=False):
+    """Create (or update) the salary sheet of the given month and enqueue its generation
+
+    @param date: salary sheet date string (Y-m-d)
+    @return SalarySheetGeneration:
+    """
+    repository = BulkSalarySheetRepository(date, festival_bonus=festival_bonus)
+    salary_date = datetime.strptime(date, "%Y-%m-%d").date()
+    with transaction.atomic():
+        salary_sheet = repository.get_or_create_sheet(salary_date)
+        SalarySheetGeneration.objects.filter(
+            salary_sheet=salary_sheet, status__in=["pending", "running", "failed"]
+        ).update(status="cancelled", updated_at=timezone.now())
+        generation = SalarySheetGeneration.objects.create(
+            salary_sheet=salary_sheet,
+            festival_bonus=festival_bonus,
+            employee_ids=list(
+                repository.get_employees(salary_date)
+                .order_by("id")
+                .values_list("id", flat=True)
+            ),
+            chunk_size=SALARY_SHEET_CHUNK_SIZE,
+        )
+    transaction.on_commit(
+        lambda: async_task("account.tasks.generate_salary_sheet", generation.id)
+    )
+    return generation
+
+
+def generate_salary_sheet(generation_id):
+    """Process salary sheet chunks from the last checkpoint
+
+    Every chunk is written together with its checkpoint in one transaction, so a
+    killed worker never leaves a half written chunk behind. When the time budget
+    is over the task enqueues itself to continue with the next chunk.
+    """
+    generation = SalarySheetGeneration.objects.select_related("salary_sheet").get(
+        id=generation_id
+    )
+    # a cancel may arrive while the task waits in the queue, only a pending or
+    # running job is picked up
+    if not SalarySheetGeneration.objects.filter(
+        id=generation.id, status__in=["pending", "running"]
+    ).update(status="running", error=None, updated_at=timezone.now()):
+        generation.refresh_from_db(fields=["status"])
+        return generation.status
+    generation.status = "running"
+    generation.error = None
+
+    repository = BulkSalarySheetRepository(
+        generation.salary_sheet.date.strftime("%Y-%m-%d"),
+        festival_bonus=generation.festival_bonus,
+    )
+    repository.salary_sheet = generation.salary_sheet
+    started = time.monotonic()
+    try:
+        while not generation.is_finished:
+            if time.monotonic() - started > SALARY_SHEET_TASK_TIME_BUDGET:
+                async_task("account.tasks.generate_salary_sheet", generation.id)
+                return generation.status
+
+            chunk = generation.get_chunk(generation.processed_chunks)
+            with transaction.atomic():
+                # lock the checkpoint row so two workers never run the same chunk
+                checkpoint = SalarySheetGeneration.objects.select_for_update().get(
+                    id=generation.id
+                )
+                if checkpoint.status != "running" or (
+                    checkpoint.processed_chunks != generation.processed_chunks
+                ):
+                    return checkpoint.status
+                repository.employee_ids = chunk
+                repository.generate(
+                    repository.get_employees(generation.salary_sheet.date)
+                )
+                generation.processed_chunks += 1
+                generation.processed_employees += len(chunk)
+                generation.save(
+                    update_fields=[
+                        "processed_chunks",
+                        "processed_employees",
+                        "updated_at",
+                    ]
+                )
+    except Exception:
+        generation.status = "failed"
+        generation.error = traceback.format_exc()
+        generation.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    finished_at = timezone.now()
+    if not SalarySheetGeneration.objects.filter(
+        id=generation.id, status="running"
+    ).update(status="completed", finished_at=finished_at, updated_at=finished_at):
+        generation.refresh_from_db(fields=["status"])
+        return generation.status
+    generation.status = "completed"
+    generation.finished_at = finished_at
+    return generation.status
+
+
+def resume_salary_sheet_generation():
+    """Re-enqueue salary sheet generations whose worker died
+
+    Scheduled every 5 minutes by migration 0174. Pending and running jobs that
+    made no progress for SALARY_SHEET_STALE_AFTER, i.e. killed at the task
+    timeout, continue from their checkpoint. Failed jobs keep their traceback
+    in error and are not retried, generating the sheet again cancels them.
+    """
+    stale_generations = SalarySheetGeneration.objects.filter(
+        status__in=["pending", "running"],
+        updated_at__lt=timezone.now() - SALARY_SHEET_STALE_AFTER,
+    ).values_list("id", flat=True)
+    for generation_id in stale_generations:
+        # skip a job cancelled since it was listed
+        if SalarySheetGeneration.objects.filter(
+            id=generation_id, status__in=["pending", "running"]
+        ).update(status="pending", updated_at=timezone.now()):
+            async_task("account.tasks.generate_salary_sheet", generation_id)
@@ -1,3 +1,348 @@
+import datetime
+
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.models import (
+    EmployeeSalary,
+    Loan,
+    SalarySheet,
+    SalarySheetGeneration,
+    SalarySheetTaxLoan,
+)
+from account.repository.BulkSalarySheetRepository import (
+    TDS_WITNESS_EMPLOYEE_ID,
+    BulkSalarySheetRepository,
+)
+from account.repository.SalarySheetRepository import SalarySheetRepository
+from account.services.salary_export import salary_rows
+from account.services.tax import calculate_monthly_tds
+from account.tasks import generate_salary_sheet
+from employee.models import Leave, Overtime, Resignation, SalaryHistory
+from employee.models.bank_account import BankAccount
+from employee.models.employee import LateAttendanceFine
+from employee.tests import create_employee, create_superuser
+from settings.models import Bank
+
+
+class SalarySheetInlineQueryTest(TestCase):
+    """The salary sheet change page renders in a fixed number of queries"""
+
+    def setUp(self):
+        self.client.force_login(create_superuser())
+        self.witness = create_employee("Loan Witness")
+
+    def create_sheet(self, date, headcount):
+        salary_sheet = SalarySheet.objects.create(date=date)
+        for index in range(headcount):
+            employee = create_employee(f"Employee {date:%Y %m} {index}")
+            EmployeeSalary.objects.create(
+                employee=employee,
+                salary_sheet=salary_sheet,
+                net_salary=50000,
+                gross_salary=50000,
+            )
+            Loan.objects.create(
+                employee=employee,
+                witness=self.witness,
+                loan_amount=500,
+                emi=500,
+                start_date=date,
+                end_date=date,
+                tenor=1,
+                payment_method="salary",
+                loan_type="tds",
+            )
+            for day in range(1, 6):
+                LateAttendanceFine.objects.create(
+                    employee=employee,
+                    month=date.month,
+                    year=date.year,
+                    date=date.replace(day=day),
+                    is_consider=False,
+                )
+        return salary_sheet
+
+    def render(self, salary_sheet):
+        response = self.client.get(
+            reverse("admin:account_salarysheet_change", args=[salary_sheet.id])
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_change_page_queries_do_not_grow_with_headcount(self):
+        small_sheet = self.create_sheet(datetime.date(2024, 1, 31), 1)
+        large_sheet = self.create_sheet(datetime.date(2024, 2, 29), 6)
+        # the first render warms the per process caches
+        self.render(small_sheet)
+        with CaptureQueriesContext(connection) as small_render:
+            self.render(small_sheet)
+
+        with self.assertNumQueries(len(small_render)):
+            response = self.render(large_sheet)
+
+        # five unconsidered late days, two above the free three
+        self.assertEqual(response.context["total_values"]["total_late_fine"], 6 * 160)
+        self.assertEqual(response.context["total_values"]["total_tax_loan"], 6 * 500)
+
+
+class BulkSalarySheetTaxLoanTest(TestCase):
+    def setUp(self):
+        self.witness = create_employee("Tax Witness", id=TDS_WITNESS_EMPLOYEE_ID)
+        self.employees = []
+        for index in range(3):
+            employee = create_employee(
+                f"Tax Payer {index}",
+                gender="male",
+                joining_date=datetime.date(2023, 1, 1),
+            )
+            SalaryHistory.objects.create(
+                employee=employee,
+                payable_salary=200000,
+                active_from=datetime.date(2023, 1, 1),
+            )
+            self.employees.append(employee)
+
+    def test_sheet_links_only_its_own_tax_loans(self):
+        salary_date = datetime.date(2024, 2, 29)
+        # posted on the salary date by create_tds, not by the sheet
+        other_loan = Loan.objects.create(
+            employee=self.employees[0],
+            witness=self.witness,
+            loan_amount=417,
+            emi=417,
+            start_date=salary_date,
+            end_date=salary_date,
+            tenor=1,
+            payment_method="salary",
+            loan_type="tds",
+        )
+        monthly_tds = calculate_monthly_tds(
+            self.employees, {employee.id: 200000 for employee in self.employees}
+        )
+
+        salary_sheet = BulkSalarySheetRepository(f"{salary_date:%Y-%m-%d}").save()
+        BulkSalarySheetRepository(f"{salary_date:%Y-%m-%d}").save()
+
+        linked = list(
+            SalarySheetTaxLoan.objects.filter(salarysheet=salary_sheet).values_list(
+                "loan__employee_id", "loan__emi"
+            )
+        )
+        self.assertCountEqual(
+            linked,
+            [
+                (employee.id, monthly_tds[employee.id])
+                for employee in self.employees
+                if monthly_tds[employee.id] > 0
+            ],
+        )
+        self.assertFalse(
+            SalarySheetTaxLoan.objects.filter(loan=other_loan).exists()
+        )
+
+
+class BulkSalarySheetEquivalenceTest(TestCase):
+    """The bulk engine writes the same salary sheet as SalarySheetRepository"""
+
+    SALARY_DATE = datetime.date(2024, 12, 31)
+    FIELDS = (
+        "employee_id",
+        "net_salary",
+        "overtime",
+        "leave_bonus",
+        "project_bonus",
+        "code_quality_bonus",
+        "festival_bonus",
+        "food_allowance",
+        "device_allowance",
+        "loan_emi",
+        "provident_fund",
+        "gross_salary",
+    )
+
+    def setUp(self):
+        self.witness = create_employee("Sheet Witness", id=TDS_WITNESS_EMPLOYEE_ID)
+
+        regular = self.employee(
+            "Regular Employee",
+            40000,
+            permanent_date=datetime.date(2023, 7, 1),
+            device_allowance=True,
+        )
+        self.leave(regular, "non_paid", datetime.date(2024, 12, 9), 2)
+        self.leave(regular, "half_day_non_paid", datetime.date(2024, 12, 11), 1)
+        self.leave(regular, "casual", datetime.date(2024, 6, 3), 3)
+        self.leave(regular, "casual", datetime.date(2024, 12, 16), 1, status="pending")
+        for day, status in ((6, "approved"), (13, "approved"), (20, "pending")):
+            Overtime.objects.create(
+                employee=regular, date=self.SALARY_DATE.replace(day=day), status=status
+            )
+        for day in range(1, 9):
+            LateAttendanceFine.objects.create(
+                employee=regular,
+                month=12,
+                year=2024,
+                date=self.SALARY_DATE.replace(day=day),
+                is_consider=day == 1,
+            )
+        self.loan(regular, "salary", 1000, datetime.date(2024, 11, 1), 3)
+
+        self.employee(
+            "Tax Payer",
+            200000,
+            gender="male",
+            tax_eligible=True,
+            permanent_date=datetime.date(2023, 7, 1),
+        )
+
+        joiner = self.employee(
+            "Month Joiner", 30000, joining_date=datetime.date(2024, 12, 10)
+        )
+        self.leave(joiner, "non_paid", datetime.date(2024, 12, 23), 1)
+
+        leaver = self.employee(
+            "Month Leaver",
+            35000,
+            joining_date=datetime.date(2024, 3, 1),
+            permanent_date=datetime.date(2024, 6, 1),
+        )
+        # active from the middle of the month, the sheet keeps the earlier salary
+        SalaryHistory.objects.create(
+            employee=leaver,
+            payable_salary=38000,
+            active_from=datetime.date(2024, 12, 15),
+        )
+        self.leave(leaver, "casual", datetime.date(2024, 10, 1), 12)
+        self.leave(leaver, "medical", datetime.date(2024, 11, 4), 9)
+        Resignation.objects.create(
+            employee=leaver,
+            message="-",
+            date=datetime.date(2024, 12, 20),
+            status="approved",
+        )
+        self.loan(leaver, "tds", 417, self.SALARY_DATE, 1)
+
+    def employee(self, full_name, payable_salary, **fields):
+        fields.setdefault("joining_date", datetime.date(2023, 1, 1))
+        fields.setdefault("tax_eligible", False)
+        employee = create_employee(full_name, **fields)
+        SalaryHistory.objects.create(
+            employee=employee,
+            payable_salary=payable_salary,
+            active_from=employee.joining_date,
+        )
+        return employee
+
+    def leave(self, employee, leave_type, start_date, days, status="approved"):
+        Leave.objects.create(
+            employee=employee,
+            leave_type=leave_type,
+            start_date=start_date,
+            end_date=start_date + datetime.timedelta(days=days - 1),
+            total_leave=days,
+            message="-",
+            status=status,
+        )
+
+    def loan(self, employee, loan_type, emi, start_date, tenor):
+        Loan.objects.create(
+            employee=employee,
+            witness=self.witness,
+            loan_amount=emi * tenor,
+            emi=emi,
+            start_date=start_date,
+            end_date=start_date + datetime.timedelta(days=31 * (tenor - 1)),
+            tenor=tenor,
+            payment_method="salary",
+            loan_type=loan_type,
+        )
+
+    def generate(self, repository_class):
+        # each repository starts from the same fixture month
+        with transaction.atomic():
+            repository_class(f"{self.SALARY_DATE:%Y-%m-%d}", festival_bonus=True).save()
+            rows = list(
+                EmployeeSalary.objects.order_by("employee_id").values(*self.FIELDS)
+            )
+            transaction.set_rollback(True)
+        return rows
+
+    def test_bulk_sheet_matches_per_employee_sheet(self):
+        expected = self.generate(SalarySheetRepository)
+        rows = self.generate(BulkSalarySheetRepository)
+
+        self.assertEqual(len(expected), 4)
+        self.assertEqual(len(rows), len(expected))
+        for row, expected_row in zip(rows, expected):
+            with self.subTest(employee_id=expected_row["employee_id"]):
+                self.assertEqual(row, expected_row)
+
+
+class SalaryExportBankAccountTest(TestCase):
+    def test_city_live_pays_the_latest_approved_default_account(self):
+        employee = create_employee("Account Holder")
+        salary_sheet = SalarySheet.objects.create(date=datetime.date(2024, 1, 31))
+        EmployeeSalary.objects.create(
+            employee=employee,
+            salary_sheet=salary_sheet,
+            net_salary=50000,
+            gross_salary=50000,
+        )
+        bank = Bank.objects.create(name="City Bank")
+        for account_number, default, is_approved in (
+            ("100", True, True),
+            ("200", True, True),
+            ("300", True, False),
+            ("400", False, True),
+        ):
+            BankAccount.objects.create(
+                employee=employee,
+                bank=bank,
+                account_number=account_number,
+                default=default,
+                is_approved=is_approved,
+            )
+
+        [row] = salary_rows(salary_sheet)
+
+        self.assertEqual(row["city_live_account_number"], "200")
+        self.assertEqual(row["approved_account_number"], "100")
+
+
+class SalarySheetGenerationTest(TestCase):
+    def setUp(self):
+        employee = create_employee(
+            "Sheet Employee", joining_date=datetime.date(2023, 1, 1)
+        )
+        SalaryHistory.objects.create(
+            employee=employee,
+            payable_salary=30000,
+            active_from=datetime.date(2023, 1, 1),
+        )
+        self.generation = SalarySheetGeneration.objects.create(
+            salary_sheet=SalarySheet.objects.create(date=datetime.date(2024, 1, 31)),
+            employee_ids=[employee.id],
+        )
+
+    def test_pending_job_completes(self):
+        self.assertEqual(generate_salary_sheet(self.generation.id), "completed")
+
+        self.generation.refresh_from_db()
+        self.assertEqual(self.generation.processed_chunks, 1)
+        self.assertIsNotNone(self.generation.finished_at)
+        self.assertEqual(EmployeeSalary.objects.count(), 1)
+
+    def test_job_cancelled_in_the_queue_is_not_resumed(self):
+        SalarySheetGeneration.objects.filter(id=self.generation.id).update(
+            status="cancelled"
+        )
+
+        self.assertEqual(generate_salary_sheet(self.generation.id), "cancelled")
 
-# Create your tests here.
+        self.generation.refresh_from_db()
+        self.assertEqual(self.generation.status, "cancelled")
+        self.assertEqual(self.generation.processed_chunks, 0)
+        self.assertFalse(EmployeeSalary.objects.exists())
@@ -1,94 +1,47 @@
-import mimetypes
-from itertools import zip_longest
-from urllib.parse import urlparse
-
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import (
-    Count,
-    DateField,
-    DecimalField,
-    ExpressionWrapper,
-    F,
-    Q,
-    Sum,
-)
+from django.db.models import F, Sum
 import os
-from django.db.models.functions import ExtractYear, TruncDate
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from django.template.loader import get_template, render_to_string
-from django.utils import timezone
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
-from weasyprint import CSS, HTML, default_url_fetcher
 
-from account.models import AccountJournal, Expense, Income, MonthlyJournal
+from account.models import AccountJournal, Expense, MonthlyJournal
+from account.services.journal_reports import JournalReports
+from account.services.vouchers import vouchers_pdf_response
 from config.utils.pdf import PDF
+from config.utils.pdf_render import A4_PAGE, render_pdf
 
-
-def generate_voucher_pdf(voucher, voucher_type, template_name):
-    expenses = (
-        voucher.expenses.values(
-            "expanse_group__account_code", "expanse_group__title"
-        )
-        .annotate(expense_amount=Sum("amount"))
-        .order_by("expanse_group__account_code")
-        .values(
-            "expanse_group__account_code",
-            "expanse_group__title",
-            "expense_amount",
-        )
-        .exclude(add_to_balance_sheet=False)
-    )
-
-    # Generate voucher number
-    id_list = []
-    get_current_month_voucher = (
-        AccountJournal.objects.filter(type="daily")
-        .order_by("date")
-        .values_list("id")
-    )
-
-    for d in get_current_month_voucher:
-        id_list.append(int(d[0]))
-
-    # index_of_id = int(id_list.index(1)) + 1
-    index_of_id = 1
-
-    date_obj = voucher.date
-    month = date_obj.strftime("%m")
-    year = date_obj.strftime("%y")
-    pv_no = f"{month}{year}/{voucher_type}00{index_of_id}"
-
-    # Get all notes for daily expense
-    expense_note = ""
-    get_expense_notes = Expense.objects.filter(date=voucher.date)
-
-    for index, note in enumerate(get_expense_notes):
-        expense_note += note.note
-        if index < len(get_expense_notes) - 1:
-            expense_note += ", "
-
-    # Render the HTML template
-    template = get_template(template_name)
-    context = {
-        "voucher": voucher,
-        "expenses": expenses,
-        "pv_no": pv_no,
-        "expense_note": expense_note,
+ATTACHMENT_SHEET_CSS = A4_PAGE + """
+    body { font-family: sans-serif }
+    .attachment-box {
+        text-align: center;
+        margin-bottom: 20px;
     }
-    html_content = template.render(context)
+    .amount-header {
+        font-size: 14px;
+        font-weight: bold;
+        color: #000;
+        margin-bottom: 8px;
+    }
+    img {
+        max-width: 100%;
+        max-height: 18cm;
+        border: 1px solid #ddd;
+        border-radius: 4px;
+    }
+    .file-link {
+        font-size: 14px;
+        color: #007BFF;
+        text-decoration: underline;
+    }
+"""
 
-    # Generate PDF
-    html = HTML(string=html_content)
-    pdf_file = html.write_pdf()
-    response = HttpResponse(pdf_file, content_type="application/pdf")
-    filename = str(timezone.now())
-    response["Content-Disposition"] = (
-        f'attachment; filename="{voucher_type.lower()}-voucher-{filename}.pdf"'
-    )
 
-    return response
+
+def generate_voucher_pdf(voucher, voucher_type, template_name):
+    return vouchers_pdf_response([voucher], voucher_type, template_name)
 
 
 @require_http_methods(["POST", "GET"])
@@ -109,191 +62,21 @@ def journal_voucher(request, id):
 @login_required(login_url="/admin/login/")
 def account_journal(request, id):
     monthly_journal = get_object_or_404(AccountJournal, id=id)
-
-    # get the template
-    template = get_template("excel/account-journal.html")
-
-    # data calculation
-    expense_dates = (
-        monthly_journal.expenses.filter(
-            date__year=monthly_journal.date.year,
-            date__month=monthly_journal.date.month,
-        )
-        .annotate(day=TruncDate("date", output_field=DateField()))
-        .annotate(year=ExtractYear("date"))
-        .values("day", "year")
-        .annotate(count=Count("id"), daily_expenses=Sum("amount"))
-        .order_by("day")
-        .values("day", "year", "daily_expenses")
-    )
-
-    expenses_data = {}
-
-    for expense_date in expense_dates:
-        expenses = (
-            monthly_journal.expenses.filter(
-                Q(date=expense_date["day"])
-                & Q(add_to_balance_sheet=True)
-                & Q(is_approved=True)
-            )
-            .values("expanse_group__account_code", "expanse_group__title")
-            .order_by("expanse_group__account_code")
-            .annotate(expense_amount=Sum("amount"))
-            .values("expense_amount")
-            .values(
-                "expanse_group__id",
-                "expanse_group__account_code",
-                "expanse_group__title",
-                "expense_amount",
-            )
-        )
-        key = str(expense_date["day"])
-        value = expenses
-        expenses_data[key] = value
-
-    # get the context data
-    context = {"expense_data": expenses_data}
-
-    # Render the html template with the context data.
-    html_content = template.render(context)
-
-    # Create a response with the Excel file
-    file_name = str(timezone.now())
-    response = HttpResponse(
-        html_content, content_type="application/vnd.ms-excel"
-    )
-    response["Content-Disposition"] = (
-        f"attachment; filename=account-journal-{file_name}.xls"
-    )
-    return response
+    return JournalReports(monthly_journal).account_journal_excel()
 
 
 @require_http_methods(["POST", "GET"])
 @login_required(login_url="/admin/login/")
 def costs_by_expense_group(request, id):
     monthly_journal = get_object_or_404(AccountJournal, id=id)
-
-    # get the template
-    template = get_template("excel/monthly-expense-group.html")
-
-    # data calculation
-    expenses_data = (
-        monthly_journal.expenses.filter(
-            Q(add_to_balance_sheet=True)
-            & Q(date__year=monthly_journal.date.year)
-            & Q(date__month=monthly_journal.date.month)
-        )
-        .values("expanse_group__account_code")
-        .annotate(
-            expense_amount=Sum("amount"),
-            vds_rate=F("expanse_group__vds_rate"),
-            tds_rate=F("expanse_group__tds_rate"),
-            vds_amount=ExpressionWrapper(
-                (F("vds_rate") * F("expense_amount") / 100),
-                output_field=DecimalField(),
-            ),
-            tds_amount=ExpressionWrapper(
-                (F("tds_rate") * F("expense_amount") / 100),
-                output_field=DecimalField(),
-            ),
-        )
-        .order_by("expanse_group__account_code")
-        .values(
-            "expanse_group__account_code",
-            "expanse_group__title",
-            "expense_amount",
-            "vds_rate",
-            "vds_amount",
-            "tds_rate",
-            "tds_amount",
-        )
-    )
-    # get the context data
-    context = {"expense_data": expenses_data}
-
-    # Render the html template with the context data.
-    html_content = template.render(context)
-
-    # Create a response with the Excel file
-    file_name = str(timezone.now())
-    response = HttpResponse(
-        html_content, content_type="application/vnd.ms-excel"
-    )
-    response["Content-Disposition"] = (
-        f"attachment; filename=account-journal-{file_name}.xls"
-    )
-    return response
+    return JournalReports(monthly_journal).group_costs_excel()
 
 
 @require_http_methods(["POST", "GET"])
 @login_required(login_url="/admin/login/")
 def balance_sheet(request, id):
     monthly_journal = get_object_or_404(AccountJournal, id=id)
-    template = get_template("excel/balance-sheet.html")
-
-    # expenses_data = Expense.objects.filter(
-    #     Q(add_to_balance_sheet = True) &
-    #     Q(is_approved = True) &
-    #     Q(date__gte = monthly_journal.date - timedelta(days=30)) &
-    #     Q(date__lte = monthly_journal.date)
-    # ).values('date','expanse_group__title', 'amount')\
-    # .order_by('date')
-
-    expenses_data = (
-        Expense.objects.filter(
-            Q(add_to_balance_sheet=True)
-            & Q(is_approved=True)
-            & Q(date__year=monthly_journal.date.year)
-            & Q(date__month=monthly_journal.date.month)
-        )
-        .values("expanse_group__title")
-        .annotate(
-            total_amount=Sum("amount"),
-        )
-        .order_by("expanse_group__title")
-    )
-
-    total_expense_amount = (
-        expenses_data.aggregate(total_amount=Sum("amount"))["total_amount"] or 0
-    )
-
-    incomes_data = (
-        Income.objects.filter(
-            Q(add_to_balance_sheet=True)
-            & Q(status="approved")
-            & Q(date__year=monthly_journal.date.year)
-            & Q(date__month=monthly_journal.date.month)
-        )
-        .values("date", "project__title", "payment")
-        .order_by("date")
-    )
-
-    total_income_amount = (
-        incomes_data.aggregate(total_amount=Sum("payment"))["total_amount"] or 0
-    )
-
-    zipped_data = list(zip_longest(incomes_data, expenses_data, fillvalue={}))
-
-    context = {
-        "month": monthly_journal.date.strftime("%B"),
-        "year": monthly_journal.date.strftime("%Y"),
-        "total_expense_amount": total_expense_amount,
-        "total_income_amount": total_income_amount,
-        "zipped_data": zipped_data,
-    }
-
-    # Render the html template with the context data.
-    html_content = template.render(context)
-
-    # Create a response with the Excel file
-    file_name = str(timezone.now())
-    response = HttpResponse(
-        html_content, content_type="application/vnd.ms-excel"
-    )
-    response["Content-Disposition"] = (
-        f"attachment; filename=income-statement -{file_name}.xls"
-    )
-    return response
+    return JournalReports(monthly_journal).balance_sheet_excel()
 
 
 
@@ -337,58 +120,11 @@ def expense_attachment(request, id):
         'attachments': attachment_data,
     })
 
-    # ✅ Custom URL fetcher for media files
-    def custom_fetcher(url, *args, **kwargs):
-        parsed = urlparse(url)
-        if parsed.path.startswith(settings.MEDIA_URL):
-            # Convert relative path to absolute file path
-            path = os.path.join(settings.MEDIA_ROOT, parsed.path[len(settings.MEDIA_URL):])
-            mime, enc = mimetypes.guess_type(path)
-            if os.path.exists(path):
-                return {
-                    "file_obj": open(path, "rb"),
-                    "mime_type": mime,
-                    "encoding": enc,
-                    "filename": os.path.basename(path),
-                }
-            else:
-                print(f"File not found: {path}")
-                return None
-        return default_url_fetcher(url, *args, **kwargs)
-
-    # Generate PDF with custom fetcher
-    html = HTML(
-        string=html_string,
+    pdf = render_pdf(
+        html_string,
         base_url=request.build_absolute_uri('/'),
-        url_fetcher=custom_fetcher,
+        stylesheets=[ATTACHMENT_SHEET_CSS],
     )
-    css = CSS(string='''
-        @page { size: A4; margin: 1cm }
-        body { font-family: sans-serif }
-        .attachment-box {
-            text-align: center;
-            margin-bottom: 20px;
-        }
-        .amount-header {
-            font-size: 14px;
-            font-weight: bold;
-            color: #000;
-            margin-bottom: 8px;
-        }
-        img {
-            max-width: 100%;
-            max-height: 18cm;
-            border: 1px solid #ddd;
-            border-radius: 4px;
-        }
-        .file-link {
-            font-size: 14px;
-            color: #007BFF;
-            text-decoration: underline;
-        }
-    ''')
-
-    pdf = html.write_pdf(stylesheets=[css])
 
     response = HttpResponse(pdf, content_type='application/pdf')
     # response['Content-Disposition'] = f'attachment; filename="expense_{expense.id}_attachments.pdf"'
@@ -398,22 +134,6 @@ def expense_attachment(request, id):
 from django.templatetags.static import static
 
 
-def custom_fetcher(url, *args, **kwargs):
-    parsed = urlparse(url)
-    if parsed.path.startswith(settings.STATIC_URL):
-        path = parsed.path.replace(
-            settings.STATIC_URL, settings.STATIC_ROOT + "/", 1
-        )
-        mime, enc = mimetypes.guess_type(path)
-        return {
-            "file_obj": open(path, "rb"),
-            "mime_type": mime,
-            "encoding": enc,
-            "filename": path.split("/")[-1],
-        }
-    return default_url_fetcher(url, *args, **kwargs)
-
-
 @require_http_methods(["GET"])
 @login_required(login_url="/admin/login/")
 def monthly_expense_statement(request, id, *args, **kwargs):
@@ -560,21 +280,6 @@ def monthly_expense_attachment(request, id, *args, **kwargs):
     }
     pdf.template_path = "pdf/monthly_expense_attachment.html"
 
-    def custom_fetcher(url, *args, **kwargs):
-        parsed = urlparse(url)
-        if parsed.path.startswith(settings.MEDIA_URL):
-            path = parsed.path.replace(
-                settings.MEDIA_URL, settings.MEDIA_ROOT + "/", 1
-            )
-            mime, enc = mimetypes.guess_type(path)
-            return {
-                "file_obj": open(path, "rb"),
-                "mime_type": mime,
-                "encoding": enc,
-                "filename": path.split("/")[-1],
-            }
-        return default_url_fetcher(url, *args, **kwargs)
-
     month = monthly_journal.date.strftime("%B")
     year = monthly_journal.date.strftime("%Y")
     pdf.file_name = f"{month}/{year}"
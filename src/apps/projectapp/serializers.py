@@ -1,6 +1,7 @@
 from django.utils import timezone
 from django.utils.text import slugify
 from rest_framework import serializers
+from django.db import transaction
 from django.db.models import Sum
 from django.core.validators import FileExtensionValidator
 
@@ -8,6 +9,7 @@ from account.models import Income
 from apps.employeeapp.serializers import EmployeeInfoSerializer
 from apps.mixin.serializer import BaseModelSerializer
 from employee.models.employee import Employee, EmployeeUnderTPM
+from employee.services.hour_graphs import refresh_all_employee_series
 from project_management.models import (
     Client,
     ClientInvoiceDate,
@@ -394,6 +396,8 @@ class WeeklyProjectUpdate(BaseModelSerializer):
         EmployeeProjectHour.objects.select_related("employee").bulk_create(
             employee_hour_list
         )
+        employee_ids = {hour.employee_id for hour in employee_hour_list}
+        transaction.on_commit(lambda: refresh_all_employee_series(employee_ids))
         return instance
 
     def update(self, instance, validated_data):
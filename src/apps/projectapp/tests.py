@@ -1,3 +1,54 @@
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from employee.models.employee_activity import EmployeeAttendanceSummary
+from employee.services.attendance_summary import summary_cell
+from employee.tests import create_employee, create_superuser
+from project_management.models import DailyProjectUpdate, Project
+
+
+class DailyProjectUpdateStatusTest(TestCase):
+    """Approving updates through the API refreshes the attendance grid"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_superuser())
+        self.employee = create_employee("Update Employee")
+        self.manager = create_employee("Update Manager", manager=True)
+        project = Project.objects.create(title="HR", description="-")
+        self.updates = [
+            DailyProjectUpdate.objects.create(
+                employee=self.employee,
+                manager=self.manager,
+                project=project,
+                hours=hours,
+            )
+            for hours in (3.0, 4.5)
+        ]
+
+    def set_status(self, status):
+        response = self.client.patch(
+            reverse("dailyprojectupdate-status-update"),
+            {"status": status, "update_ids": [update.id for update in self.updates]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def summary(self):
+        return EmployeeAttendanceSummary.objects.filter(
+            employee=self.employee, date=self.updates[0].created_at.date()
+        ).first()
+
+    def test_status_update_refreshes_accepted_hours(self):
+        self.assertIsNone(self.summary())
+
+        self.set_status("approved")
+
+        summary = self.summary()
+        self.assertEqual(summary.accepted_hours, 7.5)
+        self.assertEqual(summary_cell(summary, self.employee)["accepted_hour"], 7.5)
+
+        self.set_status("pending")
+
+        self.assertIsNone(self.summary())
@@ -26,10 +26,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.decorators import action
 from account.models import Income
+from account.services.ledger import schedule_ledger_refresh
 from apps.mixin.permission import IsSuperUser, ModelPermission
 from apps.mixin.views import BaseModelViewSet
 from employee.models.employee import Employee, EmployeeUnderTPM
 from employee.models.employee_activity import EmployeeProject
+from employee.services.attendance_summary import refresh_daily_update_summaries
 from project_management.models import (
     Client,
     ClientReview,
@@ -172,6 +174,8 @@ class DailyProjectUpdateViewSet(BaseModelViewSet):
         for update in updates:
             update.status = data["status"]
         DailyProjectUpdate.objects.bulk_update(updates, ["status"])
+        # bulk_update skips the signals the attendance summary listens to
+        refresh_daily_update_summaries(queryset)
         return Response(DailyProjectUpdateSerializer(queryset, many=True).data)
 
     @swagger_auto_schema(
@@ -910,6 +914,7 @@ class WeeklyProjectUpdateViewSet(BaseModelViewSet):
                 income_objects.append(income_obj)
 
             created_records = Income.objects.bulk_create(income_objects)
+            schedule_ledger_refresh([income.date for income in created_records])
             created_count = len(created_records)
 
             return Response(
@@ -9,13 +9,16 @@ from django.db.models import (
     BooleanField,
     Case,
     Count,
+    Prefetch,
     Q,
     Value,
     When,
 )
+from django.http import JsonResponse
 from django.template.loader import get_template
 from django.utils import timezone
 from django.utils.html import format_html
+from django.urls import path
 from django.utils.safestring import mark_safe
 
 from asset_management.models import (
@@ -47,6 +50,16 @@ from asset_management.models.asset import (
     RAMSize,
     SSDorHDDSize,
 )
+from asset_management.services.asset_board import (
+    board_prefetches,
+    holdings_snapshot,
+    invalidate_holdings,
+)
+from asset_management.services.asset_search import (
+    category_ids,
+    index_objects,
+    search_ids,
+)
 from employee.models import Employee
 from employee.models.employee import Employee
 
@@ -171,36 +184,38 @@ class AssetAdmin(admin.ModelAdmin):
         )
 
     def get_search_results(self, request, queryset, search_term):
-        qs, use_distinct = super().get_search_results(
-            request, queryset, search_term
-        )
         data = request.GET.dict()
 
         app_label = data.get("app_label")
         model_name = data.get("model_name")
         referer = request.META.get("HTTP_REFERER", "")
 
-        if (
+        if not (
             request.user.is_authenticated
             and app_label == "asset_management"
             and model_name == "employeeassignedasset"
         ):
-            if "asset_management/employeeasset" in referer:
-                url_parts = urlparse(referer).path.split("/")
-                if len(url_parts) >= 3:
-                    employee_id = url_parts[-3]
-                    assined_assets = list(
-                        EmployeeAssignedAsset.objects.filter(
-                            employee_id=employee_id
-                        ).values_list("asset_id", flat=True)
-                    )
-                    qs = Asset.objects.filter(
-                        Q(title__icontains=search_term)
-                        | Q(code__icontains=search_term)
-                        | Q(is_available=True)
-                        | Q(id__in=assined_assets),
-                    )
-        return qs, use_distinct
+            return super().get_search_results(request, queryset, search_term)
+
+        # the employee asset inline autocomplete, available assets and the
+        # ones already assigned to the employee from the search index
+        assined_assets = []
+        if "asset_management/employeeasset" in referer:
+            url_parts = urlparse(referer).path.split("/")
+            if len(url_parts) >= 3:
+                employee_id = url_parts[-3]
+                assined_assets = list(
+                    EmployeeAssignedAsset.objects.filter(
+                        employee_id=employee_id
+                    ).values_list("asset_id", flat=True)
+                )
+        asset_ids = search_ids(
+            "asset",
+            search_term,
+            available_only=True,
+            include_ids=assined_assets,
+        )
+        return queryset.filter(pk__in=asset_ids), False
 
     def get_readonly_fields(self, request, obj=None):
         readonly_fields = list(super().get_readonly_fields(request, obj))
@@ -436,7 +451,12 @@ class EmployeeAssetAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        qs = qs.filter(active=True)
+        qs = qs.filter(active=True).prefetch_related(
+            Prefetch(
+                "assigned_assets",
+                queryset=EmployeeAssignedAsset.objects.select_related("asset__item"),
+            )
+        )
         return qs
 
 
@@ -722,12 +742,9 @@ class FixedAssetModelAdmin(admin.ModelAdmin):
         return ct.model_class()
 
     def get_search_results(self, request, queryset, search_term):
-        queryset, use_distinct = super().get_search_results(
-            request, queryset, search_term
-        )
         model_class = self.get_search_from_model(request)
         if not model_class:
-            return queryset, use_distinct
+            return super().get_search_results(request, queryset, search_term)
 
         field = request.GET.get("field_name")
         search_fields = {
@@ -748,9 +765,13 @@ class FixedAssetModelAdmin(admin.ModelAdmin):
                 field, flat=True
             )
 
-        queryset = queryset.exclude(pk__in=used_pks)
-
-        return queryset, use_distinct
+        asset_ids = search_ids(
+            "fixed_asset",
+            search_term,
+            categories=category_ids(model_class._meta.get_field(field)),
+            exclude_ids=used_pks,
+        )
+        return queryset.filter(pk__in=asset_ids), False
 
     def save_model(self, request, obj, form, change):
         if getattr(obj, "id") is None:
@@ -770,6 +791,7 @@ class FixedAssetModelAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark selected as active/inactive")
     def make_active_inactive(modeladmin, request, queryset):
+        asset_ids = list(queryset.values_list("id", flat=True))
         queryset.update(
             is_active=Case(
                 When(is_active=True, then=Value(False)),
@@ -777,6 +799,8 @@ class FixedAssetModelAdmin(admin.ModelAdmin):
                 default=Value(True),
             )
         )
+        # update() skips the signals the search index listens to
+        index_objects("fixed_asset", asset_ids)
 
     class Media:
         js = ("js/fixedasset.js",)
@@ -836,12 +860,9 @@ class CPUModelAdmin(admin.ModelAdmin):
         return ct.model_class()
 
     def get_search_results(self, request, queryset, search_term):
-        queryset, use_distinct = super().get_search_results(
-            request, queryset, search_term
-        )
         model_class = self.get_search_from_model(request)
         if not model_class:
-            return queryset, use_distinct
+            return super().get_search_results(request, queryset, search_term)
         field = request.GET.get("field_name")
         search_fields = {
             f"{field}__isnull": False,
@@ -850,9 +871,8 @@ class CPUModelAdmin(admin.ModelAdmin):
             field, flat=True
         )
 
-        queryset = queryset.exclude(pk__in=used_pks)
-
-        return queryset, use_distinct
+        cpu_ids = search_ids("cpu", search_term, exclude_ids=used_pks)
+        return queryset.filter(pk__in=cpu_ids), False
 
 
 User = get_user_model()
@@ -999,6 +1019,13 @@ class EmployeeFixedAssetModelAdmin(admin.ModelAdmin):
         js = ("js/list.js", "js/new_daily_update.js", "js/menuHide.js")
 
     def get_queryset(self, request):
+        # every column of the page in one query each, see asset_board
+        qs = (
+            super()
+            .get_queryset(request)
+            .select_related("employee", "created_by")
+            .prefetch_related(*board_prefetches())
+        )
         if (
             not request.user.has_perm(
                 "asset_management.cal_view_all_employee_asset"
@@ -1006,14 +1033,31 @@ class EmployeeFixedAssetModelAdmin(admin.ModelAdmin):
             and not request.user.is_superuser
         ):
             if hasattr(request.user, "employee"):
-                return (
-                    super()
-                    .get_queryset(request)
-                    .filter(employee=request.user.employee)
-                )
+                return qs.filter(employee=request.user.employee)
             else:
-                return super().get_queryset(request).none()
-        return super().get_queryset(request)
+                return qs.none()
+        return qs
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                "holdings/",
+                self.admin_site.admin_view(self.holdings_view),
+                name="asset_management_employeefixedasset_holdings",
+            ),
+        ]
+        return my_urls + urls
+
+    def holdings_view(self, request, *args, **kwargs):
+        if not (
+            request.user.is_superuser
+            or request.user.has_perm(
+                "asset_management.cal_view_all_employee_asset"
+            )
+        ):
+            raise PermissionDenied
+        return JsonResponse(holdings_snapshot())
 
     @staticmethod
     def log_assignment(employee, asset, action, note=""):
@@ -1091,6 +1135,8 @@ class EmployeeFixedAssetModelAdmin(admin.ModelAdmin):
                 default=Value(True),
             )
         )
+        # update() skips the signals the holdings snapshot listens to
+        invalidate_holdings()
 
 
 @admin.register(AssetAssignmentLog)
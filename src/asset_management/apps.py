@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AssetManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'asset_management'
+
+    def ready(self):
+        from asset_management.services import asset_board, asset_search  # noqa: F401
@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from asset_management.services.asset_search import INDEXED, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the asset autocomplete search index, i.e. after brands or categories are renamed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=list(INDEXED), action="append", dest="kinds", help="Kind to rebuild, repeatable")
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(options["kinds"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} assets"))
@@ -0,0 +1,123 @@
+# Generated by Django 3.2.8 on 2026-10-18 16:20
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of asset_management.services.asset_search as of this migration,
+# later changes to the index are applied with rebuild_asset_search_index
+SEPARATOR = re.compile(r"[\W_]+")
+TOKEN_LENGTH = 50
+MAX_TOKENS = 64
+INDEXED = {
+    "asset": (
+        "Asset",
+        "is_available",
+        "item_id",
+        ("code", "item__title", "brand__name", "variant__name", "description"),
+    ),
+    "fixed_asset": (
+        "FixedAsset",
+        "is_active",
+        "category_id",
+        (
+            "asset_id",
+            "serial",
+            "category__name",
+            "brand__name",
+            "vendor__name",
+            "ram_size__ram_capacity",
+            "storage_size__storage_capacity",
+            "display_size__display_size",
+            "core__processor_info",
+            "gpu",
+            "other_specs",
+        ),
+    ),
+    "cpu": (
+        "CPU",
+        None,
+        None,
+        (
+            "asset_id",
+            "casing__name",
+            "processor__asset_id",
+            "ram1__asset_id",
+            "ram2__asset_id",
+            "ssd__asset_id",
+            "hdd__asset_id",
+            "gpu__asset_id",
+        ),
+    ),
+}
+
+
+def tokenize(*values):
+    tokens = []
+    for value in values:
+        if value is None or value == "":
+            continue
+        words = [word for word in SEPARATOR.split(str(value).lower()) if word]
+        tokens.extend(words)
+        if 1 < len(words) <= 3:
+            tokens.append("".join(words))
+    return list(dict.fromkeys(token[:TOKEN_LENGTH] for token in tokens))
+
+
+def build_index(apps, schema_editor):
+    AssetSearchToken = apps.get_model("asset_management", "AssetSearchToken")
+    for kind, (model_name, available_field, category_field, fields) in INDEXED.items():
+        model = apps.get_model("asset_management", model_name)
+        columns = [field for field in (available_field, category_field) if field]
+        tokens = []
+        rows = model.objects.order_by("id").values("id", *columns, *fields)
+        for row in rows.iterator():
+            for token in tokenize(*(row[field] for field in fields))[:MAX_TOKENS]:
+                tokens.append(
+                    AssetSearchToken(
+                        kind=kind,
+                        object_id=row["id"],
+                        token=token,
+                        is_available=row[available_field] if available_field else True,
+                        category_id=row[category_field] if category_field else None,
+                    )
+                )
+            if len(tokens) >= 1000:
+                AssetSearchToken.objects.bulk_create(tokens, ignore_conflicts=True)
+                tokens = []
+        AssetSearchToken.objects.bulk_create(tokens, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asset_management', '0058_employeefixedasset_extra'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('asset', 'Asset'), ('fixed_asset', 'Fixed Asset'), ('cpu', 'CPU')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('token', models.CharField(max_length=50)),
+                ('is_available', models.BooleanField(default=True)),
+                ('category_id', models.PositiveBigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Asset Search Token',
+                'verbose_name_plural': 'Asset Search Tokens',
+                'unique_together': {('kind', 'object_id', 'token')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='assetsearchtoken',
+            index=models.Index(fields=['kind', 'is_available', 'token'], name='asset_search_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assetsearchtoken',
+            index=models.Index(fields=['kind', 'category_id', 'token'], name='asset_search_category_idx'),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from .contact import *
 from .asset import *
 from .stock import *
-from .credential import *
\ No newline at end of file
+from .credential import *
+from .search import *
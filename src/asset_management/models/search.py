@@ -0,0 +1,39 @@
+from django.db import models
+
+
+class AssetSearchToken(models.Model):
+    """Search index of the asset autocompletes
+
+    One row per normalized token of an Asset, FixedAsset or CPU, maintained
+    by asset_management.services.asset_search. is_available is
+    Asset.is_available, FixedAsset.is_active and always true for a CPU.
+    """
+
+    KIND_CHOICES = (
+        ("asset", "Asset"),
+        ("fixed_asset", "Fixed Asset"),
+        ("cpu", "CPU"),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    token = models.CharField(max_length=50)
+    is_available = models.BooleanField(default=True)
+    category_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Asset Search Token"
+        verbose_name_plural = "Asset Search Tokens"
+        unique_together = ("kind", "object_id", "token")
+        indexes = [
+            models.Index(
+                fields=["kind", "is_available", "token"],
+                name="asset_search_prefix_idx",
+            ),
+            models.Index(
+                fields=["kind", "category_id", "token"],
+                name="asset_search_category_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.token}"
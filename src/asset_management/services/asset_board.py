@@ -0,0 +1,125 @@
+"""
+Employee fixed asset board
+
+The board columns are the many to many fields of EmployeeFixedAsset. A page
+of the board prefetches every column once for the whole page, with the
+relations the asset card renders selected along, so rendering a row runs no
+query. The org wide "who holds what" snapshot is built from the relation
+tables, one query per column, and cached per version; the version is bumped
+whenever an assignment is logged or a board row changes.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from asset_management.models.asset import (
+    CPU,
+    AssetAssignmentLog,
+    EmployeeFixedAsset,
+    FixedAsset,
+)
+
+KEY_PREFIX = "asset_board"
+VERSION_KEY = f"{KEY_PREFIX}:holdings:version"
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+# column name: board field
+BOARD_COLUMNS = {
+    "Table": "table",
+    "Chair": "chair",
+    "Monitor": "monitor",
+    "CPU": "cpu",
+    "Keyboard": "keyboard",
+    "Mouse": "mouse",
+    "Headphone": "headphone",
+    "Webcam": "web_cam",
+    "Extra": "extra",
+}
+
+
+def board_prefetches():
+    """
+    @return list of Prefetch: every board column with what col_cpu.html renders
+    """
+    fixed_assets = FixedAsset.objects.select_related(
+        "brand", "category", "headphone_feature"
+    )
+    cpus = CPU.objects.select_related(
+        "casing",
+        "processor__brand",
+        "processor__core",
+        "ram1__brand",
+        "ram1__ram_size",
+        "ram2__brand",
+        "ram2__ram_size",
+        "ssd__brand",
+        "ssd__storage_size",
+        "hdd__brand",
+        "hdd__storage_size",
+        "gpu",
+    )
+    return [
+        Prefetch(field, queryset=cpus if field == "cpu" else fixed_assets)
+        for field in BOARD_COLUMNS.values()
+    ]
+
+
+def invalidate_holdings():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, timeout=None)
+
+
+def _build_holdings():
+    rows = {
+        board_id: {"employee_id": employee_id, "employee": full_name, "assets": {}}
+        for board_id, employee_id, full_name in EmployeeFixedAsset.objects.filter(
+            is_active=True
+        )
+        .order_by("employee__full_name")
+        .values_list("id", "employee_id", "employee__full_name")
+    }
+    holders = {}
+    for column, field_name in BOARD_COLUMNS.items():
+        field = EmployeeFixedAsset._meta.get_field(field_name)
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        for board_id, asset_id in (
+            field.remote_field.through.objects.filter(**{f"{source}__is_active": True})
+            .order_by(f"{target}__asset_id")
+            .values_list(f"{source}_id", f"{target}__asset_id")
+        ):
+            row = rows.get(board_id)
+            if row is None:
+                # activated after the rows were read
+                continue
+            row["assets"].setdefault(column, []).append(asset_id)
+            holders.setdefault(asset_id or "-", []).append(row["employee"])
+    return {"employees": list(rows.values()), "holders": holders}
+
+
+def holdings_snapshot():
+    """
+    Assets held by every active board row, cached until the next assignment
+
+    @return dict: employees, [{employee_id, employee, assets: {column: [asset id]}}]
+        and holders, {asset id: [employee name]}
+    """
+    version = cache.get_or_set(VERSION_KEY, 1, timeout=None)
+    key = f"{KEY_PREFIX}:holdings:v{version}"
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _build_holdings()
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+@receiver(post_save, sender=AssetAssignmentLog, dispatch_uid="asset_board_log_save")
+@receiver(post_delete, sender=AssetAssignmentLog, dispatch_uid="asset_board_log_delete")
+@receiver(post_save, sender=EmployeeFixedAsset, dispatch_uid="asset_board_save")
+@receiver(post_delete, sender=EmployeeFixedAsset, dispatch_uid="asset_board_delete")
+def invalidate_board(sender, instance, **kwargs):
+    # the admin logs before the many to many fields are saved
+    transaction.on_commit(invalidate_holdings)
@@ -0,0 +1,225 @@
+"""
+Asset autocomplete search index
+
+Every Asset, FixedAsset and CPU is indexed as AssetSearchToken rows, one per
+normalized token of its code, title, serial and specification fields, along
+with its availability and category. A token is the lower case text between
+separators; a short value also gets its separators dropped, so "KB-12" is found
+by "kb", "12" and "kb12". A search matches every word of the term as a token
+prefix, an index range scan on (kind, is_available, token), and returns a
+bounded list of ids. An object is re-indexed when it is saved or deleted.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from asset_management.models.asset import CPU, Asset, AssetCategory, FixedAsset
+from asset_management.models.search import AssetSearchToken
+
+SEPARATOR = re.compile(r"[\W_]+")
+TOKEN_LENGTH = 50
+# long descriptions only index their first words
+MAX_TOKENS = 64
+MAX_QUERY_WORDS = 5
+RESULT_LIMIT = 50
+
+# kind: (model name, availability field, category field, indexed fields)
+INDEXED = {
+    "asset": (
+        "Asset",
+        "is_available",
+        "item_id",
+        ("code", "item__title", "brand__name", "variant__name", "description"),
+    ),
+    "fixed_asset": (
+        "FixedAsset",
+        "is_active",
+        "category_id",
+        (
+            "asset_id",
+            "serial",
+            "category__name",
+            "brand__name",
+            "vendor__name",
+            "ram_size__ram_capacity",
+            "storage_size__storage_capacity",
+            "display_size__display_size",
+            "core__processor_info",
+            "gpu",
+            "other_specs",
+        ),
+    ),
+    "cpu": (
+        "CPU",
+        None,
+        None,
+        (
+            "asset_id",
+            "casing__name",
+            "processor__asset_id",
+            "ram1__asset_id",
+            "ram2__asset_id",
+            "ssd__asset_id",
+            "hdd__asset_id",
+            "gpu__asset_id",
+        ),
+    ),
+}
+
+
+def _words(value):
+    return [word for word in SEPARATOR.split(str(value).lower()) if word]
+
+
+def tokenize(*values):
+    """
+    @return list: the distinct tokens of the values, in the order they appear
+    """
+    tokens = []
+    for value in values:
+        if value is None or value == "":
+            continue
+        words = _words(value)
+        tokens.extend(words)
+        if 1 < len(words) <= 3:
+            tokens.append("".join(words))
+    return list(dict.fromkeys(token[:TOKEN_LENGTH] for token in tokens))
+
+
+def index_objects(kind, ids):
+    """Rewrite the tokens of the objects of a kind, objects gone lose their tokens"""
+    model_name, available_field, category_field, fields = INDEXED[kind]
+    model = apps.get_model("asset_management", model_name)
+    ids = list(ids)
+    columns = [field for field in (available_field, category_field) if field]
+    tokens = []
+    for row in model.objects.filter(id__in=ids).values("id", *columns, *fields):
+        for token in tokenize(*(row[field] for field in fields))[:MAX_TOKENS]:
+            tokens.append(
+                AssetSearchToken(
+                    kind=kind,
+                    object_id=row["id"],
+                    token=token,
+                    is_available=row[available_field] if available_field else True,
+                    category_id=row[category_field] if category_field else None,
+                )
+            )
+    with transaction.atomic():
+        AssetSearchToken.objects.filter(kind=kind, object_id__in=ids).delete()
+        AssetSearchToken.objects.bulk_create(
+            tokens, batch_size=1000, ignore_conflicts=True
+        )
+
+
+def rebuild_index(kinds=None, batch_size=1000):
+    """
+    Index every object of the kinds, all kinds by default
+
+    @return int: number of objects indexed
+    """
+    indexed = 0
+    for kind in kinds or INDEXED:
+        model = apps.get_model("asset_management", INDEXED[kind][0])
+        ids = list(model.objects.order_by("id").values_list("id", flat=True))
+        for start in range(0, len(ids), batch_size):
+            index_objects(kind, ids[start : start + batch_size])
+        indexed += len(ids)
+    return indexed
+
+
+def category_ids(field):
+    """
+    Categories a FixedAsset foreign key or many to many field is limited to
+
+    @return list: AssetCategory ids, None when the field is not limited by category
+    """
+    limit = field.get_limit_choices_to()
+    if not isinstance(limit, dict):
+        return None
+    lookups = {
+        key[len("category__"):]: value
+        for key, value in limit.items()
+        if key.startswith("category__")
+    }
+    if not lookups:
+        return None
+    return list(AssetCategory.objects.filter(**lookups).values_list("id", flat=True))
+
+
+def search_ids(
+    kind,
+    term,
+    available_only=False,
+    include_ids=None,
+    categories=None,
+    exclude_ids=None,
+    limit=RESULT_LIMIT,
+):
+    """
+    Ids of the objects of a kind whose tokens start with every word of term
+
+    @param available_only: only available objects, plus include_ids
+    @param categories: category ids to limit to, see category_ids
+    @param exclude_ids: ids or a values_list queryset of ids to leave out
+    @return list: at most limit ids, in id order
+    """
+    tokens = AssetSearchToken.objects.filter(kind=kind)
+    if available_only:
+        available = Q(is_available=True)
+        if include_ids:
+            available |= Q(object_id__in=include_ids)
+        tokens = tokens.filter(available)
+    if categories is not None:
+        tokens = tokens.filter(category_id__in=categories)
+    if exclude_ids is not None:
+        tokens = tokens.exclude(object_id__in=exclude_ids)
+
+    words = [word[:TOKEN_LENGTH] for word in _words(term or "")][:MAX_QUERY_WORDS]
+    if not words:
+        ids = tokens.order_by("object_id").values_list("object_id", flat=True).distinct()
+        return list(ids[:limit])
+
+    tokens = tokens.filter(
+        reduce(operator.or_, (Q(token__startswith=word) for word in words))
+    )
+    if len(words) == 1:
+        ids = tokens.order_by("object_id").values_list("object_id", flat=True).distinct()
+        return list(ids[:limit])
+    # every word has to match a token of the object
+    matched = {
+        f"word_{index}": Max(
+            Case(
+                When(token__startswith=word, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        for index, word in enumerate(words)
+    }
+    rows = (
+        tokens.order_by()
+        .values("object_id")
+        .annotate(**matched)
+        .filter(**{name: 1 for name in matched})
+        .order_by("object_id")
+    )
+    return [row["object_id"] for row in rows[:limit]]
+
+
+@receiver(post_save, sender=Asset, dispatch_uid="asset_search_asset_save")
+@receiver(post_delete, sender=Asset, dispatch_uid="asset_search_asset_delete")
+@receiver(post_save, sender=FixedAsset, dispatch_uid="asset_search_fixed_asset_save")
+@receiver(post_delete, sender=FixedAsset, dispatch_uid="asset_search_fixed_asset_delete")
+@receiver(post_save, sender=CPU, dispatch_uid="asset_search_cpu_save")
+@receiver(post_delete, sender=CPU, dispatch_uid="asset_search_cpu_delete")
+def reindex_object(sender, instance, **kwargs):
+    kind = {Asset: "asset", FixedAsset: "fixed_asset", CPU: "cpu"}[sender]
+    object_id = instance.pk
+    transaction.on_commit(lambda: index_objects(kind, [object_id]))
+
@@ -1,3 +1,148 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from asset_management.models.asset import (
+    CPU,
+    AssetBrand,
+    AssetCategory,
+    EmployeeFixedAsset,
+    FixedAsset,
+)
+from asset_management.models.search import AssetSearchToken
+from asset_management.services.asset_search import (
+    RESULT_LIMIT,
+    rebuild_index,
+    search_ids,
+)
+from employee.tests import create_employee, create_superuser
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class AssetBoardQueryTest(TestCase):
+    """The employee fixed asset board renders in a fixed number of queries"""
+
+    def setUp(self):
+        self.client.force_login(create_superuser())
+        self.brand = AssetBrand.objects.create(name="Dell")
+        self.categories = {
+            name: AssetCategory.objects.create(name=name)
+            for name in ("Monitor", "Keyboard", "Processor")
+        }
+        self.asset_count = 0
+
+    def fixed_asset(self, category):
+        self.asset_count += 1
+        return FixedAsset.objects.create(
+            asset_id=f"{category[:2].upper()}-{self.asset_count}",
+            category=self.categories[category],
+            brand=self.brand,
+            serial=f"SN{self.asset_count}",
+            purchase_date=datetime.date(2024, 1, 1),
+        )
+
+    def add_board_rows(self, count):
+        for index in range(count):
+            employee = create_employee(f"Asset Holder {self.asset_count} {index}")
+            board = EmployeeFixedAsset.objects.create(employee=employee)
+            board.monitor.add(self.fixed_asset("Monitor"), self.fixed_asset("Monitor"))
+            board.keyboard.add(self.fixed_asset("Keyboard"))
+            board.cpu.add(
+                CPU.objects.create(
+                    asset_id=f"CPU-{self.asset_count}",
+                    processor=self.fixed_asset("Processor"),
+                )
+            )
+
+    def render(self):
+        cache.clear()
+        response = self.client.get(
+            reverse("admin:asset_management_employeefixedasset_changelist")
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_board_rows(1)
+        # the first render warms the per process caches
+        self.render()
+        with CaptureQueriesContext(connection) as small_render:
+            self.render()
+
+        self.add_board_rows(5)
+        # the asset cards print the category of every fixed asset
+        with self.assertNumQueries(len(small_render)):
+            self.render()
+
+
+class AssetSearchTest(TestCase):
+    def setUp(self):
+        category = AssetCategory.objects.create(name="Monitor")
+        dell = AssetBrand.objects.create(name="Dell")
+        hp = AssetBrand.objects.create(name="HP")
+        self.dell_27, self.dell_24, self.hp_27 = [
+            FixedAsset.objects.create(
+                asset_id=asset_id,
+                category=category,
+                brand=brand,
+                other_specs=specs,
+                is_active=is_active,
+                purchase_date=datetime.date(2024, 1, 1),
+            )
+            for asset_id, brand, specs, is_active in (
+                ("MN-1", dell, "27 inch", True),
+                ("MN-2", dell, "24 inch", False),
+                ("MN-3", hp, "27 inch", True),
+            )
+        ]
+        rebuild_index(["fixed_asset"])
+
+    def search(self, term, **kwargs):
+        return search_ids("fixed_asset", term, **kwargs)
+
+    def test_words_match_token_prefixes(self):
+        self.assertEqual(self.search("del"), [self.dell_27.id, self.dell_24.id])
+        self.assertEqual(self.search("MN-3"), [self.hp_27.id])
+        # a short value is also indexed without its separators
+        self.assertEqual(self.search("mn3"), [self.hp_27.id])
+
+    def test_every_word_has_to_match(self):
+        self.assertEqual(self.search("27"), [self.dell_27.id, self.hp_27.id])
+        self.assertEqual(self.search("dell 27"), [self.dell_27.id])
+        self.assertEqual(self.search("hp 24"), [])
+
+    def test_exclude_and_include_ids(self):
+        self.assertEqual(
+            self.search("dell", exclude_ids=[self.dell_27.id]), [self.dell_24.id]
+        )
+        self.assertEqual(
+            self.search(
+                "inch",
+                exclude_ids=FixedAsset.objects.filter(brand__name="HP").values_list(
+                    "id", flat=True
+                ),
+            ),
+            [self.dell_27.id, self.dell_24.id],
+        )
+        self.assertEqual(self.search("dell", available_only=True), [self.dell_27.id])
+        self.assertEqual(
+            self.search("dell", available_only=True, include_ids=[self.dell_24.id]),
+            [self.dell_27.id, self.dell_24.id],
+        )
+
+    def test_results_are_capped(self):
+        AssetSearchToken.objects.bulk_create(
+            AssetSearchToken(kind="fixed_asset", object_id=object_id, token="bulk")
+            for object_id in range(10000, 10000 + RESULT_LIMIT + 5)
+        )
+
+        ids = self.search("bulk")
+
+        self.assertEqual(ids, list(range(10000, 10000 + RESULT_LIMIT)))
+        self.assertEqual(len(self.search("")), RESULT_LIMIT)
@@ -0,0 +1,481 @@
+from datetime import datetime, timedelta
+from functools import cached_property, partial
+
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.utils.html import format_html
+
+from config.context_processors.employees import (
+    EmployeeAvailableSlotForm,
+    bookings_processor,
+    get_managed_birthday_image,
+)
+from config.settings import employee_ids as management_ids
+from employee import dashboard_cache
+from employee.admin.employee.extra_url.formal_view import EmployeeNearbySummery
+from employee.forms.employee_need_help import EmployeeNeedHelpForm
+from employee.forms.employee_online import EmployeeStatusForm
+from employee.forms.employee_project import (
+    BookConferenceRoomForm,
+    EmployeeProjectForm,
+)
+from employee.models import (
+    Employee,
+    EmployeeNeedHelp,
+    EmployeeOnline,
+    FavouriteMenu,
+    Leave,
+)
+from employee.models.employee import EmployeeAvailableSlot, LateAttendanceFine
+from employee.models.employee_activity import EmployeeProject
+from employee.models.employee_feedback import EmployeeFeedback
+from settings.models import Notice
+
+ANNOUNCEMENT_PREFIX = (
+    '<span style="background-color:tomato;padding:0.4rem 0.8rem;border-radius:0.4rem;">'
+    f'ANNOUNCEMENTS</span> {"&nbsp;" * 8}🚨'
+)
+
+
+class DashboardContext:
+    """
+    Request scoped admin dashboard context
+
+    Replaces the former per key context processors of
+    config.context_processors.employees. Every value is computed at most once
+    per request and only when a template reads it, values shared by several
+    keys (employee, last slots) are loaded once.
+    Org-wide widgets come from employee.dashboard_cache.
+    """
+
+    # Maximum number of queries needed to render a key, on top of
+    # EMPLOYEE_QUERIES for the request user's employee. Keys sharing a value
+    # (announcement and all_employees_last_slot) cost less together and
+    # cached widgets cost nothing on a cache hit.
+    EMPLOYEE_QUERIES = 1
+    QUERY_BUDGET = {
+        "leaves": 1,
+        "leaves_count": 1,
+        "employee_online": 1,
+        "current_month_feedback_done": 1,
+        "announcement": 5,
+        "birthday_today": 1,
+        "is_management": 0,
+        "birthdays": 1,
+        "new_employees": 2,
+        "new_lead_or_managers": 2,
+        "late_attendance_fine": 1,
+        "late_attendance_count": 1,
+        "status_form": 1,
+        "employee_project_form": 1,
+        "employee_need_help_form": 2,
+        "object_list": 1,
+        "conference_room_bookings": 1,
+        "employee": 0,
+        "is_manager": 0,
+        "is_lead": 0,
+        "is_sqa": 0,
+        "is_manager_lead_tpm": 0,
+        "weekly_expected_hours": 0,
+        "monthly_expected_hours": 0,
+        "can_show_permanent_increment": 2,
+        "notices": 1,
+        "current_slot": 1,
+        "all_employees_last_slot": 2,
+    }
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        self.is_dashboard = request.path == "/admin/"
+        self.is_authenticated = request.user.is_authenticated
+
+    @classmethod
+    def for_request(cls, request):
+        """Same instance for every template rendered during the request"""
+        board = getattr(request, "_dashboard_context", None)
+        if board is None:
+            board = cls(request)
+            request._dashboard_context = board
+        return board
+
+    @classmethod
+    def query_budget(cls, *keys):
+        """Upper bound of the queries needed to render the given keys"""
+        return cls.EMPLOYEE_QUERIES + sum(cls.QUERY_BUDGET[key] for key in keys)
+
+    def context(self):
+        if self.is_dashboard:
+            context = self.__dashboard_context()
+        else:
+            context = {
+                "announcement": self.__lazy("slot_announcement"),
+                "status_form": None,
+                "employee_project_form": None,
+                "employee_need_help_form": None,
+                "notices": [],
+            }
+
+        now = timezone.now()
+        context.update(
+            {
+                "is_super": self.is_authenticated and self.user.is_superuser,
+                "late_attendance_count": self.__lazy("late_attendance_count"),
+                "conference_room_bookings": bookings_processor(self.request)[
+                    "conference_room_bookings"
+                ],
+                "my_form": BookConferenceRoomForm,
+                "can_show_permanent_increment": self.__lazy(
+                    "can_show_permanent_increment"
+                ),
+                "slot_form": EmployeeAvailableSlotForm(),
+                "today": now.date(),
+                "current_slot": self.__lazy("current_slot"),
+                "all_employees_last_slot": self.__lazy("last_slot_employees"),
+            }
+        )
+        if self.is_authenticated:
+            context["object_list"] = self.__lazy("favourite_menus")
+        return context
+
+    def __dashboard_context(self):
+        context = {
+            "status_form": self.__lazy("status_form"),
+            "employee_project_form": self.__lazy("employee_project_form"),
+            "employee_need_help_form": self.__lazy("employee_need_help_form"),
+            "notices": self.__lazy("notices"),
+            "employee": self.__lazy("employee"),
+            "is_manager": self.__lazy("is_manager"),
+            "is_lead": self.__lazy("is_lead"),
+            "is_sqa": self.__lazy("is_sqa"),
+        }
+        if not self.is_authenticated:
+            return context
+
+        context.update(
+            {
+                "leaves": self.__lazy("leaves"),
+                "leaves_count": self.__lazy("leaves_count"),
+                "employee_online": self.__lazy("employee_online"),
+                "current_month_feedback_done": self.__lazy(
+                    "current_month_feedback_done"
+                ),
+                "announcement": self.__lazy("announcement"),
+                "birthday_today": self.__lazy("birthday_today"),
+                "is_management": self.__lazy("is_management"),
+                "birthdays": self.__lazy("birthdays"),
+                "new_employees": self.__lazy("new_employees"),
+                "new_lead_or_managers": self.__lazy("new_lead_or_managers"),
+                "late_attendance_fine": self.__lazy("late_attendance_fine"),
+                "is_manager_lead_tpm": self.__lazy("is_manager_lead_tpm"),
+                "weekly_expected_hours": self.__lazy("weekly_expected_hours"),
+                "monthly_expected_hours": self.__lazy("monthly_expected_hours"),
+            }
+        )
+        return context
+
+    def __lazy(self, name):
+        return SimpleLazyObject(partial(getattr, self, name))
+
+    # Employee
+    @cached_property
+    def employee(self):
+        if not self.is_authenticated:
+            return None
+        return getattr(self.user, "employee", None)
+
+    @cached_property
+    def is_management(self):
+        return self.employee is not None and str(self.employee.id) in management_ids
+
+    @cached_property
+    def is_employee(self):
+        """Authenticated non management employee, the one that sees the action forms"""
+        return self.employee is not None and not self.is_management
+
+    @cached_property
+    def is_manager(self):
+        return bool(self.employee and self.employee.manager)
+
+    @cached_property
+    def is_lead(self):
+        return bool(self.employee and self.employee.lead)
+
+    @cached_property
+    def is_sqa(self):
+        return bool(self.employee and self.employee.sqa)
+
+    @cached_property
+    def is_manager_lead_tpm(self):
+        return bool(
+            self.employee
+            and (self.employee.manager or self.employee.lead or self.employee.is_tpm)
+        )
+
+    @cached_property
+    def monthly_expected_hours(self):
+        if self.employee is None:
+            return 0
+        return int(self.employee.monthly_expected_hours or 0)
+
+    @cached_property
+    def weekly_expected_hours(self):
+        return int(self.monthly_expected_hours / 4)
+
+    @cached_property
+    def can_show_permanent_increment(self):
+        return self.user.has_perm("employee.can_show_permanent_increment")
+
+    # Formal summery
+    @cached_property
+    def nearby_summery(self):
+        return EmployeeNearbySummery()
+
+    @cached_property
+    def leaves(self):
+        return dashboard_cache.get_or_compute(
+            "leaves", lambda: list(self.nearby_summery.employee_leave_nearby()[0])
+        )
+
+    @cached_property
+    def leaves_count(self):
+        return len(self.leaves)
+
+    @cached_property
+    def employee_online(self):
+        return (
+            EmployeeOnline.objects.filter(employee__active=True)
+            .order_by(
+                "-employee__need_cto",
+                "-employee__need_hr",
+                "active",
+                "employee__full_name",
+            )
+            .exclude(employee_id__in=management_ids)
+            .select_related("employee")
+        )
+
+    @cached_property
+    def current_month_feedback_done(self):
+        if self.employee is None or self.is_management:
+            return True
+        return EmployeeFeedback.objects.filter(
+            employee_id=self.employee.id,
+            created_at__date__month=timezone.now().date().month,
+        ).exists()
+
+    @cached_property
+    def birthday_today(self):
+        if self.employee is None:
+            return False
+        return get_managed_birthday_image(self.request)
+
+    @cached_property
+    def birthdays(self):
+        return dashboard_cache.get_or_compute(
+            "birthdays", lambda: list(self.nearby_summery.birthdays())
+        )
+
+    @cached_property
+    def new_employees(self):
+        return self.nearby_summery.new_employee()
+
+    @cached_property
+    def new_lead_or_managers(self):
+        return self.nearby_summery.new_lead_or_manager()
+
+    # Announcements
+    @cached_property
+    def last_slot_employees(self):
+        return dashboard_cache.get_or_compute(
+            "last_slot_employees", self.__load_last_slot_employees
+        )
+
+    @staticmethod
+    def __load_last_slot_employees():
+        """Active employees with their latest slot choice (Half/Full), MySQL 5.x compatible"""
+        latest_ids = (
+            EmployeeAvailableSlot.objects.values("employee")
+            .annotate(max_id=Max("id"))
+            .values_list("max_id", flat=True)
+        )
+        slots = {
+            slot.employee_id: slot.get_slot_display()
+            for slot in EmployeeAvailableSlot.objects.filter(id__in=latest_ids)
+        }
+        available_employees = []
+        for employee in Employee.objects.filter(active=True).order_by("full_name"):
+            slot = slots.get(employee.id)
+            if slot is not None and slot != "N/A":
+                employee.slot_label = slot
+                available_employees.append(employee)
+        return available_employees
+
+    def __available_resources(self):
+        names = [employee.full_name for employee in self.last_slot_employees]
+        if names:
+            return [f"Available Resources ({', '.join(names)})"]
+        return []
+
+    @staticmethod
+    def __format_announcement(data):
+        if not data:
+            return None
+        return format_html(
+            ANNOUNCEMENT_PREFIX
+            + f" {'&nbsp;' * 8}🚨".join(
+                [f'<span class="single_announcement">{d}</span>' for d in data]
+            )
+        )
+
+    @cached_property
+    def slot_announcement(self):
+        return dashboard_cache.get_or_compute(
+            "slot_announcement",
+            lambda: self.__format_announcement(self.__available_resources()),
+        )
+
+    @cached_property
+    def announcement(self):
+        return dashboard_cache.get_or_compute("announcement", self.__load_announcement)
+
+    def __load_announcement(self):
+        data = self.__available_resources()
+        now = timezone.now()
+
+        leaves_today = Leave.objects.filter(
+            employee__active=True,
+            start_date__lte=now,
+            end_date__gte=now,
+        ).exclude(status="rejected")
+        if leaves_today.exists():
+            data.extend(
+                f"{leave.employee.full_name} is on {leave.leave_type} leave today."
+                for leave in Leave.objects.filter(
+                    status="Approved", start_date=datetime.now().date()
+                ).select_related("employee")
+            )
+
+        birthdays_today = list(
+            Employee.objects.filter(
+                active=True,
+                date_of_birth__day=now.date().day,
+                date_of_birth__month=now.date().month,
+            ).values_list("full_name", flat=True)
+        )
+        if birthdays_today:
+            data.append(
+                f"{', '.join(birthdays_today)} "
+                f"{'has' if len(birthdays_today) == 1 else 'have'} birthday today."
+            )
+        return self.__format_announcement(data)
+
+    # Late attendance
+    @cached_property
+    def late_attendance_fine(self):
+        current_date = datetime.now()
+        current_month = current_date.month
+        last_month = current_date.month - 1
+        current_year = current_date.year
+
+        fine = {"current": None, "last": None}
+        if self.employee is not None:
+            fine = LateAttendanceFine.objects.filter(
+                employee=self.employee,
+                year=current_year,
+                month__in=[current_month, last_month],
+            ).aggregate(
+                current=Sum("total_late_attendance_fine", filter=Q(month=current_month)),
+                last=Sum("total_late_attendance_fine", filter=Q(month=last_month)),
+            )
+        current_fine = fine["current"] if fine["current"] else 0.00
+        last_fine = fine["last"] if fine["last"] else 0.00
+
+        last_month_date = current_date + timedelta(days=-30)
+        html = f"{current_fine} ( {current_date.strftime('%b')} )  </br>{last_fine} ( {last_month_date.strftime('%b')} ) "
+        return format_html(html)
+
+    @cached_property
+    def late_attendance_count(self):
+        current_date = timezone.now()
+        current_month = current_date.month
+        last_month = current_date.month - 1 or 12
+        current_year = current_date.year
+        last_year = current_year if last_month != 12 else current_year - 1
+
+        current_month_name = current_date.strftime("%b").lower()
+        last_month_date = current_date - timedelta(days=30)
+        last_month_name = last_month_date.strftime("%b").lower()
+
+        if not self.is_authenticated:
+            html = f"<div class='text-start'>0 ({current_month_name})<br>0 ({last_month_name})<div>"
+            return format_html(html)
+        if self.employee is None:
+            return format_html(f"0 ({current_month_name})<br>0 ({last_month_name})")
+
+        current = Q(month=current_month, year=current_year)
+        last = Q(month=last_month, year=last_year)
+        counts = LateAttendanceFine.objects.filter(
+            current | last, employee=self.employee
+        ).aggregate(
+            current=Count("id", filter=current),
+            last=Count("id", filter=last),
+        )
+        html = f"{counts['current']} ({current_month_name})<br>{counts['last']} ({last_month_name})"
+        return format_html(html)
+
+    # Forms
+    @cached_property
+    def status_form(self):
+        if not self.is_employee:
+            return None
+        employee_online = EmployeeOnline.objects.get(employee_id=self.employee.id)
+        return EmployeeStatusForm(instance=employee_online)
+
+    @cached_property
+    def employee_project_form(self):
+        if not self.is_employee:
+            return None
+        employee_project = EmployeeProject.objects.get(employee_id=self.employee.id)
+        return EmployeeProjectForm(instance=employee_project)
+
+    @cached_property
+    def employee_need_help_form(self):
+        if not self.is_employee:
+            return None
+        employee_need_help, _ = EmployeeNeedHelp.objects.get_or_create(
+            employee_id=self.employee.id,
+        )
+        return EmployeeNeedHelpForm(instance=employee_need_help)
+
+    @cached_property
+    def current_slot(self):
+        if self.employee is None:
+            return None
+        current_slot = EmployeeAvailableSlot.objects.filter(
+            employee=self.employee
+        ).last()
+        return current_slot.slot if current_slot else None
+
+    # Lists
+    @cached_property
+    def notices(self):
+        return dashboard_cache.get_or_compute(
+            "notices",
+            lambda: list(
+                Notice.objects.filter(
+                    start_date__lte=timezone.now(), end_date__gte=timezone.now()
+                ).order_by("-rank", "-created_at")
+            ),
+        )
+
+    @cached_property
+    def favourite_menus(self):
+        if self.employee is None:
+            return []
+        return FavouriteMenu.objects.filter(employee_id=self.employee.id)
+
+
+def dashboard(request):
+    return DashboardContext.for_request(request).context()
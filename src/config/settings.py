@@ -125,27 +125,8 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.static",
-                "config.context_processors.employees.formal_summery",
-                "config.context_processors.employees.all_employees_last_slot_announcement",
-                "config.context_processors.employees.employee_status_form",
-                "config.context_processors.employees.employee_project_form",
-                "config.context_processors.employees.employee_need_help_form",
-                "config.context_processors.employees.favourite_menu_list",
-                # "config.context_processors.employees.project_lists",
                 "config.context_processors.month_year.current_month_year",
-                "config.context_processors.employees.conference_room_bookings",
-                "config.context_processors.employees.conference_room_bookings_form",
-                "config.context_processors.employees.employee_context_processor",
-                # "config.context_processors.employees.employee_project_list",
-                "config.context_processors.employees.total_attendance_fine",
-                "config.context_processors.employees.total_late_entry_count",
-                "config.context_processors.employees.approval_info_leave_daily_update",
-                "config.context_processors.employees.last_four_week_project_hour",
-                "config.context_processors.employees.can_show_permanent_increment",
-                "config.context_processors.employees.all_notices",
-                # "config.context_processors.employees.unread_inbox",
-                "config.context_processors.employees.available_slot_form",
-                "config.context_processors.employees.all_employees_last_slot",
+                "config.context_processors.dashboard.dashboard",
             ],
         },
     },
@@ -242,6 +223,24 @@ EMAIL_PORT = os.environ.get("EMAIL_PORT")
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 EMAIL_USE_TLS = True
+# config.utils.mail.MailPipeline, 0 messages per minute means no throttling
+EMAIL_PIPELINE_PER_MINUTE = int(os.environ.get("EMAIL_PIPELINE_PER_MINUTE", 0))
+EMAIL_PIPELINE_MAX_RETRIES = int(os.environ.get("EMAIL_PIPELINE_MAX_RETRIES", 2))
+EMAIL_PIPELINE_BACKOFF = float(os.environ.get("EMAIL_PIPELINE_BACKOFF", 2))
+
+# config.utils.pdf_render, below 2 workers batches are rendered in the calling process.
+# The asset cache is per process: the server process and every render worker
+# hold up to PDF_ASSET_CACHE_BYTES each, 0 disables it
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", 2))
+PDF_ASSET_CACHE_BYTES = int(os.environ.get("PDF_ASSET_CACHE_BYTES", 64 * 1024 * 1024))
+
+# employee.tasks.create_tds posts account.services.tax.calculate_monthly_tds instead
+# of the fixed 417 when on
+TDS_COMPUTED_AMOUNT = os.environ.get("TDS_COMPUTED_AMOUNT", "False").lower() in (
+    "true",
+    "1",
+    "t",
+)
 
 SMS_API_KEY = os.environ.get("SMS_API_KEY")
 SMS_SENDER_ID = os.environ.get("SMS_SENDER_ID")
@@ -403,6 +402,13 @@ CACHES = {
     }
 }
 
+# employee.dashboard_cache hit/miss counters, read by the dashboard_cache_stats command
+DASHBOARD_WIDGET_STATS = os.environ.get("DASHBOARD_WIDGET_STATS", "False").lower() in (
+    "true",
+    "1",
+    "t",
+)
+
 # CACHE_MIDDLEWARE_ALIAS = 'default'
 # CACHE_MIDDLEWARE_SECONDS = 60 * 15  # 15 minutes
 # CACHE_MIDDLEWARE_KEY_PREFIX = ''
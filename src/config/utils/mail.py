@@ -0,0 +1,200 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+
+from settings.models import EmailDeliveryLog
+
+HR_FROM_EMAIL = '"Mediusware-HR" <hr@mediusware.com>'
+# Q_CLUSTER timeout is 60 seconds, a throttled task has to end well before it
+TASK_TIME_BUDGET = 40
+
+logger = logging.getLogger(__name__)
+
+
+def throttled_chunk_size(size, time_budget=TASK_TIME_BUDGET):
+    """
+    Number of messages one task sends, so a throttled chunk fits in its time budget
+
+    @param size: chunk size when EMAIL_PIPELINE_PER_MINUTE does not throttle
+    @param time_budget: seconds the task may spend sending
+    @return int: between 1 and size
+    """
+    per_minute = getattr(settings, "EMAIL_PIPELINE_PER_MINUTE", 0)
+    if not per_minute:
+        return size
+    return max(1, min(size, int(per_minute * time_budget / 60)))
+
+
+def render_many(template_name, contexts):
+    """
+    Render one template for many contexts, the template is loaded and compiled once
+
+    @param template_name: template path
+    @param contexts: iterable of dict
+    @return list of str in the contexts order
+    """
+    template = get_template(template_name)
+    return [template.render(context) for context in contexts]
+
+
+def read_attachments(paths):
+    """
+    Read attachment files once for a whole batch of emails
+
+    @param paths: local file paths, empty values are skipped
+    @return list of tuple(filename, content, mimetype)
+    """
+    attachments = []
+    for path in paths:
+        if path:
+            with open(path, "rb") as attachment:
+                attachments.append((os.path.basename(path), attachment.read(), None))
+    return attachments
+
+
+def html_email(subject, html_body, to, from_email=HR_FROM_EMAIL, cc=None, attachments=None):
+    """
+    @param attachments: list of tuple(filename, content, mimetype), see read_attachments
+    """
+    email = EmailMultiAlternatives(
+        subject=subject, from_email=from_email, to=to, cc=cc or []
+    )
+    email.attach_alternative(html_body, "text/html")
+    for filename, content, mimetype in attachments or []:
+        email.attach(filename, content, mimetype)
+    return email
+
+
+class MailPipeline:
+    """
+    Send a batch of emails over one reused connection
+
+    Every message is throttled to EMAIL_PIPELINE_PER_MINUTE (0 means no limit),
+    a failed message is retried up to EMAIL_PIPELINE_MAX_RETRIES times on a
+    reopened connection waiting EMAIL_PIPELINE_BACKOFF seconds, doubled on
+    every attempt. One EmailDeliveryLog row per message is written at the end.
+    Works with any email backend, locmem and console included.
+    """
+
+    def __init__(
+        self,
+        category,
+        per_minute=None,
+        max_retries=None,
+        backoff=None,
+        connection=None,
+        sleep=time.sleep,
+    ):
+        self.category = category
+        self.per_minute = (
+            getattr(settings, "EMAIL_PIPELINE_PER_MINUTE", 0)
+            if per_minute is None
+            else per_minute
+        )
+        self.max_retries = (
+            getattr(settings, "EMAIL_PIPELINE_MAX_RETRIES", 2)
+            if max_retries is None
+            else max_retries
+        )
+        self.backoff = (
+            getattr(settings, "EMAIL_PIPELINE_BACKOFF", 2.0) if backoff is None else backoff
+        )
+        self.connection = connection or get_connection()
+        self.sleep = sleep
+        self.sent = []
+        self.failed = []
+        self.__logs = []
+        self.__last_sent_at = None
+
+    def send(self, messages):
+        """
+        @param messages: iterable of EmailMessage
+        @return int: number of messages sent
+        """
+        sent = 0
+        self.__open()
+        try:
+            for message in messages:
+                if not message.recipients():
+                    continue
+                self.__throttle()
+                if self.__send(message):
+                    sent += 1
+        finally:
+            self.connection.close()
+            self.__write_logs()
+        return sent
+
+    def __throttle(self):
+        if not self.per_minute:
+            return
+        interval = 60.0 / self.per_minute
+        if self.__last_sent_at is not None:
+            wait = self.__last_sent_at + interval - time.monotonic()
+            if wait > 0:
+                self.sleep(wait)
+        self.__last_sent_at = time.monotonic()
+
+    def __send(self, message):
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                # a fail_silently backend reports a failure by sending nothing
+                if self.connection.send_messages([message]) != 1:
+                    raise ConnectionError("the email backend did not send the message")
+            except Exception as e:
+                if attempts > self.max_retries:
+                    logger.exception("Failed to send email to %s", message.recipients())
+                    self.failed.append(message)
+                    self.__log(message, "failed", attempts, str(e))
+                    return False
+                self.sleep(self.backoff * 2 ** (attempts - 1))
+                self.__open()
+                continue
+            self.sent.append(message)
+            self.__log(message, "sent", attempts)
+            return True
+
+    def __open(self):
+        """(Re)open the connection, a failure is left to the next send_messages"""
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        try:
+            self.connection.open()
+        except Exception:
+            logger.exception("Failed to open the email connection")
+
+    def __log(self, message, status, attempts, error=None):
+        self.__logs.append(
+            EmailDeliveryLog(
+                category=self.category,
+                subject=str(message.subject)[:255],
+                recipients=", ".join(message.recipients()),
+                status=status,
+                attempts=attempts,
+                error=error,
+            )
+        )
+
+    def __write_logs(self):
+        logs, self.__logs = self.__logs, []
+        try:
+            EmailDeliveryLog.objects.bulk_create(logs, batch_size=500)
+        except Exception:
+            logger.exception("Failed to write the email delivery log")
+
+
+def send_emails(messages, category, **kwargs):
+    """
+    Send messages through a MailPipeline, see its arguments
+
+    @return int: number of messages sent
+    """
+    return MailPipeline(category, **kwargs).send(messages)
@@ -8,6 +8,7 @@ from django.utils.crypto import get_random_string
 from xhtml2pdf import pisa
 
 import config.settings
+from config.utils.pdf_render import asset_path
 
 
 class PDF:
@@ -39,9 +40,17 @@ class PDF:
         template = get_template(self.template_path)
         html = template.render(self.context)
         result = BytesIO()
-        pisa.pisaDocument(BytesIO(html.encode("utf-8")), result)
+        pisa.pisaDocument(
+            BytesIO(html.encode("utf-8")), result, link_callback=self._link_callback
+        )
         return result
 
+    @staticmethod
+    def _link_callback(uri, rel):
+        """Media and static urls are read from disk instead of over http"""
+        path = uri if os.path.isfile(uri) else asset_path(uri)
+        return path if path and os.path.isfile(path) else uri
+
     def render_to_pdf(self, download=config.settings.DOWNLOAD_PDF):
         """
 
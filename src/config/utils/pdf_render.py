@@ -0,0 +1,213 @@
+"""
+WeasyPrint rendering service
+
+Stylesheets are parsed once per process and rendered with one shared font
+configuration, so their font faces are loaded once. Media and static files
+are read from disk through asset_fetcher and kept in a bounded in-memory cache
+instead of being fetched over HTTP on every render, every process holds up to
+PDF_ASSET_CACHE_BYTES of them. Batches of documents are rendered in parallel by
+a pool of spawned processes, so no worker inherits the locks, connections or
+threads of a forked server process, and joined into one PDF.
+"""
+import mimetypes
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from io import BytesIO
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.http import HttpResponse
+from PyPDF2 import PdfFileMerger
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+A4_PAGE = "@page { size: A4; margin: 1cm }"
+
+
+class _AssetCache:
+    """Least recently used file contents, bounded by their total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.__files = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def read(self, path):
+        mtime = os.path.getmtime(path)
+        with self.__lock:
+            cached = self.__files.get(path)
+            if cached and cached[0] == mtime:
+                self.__files.move_to_end(path)
+                return cached[1]
+        with open(path, "rb") as asset:
+            content = asset.read()
+        if len(content) <= self.max_bytes:
+            with self.__lock:
+                self.__store(path, mtime, content)
+        return content
+
+    def __store(self, path, mtime, content):
+        previous = self.__files.pop(path, None)
+        if previous:
+            self.size -= len(previous[1])
+        self.__files[path] = (mtime, content)
+        self.size += len(content)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self.__files.popitem(last=False)
+            self.size -= len(evicted)
+
+
+_assets = None
+_assets_lock = threading.Lock()
+_render_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def asset_cache():
+    """The asset cache of this process, sized on first use"""
+    global _assets
+    with _assets_lock:
+        if _assets is None:
+            _assets = _AssetCache(
+                getattr(settings, "PDF_ASSET_CACHE_BYTES", 64 * 1024 * 1024)
+            )
+        return _assets
+
+
+def asset_path(url):
+    """
+    @param url: absolute or relative media or static url
+    @return str: local file path, None for any other url
+    """
+    path = unquote(urlparse(url).path)
+    for prefix, root in (
+        (settings.MEDIA_URL, settings.MEDIA_ROOT),
+        (settings.STATIC_URL, settings.STATIC_ROOT),
+    ):
+        prefix = urlparse(prefix or "").path
+        if prefix and path.startswith(prefix):
+            return os.path.join(str(root), path[len(prefix):])
+    return None
+
+
+def asset_fetcher(url, *args, **kwargs):
+    """WeasyPrint url fetcher reading media and static files from the asset cache"""
+    path = asset_path(url)
+    if path is None or not os.path.isfile(path):
+        # other hosts and files kept on a remote storage
+        return default_url_fetcher(url, *args, **kwargs)
+    content = asset_cache().read(path)
+    mime_type, encoding = mimetypes.guess_type(path)
+    return {
+        "string": content,
+        "mime_type": mime_type,
+        "encoding": encoding,
+        "filename": os.path.basename(path),
+        "redirected_url": url,
+    }
+
+
+@lru_cache(maxsize=None)
+def font_config():
+    return FontConfiguration()
+
+
+@lru_cache(maxsize=32)
+def stylesheet(css):
+    return CSS(string=css, url_fetcher=asset_fetcher, font_config=font_config())
+
+
+def render_pdf(html, base_url=None, stylesheets=()):
+    """
+    @param html: rendered template
+    @param stylesheets: css strings, each one is parsed once per process
+    @return bytes
+    """
+    # the shared font configuration is not thread safe
+    with _render_lock:
+        return HTML(
+            string=html, base_url=base_url, url_fetcher=asset_fetcher
+        ).write_pdf(
+            stylesheets=[stylesheet(css) for css in stylesheets],
+            font_config=font_config(),
+        )
+
+
+def _render_job(job):
+    return render_pdf(*job)
+
+
+def _render_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # a pool created before a fork belongs to the parent process
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, "PDF_RENDER_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def merge_pdfs(documents):
+    """
+    @param documents: list of pdf bytes
+    @return bytes: the documents one after another
+    """
+    merger = PdfFileMerger()
+    for document in documents:
+        merger.append(BytesIO(document))
+    result = BytesIO()
+    merger.write(result)
+    merger.close()
+    return result.getvalue()
+
+
+def render_many(jobs):
+    """
+    Render many documents in parallel and join them into one PDF
+
+    Documents are rendered in the calling process when PDF_RENDER_WORKERS is
+    below 2, for a single document or when the pool is broken.
+
+    @param jobs: list of tuple(html, base_url, stylesheets), see render_pdf
+    @return bytes
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return b""
+    documents = None
+    if len(jobs) > 1 and getattr(settings, "PDF_RENDER_WORKERS", 2) > 1:
+        try:
+            documents = list(_render_pool().map(_render_job, jobs))
+        except BrokenProcessPool:
+            _reset_pool()
+    if documents is None:
+        documents = [render_pdf(*job) for job in jobs]
+    if len(documents) == 1:
+        return documents[0]
+    return merge_pdfs(documents)
+
+
+def pdf_response(content, filename, download=True):
+    response = HttpResponse(content, content_type="application/pdf")
+    disposition = "attachment" if download else "inline"
+    response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    return response
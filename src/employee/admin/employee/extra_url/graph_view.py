@@ -4,8 +4,8 @@ import datetime
 from dateutil.relativedelta import relativedelta
 from django.contrib import admin
 from django.core.exceptions import PermissionDenied
-from django.db.models import F, Sum
-from django.db.models.functions import TruncMonth, TruncYear
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
 from django.template.response import TemplateResponse
 
 from employee.admin.employee._forms import (
@@ -14,6 +14,11 @@ from employee.admin.employee._forms import (
     ClientProjectsHourFilterForm,
 )
 from employee.models import Employee
+from employee.services.hour_graphs import (
+    all_employee_dataset,
+    client_projects_dataset,
+    last_working_day_chart,
+)
 from project_management.models import (
     DailyProjectUpdate,
     EmployeeProjectHour,
@@ -59,34 +64,10 @@ class GraphView(admin.ModelAdmin):
 
     def _get_all_employee_dataset(self):
         """
-
-        @param employees:
+        Cached, patched on every EmployeeProjectHour write
         @return:
         """
-        dataset = []
-        employees = Employee.objects.filter(active=True, manager=False).all()
-        date_to_check = datetime.date.today() - datetime.timedelta(days=60)
-        for employee in employees:
-            data = []
-            employee_hours = employee.employeeprojecthour_set.order_by('project_hour__date').filter(
-                project_hour__date__gte=date_to_check).values(
-                'hours',
-                'project_hour',
-                'project_hour__date'
-            )
-            if employee_hours.count() > 0:
-                for employee_hour in employee_hours:
-                    timestamp = int(datetime.datetime.combine(
-                        employee_hour['project_hour__date'],
-                        datetime.datetime.min.time()
-                    ).timestamp())
-                    data.append([timestamp * 1000, employee_hour['hours']])
-                dataset.append({
-                    'type': 'spline',
-                    'name': employee.full_name,
-                    'data': data,
-                })
-        return dataset
+        return all_employee_dataset()
 
     def _get_chart_data(self, request, *args, **kwargs):
         """
@@ -449,122 +430,7 @@ class GraphView(admin.ModelAdmin):
         return TemplateResponse(request, "admin/employee/client_projects_hour_graph.html", context)
     
     def _get_client_all_projects_dataset(self, client_id:int, filters:dict):
-        projects = Project.objects.select_related("client").only("title", "client").filter(client_id=client_id)
-        dataset = dict()
-        client = projects.first().client
-        client_name = client.name
-        client_id = client.id
-        date_filters = {
-            "date__gte": filters.pop("date__gte")
-        }
-        if filters.get("date__lte"):
-            date_filters["date__lte"] = filters.pop("date__lte")
-        # for all project
-        # weekly projects hours
-        all_project_hours = ProjectHour.objects.filter(
-            project_id__in=projects.values_list("id", flat=True),
-            **date_filters,
-        )
-        if projects.count() > 1 and all_project_hours.exists():
-            weekly_all_project_hours = all_project_hours.values("date").annotate(
-                total_hour = Sum("hours")
-            ).filter(
-                **filters,
-            ).order_by("date")
-            chart = {
-                "weekly": {
-                    "label": "Weekly Hours",
-                    "client_name": client_name,
-                    "client_id": client_id,
-                    "labels": [],
-                    "data": [],
-                    "total_hour": 0,
-                },
-                "monthly": {
-                    "label": "Monthly Hours",
-                    "client_name": client_name,
-                    "client_id": client_id,
-                    "labels": [],
-                    "data": [],
-                    "total_hour": 0,
-                }
-            }
-            for weekly_project_hour in weekly_all_project_hours:
-                chart["weekly"]["labels"].append(weekly_project_hour.get("date").strftime("%d-%b-%Y"))
-                chart["weekly"]["data"].append(weekly_project_hour.get("total_hour"))
-                chart["weekly"]["total_hour"] += weekly_project_hour.get("total_hour")
-            monthly_all_project_hours = all_project_hours.values(
-                "date__year", "date__month"
-            ).annotate(
-                total_hour = Sum("hours"),
-            ).filter(
-                **filters,
-            ).order_by("date__year", "date__month")
-            for monthly_project_hour in monthly_all_project_hours:
-                month_num = str(monthly_project_hour.get("date__month")).zfill(2)
-                month_abbr = calendar.month_abbr[int(month_num)]
-                chart["monthly"]["labels"].append(f"{month_abbr}-{monthly_project_hour.get('date__year')}")
-                chart["monthly"]["data"].append(monthly_project_hour.get("total_hour"))
-                chart["monthly"]["total_hour"] += monthly_project_hour.get("total_hour")
-            dataset["All Projects"] = {
-                "name": "All Projects",
-                **chart,
-            }
-        # for project by project
-        for project in projects:
-            project_hours = ProjectHour.objects.filter(
-                project_id=project.id,
-                **date_filters,
-            )
-
-            if project_hours.count() > 0:
-                weekly_project_hours = project_hours.values("date").annotate(
-                    total_hour = Sum("hours")
-                ).filter(
-                    **filters,
-                ).order_by("date")
-                chart = {
-                    "weekly": {
-                        "label": "Weekly Hours",
-                        "client_name": client_name,
-                        "client_id": client_id,
-                        "labels": [],
-                        "data": [],
-                        "total_hour": 0,
-                    },
-                    "monthly": {
-                        "label": "Monthly Hours",
-                        "client_name": client_name,
-                        "client_id": client_id,
-                        "labels": [],
-                        "data": [],
-                        "total_hour": 0,
-                    }
-                }
-                for project_hour in weekly_project_hours:
-                    chart["weekly"]["labels"].append(project_hour.get("date").strftime("%d-%b-%Y"))
-                    chart["weekly"]["data"].append(project_hour.get("total_hour"))
-                    chart["weekly"]["total_hour"] += project_hour.get("total_hour")
-                
-                monthly_project_hours = project_hours.values(
-                    "date__year", "date__month",
-                ).annotate(
-                    total_hour = Sum("hours"),
-                ).filter(
-                    **filters,
-                ).order_by("date__year", "date__month",)
-                for monthly_project_hour in monthly_project_hours:
-                    month_num = str(monthly_project_hour.get("date__month")).zfill(2)
-                    month_abbr = calendar.month_abbr[int(month_num)]
-                    chart["monthly"]["labels"].append(f"{month_abbr}-{monthly_project_hour.get('date__year')}")
-                    chart["monthly"]["data"].append(monthly_project_hour.get("total_hour"))
-                    chart["monthly"]["total_hour"] += monthly_project_hour.get("total_hour")
-                dataset[project.title] = {
-                    "name": project.title,
-                    "project_id": project.id,
-                    **chart,
-                }
-        return dataset
+        return client_projects_dataset(client_id, filters)
 
     def all_employee_last_working_day_graph_view(self, request, *args, **kwargs):
         if request.user.has_perm("employee.view_employeeundertpm") is False:
@@ -603,42 +469,4 @@ class GraphView(admin.ModelAdmin):
         return TemplateResponse(request, "admin/employee/employees_last_working_day_hours.html", context)
 
     def _all_employee_last_working_day_graph_data(self, date_filters, hours_filters):
-        daily_employee_hours = (
-            DailyProjectUpdate.objects.filter(**date_filters)
-            .select_related("employee", "project")
-            .values("employee", "employee__full_name")
-            .annotate(total_hour=Sum("hours")).filter(**hours_filters)
-            .order_by("total_hour")
-        )
-
-        project_data = (
-            DailyProjectUpdate.objects.filter(**date_filters)
-            .select_related("project")
-            .values("employee", "project__title", "hours")
-            .order_by("employee", "project__title")
-        )
-
-        employee_projects = {}
-        for entry in project_data:
-            employee_id = entry["employee"]
-            if employee_id not in employee_projects:
-                employee_projects[employee_id] = []
-            employee_projects[employee_id].append([entry["project__title"], entry["hours"]])
-
-        chart = {
-            "label": "Daily Project Hours",
-            "labels": [],
-            "data": [],
-            "projects_hour": [],
-            "employees_id": [],
-            "total_hour": 0,
-        }
-        for daily_employee_hour in daily_employee_hours:
-            employee_id = daily_employee_hour["employee"]
-            chart["labels"].append(daily_employee_hour["employee__full_name"])
-            chart["data"].append(daily_employee_hour["total_hour"])
-            chart["employees_id"].append(employee_id)
-            chart["projects_hour"].append(employee_projects.get(employee_id, []))
-            chart["total_hour"] += daily_employee_hour["total_hour"]
-        return chart
-
+        return last_working_day_chart(date_filters, hours_filters)
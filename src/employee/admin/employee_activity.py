@@ -1,11 +1,12 @@
 import datetime
 import math
 import re
+import tempfile
 from functools import update_wrapper
 
 from django.contrib import admin, messages
-from django.db.models import Count, Q
-from django.http import HttpResponse, JsonResponse
+from django.db.models import Count, F, Q
+from django.http import FileResponse, JsonResponse
 
 # Needed for optional Features
 # from django.db.models import Count, Case, When, Value, BooleanField
@@ -17,9 +18,6 @@ from django.utils import timezone
 from django.utils.dateparse import parse_date
 from django.utils.html import format_html
 from django.views.decorators.csrf import csrf_exempt
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
-from openpyxl.writer.excel import save_virtual_workbook
 
 from config.settings import employee_ids as management_ids
 from employee.forms.prayer_info import EmployeePrayerInfoForm
@@ -27,11 +25,14 @@ from employee.models import (
     Employee,
     EmployeeActivity,
     EmployeeAttendance,
+    EmployeeAttendanceSummary,
     EmployeeOnline,
     EmployeeSkill,
     PrayerInfo,
 )
 from employee.models.employee_activity import EmployeeProject
+from employee.services.attendance_report import write_attendance_report
+from employee.services.attendance_summary import summary_cell
 
 
 def sToTime(duration):
@@ -184,9 +185,6 @@ class EmployeeAttendanceAdmin(admin.ModelAdmin):
             if (now - datetime.timedelta(i)).date().strftime("%a")
             not in ["Sat", "Sun"]
         ]
-        last_x_date: datetime._Date = (
-            now - datetime.timedelta(day_range)
-        ).date()
         last_month = (now.replace(day=1) - datetime.timedelta(days=1)).date()
 
         # # Filter employees based on user permissions
@@ -247,201 +245,46 @@ class EmployeeAttendanceAdmin(admin.ModelAdmin):
             )
         )
 
-        emps = sorted(emps, key=lambda item: (item.is_online))
+        emps = sorted(
+            emps.annotate(online=F("employeeonline__active")),
+            key=lambda item: bool(item.online),
+        )
         user_data = None
         for index, emp in enumerate(emps):
-            if emp.user == request.user:
+            if emp.user_id == request.user.id:
                 user_data = emps.pop(index)
                 break
         if user_data:
             emps.insert(0, user_data)
 
-        date_datas = {}
-
-        manager_date_and_hours = {}
+        summaries = {
+            (summary.employee_id, summary.date): summary
+            for summary in EmployeeAttendanceSummary.objects.filter(
+                date__gte=last_x_dates[-1],
+                date__lte=last_x_dates[0],
+                employee__active=True,
+                employee__show_in_attendance_list=True,
+            )
+        }
 
+        date_datas = {}
         for emp in emps:
             temp = {}
-            attendances = emp.employeeattendance_set.all()
-
-            empdailyhours = emp.dailyprojectupdate_employee.filter(
-                created_at__date__gte=last_x_date,
-                status="approved",
-            )
+            is_manager_hour = False
             for date in last_x_dates:
-                temp[date] = dict()
-
-                for edh in reversed(empdailyhours):
-                    if edh.created_at.date() == date:
-                        if edh.manager != edh.employee:
-                            manager_id = edh.manager.id
-
-                            if manager_id not in manager_date_and_hours:
-                                manager_date_and_hours[manager_id] = {}
-
-                            if date not in manager_date_and_hours[manager_id]:
-                                manager_date_and_hours[manager_id][date] = (
-                                    edh.hours
-                                )
-                            else:
-                                manager_date_and_hours[manager_id][date] += (
-                                    edh.hours
-                                )
-
-                        if date not in temp:
-                            temp[date] = {"accepted_hour": edh.hours}
-                        else:
-                            temp[date]["accepted_hour"] = (
-                                temp[date].get("accepted_hour", 0) + edh.hours
-                            )
-                avg_total = 0
-                for attendance in attendances:
-                    if attendance.date == date:
-                        activities = attendance.employeeactivity_set.all()
-                        if activities.exists():
-                            activities = list(activities)
-                            al = len(activities)
-                            start_time = activities[0].start_time
-                            end_time = activities[-1].end_time
-                            is_updated_by_bot = activities[-1].is_updated_by_bot
-                            break_time = 0
-                            inside_time = 0
-
-                            for i in range(al - 1):
-                                et = activities[i].end_time
-                                if (
-                                    et
-                                    and et.date()
-                                    == activities[i + 1].start_time.date()
-                                ):
-                                    break_time += (
-                                        activities[i + 1].start_time.timestamp()
-                                        - et.timestamp()
-                                    )
-                            for i in range(al):
-                                st, et = (
-                                    activities[i].start_time,
-                                    activities[i].end_time,
-                                )
-                                if not et:
-                                    et = timezone.now()
-                                inside_time += et.timestamp() - st.timestamp()
-
-                            break_time_s = sToTime(break_time)
-                            inside_time_s = sToTime(inside_time)
-                            employee_is_lead = emp.lead or emp.manager
-                            start_time_timeobj = start_time.time()
-                            is_late = False
-                            late_time_change_date = datetime.datetime.strptime(
-                                "2025-02-11", "%Y-%m-%d"
-                            ).date()  # it may change if late time change
-                            today = attendance.date
-                            if start_time:
-                                if today >= late_time_change_date:
-                                    is_late = (
-                                        employee_is_lead
-                                        and (
-                                            (
-                                                start_time_timeobj.hour == 11
-                                                and start_time_timeobj.minute
-                                                > 10
-                                            )
-                                            or start_time_timeobj.hour >= 12
-                                        )
-                                    ) or (
-                                        not employee_is_lead
-                                        and (
-                                            (
-                                                start_time_timeobj.hour >= 11
-                                                and start_time_timeobj.minute
-                                                > 10
-                                            )
-                                            or start_time_timeobj.hour >= 12
-                                        )
-                                    )
-                                else:
-                                    is_late = (
-                                        employee_is_lead
-                                        and (
-                                            (
-                                                start_time_timeobj.hour == 11
-                                                and start_time_timeobj.minute
-                                                > 30
-                                            )
-                                            or start_time_timeobj.hour >= 12
-                                        )
-                                    ) or (
-                                        not employee_is_lead
-                                        and (
-                                            (
-                                                start_time_timeobj.hour >= 11
-                                                and start_time_timeobj.minute
-                                                > 30
-                                            )
-                                            or start_time_timeobj.hour >= 12
-                                        )
-                                    )
-                            temp[date].update(
-                                {
-                                    "entry_time": (
-                                        start_time.time() if start_time else "-"
-                                    ),
-                                    "exit_time": end_time.time()
-                                    if end_time
-                                    else "-",
-                                    "is_updated_by_bot": is_updated_by_bot,
-                                    "break_time": break_time_s,
-                                    "break_time_hour": math.floor(
-                                        (break_time / (60 * 60)) % 24
-                                    ),
-                                    "break_time_minute": math.floor(
-                                        break_time / 60
-                                    ),
-                                    "inside_time": inside_time_s,
-                                    "inside_time_hour": math.floor(
-                                        (inside_time / (60 * 60)) % 24
-                                    ),
-                                    "inside_time_minute": math.floor(
-                                        inside_time / 60
-                                    ),
-                                    "total_time": sToTime(
-                                        inside_time + break_time
-                                    ),
-                                    "total_time_hour": math.floor(
-                                        (inside_time + break_time)
-                                        / (60 * 60)
-                                        % 24
-                                    ),
-                                    "employee_is_lead": emp.lead or emp.manager,
-                                    "is_late": is_late,
-                                    # "total_late": emp.last_month_late_attendance or 0
-                                }
-                            )
-                        break
-            date_datas.update({emp: temp})
-        # print(date_datas)
-        # for emp in emps:
-        #         if manager_date_and_hours.get(emp.id):
-        #                 print(date_datas[emp])
-        #                 for date in last_x_dates:
-        #                     if date_datas[emp][date].get('accepted_hour'):
-        #                         date_datas[emp][date]['accepted_hour'] +=  manager_date_and_hours.get(emp.id).get(0, date)
-        #                     else:
-        #                         date_datas[emp][date]['accepted_hour'] = manager_date_and_hours.get(emp.id).get(0, date)
-        for emp in emps:
-            if manager_date_and_hours.get(emp.id):
-                # print(date_datas[emp])
+                summary = summaries.get((emp.id, date))
+                temp[date] = summary_cell(summary, emp, now) if summary else {}
+                is_manager_hour = is_manager_hour or bool(
+                    summary and summary.manager_hours
+                )
+            if is_manager_hour:
                 for date in last_x_dates:
-                    accepted_hour = date_datas[emp][date].get(
-                        "accepted_hour", 0
-                    )
-
-                    manager_hour = manager_date_and_hours.get(emp.id, {}).get(
-                        date, 0
+                    summary = summaries.get((emp.id, date))
+                    temp[date]["accepted_hour"] = temp[date].get("accepted_hour", 0)
+                    temp[date]["manager_hour"] = (
+                        summary.manager_hours if summary else 0
                     )
-
-                    date_datas[emp][date]["accepted_hour"] = accepted_hour
-                    date_datas[emp][date]["manager_hour"] = manager_hour
+            date_datas.update({emp: temp})
 
         online_status_form = False
         if str(request.user.employee.id) not in management_ids:
@@ -475,8 +318,6 @@ class EmployeeAttendanceAdmin(admin.ModelAdmin):
                 o = "entry"
 
             date_datas = dict(date_datas_sorted)
-            print("*" * 100)
-            print(last_x_dates)
 
         employee_avg_hours_dict = {}
         # for emp, dates_data in date_datas.items():
@@ -560,296 +401,16 @@ class EmployeeAttendanceAdmin(admin.ModelAdmin):
         from_date = datetime.datetime.strptime(
             data.get("from_date"), "%Y-%m-%d"
         )
-        now = to_date
-        DEFAULT_EXIT_HOUR = 12 + 8  # 24 Hour time == 9 pm
-        DEFAULT_EXIT_TIME = now.replace(
-            hour=DEFAULT_EXIT_HOUR, minute=0, second=0
-        )
-        day_count = to_date - from_date
-        day_range = day_count.days + 1
-
-        last_x_dates = [
-            (now - datetime.timedelta(i)).date()
-            for i in range(day_range)
-            if (now - datetime.timedelta(i)).date().strftime("%a")
-            not in ["Sat", "Sun"]
-        ]
-        last_x_date = (now - datetime.timedelta(10)).date()
-        last_month = (now.replace(day=1) - datetime.timedelta(days=1)).date()
-
-        emps = (
-            Employee.objects.filter(
-                active=True,
-                show_in_attendance_list=True,
-            )
-            .order_by("full_name")
-            .annotate(
-                last_month_attendance=Count(
-                    "employeeattendance",
-                    filter=Q(
-                        employeeattendance__date__year=last_month.year,
-                        employeeattendance__date__month=last_month.month,
-                    ),
-                )
-            )
-        )
-
-        emps = sorted(emps, key=lambda item: (item.is_online))
-        user_data = None
-        for index, emp in enumerate(emps):
-            if emp.user == request.user:
-                user_data = emps.pop(index)
-                break
-        if user_data:
-            emps.insert(0, user_data)
-
-        date_datas = {}
-
-        manager_date_and_hours = {}
-
-        for emp in emps:
-            temp = {}
-            attendances = emp.employeeattendance_set.all()
-
-            empdailyhours = emp.dailyprojectupdate_employee.filter(
-                created_at__date__gte=last_x_date,
-                status="approved",
-            )
-
-            for date in last_x_dates:
-                temp[date] = dict()
-
-                for edh in reversed(empdailyhours):
-                    if edh.created_at.date() == date:
-                        if edh.manager != edh.employee:
-                            manager_id = edh.manager.id
-
-                            if manager_id not in manager_date_and_hours:
-                                manager_date_and_hours[manager_id] = {}
-
-                            if date not in manager_date_and_hours[manager_id]:
-                                manager_date_and_hours[manager_id][date] = (
-                                    edh.hours
-                                )
-                            else:
-                                manager_date_and_hours[manager_id][date] += (
-                                    edh.hours
-                                )
-
-                        if date not in temp:
-                            temp[date] = {"accepted_hour": edh.hours}
-                        else:
-                            temp[date]["accepted_hour"] = (
-                                temp[date].get("accepted_hour", 0) + edh.hours
-                            )
-
-                for attendance in attendances:
-                    if attendance.date == date:
-                        activities = attendance.employeeactivity_set.all()
-                        if activities.exists():
-                            activities = list(activities)
-                            al = len(activities)
-                            start_time = activities[0].start_time
-                            end_time = activities[-1].end_time
-                            is_updated_by_bot = activities[-1].is_updated_by_bot
-                            break_time = 0
-                            inside_time = 0
-
-                            for i in range(al - 1):
-                                et = activities[i].end_time
-                                if (
-                                    et
-                                    and et.date()
-                                    == activities[i + 1].start_time.date()
-                                ):
-                                    break_time += (
-                                        activities[i + 1].start_time.timestamp()
-                                        - et.timestamp()
-                                    )
-                            for i in range(al):
-                                st, et = (
-                                    activities[i].start_time,
-                                    activities[i].end_time,
-                                )
-                                if not et:
-                                    et = timezone.now()
-                                inside_time += et.timestamp() - st.timestamp()
-
-                            break_time_s = sToTime(break_time)
-                            inside_time_s = sToTime(inside_time)
-                            employee_is_lead = emp.lead or emp.manager
-                            start_time_timeobj = start_time.time()
-                            if start_time:
-                                is_late = (
-                                    employee_is_lead
-                                    and (
-                                        (
-                                            start_time_timeobj.hour == 11
-                                            and start_time_timeobj.minute > 30
-                                        )
-                                        or start_time_timeobj.hour >= 12
-                                    )
-                                ) or (
-                                    not employee_is_lead
-                                    and (
-                                        (
-                                            start_time_timeobj.hour >= 11
-                                            and start_time_timeobj.minute > 30
-                                        )
-                                        or start_time_timeobj.hour >= 12
-                                    )
-                                )
-                            temp[date].update(
-                                {
-                                    "entry_time": (
-                                        start_time.time() if start_time else "-"
-                                    ),
-                                    "exit_time": end_time.time()
-                                    if end_time
-                                    else "-",
-                                    "is_updated_by_bot": is_updated_by_bot,
-                                    "break_time": break_time_s,
-                                    "break_time_hour": math.floor(
-                                        (break_time / (60 * 60)) % 24
-                                    ),
-                                    "break_time_minute": math.floor(
-                                        break_time / 60
-                                    ),
-                                    "inside_time": inside_time_s,
-                                    "inside_time_hour": math.floor(
-                                        (inside_time / (60 * 60)) % 24
-                                    ),
-                                    "inside_time_minute": math.floor(
-                                        inside_time / 60
-                                    ),
-                                    "total_time": sToTime(
-                                        inside_time + break_time
-                                    ),
-                                    "total_time_hour": math.floor(
-                                        (inside_time + break_time)
-                                        / (60 * 60)
-                                        % 24
-                                    ),
-                                    "employee_is_lead": emp.lead or emp.manager,
-                                    "is_late": is_late,
-                                }
-                            )
-                        break
-            date_datas.update({emp: temp})
-
-        # for emp in emps:
-        #         if manager_date_and_hours.get(emp.id):
-        #                 print(date_datas[emp])
-        #                 for date in last_x_dates:
-        #                     if date_datas[emp][date].get('accepted_hour'):
-        #                         date_datas[emp][date]['accepted_hour'] +=  manager_date_and_hours.get(emp.id).get(0, date)
-        #                     else:
-        #                         date_datas[emp][date]['accepted_hour'] = manager_date_and_hours.get(emp.id).get(0, date)
-        for emp in emps:
-            if manager_date_and_hours.get(emp.id):
-                # print(date_datas[emp])
-                for date in last_x_dates:
-                    accepted_hour = date_datas[emp][date].get(
-                        "accepted_hour", 0
-                    )
-
-                    manager_hour = manager_date_and_hours.get(emp.id, {}).get(
-                        date, 0
-                    )
-
-                    date_datas[emp][date]["accepted_hour"] = accepted_hour
-                    date_datas[emp][date]["manager_hour"] = manager_hour
-
-        online_status_form = False
-        if str(request.user.employee.id) not in management_ids:
-            online_status_form = True
-
-        o = request.GET.get("o", None)
-
-        if o:
-            if o == "entry":
-                date_datas_sorted = sorted(
-                    date_datas.items(),
-                    key=lambda x: x[-1]
-                    .get(
-                        datetime.datetime.now().date(),
-                        datetime.datetime.now().date(),
-                    )
-                    .get("entry_time", DEFAULT_EXIT_TIME.time()),
-                )
-                o = "-entry"
-            elif o == "-entry":
-                date_datas_sorted = sorted(
-                    date_datas.items(),
-                    key=lambda x: x[-1]
-                    .get(
-                        datetime.datetime.now().date(),
-                        datetime.datetime.now().date(),
-                    )
-                    .get("entry_time", DEFAULT_EXIT_TIME.time()),
-                    reverse=True,
-                )
-                o = "entry"
-
-            date_datas = dict(date_datas_sorted)
-        context = dict(
-            self.admin_site.each_context(request),
-            dates=last_x_dates,
-            last_month=last_month,
-            date_datas=date_datas,
-            o=o,  # order key
-            online_status_form=online_status_form,
-        )
-        wb = Workbook()
-        attendance_sheet = wb.create_sheet(title="Employee Attendance")
-        attendance_sheet.append(
-            [
-                "Employee",
-                "Date",
-                "Entry Time",
-                "Exit Time",
-                "Break Time",
-                "Inside Hours",
-                "Total Hours",
-            ]
-        )
-        row_num = 2
-        for employee, all_data in date_datas.items():
-            first_row = row_num
-            for date, data in all_data.items():
-                break_time = f"{data.get('break_time_hour', 0)}h: {data.get('break_time_minute', 0)}m"
-                inside_time = f"{data.get('inside_time_hour', 0)}h: {data.get('inside_time_minute', 0)}m"
-                attendance_sheet.append(
-                    [
-                        employee.full_name if row_num == first_row else "",
-                        date.strftime("%d/%m/%Y"),
-                        data.get("entry_time", None),
-                        data.get("exit_time", None),
-                        data.get("break_time", 0),
-                        data.get("inside_time", 0),
-                        data.get("total_time", 0),
-                    ]
-                )
-                row_num += 1
-
-            attendance_sheet.merge_cells(f"A{first_row}:A{row_num - 1}")
-
-            # Center the text in the merged cell
-            attendance_sheet[f"A{first_row}"].alignment = Alignment(
-                horizontal="center", vertical="center"
-            )
-
-        columns = ["A", "B", "C", "D", "E", "F", "G"]
-        for col in columns:
-            attendance_sheet.column_dimensions[col].width = 20
-        wb.remove(wb["Sheet"])
-        response = HttpResponse(
-            content=save_virtual_workbook(wb),
+        # built on disk and streamed back, the workbook never sits in memory
+        report = tempfile.TemporaryFile()
+        write_attendance_report(report, from_date.date(), to_date.date())
+        report.seek(0)
+        response = FileResponse(
+            report,
+            as_attachment=True,
+            filename="Employee-Attendance.xlsx",
             content_type="application/ms-excel",
         )
-        response["Content-Disposition"] = (
-            "attachment; filename=Employee-Attendance.xlsx"
-        )
         return response
 
 
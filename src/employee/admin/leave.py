@@ -12,6 +12,7 @@ from django.utils.html import format_html
 from django_q.tasks import async_task
 from django.apps import apps
 
+from employee import dashboard_cache
 from employee.models import Leave, LeaveAttachment
 from employee.models.employee_activity import EmployeeProject
 from employee.models.leave import leave
@@ -479,6 +480,8 @@ class LeaveManagement(admin.ModelAdmin):
         ):
             messages.success(request, "Leaves approved.")
             queryset.update(status="approved")
+            # update skips the receivers that drop the cached dashboard widgets
+            dashboard_cache.invalidate(*dashboard_cache.widgets_built_from(Leave))
         else:
             messages.error(request, "You don't have permission.")
 
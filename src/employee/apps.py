@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class EmployeeConfig(AppConfig):
     name = 'employee'
+
+    def ready(self):
+        from employee import dashboard_cache  # noqa: F401
+        from employee.services import attendance_summary  # noqa: F401
+        from employee.services import hour_graphs  # noqa: F401
@@ -0,0 +1,142 @@
+"""
+Org-wide admin dashboard widgets cache
+
+Birthdays, leaves, available slots, notices and the announcement ticker are the
+same for every employee, they are computed once a day into the default (redis)
+cache and dropped as soon as one of the models they are built from changes.
+Hit and miss counters are only kept when settings.DASHBOARD_WIDGET_STATS is on,
+they cost a cache round trip on every widget read.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from employee.models import Employee, Leave
+from employee.models.employee import EmployeeAvailableSlot
+from settings.models import Notice
+
+KEY_PREFIX = "dashboard_widget"
+
+# widget name: models it is built from
+WIDGETS = {
+    "birthdays": (Employee,),
+    "leaves": (Leave, Employee),
+    "last_slot_employees": (EmployeeAvailableSlot, Employee),
+    "slot_announcement": (EmployeeAvailableSlot, Employee),
+    "announcement": (EmployeeAvailableSlot, Leave, Employee),
+    "notices": (Notice,),
+}
+
+_missing = object()
+
+
+def widget_key(widget, day=None):
+    day = day or timezone.now().date()
+    return f"{KEY_PREFIX}:{widget}:{day.isoformat()}"
+
+
+def stats_key(widget, counter):
+    return f"{KEY_PREFIX}:stats:{widget}:{counter}"
+
+
+def seconds_until_tomorrow():
+    now = timezone.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return max(int((tomorrow - now).total_seconds()), 1)
+
+
+def _count(widget, counter):
+    if not getattr(settings, "DASHBOARD_WIDGET_STATS", False):
+        return
+    key = stats_key(widget, counter)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_or_compute(widget, compute):
+    """
+    Today's value of the widget, computed and stored when missing
+
+    @param widget: name of the widget, one of WIDGETS
+    @param compute: callable building the value, it must return a picklable value
+    """
+    key = widget_key(widget)
+    value = cache.get(key, _missing)
+    if value is not _missing:
+        _count(widget, "hits")
+        return value
+
+    _count(widget, "misses")
+    value = compute()
+    cache.set(key, value, timeout=seconds_until_tomorrow())
+    return value
+
+
+def invalidate(*widgets):
+    cache.delete_many([widget_key(widget) for widget in widgets])
+
+
+def widgets_built_from(model):
+    return [widget for widget, models in WIDGETS.items() if model in models]
+
+
+def widget_cache_stats():
+    """
+    @return dict: {widget: {"hits": int, "misses": int, "hit_rate": float}}
+    """
+    keys = [
+        stats_key(widget, counter)
+        for widget in WIDGETS
+        for counter in ("hits", "misses")
+    ]
+    counters = cache.get_many(keys)
+    stats = {}
+    for widget in WIDGETS:
+        hits = int(counters.get(stats_key(widget, "hits")) or 0)
+        misses = int(counters.get(stats_key(widget, "misses")) or 0)
+        stats[widget] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+    return stats
+
+
+def reset_widget_cache_stats():
+    cache.delete_many(
+        [
+            stats_key(widget, counter)
+            for widget in WIDGETS
+            for counter in ("hits", "misses")
+        ]
+    )
+
+
+@receiver(post_save, sender=Employee, dispatch_uid="dashboard_widget_employee_save")
+@receiver(post_delete, sender=Employee, dispatch_uid="dashboard_widget_employee_delete")
+@receiver(post_save, sender=Leave, dispatch_uid="dashboard_widget_leave_save")
+@receiver(post_delete, sender=Leave, dispatch_uid="dashboard_widget_leave_delete")
+@receiver(post_save, sender=Notice, dispatch_uid="dashboard_widget_notice_save")
+@receiver(post_delete, sender=Notice, dispatch_uid="dashboard_widget_notice_delete")
+@receiver(
+    post_save,
+    sender=EmployeeAvailableSlot,
+    dispatch_uid="dashboard_widget_available_slot_save",
+)
+@receiver(
+    post_delete,
+    sender=EmployeeAvailableSlot,
+    dispatch_uid="dashboard_widget_available_slot_delete",
+)
+def invalidate_dashboard_widgets(sender, **kwargs):
+    widgets = widgets_built_from(sender)
+    # drop after commit, a render between the delete and the commit would cache old rows
+    transaction.on_commit(lambda: invalidate(*widgets))
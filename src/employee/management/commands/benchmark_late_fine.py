@@ -0,0 +1,156 @@
+import random
+import time
+from datetime import datetime
+from datetime import time as clock
+
+from django.contrib.auth.models import User
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from employee.models import Employee, EmployeeAttendance, SalaryHistory
+from employee.models.employee import LateAttendanceFine
+from employee.services.late_attendance import (
+    LATE_ENTRY_TIME,
+    LateAttendanceFineEngine,
+    late_fine_amount,
+)
+from settings.models import Designation, LeaveManagement, PayScale
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the late attendance fine engine against the per employee loop "
+        "on synthetic employees, everything is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 5000])
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            try:
+                with transaction.atomic():
+                    self.benchmark(size, random.Random(options["seed"]))
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def benchmark(self, size, rand):
+        today = datetime.now().date()
+        self.create_employees(size, today, rand)
+
+        with CaptureQueriesContext(connection) as legacy_queries:
+            started = time.perf_counter()
+            expected = self.per_employee_fines(today)
+            legacy = time.perf_counter() - started
+
+        engine = LateAttendanceFineEngine(date=today)
+        with CaptureQueriesContext(connection) as engine_queries:
+            started = time.perf_counter()
+            fines = engine.save(notify=False)
+            batch = time.perf_counter() - started
+        actual = {
+            fine.employee_id: float(fine.total_late_attendance_fine) for fine in fines
+        }
+
+        self.stdout.write(f"Employees: {size}")
+        self.stdout.write(
+            f"Per employee: {legacy:.3f}s, {len(legacy_queries)} queries (without inserts)"
+        )
+        self.stdout.write(
+            f"Engine: {batch:.3f}s, {len(engine_queries)} queries (with inserts)"
+        )
+        if expected == actual:
+            self.stdout.write(self.style.SUCCESS(f"Parity: {len(actual)} fines match"))
+        else:
+            self.stdout.write(self.style.ERROR("Fines differ from the per employee loop"))
+
+    def create_employees(self, size, today, rand):
+        designation = Designation.objects.first()
+        leave_management = LeaveManagement.objects.first()
+        pay_scale = PayScale.objects.first()
+        if not (designation and leave_management and pay_scale):
+            raise CommandError("A designation, leave management and pay scale are required")
+
+        prefix = f"late-fine-benchmark-{size}-"
+        User.objects.bulk_create(
+            [User(username=f"{prefix}{index}") for index in range(size)]
+        )
+        users = User.objects.filter(username__startswith=prefix).values_list("id", flat=True)
+        Employee.objects.bulk_create(
+            [
+                Employee(
+                    user_id=user_id,
+                    full_name=f"Benchmark {user_id}",
+                    email=f"{prefix}{user_id}@example.com",
+                    designation=designation,
+                    leave_management=leave_management,
+                    pay_scale=pay_scale,
+                )
+                for user_id in users
+            ]
+        )
+        employee_ids = list(
+            Employee.objects.filter(user__username__startswith=prefix).values_list(
+                "id", flat=True
+            )
+        )
+        SalaryHistory.objects.bulk_create(
+            [
+                SalaryHistory(employee_id=employee_id, payable_salary=50000)
+                for employee_id in employee_ids
+            ]
+        )
+
+        attendances = []
+        for employee_id in employee_ids:
+            for day in range(1, today.day + 1):
+                attendances.append(
+                    EmployeeAttendance(
+                        employee_id=employee_id,
+                        date=today.replace(day=day),
+                        entry_time=clock(
+                            hour=rand.choice([10, 10, 11]), minute=rand.randrange(60)
+                        ),
+                    )
+                )
+        EmployeeAttendance.objects.bulk_create(attendances, batch_size=5000)
+
+    @staticmethod
+    def per_employee_fines(today):
+        """The previous late_attendance_calculate loop, without inserts and mails"""
+        fines = {}
+        employees = Employee.objects.filter(
+            active=True, show_in_attendance_list=True, exception_la=False
+        ).exclude(salaryhistory__isnull=True)
+        for employee in employees:
+            total_consider = LateAttendanceFine.objects.filter(
+                employee=employee,
+                date__year=today.year,
+                date__month=today.month,
+                is_consider=True,
+            ).count()
+            total_late_entry = (
+                EmployeeAttendance.objects.filter(
+                    employee=employee,
+                    date__year=today.year,
+                    date__month=today.month,
+                    entry_time__gt=LATE_ENTRY_TIME,
+                ).count()
+                - total_consider
+            )
+            today_late_entry = EmployeeAttendance.objects.filter(
+                employee=employee, date=today, entry_time__gt=LATE_ENTRY_TIME
+            )
+            if (
+                not LateAttendanceFine.objects.filter(employee=employee, date=today).exists()
+                and today_late_entry.exists()
+            ):
+                fines[employee.id] = late_fine_amount(total_late_entry)
+        return fines
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from employee.dashboard_cache import reset_widget_cache_stats, widget_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Hit/miss counters of the admin dashboard widgets cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters")
+
+    def handle(self, *args, **options):
+        if not settings.DASHBOARD_WIDGET_STATS:
+            self.stdout.write(
+                self.style.WARNING("DASHBOARD_WIDGET_STATS is off, no counters are kept")
+            )
+        for widget, counters in widget_cache_stats().items():
+            self.stdout.write(
+                f"{widget}: {counters['hits']} hits, {counters['misses']} misses, "
+                f"hit rate {counters['hit_rate']:.2%}"
+            )
+        if options["reset"]:
+            reset_widget_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -0,0 +1,28 @@
+import datetime
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from employee.services.attendance_summary import rebuild_attendance_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per employee per day attendance summary (backfill or repair)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=45, help="Days back from today")
+        parser.add_argument("--from", dest="from_date", help="Start date, YYYY-MM-DD")
+        parser.add_argument("--to", dest="to_date", help="End date, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        end_date = parse_date(options["to_date"] or "") or timezone.now().date()
+        start_date = parse_date(options["from_date"] or "") or (
+            end_date - datetime.timedelta(days=options["days"])
+        )
+        refreshed = rebuild_attendance_summaries(start_date, end_date)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {refreshed} attendance summaries from {start_date} to {end_date}"
+            )
+        )
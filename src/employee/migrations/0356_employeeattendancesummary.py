@@ -0,0 +1,42 @@
+# Generated by Django 3.2.8 on 2026-10-18 11:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0355_employee_author_bio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeAttendanceSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('entry_time', models.DateTimeField(blank=True, null=True)),
+                ('exit_time', models.DateTimeField(blank=True, null=True)),
+                ('is_updated_by_bot', models.BooleanField(default=False)),
+                ('break_seconds', models.FloatField(default=0.0)),
+                ('inside_seconds', models.FloatField(default=0.0, help_text='Inside time of the closed activities')),
+                ('open_activities', models.PositiveSmallIntegerField(default=0)),
+                ('open_start_total', models.FloatField(default=0.0, help_text='Sum of the start timestamps of the open activities')),
+                ('accepted_hours', models.FloatField(default=0.0)),
+                ('manager_hours', models.FloatField(default=0.0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='employee.employee')),
+            ],
+            options={
+                'verbose_name': 'Employee Attendance Summary',
+                'verbose_name_plural': 'Employee Attendance Summaries',
+                'unique_together': {('employee', 'date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='employeeattendancesummary',
+            index=models.Index(fields=['date', 'employee'], name='attendance_summary_date_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.8 on 2026-10-18 21:00
+
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_fines(apps, schema_editor):
+    """
+    Fines are payroll history, duplicates of a day are left for a person to
+    resolve instead of being deleted here
+    """
+    LateAttendanceFine = apps.get_model("employee", "LateAttendanceFine")
+    duplicates = (
+        LateAttendanceFine.objects.filter(date__isnull=False)
+        .values_list("employee_id", "date")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+        .order_by("employee_id", "date")
+    )
+    if duplicates:
+        pairs = ", ".join(
+            f"employee {employee_id} on {date} ({total} fines)"
+            for employee_id, date, total in duplicates
+        )
+        raise IntegrityError(
+            "Resolve the duplicate late attendance fines before adding the "
+            f"unique_late_attendance_fine_day constraint: {pairs}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0356_employeeattendancesummary'),
+    ]
+
+    operations = [
+        # the check changes no rows, reversing it has nothing to undo
+        migrations.RunPython(check_duplicate_fines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lateattendancefine',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_late_attendance_fine_day'),
+        ),
+    ]
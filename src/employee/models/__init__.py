@@ -7,7 +7,12 @@ from .attachment import Attachment
 from .bank_account import BankAccount
 from .employee_skill import Skill, EmployeeSkill, Learning
 from .employee_social import EmployeeSocial, EmployeeContent
-from .employee_activity import EmployeeOnline, EmployeeAttendance, EmployeeActivity
+from .employee_activity import (
+    EmployeeOnline,
+    EmployeeAttendance,
+    EmployeeActivity,
+    EmployeeAttendanceSummary,
+)
 from .employee_feedback import EmployeeFeedback
 from .tour_allowance import TourAllowance
 from .excuse_note import ExcuseNote, ExcuseNoteAttachment
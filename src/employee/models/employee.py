@@ -844,6 +844,11 @@ class LateAttendanceFine(models.Model):
         permissions = [
             ("can_view_all_late_attendance", "Can view all late attendance fines"),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "date"], name="unique_late_attendance_fine_day"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.employee.user.username} - {self.month}/{self.year}"
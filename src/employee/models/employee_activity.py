@@ -44,6 +44,11 @@ def save_employee_attendance(sender, **kwargs):
         )
         if activities.exists():
             activities.update(end_time=timezone.now())
+            from employee.services.attendance_summary import (
+                refresh_attendance_summaries,
+            )
+
+            refresh_attendance_summaries([(attendance.employee_id, attendance.date)])
 
 
 class EmployeeAttendance(TimeStampMixin, AuthorMixin):
@@ -87,6 +92,55 @@ class EmployeeActivity(TimeStampMixin, AuthorMixin):
     is_updated_by_bot = models.BooleanField(default=False)
 
 
+class EmployeeAttendanceSummary(TimeStampMixin):
+    """
+    Attendance figures of an employee for a day
+
+    Materialized from EmployeeActivity and approved DailyProjectUpdate rows by
+    employee.services.attendance_summary, the attendance changelist renders from it.
+    Open activities are kept apart, their inside time depends on the render time.
+    """
+
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name="attendance_summaries"
+    )
+    date = models.DateField()
+    entry_time = models.DateTimeField(null=True, blank=True)
+    exit_time = models.DateTimeField(null=True, blank=True)
+    is_updated_by_bot = models.BooleanField(default=False)
+    break_seconds = models.FloatField(default=0.0)
+    inside_seconds = models.FloatField(
+        default=0.0, help_text="Inside time of the closed activities"
+    )
+    open_activities = models.PositiveSmallIntegerField(default=0)
+    open_start_total = models.FloatField(
+        default=0.0, help_text="Sum of the start timestamps of the open activities"
+    )
+    accepted_hours = models.FloatField(default=0.0)
+    manager_hours = models.FloatField(default=0.0)
+
+    class Meta:
+        verbose_name = "Employee Attendance Summary"
+        verbose_name_plural = "Employee Attendance Summaries"
+        unique_together = ("employee", "date")
+        indexes = [
+            models.Index(fields=["date", "employee"], name="attendance_summary_date_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.date}"
+
+    def get_inside_seconds(self, now=None):
+        if not self.open_activities:
+            return self.inside_seconds
+        now = now or timezone.now()
+        return (
+            self.inside_seconds
+            + self.open_activities * now.timestamp()
+            - self.open_start_total
+        )
+
+
 class EmployeeProject(TimeStampMixin, AuthorMixin):
     employee = models.OneToOneField(Employee, on_delete=models.CASCADE)
     project = models.ManyToManyField(
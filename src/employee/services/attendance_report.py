@@ -0,0 +1,87 @@
+import datetime
+from itertools import groupby
+
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+
+from employee.models import Employee, EmployeeAttendanceSummary
+from employee.services.attendance_summary import summary_cell
+
+HEADERS = [
+    "Employee",
+    "Date",
+    "Entry Time",
+    "Exit Time",
+    "Break Time",
+    "Inside Hours",
+    "Total Hours",
+]
+
+
+def report_dates(from_date, to_date):
+    """Working days from to_date back to from_date"""
+    return [
+        to_date - datetime.timedelta(days)
+        for days in range((to_date - from_date).days + 1)
+        if (to_date - datetime.timedelta(days)).strftime("%a") not in ["Sat", "Sun"]
+    ]
+
+
+def write_attendance_report(file, from_date, to_date, chunk_size=2000):
+    """
+    Write the attendance report of every listed employee into file
+
+    The workbook is write-only and fed from one ordered summary queryset read
+    with .iterator(), memory stays flat whatever the number of employees or days.
+    """
+    dates = report_dates(from_date, to_date)
+    employees = (
+        Employee.objects.filter(active=True, show_in_attendance_list=True)
+        .order_by("full_name", "id")
+        .only("id", "full_name", "lead", "manager")
+    )
+    summaries = groupby(
+        EmployeeAttendanceSummary.objects.filter(
+            employee__active=True,
+            employee__show_in_attendance_list=True,
+            date__gte=from_date,
+            date__lte=to_date,
+        )
+        .order_by("employee__full_name", "employee_id")
+        .iterator(chunk_size=chunk_size),
+        key=lambda summary: summary.employee_id,
+    )
+    next_group = next(summaries, None)
+
+    wb = Workbook(write_only=True)
+    attendance_sheet = wb.create_sheet(title="Employee Attendance")
+    for col in ["A", "B", "C", "D", "E", "F", "G"]:
+        attendance_sheet.column_dimensions[col].width = 20
+    attendance_sheet.append(HEADERS)
+
+    now = timezone.now()
+    for employee in employees.iterator(chunk_size=chunk_size):
+        employee_summaries = {}
+        if next_group is not None and next_group[0] == employee.id:
+            employee_summaries = {summary.date: summary for summary in next_group[1]}
+            next_group = next(summaries, None)
+
+        name = WriteOnlyCell(attendance_sheet, value=employee.full_name)
+        name.alignment = Alignment(horizontal="center", vertical="center")
+        for date in dates:
+            summary = employee_summaries.get(date)
+            data = summary_cell(summary, employee, now) if summary else {}
+            attendance_sheet.append(
+                [
+                    name if date == dates[0] else "",
+                    date.strftime("%d/%m/%Y"),
+                    data.get("entry_time", None),
+                    data.get("exit_time", None),
+                    data.get("break_time", 0),
+                    data.get("inside_time", 0),
+                    data.get("total_time", 0),
+                ]
+            )
+    wb.save(file)
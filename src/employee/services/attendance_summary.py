@@ -0,0 +1,310 @@
+import datetime
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from employee.models import (
+    EmployeeActivity,
+    EmployeeAttendance,
+    EmployeeAttendanceSummary,
+)
+from project_management.models import DailyProjectUpdate
+
+# entries after 11:10 are late from this date on, after 11:30 before it
+LATE_TIME_CHANGE_DATE = datetime.date(2025, 2, 11)
+
+SUMMARY_FIELDS = (
+    "entry_time",
+    "exit_time",
+    "is_updated_by_bot",
+    "break_seconds",
+    "inside_seconds",
+    "open_activities",
+    "open_start_total",
+    "accepted_hours",
+    "manager_hours",
+)
+EMPTY_SUMMARY = {
+    "entry_time": None,
+    "exit_time": None,
+    "is_updated_by_bot": False,
+    "break_seconds": 0.0,
+    "inside_seconds": 0.0,
+    "open_activities": 0,
+    "open_start_total": 0.0,
+    "accepted_hours": 0.0,
+    "manager_hours": 0.0,
+}
+
+
+def summarize_activities(activities):
+    """
+    Attendance figures of a day from its activities in saving order
+
+    @param activities: list of dict with start_time, end_time and is_updated_by_bot
+    @return dict: EmployeeAttendanceSummary activity field values
+    """
+    if not activities:
+        return {}
+    break_seconds = 0
+    inside_seconds = 0
+    open_activities = 0
+    open_start_total = 0
+    for current, following in zip(activities, activities[1:]):
+        end_time = current["end_time"]
+        if end_time and end_time.date() == following["start_time"].date():
+            break_seconds += following["start_time"].timestamp() - end_time.timestamp()
+    for activity in activities:
+        if activity["end_time"]:
+            inside_seconds += (
+                activity["end_time"].timestamp() - activity["start_time"].timestamp()
+            )
+        else:
+            open_activities += 1
+            open_start_total += activity["start_time"].timestamp()
+    return {
+        "entry_time": activities[0]["start_time"],
+        "exit_time": activities[-1]["end_time"],
+        "is_updated_by_bot": activities[-1]["is_updated_by_bot"],
+        "break_seconds": break_seconds,
+        "inside_seconds": inside_seconds,
+        "open_activities": open_activities,
+        "open_start_total": open_start_total,
+    }
+
+
+@transaction.atomic
+def refresh_attendance_summaries(pairs):
+    """
+    Recompute the summary rows of the given (employee_id, date) pairs in 6 queries
+
+    Rows left without attendance and approved hours are deleted.
+    """
+    pairs = {(employee_id, day) for employee_id, day in pairs if employee_id and day}
+    if not pairs:
+        return
+    employee_ids = {employee_id for employee_id, _ in pairs}
+    dates = {day for _, day in pairs}
+
+    # the first attendance of the day, as the changelist always showed
+    attendance_ids = {}
+    for attendance_id, employee_id, day in (
+        EmployeeAttendance.objects.filter(employee_id__in=employee_ids, date__in=dates)
+        .order_by("id")
+        .values_list("id", "employee_id", "date")
+    ):
+        if (employee_id, day) in pairs:
+            attendance_ids.setdefault((employee_id, day), attendance_id)
+
+    activities = defaultdict(list)
+    for activity in (
+        EmployeeActivity.objects.filter(employee_attendance_id__in=attendance_ids.values())
+        .order_by("id")
+        .values("employee_attendance_id", "start_time", "end_time", "is_updated_by_bot")
+    ):
+        activities[activity["employee_attendance_id"]].append(activity)
+
+    approved_updates = DailyProjectUpdate.objects.filter(
+        status="approved", created_at__date__in=dates
+    ).order_by()
+    accepted_hours = {
+        (row["employee_id"], row["created_at__date"]): row["total"]
+        for row in approved_updates.filter(employee_id__in=employee_ids)
+        .values("employee_id", "created_at__date")
+        .annotate(total=Sum("hours"))
+    }
+    manager_hours = {
+        (row["manager_id"], row["created_at__date"]): row["total"]
+        for row in approved_updates.filter(manager_id__in=employee_ids)
+        .exclude(employee_id=F("manager_id"))
+        .values("manager_id", "created_at__date")
+        .annotate(total=Sum("hours"))
+    }
+
+    existing = {
+        (summary.employee_id, summary.date): summary
+        for summary in EmployeeAttendanceSummary.objects.filter(
+            employee_id__in=employee_ids, date__in=dates
+        )
+    }
+
+    now = timezone.now()
+    to_create, to_update, to_delete = [], [], []
+    for pair in pairs:
+        attendance_id = attendance_ids.get(pair)
+        values = dict(EMPTY_SUMMARY)
+        values.update(summarize_activities(activities.get(attendance_id, [])))
+        values["accepted_hours"] = accepted_hours.get(pair) or 0.0
+        values["manager_hours"] = manager_hours.get(pair) or 0.0
+
+        summary = existing.get(pair)
+        if (
+            attendance_id is None
+            and not values["accepted_hours"]
+            and not values["manager_hours"]
+        ):
+            if summary:
+                to_delete.append(summary.id)
+            continue
+        if summary is None:
+            to_create.append(
+                EmployeeAttendanceSummary(employee_id=pair[0], date=pair[1], **values)
+            )
+            continue
+        for field, value in values.items():
+            setattr(summary, field, value)
+        summary.updated_at = now
+        to_update.append(summary)
+
+    if to_delete:
+        EmployeeAttendanceSummary.objects.filter(id__in=to_delete).delete()
+    EmployeeAttendanceSummary.objects.bulk_create(to_create)
+    EmployeeAttendanceSummary.objects.bulk_update(
+        to_update, list(SUMMARY_FIELDS) + ["updated_at"], batch_size=500
+    )
+
+
+def rebuild_attendance_summaries(start_date, end_date, chunk_days=7):
+    """
+    Recompute every summary row between start_date and end_date (inclusive)
+
+    @return int: number of (employee, date) pairs refreshed
+    """
+    refreshed = 0
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + datetime.timedelta(days=chunk_days - 1), end_date)
+        pairs = set(
+            EmployeeAttendance.objects.filter(
+                date__gte=chunk_start, date__lte=chunk_end
+            ).values_list("employee_id", "date")
+        )
+        pairs.update(
+            EmployeeAttendanceSummary.objects.filter(
+                date__gte=chunk_start, date__lte=chunk_end
+            ).values_list("employee_id", "date")
+        )
+        approved_updates = DailyProjectUpdate.objects.filter(
+            status="approved",
+            created_at__date__gte=chunk_start,
+            created_at__date__lte=chunk_end,
+        )
+        for employee_id, manager_id, created_at in approved_updates.values_list(
+            "employee_id", "manager_id", "created_at"
+        ):
+            pairs.add((employee_id, created_at.date()))
+            pairs.add((manager_id, created_at.date()))
+        refresh_attendance_summaries(pairs)
+        refreshed += len(pairs)
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+    return refreshed
+
+
+def refresh_daily_update_summaries(queryset):
+    """Refresh the summaries touched by a bulk update of DailyProjectUpdate rows"""
+    pairs = set()
+    for employee_id, manager_id, created_at in queryset.values_list(
+        "employee_id", "manager_id", "created_at"
+    ):
+        pairs.add((employee_id, created_at.date()))
+        pairs.add((manager_id, created_at.date()))
+    refresh_attendance_summaries(pairs)
+
+
+def to_time(duration):
+    return f"{math.floor((duration / (60 * 60)) % 24):01}h: {math.floor((duration / 60) % 60):01}m"
+
+
+def is_late_entry(entry_time, day, employee_is_lead):
+    late_minute = 10 if day >= LATE_TIME_CHANGE_DATE else 30
+    if employee_is_lead:
+        return (
+            entry_time.hour == 11 and entry_time.minute > late_minute
+        ) or entry_time.hour >= 12
+    return (
+        entry_time.hour >= 11 and entry_time.minute > late_minute
+    ) or entry_time.hour >= 12
+
+
+def summary_cell(summary, employee, now=None):
+    """
+    Attendance changelist cell of a summary row
+
+    @return dict: the keys employee_attendance.html reads
+    """
+    cell = {}
+    if summary.accepted_hours:
+        cell["accepted_hour"] = summary.accepted_hours
+    if summary.entry_time is None:
+        return cell
+
+    break_time = summary.break_seconds
+    inside_time = summary.get_inside_seconds(now)
+    employee_is_lead = employee.lead or employee.manager
+    entry_time = summary.entry_time.time()
+    cell.update(
+        {
+            "entry_time": entry_time,
+            "exit_time": summary.exit_time.time() if summary.exit_time else "-",
+            "is_updated_by_bot": summary.is_updated_by_bot,
+            "break_time": to_time(break_time),
+            "break_time_hour": math.floor((break_time / (60 * 60)) % 24),
+            "break_time_minute": math.floor(break_time / 60),
+            "inside_time": to_time(inside_time),
+            "inside_time_hour": math.floor((inside_time / (60 * 60)) % 24),
+            "inside_time_minute": math.floor(inside_time / 60),
+            "total_time": to_time(inside_time + break_time),
+            "total_time_hour": math.floor((inside_time + break_time) / (60 * 60) % 24),
+            "employee_is_lead": employee_is_lead,
+            "is_late": is_late_entry(entry_time, summary.date, employee_is_lead),
+        }
+    )
+    return cell
+
+
+def _refresh_attendance(attendance_id):
+    attendance = (
+        EmployeeAttendance.objects.filter(id=attendance_id)
+        .values_list("employee_id", "date")
+        .first()
+    )
+    if attendance:
+        refresh_attendance_summaries([attendance])
+
+
+@receiver(post_save, sender=EmployeeActivity, dispatch_uid="attendance_summary_activity_save")
+@receiver(
+    post_delete, sender=EmployeeActivity, dispatch_uid="attendance_summary_activity_delete"
+)
+def refresh_activity_summary(sender, instance, **kwargs):
+    _refresh_attendance(instance.employee_attendance_id)
+
+
+@receiver(
+    post_save, sender=EmployeeAttendance, dispatch_uid="attendance_summary_attendance_save"
+)
+@receiver(
+    post_delete,
+    sender=EmployeeAttendance,
+    dispatch_uid="attendance_summary_attendance_delete",
+)
+def refresh_attendance_summary(sender, instance, **kwargs):
+    refresh_attendance_summaries([(instance.employee_id, instance.date)])
+
+
+@receiver(
+    post_save, sender=DailyProjectUpdate, dispatch_uid="attendance_summary_update_save"
+)
+@receiver(
+    post_delete, sender=DailyProjectUpdate, dispatch_uid="attendance_summary_update_delete"
+)
+def refresh_daily_update_summary(sender, instance, **kwargs):
+    day = instance.created_at.date()
+    refresh_attendance_summaries(
+        [(instance.employee_id, day), (instance.manager_id, day)]
+    )
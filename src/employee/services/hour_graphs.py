@@ -0,0 +1,354 @@
+"""
+Hour graph datasets of the superuser graph pages
+
+Every graph is built from one grouped query and cached per (graph, filters).
+The all employee series are patched per employee when EmployeeProjectHour
+rows are written, the other graphs are versioned and rebuilt on the next view
+after a write to the rows they are built from.
+"""
+import calendar
+import datetime
+from collections import OrderedDict, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from employee.dashboard_cache import seconds_until_tomorrow
+from employee.models import Employee
+from project_management.models import (
+    DailyProjectUpdate,
+    EmployeeProjectHour,
+    EmployeeProjectHourGroupByEmployee,
+    Project,
+    ProjectHour,
+)
+
+KEY_PREFIX = "hour_graph"
+ALL_EMPLOYEE_DAYS = 60
+GRAPH_TIMEOUT = 60 * 60
+
+ALL_EMPLOYEE = "all_employee"
+CLIENT_PROJECTS = "client_projects"
+LAST_WORKING_DAY = "last_working_day"
+
+
+def graph_key(graph, *filters):
+    """
+    @param filters: the values the dataset depends on, in a fixed order
+    """
+    version = cache.get_or_set(f"{KEY_PREFIX}:{graph}:version", 1, timeout=None)
+    parts = ":".join(str(value) for value in filters)
+    return f"{KEY_PREFIX}:{graph}:v{version}:{parts}"
+
+
+def invalidate_graph(graph):
+    try:
+        cache.incr(f"{KEY_PREFIX}:{graph}:version")
+    except ValueError:
+        cache.add(f"{KEY_PREFIX}:{graph}:version", 1, timeout=None)
+
+
+def _get_or_set(key, compute, timeout=GRAPH_TIMEOUT):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout=timeout)
+    return value
+
+
+class _Timestamps(dict):
+    """date -> highcharts timestamp, each date is converted once per dataset"""
+
+    def __missing__(self, date):
+        timestamp = int(
+            datetime.datetime.combine(date, datetime.datetime.min.time()).timestamp()
+        )
+        self[date] = timestamp * 1000
+        return self[date]
+
+
+def _employee_series(employee_ids=None, today=None):
+    """
+    @return OrderedDict: {employee_id: spline series} of employees having hours
+    """
+    today = today or timezone.now().date()
+    employee_hours = EmployeeProjectHour.objects.filter(
+        employee__active=True,
+        employee__manager=False,
+        project_hour__date__gte=today - datetime.timedelta(days=ALL_EMPLOYEE_DAYS),
+    )
+    if employee_ids is not None:
+        employee_hours = employee_hours.filter(employee_id__in=employee_ids)
+
+    timestamps = _Timestamps()
+    series = OrderedDict()
+    for employee_id, full_name, date, hours in employee_hours.order_by(
+        "employee_id", "project_hour__date"
+    ).values_list("employee_id", "employee__full_name", "project_hour__date", "hours"):
+        if employee_id not in series:
+            series[employee_id] = {"type": "spline", "name": full_name, "data": []}
+        series[employee_id]["data"].append([timestamps[date], hours])
+    return series
+
+
+def all_employee_dataset():
+    """Last 60 days hours of every active non manager employee, one spline per employee"""
+    today = timezone.now().date()
+    series = _get_or_set(
+        graph_key(ALL_EMPLOYEE, today),
+        lambda: list(_employee_series(today=today).items()),
+        timeout=seconds_until_tomorrow(),
+    )
+    return [employee_series for _, employee_series in series]
+
+
+def refresh_all_employee_series(employee_ids):
+    """Patch the cached series of the given employees with one query"""
+    today = timezone.now().date()
+    key = graph_key(ALL_EMPLOYEE, today)
+    series = cache.get(key)
+    if series is None:
+        return
+    fresh = _employee_series(employee_ids, today=today)
+    cached_ids = {employee_id for employee_id, _ in series}
+    if any(employee_id not in cached_ids for employee_id in fresh):
+        # a new employee in the graph, its place comes from the next full build
+        cache.delete(key)
+        return
+    series = [
+        (employee_id, fresh.get(employee_id, employee_series))
+        for employee_id, employee_series in series
+        if employee_id not in employee_ids or employee_id in fresh
+    ]
+    cache.set(key, series, timeout=seconds_until_tomorrow())
+
+
+def _month_label(year, month):
+    return f"{calendar.month_abbr[month]}-{year}"
+
+
+def _passes(total, filters):
+    if filters.get("total_hour__gte") is not None and total < float(
+        filters["total_hour__gte"]
+    ):
+        return False
+    if filters.get("total_hour__lte") is not None and total > float(
+        filters["total_hour__lte"]
+    ):
+        return False
+    return True
+
+
+def _weekly_monthly_chart(hours_by_date, client_name, client_id, filters):
+    """
+    @param hours_by_date: OrderedDict {date: total hour} in date order
+    """
+    chart = {
+        "weekly": {
+            "label": "Weekly Hours",
+            "client_name": client_name,
+            "client_id": client_id,
+            "labels": [],
+            "data": [],
+            "total_hour": 0,
+        },
+        "monthly": {
+            "label": "Monthly Hours",
+            "client_name": client_name,
+            "client_id": client_id,
+            "labels": [],
+            "data": [],
+            "total_hour": 0,
+        },
+    }
+    monthly_hours = OrderedDict()
+    for date, total_hour in hours_by_date.items():
+        month = (date.year, date.month)
+        monthly_hours[month] = monthly_hours.get(month, 0) + total_hour
+        if _passes(total_hour, filters):
+            chart["weekly"]["labels"].append(date.strftime("%d-%b-%Y"))
+            chart["weekly"]["data"].append(total_hour)
+            chart["weekly"]["total_hour"] += total_hour
+    for (year, month), total_hour in monthly_hours.items():
+        if _passes(total_hour, filters):
+            chart["monthly"]["labels"].append(_month_label(year, month))
+            chart["monthly"]["data"].append(total_hour)
+            chart["monthly"]["total_hour"] += total_hour
+    return chart
+
+
+def _client_projects_dataset(client_id, date_filters, filters):
+    projects = list(
+        Project.objects.select_related("client")
+        .only("title", "client__name")
+        .filter(client_id=client_id)
+    )
+    if not projects:
+        return {}
+    client = projects[0].client
+
+    project_hours = defaultdict(OrderedDict)
+    all_project_hours = OrderedDict()
+    for project_id, date, total_hour in (
+        ProjectHour.objects.filter(
+            project_id__in=[project.id for project in projects], **date_filters
+        )
+        .values("project_id", "date")
+        .annotate(total_hour=Sum("hours"))
+        .order_by("date")
+        .values_list("project_id", "date", "total_hour")
+    ):
+        project_hours[project_id][date] = total_hour
+        all_project_hours[date] = all_project_hours.get(date, 0) + total_hour
+
+    dataset = dict()
+    if len(projects) > 1 and all_project_hours:
+        dataset["All Projects"] = {
+            "name": "All Projects",
+            **_weekly_monthly_chart(all_project_hours, client.name, client.id, filters),
+        }
+    for project in projects:
+        if project.id in project_hours:
+            dataset[project.title] = {
+                "name": project.title,
+                "project_id": project.id,
+                **_weekly_monthly_chart(
+                    project_hours[project.id], client.name, client.id, filters
+                ),
+            }
+    return dataset
+
+
+def client_projects_dataset(client_id, filters):
+    """
+    Weekly and monthly hours of every project of the client and of all of them
+
+    @param filters: date__gte, optional date__lte, total_hour__gte and total_hour__lte
+    """
+    filters = dict(filters)
+    date_filters = {"date__gte": filters.pop("date__gte")}
+    if filters.get("date__lte"):
+        date_filters["date__lte"] = filters.pop("date__lte")
+    filters.pop("date__lte", None)
+    return _get_or_set(
+        graph_key(
+            CLIENT_PROJECTS,
+            client_id,
+            date_filters["date__gte"],
+            date_filters.get("date__lte"),
+            filters.get("total_hour__gte"),
+            filters.get("total_hour__lte"),
+        ),
+        lambda: _client_projects_dataset(client_id, date_filters, filters),
+    )
+
+
+def _last_working_day_chart(date_filters, hours_filters):
+    employees = OrderedDict()
+    for employee_id, full_name, project_title, hours in (
+        DailyProjectUpdate.objects.filter(**date_filters)
+        .order_by("employee", "project__title")
+        .values_list("employee", "employee__full_name", "project__title", "hours")
+    ):
+        employee = employees.setdefault(
+            employee_id, {"name": full_name, "total_hour": 0, "projects": []}
+        )
+        employee["total_hour"] += hours
+        employee["projects"].append([project_title, hours])
+
+    chart = {
+        "label": "Daily Project Hours",
+        "labels": [],
+        "data": [],
+        "projects_hour": [],
+        "employees_id": [],
+        "total_hour": 0,
+    }
+    for employee_id, employee in sorted(
+        employees.items(), key=lambda item: item[1]["total_hour"]
+    ):
+        if not _passes(employee["total_hour"], hours_filters):
+            continue
+        chart["labels"].append(employee["name"])
+        chart["data"].append(employee["total_hour"])
+        chart["employees_id"].append(employee_id)
+        chart["projects_hour"].append(employee["projects"])
+        chart["total_hour"] += employee["total_hour"]
+    return chart
+
+
+def last_working_day_chart(date_filters, hours_filters):
+    """
+    Daily update hours of every employee on a day, lowest first
+
+    @param date_filters: {"created_at__date": date}
+    @param hours_filters: optional total_hour__gte and total_hour__lte
+    """
+    return _get_or_set(
+        graph_key(
+            LAST_WORKING_DAY,
+            date_filters["created_at__date"],
+            hours_filters.get("total_hour__gte"),
+            hours_filters.get("total_hour__lte"),
+        ),
+        lambda: _last_working_day_chart(date_filters, hours_filters),
+    )
+
+
+@receiver(
+    post_save, sender=EmployeeProjectHour, dispatch_uid="hour_graph_employee_hour_save"
+)
+@receiver(
+    post_delete,
+    sender=EmployeeProjectHour,
+    dispatch_uid="hour_graph_employee_hour_delete",
+)
+@receiver(
+    post_save,
+    sender=EmployeeProjectHourGroupByEmployee,
+    dispatch_uid="hour_graph_weekly_employee_hour_save",
+)
+@receiver(
+    post_delete,
+    sender=EmployeeProjectHourGroupByEmployee,
+    dispatch_uid="hour_graph_weekly_employee_hour_delete",
+)
+def refresh_employee_hour_graph(sender, instance, **kwargs):
+    employee_ids = {instance.employee_id}
+    transaction.on_commit(lambda: refresh_all_employee_series(employee_ids))
+
+
+@receiver(post_save, sender=ProjectHour, dispatch_uid="hour_graph_project_hour_save")
+@receiver(post_delete, sender=ProjectHour, dispatch_uid="hour_graph_project_hour_delete")
+@receiver(post_save, sender=Project, dispatch_uid="hour_graph_project_save")
+@receiver(post_delete, sender=Project, dispatch_uid="hour_graph_project_delete")
+def invalidate_client_projects_graph(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_graph(CLIENT_PROJECTS))
+    if sender is ProjectHour and kwargs.get("created") is False:
+        # the date of the employee hours may have moved
+        employee_ids = set(
+            instance.employeeprojecthour_set.values_list("employee_id", flat=True)
+        )
+        transaction.on_commit(lambda: refresh_all_employee_series(employee_ids))
+
+
+@receiver(
+    post_save, sender=DailyProjectUpdate, dispatch_uid="hour_graph_daily_update_save"
+)
+@receiver(
+    post_delete, sender=DailyProjectUpdate, dispatch_uid="hour_graph_daily_update_delete"
+)
+def invalidate_last_working_day_graph(sender, **kwargs):
+    transaction.on_commit(lambda: invalidate_graph(LAST_WORKING_DAY))
+
+
+@receiver(post_save, sender=Employee, dispatch_uid="hour_graph_employee_save")
+@receiver(post_delete, sender=Employee, dispatch_uid="hour_graph_employee_delete")
+def invalidate_employee_graphs(sender, **kwargs):
+    # names, active and manager flags are part of the series
+    transaction.on_commit(lambda: invalidate_graph(ALL_EMPLOYEE))
+    transaction.on_commit(lambda: invalidate_graph(LAST_WORKING_DAY))
@@ -0,0 +1,141 @@
+from datetime import datetime, time
+
+from django.db import transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django_q.tasks import async_task
+
+from account.services.salary_report import invalidate_salary_reports
+from employee.models import Employee, EmployeeAttendance
+from employee.models.employee import LateAttendanceFine
+
+LATE_ENTRY_TIME = time(hour=11, minute=11)
+
+# (late entries above, fine), first match wins
+FINE_TIERS = ((6, 500.00), (3, 80.00))
+
+MAIL_BATCH_SIZE = 50
+
+
+def late_fine_amount(late_count):
+    for late_entries, fine in FINE_TIERS:
+        if late_count > late_entries:
+            return fine
+    return 0.00
+
+
+def _count(queryset):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values("employee_id")
+            .annotate(total=Count("id"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+class LateAttendanceFineEngine:
+    """
+    Late attendance fines of a day for the whole organisation
+
+    Every employee's monthly late count and today's late entry come from one
+    query, the fines are bulk inserted and the notifications are handed to
+    the employee.tasks.send_late_entry_mails task in batches.
+    Running it again the same day only picks employees without a fine for the day,
+    fines a concurrent run inserted first are skipped by the unique constraint.
+    """
+
+    def __init__(self, date=None, late_entry_time=None):
+        self.date = date or datetime.now().date()
+        self.late_entry_time = late_entry_time or LATE_ENTRY_TIME
+
+    def get_employees(self):
+        month_filter = {
+            "employee_id": OuterRef("pk"),
+            "date__year": self.date.year,
+            "date__month": self.date.month,
+        }
+        today_late_entries = EmployeeAttendance.objects.filter(
+            employee_id=OuterRef("pk"),
+            date=self.date,
+            entry_time__gt=self.late_entry_time,
+        ).order_by("id")
+        return (
+            Employee.objects.filter(
+                active=True, show_in_attendance_list=True, exception_la=False
+            )
+            .exclude(salaryhistory__isnull=True)
+            .annotate(
+                total_consider=_count(
+                    LateAttendanceFine.objects.filter(is_consider=True, **month_filter)
+                ),
+                month_late_entry=_count(
+                    EmployeeAttendance.objects.filter(
+                        entry_time__gt=self.late_entry_time, **month_filter
+                    )
+                ),
+                today_entry_time=Subquery(today_late_entries.values("entry_time")[:1]),
+                has_today_fine=Exists(
+                    LateAttendanceFine.objects.filter(
+                        employee_id=OuterRef("pk"), date=self.date
+                    )
+                ),
+            )
+            .filter(today_entry_time__isnull=False, has_today_fine=False)
+            .only("id", "full_name", "email")
+        )
+
+    def build_fines(self):
+        """
+        @return list of tuple(LateAttendanceFine, late count of the month including today)
+        """
+        fines = []
+        for employee in self.get_employees():
+            late_count = employee.month_late_entry - employee.total_consider
+            fines.append(
+                (
+                    LateAttendanceFine(
+                        employee=employee,
+                        month=self.date.month,
+                        year=self.date.year,
+                        date=self.date,
+                        is_consider=False,
+                        total_late_attendance_fine=late_fine_amount(late_count),
+                        entry_time=employee.today_entry_time,
+                    ),
+                    late_count,
+                )
+            )
+        return fines
+
+    @transaction.atomic
+    def save(self, notify=True):
+        fines = self.build_fines()
+        # a run saving the same day at the same time already holds those fines
+        LateAttendanceFine.objects.bulk_create(
+            [fine for fine, _ in fines], ignore_conflicts=True
+        )
+        transaction.on_commit(invalidate_salary_reports)
+
+        if notify and fines:
+            notifications = [
+                {
+                    "employee_id": fine.employee_id,
+                    "entry_time": fine.entry_time,
+                    "late_count": late_count,
+                }
+                for fine, late_count in fines
+            ]
+            transaction.on_commit(lambda: self.__notify(notifications))
+        return [fine for fine, _ in fines]
+
+    def __notify(self, notifications):
+        for start in range(0, len(notifications), MAIL_BATCH_SIZE):
+            async_task(
+                "employee.tasks.send_late_entry_mails",
+                self.date,
+                notifications[start : start + MAIL_BATCH_SIZE],
+            )
@@ -2,13 +2,13 @@ import calendar
 import datetime
 import math
 from datetime import date, datetime
+from django.conf import settings
 from django.contrib.auth.models import User
 import requests
 from dateutil.relativedelta import relativedelta
 from django.core import management
 from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.db.models import (
-    Count,
     ExpressionWrapper,
     F,
     FloatField,
@@ -21,6 +21,9 @@ from django.template import loader
 from django.utils import timezone
 
 from account.models import Loan
+from account.services.salary_report import invalidate_salary_reports
+from account.services.tax import calculate_monthly_tds
+from config.utils.mail import render_many, send_emails
 from employee.models import (
     Employee,
     EmployeeAttendance,
@@ -32,7 +35,12 @@ from employee.models import (
     PrayerInfo,
     SalaryHistory,
 )
-from employee.models.employee import LateAttendanceFine
+from employee.services.hour_graphs import (
+    LAST_WORKING_DAY,
+    invalidate_graph,
+    refresh_all_employee_series,
+)
+from employee.services.late_attendance import LateAttendanceFineEngine
 from project_management.models import (
     DailyProjectUpdate,
     EmployeeProjectHour,
@@ -107,7 +115,7 @@ def send_mail_to_employee(employee, pdf, html_body, subject, letter_type):
                 )
             else:
                 email.attach_file(file_path)
-    email.send()
+    send_emails([email], category="employee_letter")
 
 
 # def leave_mail(leave: Leave):
@@ -185,7 +193,7 @@ def leave_mail(leave: Leave):
         )
 
     email.attach_alternative(html_body, "text/html")
-    email.send()
+    send_emails([email], category="leave")
     print("end leave mail")
 
 
@@ -203,7 +211,7 @@ def permanent_notification(employees):
     email.to = ["admin@mediusware.com"]
     # email.bcc = ['coredeveloper.2013@gmail.com',]
     email.from_email = "no-reply@mediusware.com"
-    email.send()
+    send_emails([email], category="permanent_notification")
 
 
 def increment_notification(employees):
@@ -217,7 +225,7 @@ def increment_notification(employees):
     email.to = ["admin@mediusware.com"]
     # email.bcc = ['coredeveloper.2013@gmail.com',]
     email.from_email = "no-reply@mediusware.com"
-    email.send()
+    send_emails([email], category="increment_notification")
 
 
 def execute_increment_notification():
@@ -272,6 +280,8 @@ def no_daily_update():
                 )
             )
         DailyProjectUpdate.objects.bulk_create(emps)
+        # bulk_create skips the signal the last working day graph listens to
+        invalidate_graph(LAST_WORKING_DAY)
 
         # print("[Bot] Daily Update Done")
 
@@ -318,6 +328,7 @@ def no_project_update():
                     )
                 )
             DailyProjectUpdate.objects.bulk_create(punf)
+            invalidate_graph(LAST_WORKING_DAY)
             # print("[Bot] No project update")
     return
 
@@ -379,6 +390,7 @@ def bonus__project_hour__monthly(date, project_id, manager_employee_id):
     project_hour.save()
 
     EmployeeProjectHour.objects.bulk_create(eph)
+    refresh_all_employee_series({hour.employee_id for hour in eph})
     print("[Bot] Monthly Bonus Done")
 
 
@@ -576,14 +588,34 @@ def create_tds():
     LOAN_AMOUNT = 417
     LOAN_DATE = today + relativedelta(day=31)  # Gets the maximum month of that  day
 
+    # one TDS loan per employee and month, a rerun must not deduct twice
+    employees = list(
+        employees.exclude(
+            id__in=Loan.objects.filter(
+                loan_type="tds",
+                start_date__year=LOAN_DATE.year,
+                start_date__month=LOAN_DATE.month,
+            ).values("employee_id")
+        )
+    )
+    if settings.TDS_COMPUTED_AMOUNT:
+        monthly_tds = calculate_monthly_tds(
+            employees,
+            {employee.id: employee.max_payable_salary for employee in employees},
+        )
+    else:
+        monthly_tds = {employee.id: LOAN_AMOUNT for employee in employees}
+
     loans = list()
     for employee in employees:
+        if not monthly_tds[employee.id]:
+            continue
         loans.append(
             Loan(
                 employee=employee,
                 witness_id=30,  # Must change  to 30
-                loan_amount=LOAN_AMOUNT,
-                emi=LOAN_AMOUNT,
+                loan_amount=monthly_tds[employee.id],
+                emi=monthly_tds[employee.id],
                 effective_date=LOAN_DATE,
                 start_date=LOAN_DATE,
                 end_date=LOAN_DATE,
@@ -593,6 +625,7 @@ def create_tds():
             )
         )
     Loan.objects.bulk_create(loans)
+    invalidate_salary_reports()
 
 
 # onetime call function for creating all entry_pass_id
@@ -621,82 +654,45 @@ from datetime import time
 
 
 def late_attendance_calculate(late_entry_time=None):
-    employees = Employee.objects.filter(
-        active=True, show_in_attendance_list=True, exception_la=False   
-    ).exclude(salaryhistory__isnull=True)
-    late_entry = late_entry_time if late_entry_time else time(hour=11, minute=11)
+    LateAttendanceFineEngine(late_entry_time=late_entry_time).save()
 
-    current_date = datetime.now()
-    current_month = current_date.month
-    current_year = current_date.year
 
-    for employee in employees:
-        # Get considered late entries for current month
-        total_consider = LateAttendanceFine.objects.filter(
-            employee=employee,
-            date__year=current_year,
-            date__month=current_month,
-            is_consider=True,
-        ).count()
-
-        # Count late entries for current month (including today)
-        total_late_entry = (
-            EmployeeAttendance.objects.filter(
-                employee=employee,
-                date__year=current_year,
-                date__month=current_month,
-                entry_time__gt=late_entry,
-            ).count()
-            - total_consider
-        )
-
-        # Check today's late entry
-        today_late_entry = EmployeeAttendance.objects.filter(
-            employee=employee, date=current_date, entry_time__gt=late_entry
+def send_late_entry_mails(date, notifications):
+    """
+    @param notifications: list of dict with employee_id, entry_time and late_count
+    """
+    employees = Employee.objects.in_bulk(
+        [notification["employee_id"] for notification in notifications]
+    )
+    notifications = [
+        (employees[notification["employee_id"]], notification)
+        for notification in notifications
+        if notification["employee_id"] in employees
+        and employees[notification["employee_id"]].email
+    ]
+    html_bodies = render_many(
+        "mails/late_entry_mail.html",
+        [
+            {
+                "employee": employee,
+                "entry_time": notification["entry_time"],
+                "late_count": notification["late_count"],
+            }
+            for employee, notification in notifications
+        ],
+    )
+    emails = []
+    for (employee, _), html_body in zip(notifications, html_bodies):
+        email = EmailMultiAlternatives(
+            subject=f"Attention Required: Late Entry Logged {date}",
+            from_email='"Mediusware-HR" <hr@mediusware.com>',
+            to=[employee.email],
         )
+        email.attach_alternative(html_body, "text/html")
+        emails.append(email)
 
-        if not LateAttendanceFine.objects.filter(
-            employee=employee, date=current_date
-        ).exists() and today_late_entry.exists():
-            entry_time = today_late_entry.first().entry_time
-            # Use total_late_entry directly (already includes today)
-            late_count = total_late_entry  # FIX: Removed +1
-
-            if total_late_entry > 6:
-                fine_amount = 500.00
-            elif total_late_entry > 3:
-                fine_amount = 80.00
-            else:
-                fine_amount = 0.00
-
-            LateAttendanceFine.objects.create(
-                employee=employee,
-                month=current_month,
-                year=current_year,
-                date=current_date,
-                is_consider=False,
-                total_late_attendance_fine=fine_amount,
-                entry_time=entry_time,
-            )
-
-            html_body = loader.render_to_string(
-                "mails/late_entry_mail.html",
-                context={
-                    "employee": employee,
-                    "entry_time": entry_time,
-                    "late_count": late_count,
-                },
-            )
-            email = EmailMultiAlternatives(
-                subject=f"Attention Required: Late Entry Logged {current_date}",
-                from_email='"Mediusware-HR" <hr@mediusware.com>',
-                to=[employee.email],
-            )
-            email.attach_alternative(html_body, "text/html")
-            try:
-                email.send()
-            except Exception as e:
-                print(f"Failed to send email to {employee.email}: {str(e)}")
+    # one SMTP connection for the whole batch
+    send_emails(emails, category="late_entry")
 
 
 def send_birthday_email():
@@ -704,122 +700,25 @@ def send_birthday_email():
         active=True, date_of_birth=timezone.now().date()
     )
 
-    for employee in employees:
-        html_body = loader.render_to_string(
-            "mails/employee_birthday_mail.html",
-            context={
-                "employee": employee,
-            },
-        )
-
+    html_bodies = render_many(
+        "mails/employee_birthday_mail.html",
+        [{"employee": employee} for employee in employees],
+    )
+    emails = []
+    for employee, html_body in zip(employees, html_bodies):
         email = EmailMultiAlternatives()
         email.subject = "Happy Birthday!"
         email.attach_alternative(html_body, "text/html")
         email.to = [employee.email]
         email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
-        email.send()
+        emails.append(email)
+    send_emails(emails, category="birthday")
 
 
-from django.db.models import DateTimeField, Max, Value
-from django.db.models.functions import Coalesce
 
 
 def new_late_attendance_calculate(late_entry_time):
-    late_entry = time(hour=11, minute=31)
-    current_date = datetime.now()
-    current_month = current_date.month
-    current_year = current_date.year
-
-    # Annotate late entry time for today using aggregate
-    employees = (
-        Employee.objects.filter(active=True, show_in_attendance_list=True)
-        .exclude(salaryhistory__isnull=True)
-        .annotate(
-            total_consider=Count(
-                "lateattendancefine",
-                filter=Q(
-                    lateattendancefine__date__year=current_year,
-                    lateattendancefine__date__month=current_month,
-                    lateattendancefine__is_consider=True,
-                ),
-            ),
-            total_late_entry=Count(
-                "employeeattendance",
-                filter=Q(
-                    employeeattendance__date__year=current_year,
-                    employeeattendance__date__month=current_month,
-                    employeeattendance__entry_time__gt=late_entry_time,
-                ),
-            )
-            - F("total_consider"),
-            today_late_entry_time=Coalesce(
-                Max(
-                    "employeeattendance__entry_time",
-                    filter=Q(
-                        employeeattendance__date=current_date,
-                        employeeattendance__entry_time__gt=late_entry,
-                    ),
-                ),
-                Value(None),
-                output_field=DateTimeField(),
-            ),
-            has_today_fine=Count(
-                "lateattendancefine",
-                filter=Q(lateattendancefine__date=current_date),
-            ),
-        )
-    )
-
-    # Filter employees
-    late_employees = employees.filter(
-        today_late_entry_time__isnull=False, has_today_fine=0
-    )
-
-    # Prepare fines and emails
-    fines = []
-    emails = []
-
-    for employee in late_employees:
-        fine_amount = 0.00
-        if employee.total_late_entry > 6:
-            fine_amount = 500.00
-        elif employee.total_late_entry > 3:
-            fine_amount = 80.00
-
-        fines.append(
-            LateAttendanceFine(
-                employee=employee,
-                month=current_month,
-                year=current_year,
-                date=current_date,
-                total_late_attendance_fine=fine_amount,
-                entry_time=employee.today_late_entry_time,
-                is_consider=False,
-            )
-        )
-
-        if fine_amount > 0:
-            html_body = loader.render_to_string(
-                "mails/late_entry_mail.html",
-                context={
-                    "employee": employee,
-                    "entry_time": employee.today_late_entry_time,
-                },
-            )
-            email = EmailMultiAlternatives()
-            email.subject = f"Attention Required: Late Entry Logged {current_date}"
-            email.attach_alternative(html_body, "text/html")
-            email.to = [employee.email]
-            email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
-            emails.append(email)
-
-    # Bulk create fines
-    LateAttendanceFine.objects.bulk_create(fines)
-    print(fines)
-    print("Fines created.")
-    # Send emails
-    for email in emails:
-        email.send()
+    late_attendance_calculate(late_entry_time)
 
 
 def send_resignation_application_email(obj):
@@ -840,7 +739,7 @@ def send_resignation_application_email(obj):
         from_email=obj.employee.email,
         to=["hr@mediusware.com"],
     )
-    email.send()
+    send_emails([email], category="resignation_application")
 
 
 def send_resignation_feedback_email(subject, body, from_email, to_email):
@@ -849,7 +748,7 @@ def send_resignation_feedback_email(subject, body, from_email, to_email):
     email.attach_alternative(body, "text/html")
     email.to = to_email
     email.from_email = from_email
-    email.send()
+    send_emails([email], category="resignation_feedback")
 
 
 
@@ -866,7 +765,7 @@ def email_send_to_employee(employee, pdf, html_body, subject):
         email.attach(pdf.split("/")[-1], response.content, "application/pdf")
     elif pdf:
         email.attach_file(pdf)
-    email.send()
+    send_emails([email], category="employee_letter")
     
     
     
@@ -882,7 +781,7 @@ def role_change_email_send_to_employee(employee, pdf, html_body, subject):
         email.attach(pdf.split("/")[-1], response.content, "application/pdf")
     elif pdf:
         email.attach_file(pdf)
-    email.send()
+    send_emails([email], category="role_change")
 
 
 def send_absent_without_leave_email():
@@ -967,5 +866,5 @@ def send_absent_without_leave_email():
     print("email body")
     email.attach_alternative(html_body, "text/html")
     print("email body end")
-    email.send()
+    send_emails([email], category="absent_without_leave")
     print(f"Email sent to HR with {len(employee_data)} absent employees for {today}.")
\ No newline at end of file
@@ -1,3 +1,264 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from account.models import Loan
+from account.services.tax import calculate_monthly_tds
+from config.context_processors.dashboard import DashboardContext, dashboard
+from employee import dashboard_cache
+from employee.models import Employee, Leave, SalaryHistory
+from employee.models.employee import EmployeeAvailableSlot, LateAttendanceFine
+from employee.models.employee_activity import EmployeeAttendance
+from employee.services.hour_graphs import last_working_day_chart
+from employee.services.late_attendance import LateAttendanceFineEngine
+from employee.tasks import create_tds, no_daily_update
+from project_management.models import Project
+from settings.models import Designation, LeaveManagement, Notice, PayScale
+
+
+# Fixtures shared by the test modules of the other apps
+
+
+def create_employee(full_name, **fields):
+    """Employee with a login and the settings rows it requires"""
+    username = full_name.lower().replace(" ", ".")
+    designation, _ = Designation.objects.get_or_create(
+        title="Software Engineer", defaults={"description": "-"}
+    )
+    leave_management, _ = LeaveManagement.objects.get_or_create(
+        title="Regular", defaults={"casual_leave": 10, "medical_leave": 14}
+    )
+    pay_scale, _ = PayScale.objects.get_or_create(
+        title="Regular",
+        defaults={
+            "basic": 60.0,
+            "travel_allowance": 10.0,
+            "house_allowance": 20.0,
+            "medical_allowance": 10.0,
+            "net_payable": 100.0,
+            "provision_period": 3,
+            "increment_period": 12,
+            "increment_rate": 10.0,
+        },
+    )
+    fields.setdefault("email", f"{username}@example.com")
+    return Employee.objects.create(
+        user=User.objects.create_user(username=username, password="password"),
+        full_name=full_name,
+        phone="01700000000",
+        designation=designation,
+        leave_management=leave_management,
+        pay_scale=pay_scale,
+        **fields,
+    )
+
+
+def create_superuser(username="admin"):
+    return User.objects.create_superuser(
+        username=username, email=f"{username}@example.com", password="password"
+    )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class DashboardWidgetCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(create_superuser())
+        employee = create_employee("Leave Employee")
+        today = timezone.now().date()
+        self.leave = Leave.objects.create(
+            employee=employee,
+            start_date=today,
+            end_date=today,
+            total_leave=1,
+            leave_type="casual",
+            applied_leave_type="casual",
+            message="-" * 150,
+        )
+
+    def test_approve_selected_drops_the_leave_widgets(self):
+        for widget in dashboard_cache.WIDGETS:
+            dashboard_cache.get_or_compute(widget, lambda: "cached")
+
+        self.client.post(
+            reverse("admin:employee_leave_changelist"),
+            {"action": "approve_selected", "_selected_action": [self.leave.id]},
+        )
+
+        self.leave.refresh_from_db()
+        self.assertEqual(self.leave.status, "approved")
+        for widget in dashboard_cache.WIDGETS:
+            cached = cache.get(dashboard_cache.widget_key(widget))
+            if Leave in dashboard_cache.WIDGETS[widget]:
+                self.assertIsNone(cached)
+            else:
+                self.assertEqual(cached, "cached")
+
+    @override_settings(DASHBOARD_WIDGET_STATS=False)
+    def test_reads_are_not_counted_by_default(self):
+        dashboard_cache.get_or_compute("notices", list)
+        dashboard_cache.get_or_compute("notices", list)
+        self.assertEqual(dashboard_cache.widget_cache_stats()["notices"]["hits"], 0)
+
+    @override_settings(DASHBOARD_WIDGET_STATS=True)
+    def test_reads_are_counted_when_enabled(self):
+        dashboard_cache.get_or_compute("notices", list)
+        dashboard_cache.get_or_compute("notices", list)
+        stats = dashboard_cache.widget_cache_stats()["notices"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class CreateTdsTest(TestCase):
+    def setUp(self):
+        create_employee("Tds Witness", id=30)
+        self.employee = create_employee("Tds Employee", gender="male")
+        SalaryHistory.objects.create(employee=self.employee, payable_salary=50000)
+
+    def tds_loans(self):
+        return Loan.objects.filter(employee=self.employee, loan_type="tds")
+
+    def test_fixed_amount_once_per_month(self):
+        create_tds()
+        create_tds()
+
+        self.assertEqual(
+            list(self.tds_loans().values_list("loan_amount", "emi")), [(417, 417)]
+        )
+
+    @override_settings(TDS_COMPUTED_AMOUNT=True)
+    def test_computed_amount_is_opt_in(self):
+        create_tds()
+        create_tds()
+
+        amount = calculate_monthly_tds([self.employee], {self.employee.id: 50000})[
+            self.employee.id
+        ]
+        expected = [(amount,)] if amount else []
+        self.assertEqual(list(self.tds_loans().values_list("emi")), expected)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class AdminDashboardQueryTest(TestCase):
+    """The admin index stays within DashboardContext.QUERY_BUDGET"""
+
+    def setUp(self):
+        cache.clear()
+        self.employee = create_employee("Dashboard Employee")
+        User.objects.filter(id=self.employee.user_id).update(
+            is_staff=True, is_superuser=True
+        )
+
+    def add_colleagues(self, count):
+        today = timezone.now()
+        for index in range(count):
+            colleague = create_employee(f"Colleague {index}")
+            EmployeeAvailableSlot.objects.create(
+                employee=colleague, date=today, slot="full"
+            )
+            Leave.objects.create(
+                employee=colleague,
+                start_date=today.date(),
+                end_date=today.date(),
+                total_leave=1,
+                leave_type="casual",
+                status="approved",
+                message="-" * 150,
+            )
+            Notice.objects.create(title=f"Notice {index}", file="notices/notice.pdf")
+
+    def test_dashboard_context_within_query_budget(self):
+        self.add_colleagues(2)
+        request = RequestFactory().get("/admin/")
+        request.user = User.objects.get(id=self.employee.user_id)
+
+        with CaptureQueriesContext(connection) as queries:
+            for value in dashboard(request).values():
+                bool(value)
+
+        budget = DashboardContext.query_budget(*DashboardContext.QUERY_BUDGET)
+        self.assertLessEqual(len(queries), budget)
+
+    def test_admin_index_queries_do_not_grow_with_headcount(self):
+        self.client.force_login(User.objects.get(id=self.employee.user_id))
+        self.add_colleagues(1)
+        # the first render warms the per process caches
+        self.client.get(reverse("admin:index"))
+        cache.clear()
+        with CaptureQueriesContext(connection) as small_render:
+            self.assertEqual(self.client.get(reverse("admin:index")).status_code, 200)
+
+        self.add_colleagues(5)
+        cache.clear()
+        with self.assertNumQueries(len(small_render)):
+            self.client.get(reverse("admin:index"))
+
+
+class LateAttendanceFineTest(TestCase):
+    def test_one_fine_per_employee_and_day(self):
+        employee = create_employee("Late Employee")
+        day = datetime.date(2024, 1, 10)
+        LateAttendanceFine.objects.create(
+            employee=employee, month=day.month, year=day.year, date=day
+        )
+
+        with self.assertRaises(IntegrityError):
+            LateAttendanceFine.objects.create(
+                employee=employee, month=day.month, year=day.year, date=day
+            )
+
+    def test_engine_skips_fines_a_concurrent_run_saved(self):
+        employee = create_employee("Late Employee")
+        SalaryHistory.objects.create(
+            employee=employee,
+            payable_salary=30000,
+            active_from=datetime.date(2024, 1, 1),
+        )
+        day = datetime.date(2024, 1, 10)
+        EmployeeAttendance.objects.create(
+            employee=employee, date=day, entry_time=datetime.time(11, 30)
+        )
+        engine = LateAttendanceFineEngine(date=day)
+        # both runs build their fines before either of them saves
+        stale_fines = engine.build_fines()
+        LateAttendanceFineEngine(date=day).save(notify=False)
+
+        with mock.patch.object(engine, "build_fines", return_value=stale_fines):
+            engine.save(notify=False)
+
+        self.assertEqual(
+            LateAttendanceFine.objects.filter(employee=employee, date=day).count(), 1
+        )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class BotDailyUpdateGraphTest(TestCase):
+    def test_bot_update_shows_on_the_cached_graph(self):
+        # the bot posts as manager 30 on the no client project 92
+        create_employee("Bot Manager", id=30)
+        Project.objects.create(id=92, title="No Client Project", description="-")
+        employee = create_employee("Forgetful Employee")
+        today = timezone.now().date()
+        EmployeeAttendance.objects.create(employee=employee, date=today)
+        self.assertEqual(
+            last_working_day_chart({"created_at__date": today}, {})["employees_id"], []
+        )
+
+        no_daily_update()
+
+        self.assertEqual(
+            last_working_day_chart({"created_at__date": today}, {})["employees_id"],
+            [employee.id],
+        )
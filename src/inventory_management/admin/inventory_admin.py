@@ -1,6 +1,4 @@
 from django.contrib import admin, messages
-from django.db import transaction
-from django.db.models import Q, Sum
 from django.utils.html import format_html
 
 from inventory_management.forms import (
@@ -14,6 +12,8 @@ from inventory_management.models import (
     InventoryTransaction,
     InventoryUnit,
 )
+from inventory_management.services.consumption import consumption_rows, trend_months
+from inventory_management.services.stock_ledger import save_transaction, set_status
 
 # Register your models here.
 
@@ -101,41 +101,12 @@ class InventoryTransactionAdmin(admin.ModelAdmin):
             obj.get_status_display(),
         )
 
-    @transaction.atomic
     def save_model(self, request, obj, form, change):
-        item = InventoryItem.objects.get(id=obj.inventory_item.id)
-        obj.available_item = item.quantity
-        if obj.transaction_type == "i" and obj.status == "approved":  # IN
-            
-            item.quantity = item.quantity + obj.quantity
-            item.save()
-        elif obj.transaction_type == "o" and obj.status == "approved":  # OUT
-            # item = InventoryItem.objects.get(id=obj.inventory_item.id)
-            item.quantity = item.quantity - obj.quantity
-            item.save()
-        if obj.id:
-            if obj.transaction_type == "i" and obj.status == "pending":  # IN
-                # item = InventoryItem.objects.get(id=obj.inventory_item.id)
-                item.quantity = item.quantity - obj.quantity
-                item.save()
-            elif obj.transaction_type == "o" and obj.status == "pending":  # OUT
-                # item = InventoryItem.objects.get(id=obj.inventory_item.id)
-                item.quantity = item.quantity + obj.quantity
-                item.save()
-        super().save_model(request, obj, form, change)
+        save_transaction(obj)
 
     @admin.action(description="Mark Selected Inventory as Approved")
     def mark_as_approved(self, request, queryset):
-        for obj in queryset.filter(status="pending"):
-            if obj.transaction_type == "i":  # IN
-                item = InventoryItem.objects.get(id=obj.inventory_item.id)
-                item.quantity = item.quantity + obj.quantity
-                item.save()
-            elif obj.transaction_type == "o":  # OUT
-                item = InventoryItem.objects.get(id=obj.inventory_item.id)
-                item.quantity = item.quantity - obj.quantity
-                item.save()
-        queryset.update(status="approved")
+        set_status(queryset, "approved")
         self.message_user(
             request,
             "Selected transactions approved successfully",
@@ -144,16 +115,7 @@ class InventoryTransactionAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark Selected Inventory as Pending")
     def mark_as_pending(self, request, queryset):
-        for obj in queryset.filter(status="approved"):
-            if obj.transaction_type == "i":  # IN
-                item = InventoryItem.objects.get(id=obj.inventory_item.id)
-                item.quantity = item.quantity - obj.quantity
-                item.save()
-            elif obj.transaction_type == "o":  # OUT
-                item = InventoryItem.objects.get(id=obj.inventory_item.id)
-                item.quantity = item.quantity + obj.quantity
-                item.save()
-        queryset.update(status="pending")
+        set_status(queryset, "pending")
         self.message_user(
             request, "Selected inventory marked as pending", messages.SUCCESS
         )
@@ -185,126 +147,69 @@ class InventoryTransactionAdmin(admin.ModelAdmin):
 admin.site.register(InventoryUnit)
 
 
-import calendar
-
-from dateutil.relativedelta import relativedelta
-from django.utils import timezone
-
-
-# Helper function to get start/end dates for n months ago
-def get_start_end_dates(n_months_ago):
-    today = timezone.now().date()
-    target_month = today - relativedelta(months=n_months_ago)
-    start_date = target_month.replace(day=1)
-    end_date = target_month.replace(
-        day=calendar.monthrange(target_month.year, target_month.month)[1]
-    )
-    return start_date, end_date
+# months shown by the summary, ?months= switches to a longer trend
+TREND_VAR = "months"
+TREND_CHOICES = (4, 12, 24)
 
 
 @admin.register(InventorySummary)
 class InventorySummaryAdmin(admin.ModelAdmin):
     change_list_template = "admin/inventory/inventory_summary.html"
+    # the month columns follow, "2" is the current month
     sortable_fields = {
         "0": "inventory_item__name",
         "1": "inventory_item__quantity",
-        "2": "current_total_out",
-        "3": "one_month_ago_total_out",
-        "4": "two_months_ago_total_out",
-        "5": "three_months_ago_total_out",
     }
 
-    def _build_queryset(self, request):
-        # Get start/end dates for the last 4 months
-        current_month = get_start_end_dates(0)
-        one_month_ago = get_start_end_dates(1)
-        two_months_ago = get_start_end_dates(2)
-        three_months_ago = get_start_end_dates(3)
-
-        # Calculate overall date range
-        today = timezone.now().date()
-        start_date_overall = today - relativedelta(months=3)
-        start_date_overall = start_date_overall.replace(day=1)
-        end_date_overall = today.replace(
-            day=calendar.monthrange(today.year, today.month)[1]
-        )
-
-        qs = super().get_queryset(request)
-        return (
-            qs.filter(
-                transaction_type="o",
-                status="approved",
-                transaction_date__lte=end_date_overall,
-                transaction_date__gte=start_date_overall,
-            )
-            .values("inventory_item")
-            .annotate(
-                current_total_out=Sum(
-                    "quantity",
-                    filter=Q(
-                        transaction_date__gte=current_month[0],
-                        transaction_date__lte=current_month[1],
-                    ),
-                ),
-                one_month_ago_total_out=Sum(
-                    "quantity",
-                    filter=Q(
-                        transaction_date__gte=one_month_ago[0],
-                        transaction_date__lte=one_month_ago[1],
-                    ),
-                ),
-                two_months_ago_total_out=Sum(
-                    "quantity",
-                    filter=Q(
-                        transaction_date__gte=two_months_ago[0],
-                        transaction_date__lte=two_months_ago[1],
-                    ),
-                ),
-                three_months_ago_total_out=Sum(
-                    "quantity",
-                    filter=Q(
-                        transaction_date__gte=three_months_ago[0],
-                        transaction_date__lte=three_months_ago[1],
-                    ),
-                ),
-            )
-            .values(
-                "inventory_item__name",
-                "current_total_out",
-                "inventory_item__quantity",
-                "one_month_ago_total_out",
-                "two_months_ago_total_out",
-                "three_months_ago_total_out",
-            )
-        )
+    def get_trend(self, request):
+        try:
+            trend = int(request.GET.get(TREND_VAR, TREND_CHOICES[0]))
+        except ValueError:
+            return TREND_CHOICES[0]
+        return trend if trend in TREND_CHOICES else TREND_CHOICES[0]
 
     def get_sort_keys(self, request):
+        """
+        @return tuple(sort key function or None, descending, o param)
+        """
         o_param: str = request.GET.get("o", "")
-        if o_param:
-            if o_param.startswith("-"):
-                sortable_field_key = o_param[1:]
-                field = f"-{self.sortable_fields[sortable_field_key]}"
-                return field, o_param
-            sortable_field_key = o_param
-            field = f"{self.sortable_fields[sortable_field_key]}"
-            return field, o_param
-        return "", ""
+        column = o_param.lstrip("-")
+        if column in self.sortable_fields:
+            field = self.sortable_fields[column]
+            return (lambda row: row[field]), o_param.startswith("-"), o_param
+        if column.isdigit():
+            index = int(column) - len(self.sortable_fields)
+            return (
+                (lambda row: row["months"][index] or 0),
+                o_param.startswith("-"),
+                o_param,
+            )
+        return None, False, ""
+
+    def get_rows(self, request, months):
+        """Consumption rows of the months from the rollup, sorted by the o param"""
+        rows = consumption_rows(months)
+        sort_key, descending, _ = self.get_sort_keys(request)
+        if sort_key:
+            try:
+                rows.sort(key=sort_key, reverse=descending)
+            except IndexError:
+                pass
+        return rows
 
     def get_queryset(self, request):
-        qs = self._build_queryset(request)
-        sort_keys, _ = self.get_sort_keys(request)
-        if sort_keys:
-            qs = qs.order_by(sort_keys)
-        return qs
+        # the summary rows are read from the consumption rollup, see get_rows
+        return super().get_queryset(request).none()
 
     def changelist_view(self, request, extra_context=None):
+        trend = self.get_trend(request)
+        months = trend_months(trend)
+        rows = self.get_rows(request, months)
         # Generate month names for headers
-        today = timezone.now().date()
         month_names = ["Inventory Item", "Current Stock"]
-        for i in range(4):
-            month_date = today - relativedelta(months=i)
+        for month_date in months:
             month_names.append(month_date.strftime("%b %Y"))
-        sort_keys, param = self.get_sort_keys(request)
+        _, _, param = self.get_sort_keys(request)
         query_param = None
         for i, val in enumerate(month_names, start=1):
             if param and param.startswith("-"):
@@ -315,13 +220,19 @@ class InventorySummaryAdmin(admin.ModelAdmin):
                 query_param = f"-{param}"
                 break
 
+        # the changelist would take the trend for a field lookup
+        request.GET = request.GET.copy()
+        request.GET.pop(TREND_VAR, None)
+
         extra_context = extra_context or {}
 
         extra_context.update(
             {
                 "month_headers": month_names,
-                "qs": self.get_queryset(request),
+                "qs": rows,
                 "query_param": query_param,
+                "trend": trend,
+                "trend_choices": TREND_CHOICES,
             }
         )
 
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from inventory_management.services.stock_ledger import rebuild_stock
+
+
+class Command(BaseCommand):
+    help = "Audit item quantities against the approved inventory transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--item", type=int, action="append", dest="item_ids", help="Item id, repeatable")
+        parser.add_argument("--fix", action="store_true", help="Repair quantities and available item snapshots")
+
+    def handle(self, *args, **options):
+        mismatched = rebuild_stock(options["item_ids"], fix=options["fix"])
+        for item_id, quantity, balance in mismatched:
+            self.stdout.write(f"Item {item_id}: recorded {quantity}, transactions {balance}")
+        action = "Repaired" if options["fix"] else "Found"
+        self.stdout.write(self.style.SUCCESS(f"{action} {len(mismatched)} mismatched items"))
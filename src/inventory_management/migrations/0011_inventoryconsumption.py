@@ -0,0 +1,52 @@
+# Generated by Django 3.2.8 on 2026-10-18 14:20
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def backfill_consumption(apps, schema_editor):
+    InventoryTransaction = apps.get_model('inventory_management', 'InventoryTransaction')
+    InventoryConsumption = apps.get_model('inventory_management', 'InventoryConsumption')
+    InventoryConsumption.objects.bulk_create(
+        [
+            InventoryConsumption(inventory_item_id=item_id, month=month, quantity=quantity)
+            for item_id, month, quantity in InventoryTransaction.objects.filter(
+                transaction_type='o', status='approved'
+            )
+            .annotate(month=TruncMonth('transaction_date'))
+            .order_by()
+            .values('inventory_item_id', 'month')
+            .annotate(total=Sum('quantity'))
+            .values_list('inventory_item_id', 'month', 'total')
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0010_inventorytransaction_available_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_management.inventoryitem')),
+            ],
+            options={
+                'verbose_name': 'Inventory Consumption',
+                'verbose_name_plural': 'Inventory Consumptions',
+                'unique_together': {('inventory_item', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_consumption, migrations.RunPython.noop),
+    ]
@@ -96,4 +96,19 @@ class InventorySummary(InventoryTransaction):
     class Meta:
         proxy = True
         verbose_name = "Inventory Summary"
-        verbose_name_plural = "Inventory Summary"
\ No newline at end of file
+        verbose_name_plural = "Inventory Summary"
+
+class InventoryConsumption(TimeStampMixin):
+    """Approved OUT quantity of an item in a month, kept by the stock ledger"""
+
+    inventory_item = models.ForeignKey(InventoryItem, on_delete=models.CASCADE)
+    month = models.DateField(help_text="First day of the month")
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Inventory Consumption"
+        verbose_name_plural = "Inventory Consumptions"
+        unique_together = ("inventory_item", "month")
+
+    def __str__(self):
+        return f"{self.inventory_item_id} | {self.month:%b %Y} | {self.quantity}"
@@ -0,0 +1,146 @@
+"""
+Monthly inventory consumption rollup
+
+One InventoryConsumption row per (item, month) holds the approved OUT quantity
+of the item in the month. The stock ledger refreshes the rows of the
+transactions it approves, returns to pending or edits, a deleted transaction
+refreshes its row once the deletion commits. The summary page and the trend
+view read these rows only.
+"""
+import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from inventory_management.models import (
+    InventoryConsumption,
+    InventorySummary,
+    InventoryTransaction,
+)
+
+
+def month_start(day):
+    return datetime.date(day.year, day.month, 1)
+
+
+def refresh_consumption(pairs):
+    """
+    Recompute the rollup rows of (item id, date) pairs, a fixed number of
+    queries whatever the number of pairs
+    """
+    pairs = {(item_id, month_start(day)) for item_id, day in pairs if day}
+    if not pairs:
+        return
+    item_ids = {item_id for item_id, _ in pairs}
+    months = sorted({month for _, month in pairs})
+    totals = {
+        (item_id, month): total
+        for item_id, month, total in InventoryTransaction.objects.filter(
+            transaction_type="o",
+            status="approved",
+            inventory_item_id__in=item_ids,
+            transaction_date__gte=months[0],
+            transaction_date__lt=months[-1] + relativedelta(months=1),
+        )
+        .annotate(month=TruncMonth("transaction_date"))
+        .order_by()
+        .values("inventory_item_id", "month")
+        .annotate(total=Sum("quantity"))
+        .values_list("inventory_item_id", "month", "total")
+    }
+    existing = {
+        (row.inventory_item_id, row.month): row
+        for row in InventoryConsumption.objects.filter(
+            inventory_item_id__in=item_ids, month__in=months
+        )
+    }
+
+    now = timezone.now()
+    to_create, to_update, to_delete = [], [], []
+    for pair in pairs:
+        total = totals.get(pair)
+        row = existing.get(pair)
+        if not total:
+            if row is not None:
+                to_delete.append(row.id)
+        elif row is None:
+            to_create.append(
+                InventoryConsumption(
+                    inventory_item_id=pair[0], month=pair[1], quantity=total
+                )
+            )
+        elif row.quantity != total:
+            row.quantity = total
+            row.updated_at = now
+            to_update.append(row)
+    InventoryConsumption.objects.filter(id__in=to_delete).delete()
+    # a concurrent refresh of a deleted transaction may have created the row
+    InventoryConsumption.objects.bulk_create(
+        to_create, batch_size=500, ignore_conflicts=True
+    )
+    InventoryConsumption.objects.bulk_update(
+        to_update, ["quantity", "updated_at"], batch_size=500
+    )
+
+
+def trend_months(count, today=None):
+    """
+    @return list of date: first day of the current month and the count - 1 before it
+    """
+    current = month_start(today or timezone.now().date())
+    return [current - relativedelta(months=index) for index in range(count)]
+
+
+def consumption_rows(months):
+    """
+    Items consumed in the given months with their consumption per month, one query
+
+    @param months: first days of the months, see trend_months
+    @return list of dict: inventory_item_id, inventory_item__name,
+        inventory_item__quantity and months, the quantities in the months order
+    """
+    index = {month: position for position, month in enumerate(months)}
+    items = {}
+    for item_id, name, stock, month, quantity in (
+        InventoryConsumption.objects.filter(month__in=months)
+        .order_by("inventory_item__name", "inventory_item_id")
+        .values_list(
+            "inventory_item_id",
+            "inventory_item__name",
+            "inventory_item__quantity",
+            "month",
+            "quantity",
+        )
+    ):
+        item = items.get(item_id)
+        if item is None:
+            item = items[item_id] = {
+                "inventory_item_id": item_id,
+                "inventory_item__name": name,
+                "inventory_item__quantity": stock,
+                "months": [None] * len(months),
+            }
+        item["months"][index[month]] = quantity
+    return list(items.values())
+
+
+@receiver(
+    post_delete,
+    sender=InventoryTransaction,
+    dispatch_uid="inventory_consumption_transaction_delete",
+)
+@receiver(
+    post_delete,
+    sender=InventorySummary,
+    dispatch_uid="inventory_consumption_summary_delete",
+)
+def refresh_deleted_consumption(sender, instance, **kwargs):
+    if instance.transaction_type != "o" or instance.status != "approved":
+        return
+    pair = (instance.inventory_item_id, instance.transaction_date)
+    transaction.on_commit(lambda: refresh_consumption([pair]))
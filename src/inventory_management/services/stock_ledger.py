@@ -0,0 +1,207 @@
+"""
+Inventory stock ledger
+
+The quantity of an item is the sum of its approved IN transactions minus its
+approved OUT transactions. Approving a transaction adds its delta to the item,
+returning it to pending takes the delta back. Deltas are grouped per item and
+written with one F() update inside a transaction holding row locks on the
+transactions and the items, so concurrent approvals and edits never lose an
+update. available_item keeps the item quantity before the transaction applied
+and the monthly consumption rollup is refreshed in the same transaction.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from inventory_management.models import InventoryItem, InventoryTransaction
+from inventory_management.services.consumption import refresh_consumption
+
+
+def _delta(transaction_type, quantity):
+    return quantity if transaction_type == "i" else -quantity
+
+
+def _snapshot(quantity):
+    # available_item is a positive integer field
+    return max(int(quantity), 0)
+
+
+def _lock_items(item_ids):
+    """
+    @return dict: {item id: quantity}, items locked in id order against deadlocks
+    """
+    return dict(
+        InventoryItem.objects.select_for_update()
+        .filter(id__in=item_ids)
+        .order_by("id")
+        .values_list("id", "quantity")
+    )
+
+
+def _apply(deltas):
+    """Add the quantity deltas to their items in one update"""
+    deltas = {item_id: delta for item_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    InventoryItem.objects.filter(id__in=deltas).update(
+        quantity=F("quantity")
+        + Case(
+            *[When(id=item_id, then=Value(delta)) for item_id, delta in deltas.items()],
+            default=Value(Decimal(0)),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+@transaction.atomic
+def set_status(queryset, status):
+    """
+    Approve or return to pending the transactions of queryset
+
+    @param status: "approved" or "pending"
+    @return int: number of transactions whose status changed
+    """
+    rows = list(
+        queryset.exclude(status=status)
+        .select_for_update()
+        .order_by("transaction_date", "id")
+        .values_list(
+            "id", "inventory_item_id", "transaction_type", "quantity", "transaction_date"
+        )
+    )
+    if not rows:
+        return 0
+    sign = 1 if status == "approved" else -1
+    running = _lock_items({row[1] for row in rows})
+    deltas = defaultdict(Decimal)
+    snapshots = []
+    for transaction_id, item_id, transaction_type, quantity, _ in rows:
+        delta = sign * _delta(transaction_type, quantity)
+        if status == "approved":
+            snapshots.append(
+                InventoryTransaction(id=transaction_id, available_item=_snapshot(running[item_id]))
+            )
+        running[item_id] += delta
+        deltas[item_id] += delta
+
+    _apply(deltas)
+    InventoryTransaction.objects.bulk_update(snapshots, ["available_item"], batch_size=500)
+    InventoryTransaction.objects.filter(id__in=[row[0] for row in rows]).update(
+        status=status, updated_at=timezone.now()
+    )
+    refresh_consumption(
+        (item_id, transaction_date)
+        for _, item_id, transaction_type, _, transaction_date in rows
+        if transaction_type == "o"
+    )
+    return len(rows)
+
+
+@transaction.atomic
+def save_transaction(obj: InventoryTransaction):
+    """
+    Save a transaction and move its items by the change of its approved delta
+
+    An edit of an approved transaction only applies the difference, a new or
+    newly approved transaction snapshots the quantity of its item first.
+    """
+    deltas = defaultdict(Decimal)
+    previous = None
+    if obj.pk:
+        previous = (
+            InventoryTransaction.objects.select_for_update()
+            .filter(pk=obj.pk)
+            .values_list(
+                "inventory_item_id",
+                "transaction_type",
+                "quantity",
+                "status",
+                "transaction_date",
+            )
+            .first()
+        )
+    if previous and previous[3] == "approved":
+        deltas[previous[0]] -= _delta(previous[1], previous[2])
+    if obj.status == "approved":
+        deltas[obj.inventory_item_id] += _delta(obj.transaction_type, obj.quantity)
+
+    quantities = _lock_items(set(deltas) | {obj.inventory_item_id})
+    if previous is None or previous[3] != obj.status or previous[0] != obj.inventory_item_id:
+        obj.available_item = _snapshot(quantities[obj.inventory_item_id])
+    _apply(deltas)
+    obj.save()
+    refresh_consumption(
+        [(obj.inventory_item_id, obj.transaction_date)]
+        + ([(previous[0], previous[4])] if previous else [])
+    )
+
+
+def item_balances(item_ids=None):
+    """
+    Balance of items rebuilt from the approved transactions, one query
+
+    @return dict: {item id: Decimal}, items without an approved transaction left out
+    """
+    transactions = InventoryTransaction.objects.filter(status="approved")
+    if item_ids is not None:
+        transactions = transactions.filter(inventory_item_id__in=item_ids)
+    return {
+        item_id: (stock_in or 0) - (stock_out or 0)
+        for item_id, stock_in, stock_out in transactions.order_by()
+        .values("inventory_item_id")
+        .annotate(
+            stock_in=Sum("quantity", filter=Q(transaction_type="i")),
+            stock_out=Sum("quantity", filter=Q(transaction_type="o")),
+        )
+        .values_list("inventory_item_id", "stock_in", "stock_out")
+    }
+
+
+@transaction.atomic
+def rebuild_stock(item_ids=None, fix=False):
+    """
+    Compare item quantities with the transaction log, optionally repair them
+
+    With fix, mismatched quantities are set to the rebuilt balance and the
+    available_item snapshots of the approved transactions are replayed.
+
+    @return list of tuple(item id, recorded quantity, rebuilt balance) of mismatched items
+    """
+    items = InventoryItem.objects.order_by("id")
+    if item_ids is not None:
+        items = items.filter(id__in=item_ids)
+    if fix:
+        items = items.select_for_update()
+    recorded = dict(items.values_list("id", "quantity"))
+    balances = item_balances(list(recorded))
+    mismatched = [
+        (item_id, quantity, balances.get(item_id, Decimal(0)))
+        for item_id, quantity in recorded.items()
+        if quantity != balances.get(item_id, Decimal(0))
+    ]
+    if not fix:
+        return mismatched
+
+    for item_id, _, balance in mismatched:
+        InventoryItem.objects.filter(id=item_id).update(
+            quantity=balance, updated_at=timezone.now()
+        )
+    running = defaultdict(Decimal)
+    snapshots = []
+    for transaction_id, item_id, transaction_type, quantity in (
+        InventoryTransaction.objects.filter(
+            status="approved", inventory_item_id__in=list(recorded)
+        )
+        .order_by("transaction_date", "id")
+        .values_list("id", "inventory_item_id", "transaction_type", "quantity")
+    ):
+        snapshots.append(
+            InventoryTransaction(id=transaction_id, available_item=_snapshot(running[item_id]))
+        )
+        running[item_id] += _delta(transaction_type, quantity)
+    InventoryTransaction.objects.bulk_update(snapshots, ["available_item"], batch_size=500)
+    return mismatched
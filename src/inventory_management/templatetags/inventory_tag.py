@@ -7,8 +7,7 @@ register = template.Library()
 def is_query(param, value):
     if not param:
         return False
-    if param.startswith("-") and str(value) in param:
-        return True
-    return str(value) in param
+    # exact match, column 12 of a long trend is not column 1 or 2
+    return param.lstrip("-") == str(value)
 
     
\ No newline at end of file
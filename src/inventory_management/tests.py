@@ -1,3 +1,96 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+
+from inventory_management.models import InventoryItem, InventoryTransaction
+from inventory_management.services.stock_ledger import (
+    item_balances,
+    rebuild_stock,
+    set_status,
+)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class StockLedgerConcurrencyTest(TransactionTestCase):
+    """Two approvals touching the same items at once must not lose an update"""
+
+    def setUp(self):
+        self.pen = InventoryItem.objects.create(name="Pen")
+        self.paper = InventoryItem.objects.create(name="Paper")
+
+    def create_transactions(self, *rows):
+        return [
+            InventoryTransaction.objects.create(
+                inventory_item=item,
+                transaction_type=transaction_type,
+                quantity=Decimal(quantity),
+            ).id
+            for item, transaction_type, quantity in rows
+        ]
+
+    def approve_at_once(self, *batches):
+        barrier = threading.Barrier(len(batches))
+        errors = []
+
+        def approve(transaction_ids):
+            try:
+                barrier.wait()
+                set_status(
+                    InventoryTransaction.objects.filter(id__in=transaction_ids),
+                    "approved",
+                )
+            except Exception as error:  # surfaced in the test thread below
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=approve, args=(batch,)) for batch in batches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_approvals_match_ledger(self):
+        first = self.create_transactions(
+            (self.pen, "i", "10"), (self.paper, "i", "5"), (self.pen, "o", "2")
+        )
+        second = self.create_transactions(
+            (self.paper, "i", "7"), (self.pen, "o", "4"), (self.paper, "o", "1")
+        )
+
+        self.approve_at_once(first, second)
+
+        balances = item_balances()
+        self.pen.refresh_from_db()
+        self.paper.refresh_from_db()
+        self.assertEqual(self.pen.quantity, Decimal("4"))
+        self.assertEqual(self.paper.quantity, Decimal("11"))
+        self.assertEqual(self.pen.quantity, balances[self.pen.id])
+        self.assertEqual(self.paper.quantity, balances[self.paper.id])
+        self.assertFalse(
+            InventoryTransaction.objects.exclude(status="approved").exists()
+        )
+
+        # the ledger rebuild finds nothing to repair and keeps the quantities
+        self.assertEqual(rebuild_stock(), [])
+        self.assertEqual(rebuild_stock(fix=True), [])
+        self.pen.refresh_from_db()
+        self.paper.refresh_from_db()
+        self.assertEqual(self.pen.quantity, Decimal("4"))
+        self.assertEqual(self.paper.quantity, Decimal("11"))
+
+    def test_rebuild_repairs_a_drifted_quantity(self):
+        transaction_ids = self.create_transactions(
+            (self.pen, "i", "10"), (self.pen, "o", "3")
+        )
+        set_status(InventoryTransaction.objects.filter(id__in=transaction_ids), "approved")
+        InventoryItem.objects.filter(id=self.pen.id).update(quantity=Decimal("99"))
+
+        mismatched = rebuild_stock(fix=True)
+
+        self.assertEqual(mismatched, [(self.pen.id, Decimal("99"), Decimal("7"))])
+        self.pen.refresh_from_db()
+        self.assertEqual(self.pen.quantity, Decimal("7"))
@@ -5,3 +5,4 @@ from .promotion import *
 from .viva_time_booking_slot_admin import *
 from .viva_config_admin import *
 from .candidate_email_admin import *
+from .mail_campaign_admin import *
@@ -16,7 +16,7 @@ from django.utils import timezone
 from django.utils.dateformat import DateFormat
 from django.utils.html import format_html, linebreaks
 from django.utils.translation import gettext_lazy as _
-from django_q.tasks import async_task, schedule
+from django_q.tasks import async_task
 
 from config import settings
 from job_board.mails.mail import re_apply_alert_mail
@@ -32,8 +32,9 @@ from job_board.models.candidate import (
     JobPreferenceRequest,
     ResetPassword,
 )
-from job_board.models.candidate_email import CandidateEmail, CandidateEmailAttatchment
+from job_board.models.candidate_email import CandidateEmail
 from job_board.models.job import Job
+from job_board.services.mail_campaign import start_mail_campaign
 
 # from job_board.views.apis.authentication import ApplicationSummaryView
 
@@ -410,6 +411,21 @@ class CandidateJobAdmin(admin.ModelAdmin):
     list_per_page = 20
     ordering = ("pk",)
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("candidate", "job")
+            .prefetch_related(
+                Prefetch(
+                    "candidate_assessment",
+                    queryset=CandidateAssessment.with_result(
+                        CandidateAssessment.objects.select_related("assessment")
+                    ),
+                )
+            )
+        )
+
     @admin.display(description="Job", ordering="job")
     def get_job(self, obj):
         return obj.job.title
@@ -468,8 +484,12 @@ class CandidateApplicationSummaryAdmin(admin.ModelAdmin):
 
     # Action to generate the summary
     def generate_summary(self, request, queryset):
-        CandidateApplicationSummary.generate_summary()
-        self.message_user(request, "Application summary has been generated.")
+        created, updated, deleted = CandidateApplicationSummary.generate_summary()
+        self.message_user(
+            request,
+            f"Application summary has been generated: {created} added, "
+            f"{updated} updated, {deleted} removed.",
+        )
 
     generate_summary.short_description = "Generate application summary"
 
@@ -574,6 +594,7 @@ class CandidateAssessmentAdmin(admin.ModelAdmin):
             "candidate_job__job",
             "assessment",
         )
+        qs = CandidateAssessment.with_result(qs)
         qs = qs.prefetch_related(
             Prefetch(
                 "candidateassessmentreview_set",
@@ -613,40 +634,23 @@ class CandidateAssessmentAdmin(admin.ModelAdmin):
 
     @admin.action(description="Send Email")
     def send_email(self, request, queryset):
-        candidate_email_list = [
-            candidate_email.candidate_job.candidate.email
-            for candidate_email in queryset
-        ]
-        hour = 0
-        chunk_size = 50
         candidate_email_instance = CandidateEmail.objects.filter(
             by_default=True
         ).first()
-        attachmentqueryset = CandidateEmailAttatchment.objects.filter(
-            candidate_email=candidate_email_instance
-        )
-        attachment_paths = [
-            attachment.attachments.path for attachment in attachmentqueryset
-        ]
         if candidate_email_instance:
-            chunks = [
-                candidate_email_list[i : i + chunk_size]
-                for i in range(0, len(candidate_email_list), chunk_size)
-            ]
-
-            # Schedule tasks for sending emails in chunks with a delay of one hour between each chunk
-            for i, chunk in enumerate(chunks):
-                print(chunk)
-                schedule(
-                    "job_board.tasks.send_chunked_emails",
-                    chunk,
-                    candidate_email_instance.id,
-                    attachment_paths,
-                    next_run=timezone.now() + timedelta(hours=hour),
-                )
-                hour += 1
-
-            messages.success(request, "Email has sent successfully.")
+            # chunks are sent with a delay of one hour between each chunk
+            campaign = start_mail_campaign(
+                "candidate_email",
+                queryset.values_list("candidate_job__candidate__email", flat=True),
+                candidate_email_instance.subject,
+                candidate_email=candidate_email_instance,
+                chunk_interval=3600,
+            )
+            messages.success(
+                request,
+                f"Email campaign #{campaign.id} started for "
+                f"{campaign.total_recipients} candidate(s).",
+            )
         else:
             messages.error(
                 request,
@@ -0,0 +1,59 @@
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path
+
+from job_board.models.mail_campaign import MailCampaign
+
+
+@admin.register(MailCampaign)
+class MailCampaignAdmin(admin.ModelAdmin):
+    list_display = (
+        "subject",
+        "kind",
+        "status",
+        "get_progress",
+        "sent_count",
+        "failed_count",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status", "kind")
+    search_fields = ("subject",)
+    exclude = ("recipients",)
+    readonly_fields = ("get_progress",)
+
+    def get_queryset(self, request):
+        # the recipient lists stay out of the changelist query
+        return (
+            super()
+            .get_queryset(request)
+            .defer("recipients", "context", "failed_recipients")
+        )
+
+    @admin.display(description="Progress")
+    def get_progress(self, obj):
+        return f"{obj.progress}%"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                "<int:object_id>/progress/",
+                self.admin_site.admin_view(self.progress_view),
+                name="job_board_mailcampaign_progress",
+            ),
+        ]
+        return my_urls + urls
+
+    def progress_view(self, request, object_id, *args, **kwargs):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        return JsonResponse(get_object_or_404(MailCampaign, id=object_id).as_dict())
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class JobBoardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'job_board'
+
+    def ready(self):
+        from job_board.services import exam_session  # noqa: F401
@@ -1,21 +1,28 @@
 # management/commands/check_bulk_email_status.py
 
 from django.core.management.base import BaseCommand
-from django_q.models import Success, Failure
+
+from job_board.models.mail_campaign import MailCampaign
+from job_board.services.mail_campaign import reported_campaigns
+
 
 class Command(BaseCommand):
     help = 'Check the status of bulk application emails'
 
-    def handle(self, *args, **options):
-        # Get successful emails
-        successes = Success.objects.filter(group='Bulk Application Emails')
-        self.stdout.write(self.style.SUCCESS(f"\nSuccessfully sent emails: {successes.count()}"))
-        for success in successes:
-            if isinstance(success.result, dict):
-                self.stdout.write(f"✓ {success.result.get('email', 'Unknown')}")
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Include campaigns finished long ago')
 
-        # Get failed emails
-        failures = Failure.objects.filter(group='Bulk Application Emails')
-        self.stdout.write(self.style.ERROR(f"\nFailed emails: {failures.count()}"))
-        for failure in failures:
-            self.stdout.write(self.style.ERROR(f"✗ {failure.result}"))
+    def handle(self, *args, **options):
+        if options['all']:
+            campaigns = MailCampaign.objects.filter(kind='reopportunity').order_by('-id')
+        else:
+            campaigns = reported_campaigns('reopportunity')
+        for campaign in campaigns:
+            self.stdout.write(
+                f"\nCampaign #{campaign.id} {campaign.get_status_display()} "
+                f"{campaign.progress}% - {campaign.context.get('job_title', '')}"
+            )
+            self.stdout.write(self.style.SUCCESS(f"Successfully sent emails: {campaign.sent_count}"))
+            self.stdout.write(self.style.ERROR(f"Failed emails: {campaign.failed_count}"))
+            for email in campaign.failed_recipients:
+                self.stdout.write(self.style.ERROR(f"✗ {email}"))
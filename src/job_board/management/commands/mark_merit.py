@@ -1,7 +1,8 @@
 from django.core.management import BaseCommand
 from django.utils import timezone
 
-from job_board.models.candidate import CandidateAssessment
+from job_board.models.assessment import Assessment
+from job_board.models.candidate import CandidateAssessment, CandidateJob
 
 
 class Command(BaseCommand):
@@ -10,15 +11,14 @@ class Command(BaseCommand):
         parser.add_argument('assessment_id', type=int)
 
     def handle(self, *args, **options):
-        candidate_assessments = CandidateAssessment.objects.filter(
-            assessment_id=options['assessment_id'],
-            exam_end_at__lte=timezone.now(),
-            candidate_job__merit=None
-        ).all()
-        for candidate_assessment in candidate_assessments:
-            print('hello', candidate_assessments)
-            if candidate_assessment.score >= candidate_assessment.assessment.pass_score:
-                candidate_assessment.candidate_job.merit = True
-                candidate_assessment.candidate_job.save()
-                print('mark merit', candidate_assessment.candidate_job)
-                # TODO : Send email to candidate and admin
+        pass_score = Assessment.objects.get(pk=options['assessment_id']).pass_score
+        # every passed candidate job of the finished assessments in one update
+        marked = CandidateJob.objects.filter(
+            merit=None,
+            id__in=CandidateAssessment.objects.filter(
+                assessment_id=options['assessment_id'],
+                exam_end_at__lte=timezone.now(),
+                score__gte=pass_score,
+            ).values('candidate_job_id'),
+        ).update(merit=True)
+        self.stdout.write(f'Marked {marked} candidate jobs as merit')
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.8 on 2026-10-18 12:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_board', '0079_alter_candidate_application_status'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='candidateapplicationsummary',
+            unique_together={('job', 'year', 'month')},
+        ),
+    ]
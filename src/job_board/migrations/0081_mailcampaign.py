@@ -0,0 +1,45 @@
+# Generated by Django 3.2.8 on 2026-10-18 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django_userforeignkey.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('job_board', '0080_alter_candidateapplicationsummary_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('reopportunity', 'Career Opportunity'), ('candidate_email', 'Candidate Email')], max_length=30)),
+                ('subject', models.CharField(max_length=255)),
+                ('context', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', '⌛ Pending'), ('running', '⏳ Running'), ('completed', '✔ Completed'), ('failed', '⛔ Failed'), ('cancelled', '✖ Cancelled')], db_index=True, default='pending', max_length=20)),
+                ('recipients', models.JSONField(default=list)),
+                ('total_recipients', models.PositiveIntegerField(default=0)),
+                ('chunk_size', models.PositiveIntegerField(default=50)),
+                ('chunk_interval', models.PositiveIntegerField(default=0)),
+                ('processed_chunks', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('failed_recipients', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('candidate_email', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='job_board.candidateemail')),
+                ('created_by', django_userforeignkey.models.fields.UserForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job_board_mailcampaign_related', to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+            ],
+            options={
+                'verbose_name': 'Mail Campaign',
+                'verbose_name_plural': 'Mail Campaigns',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+RESUME_TASK = "job_board.services.mail_campaign.resume_mail_campaigns"
+
+
+def add_schedule(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        func=RESUME_TASK,
+        defaults={
+            "name": "Resume mail campaigns",
+            "schedule_type": "I",
+            "minutes": 5,
+            "repeats": -1,
+        },
+    )
+
+
+def remove_schedule(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(func=RESUME_TASK).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_board', '0081_mailcampaign'),
+        ('django_q', '0013_task_attempt_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_schedule, remove_schedule),
+    ]
@@ -4,3 +4,4 @@ from .viva_time_booking_slot import JobVivaTimeSlot
 from .viva_config import VivaConfig
 from .candidate_email import *
 from job_board.models import *
+from .mail_campaign import MailCampaign
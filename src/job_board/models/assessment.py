@@ -1,5 +1,6 @@
 from django.db import models
-from django.db.models import Sum
+from django.db.models import FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
 from tinymce.models import HTMLField
 
@@ -47,6 +48,26 @@ class Assessment(AuthorMixin, TimeStampMixin):
     def pass_score(self):
         return (float(self.score) * float(self.pass_percentage)) / 100
 
+    @staticmethod
+    def score_subquery(assessment_field):
+        """
+        Total question score of the assessment referenced by assessment_field,
+        the score property as an expression
+
+        @param assessment_field: field of the outer query holding the assessment id
+        """
+        return Coalesce(
+            Subquery(
+                AssessmentQuestion.objects.filter(assessment_id=OuterRef(assessment_field))
+                .order_by()
+                .values('assessment_id')
+                .annotate(total=Sum('score'))
+                .values('total'),
+                output_field=FloatField(),
+            ),
+            Value(0.0),
+        )
+
 
 class AssessmentQuestion(AuthorMixin, TimeStampMixin):
     TYPE = (
@@ -2,13 +2,13 @@ import os
 import random
 import uuid
 from datetime import timedelta, datetime
-from django.db.models import Count
+from django.db.models import Case, Count, ExpressionWrapper, F, Value, When
 from django import forms
 from django.contrib.auth import hashers
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django_q.tasks import async_task
@@ -134,38 +134,112 @@ class CandidateApplicationSummary(models.Model):
     month = models.IntegerField()
     application_count = models.IntegerField()
 
+    SUMMARY_YEARS = 4
+
     @classmethod
     def generate_summary(cls):
-        # Clear existing data
-        cls.objects.all().delete()
+        """
+        Rebuild the monthly application counts of every job for the last
+        SUMMARY_YEARS years from one grouped query
+
+        Only new and changed (job, year, month) rows are written, rows left
+        without applications or out of the window are deleted.
 
-        # Get current year
+        @return tuple(created, updated, deleted)
+        """
         current_year = datetime.now().year
-        years_range = range(current_year, current_year - 4, -1)
-
-        # Generate summary for each job and year/month combination
-        for job in Job.objects.all():
-            applications = CandidateJob.objects.filter(
-                job=job,
-                created_at__year__in=years_range
-            ).values(
-                'created_at__year',
-                'created_at__month'
-            ).annotate(
-                count=Count('id')
+        counts = {
+            (row['job_id'], row['created_at__year'], row['created_at__month']): row['count']
+            for row in CandidateJob.objects.filter(
+                created_at__year__gt=current_year - cls.SUMMARY_YEARS,
+                created_at__year__lte=current_year,
             )
+            .order_by()
+            .values('job_id', 'created_at__year', 'created_at__month')
+            .annotate(count=Count('id'))
+        }
+        return cls.__write(counts, cls.objects.all())
 
-            for app in applications:
-                cls.objects.create(
-                    job=job,
-                    year=app['created_at__year'],
-                    month=app['created_at__month'],
-                    application_count=app['count']
-                )
+    @classmethod
+    def refresh_month(cls, job_ids, year, month):
+        """
+        Recount the applications of the given jobs in one month
+
+        @return tuple(created, updated, deleted)
+        """
+        job_ids = {job_id for job_id in job_ids if job_id}
+        counts = {
+            (row['job_id'], year, month): row['count']
+            for row in CandidateJob.objects.filter(
+                job_id__in=job_ids,
+                created_at__year=year,
+                created_at__month=month,
+            )
+            .order_by()
+            .values('job_id')
+            .annotate(count=Count('id'))
+        }
+        existing = cls.objects.filter(job_id__in=job_ids, year=year, month=month)
+        return cls.__write(counts, existing)
+
+    @classmethod
+    def __write(cls, counts, existing):
+        """
+        @param counts: {(job_id, year, month): application count}
+        @param existing: summary rows covering every key of counts, rows of
+            existing missing from counts are deleted
+        """
+        to_update, to_delete = [], []
+        for summary in existing:
+            count = counts.pop((summary.job_id, summary.year, summary.month), None)
+            if count is None:
+                to_delete.append(summary.id)
+            elif count != summary.application_count:
+                summary.application_count = count
+                to_update.append(summary)
+        to_create = [
+            cls(job_id=job_id, year=year, month=month, application_count=count)
+            for (job_id, year, month), count in counts.items()
+        ]
+        if to_delete:
+            cls.objects.filter(id__in=to_delete).delete()
+        cls.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+        cls.objects.bulk_update(to_update, ['application_count'], batch_size=500)
+        return len(to_create), len(to_update), len(to_delete)
 
     class Meta:
         verbose_name = "Re-opportunity to Candidate"
         verbose_name_plural = "Re-opportunity to Candidates"
+        unique_together = ("job", "year", "month")
+
+
+@receiver(pre_save, sender=CandidateJob)
+def candidate_job_summary_pre_save(sender, instance, raw=False, **kwargs):
+    # a moved application leaves its previous job count behind
+    instance._summary_job_id = None
+    if instance.pk and not raw:
+        instance._summary_job_id = (
+            CandidateJob.objects.filter(pk=instance.pk)
+            .values_list('job_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=CandidateJob)
+@receiver(post_delete, sender=CandidateJob)
+def candidate_job_summary_refresh(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    created_at = instance.created_at or timezone.now()
+    job_ids = {instance.job_id, getattr(instance, '_summary_job_id', None)}
+    if kwargs.get('created') is False and len(job_ids - {None}) == 1:
+        # an edit keeping the job does not change the counts
+        return
+    transaction.on_commit(
+        lambda: CandidateApplicationSummary.refresh_month(
+            job_ids, created_at.year, created_at.month
+        )
+    )
 
 
 
@@ -233,10 +307,35 @@ class CandidateAssessment(TimeStampMixin):
     def result(self):
         if not self.step:
             return '-'
-        if self.score >= self.assessment.pass_score:
+        if self.is_passed:
             return 'pass'
         return 'fail'
 
+    @property
+    def is_passed(self):
+        # annotated by with_result, computed for a single instance
+        if 'annotated_passed' in self.__dict__:
+            return self.annotated_passed
+        return self.score >= self.assessment.pass_score
+
+    @staticmethod
+    def with_result(queryset):
+        """
+        Annotate assessment_pass_score and annotated_passed, result and is_passed
+        of every row are then read without a query
+        """
+        return queryset.annotate(
+            assessment_pass_score=ExpressionWrapper(
+                Assessment.score_subquery('assessment_id') * F('assessment__pass_percentage') / 100,
+                output_field=models.FloatField(),
+            ),
+            annotated_passed=Case(
+                When(score__gte=F('assessment_pass_score'), then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
+
 
 @receiver(post_save, sender=CandidateAssessment)
 def candidate_assessment_pre_save(sender, instance, created, *args, **kwargs):
@@ -0,0 +1,92 @@
+from math import floor
+
+from django.db import models
+
+from config.model.AuthorMixin import AuthorMixin
+from config.model.TimeStampMixin import TimeStampMixin
+from job_board.models.candidate_email import CandidateEmail
+
+
+class MailCampaign(TimeStampMixin, AuthorMixin):
+    """Candidate mail campaign
+
+    Recipients are mailed in chunks by job_board.services.mail_campaign,
+    processed_chunks is the checkpoint a crashed campaign resumes from.
+    """
+
+    KIND_CHOICE = (
+        ("reopportunity", "Career Opportunity"),
+        ("candidate_email", "Candidate Email"),
+    )
+    STATUS_CHOICE = (
+        ("pending", "⌛ Pending"),
+        ("running", "⏳ Running"),
+        ("completed", "✔ Completed"),
+        ("failed", "⛔ Failed"),
+        ("cancelled", "✖ Cancelled"),
+    )
+    kind = models.CharField(max_length=30, choices=KIND_CHOICE)
+    subject = models.CharField(max_length=255)
+    candidate_email = models.ForeignKey(
+        CandidateEmail, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    context = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICE, default="pending", db_index=True
+    )
+    recipients = models.JSONField(default=list)
+    # len(recipients), kept apart so progress never loads the recipient list
+    total_recipients = models.PositiveIntegerField(default=0)
+    chunk_size = models.PositiveIntegerField(default=50)
+    # seconds to wait between two chunks, 0 sends them back to back
+    chunk_interval = models.PositiveIntegerField(default=0)
+    processed_chunks = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    failed_recipients = models.JSONField(default=list, blank=True)
+    error = models.TextField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def total_chunks(self):
+        return -(-self.total_recipients // self.chunk_size)
+
+    @property
+    def is_finished(self):
+        return self.processed_chunks >= self.total_chunks
+
+    @property
+    def progress(self):
+        if not self.total_recipients:
+            return 100
+        return floor(
+            (self.sent_count + self.failed_count) * 100 / self.total_recipients
+        )
+
+    def get_chunk(self, index):
+        return self.recipients[
+            index * self.chunk_size : (index + 1) * self.chunk_size
+        ]
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "sent": self.sent_count,
+            "failed": self.failed_count,
+            "total_recipients": self.total_recipients,
+            "processed_chunks": self.processed_chunks,
+            "total_chunks": self.total_chunks,
+            "failed_recipients": self.failed_recipients,
+            "error": self.error,
+            "finished_at": self.finished_at,
+        }
+
+    def __str__(self):
+        return f"{self.subject} - {self.status}"
+
+    class Meta:
+        verbose_name = "Mail Campaign"
+        verbose_name_plural = "Mail Campaigns"
@@ -0,0 +1,261 @@
+"""
+Exam session cache of the candidate assessment API
+
+The questions of an assessment, answers and their scores included, are read
+once and cached per assessment version; the version is bumped whenever a
+question or an answer changes. The progress of a candidate (current step,
+score and answered questions) lives in a per assessment session cache entry
+and is written behind to CandidateAssessment.step and score by
+flush_exam_session. A session missing from the cache is rebuilt from the
+CandidateAssessmentAnswer rows, which are always written right away, and so is
+every flushed session.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from job_board.models.assessment import AssessmentAnswer, AssessmentQuestion
+from job_board.models.candidate import CandidateAssessment, CandidateAssessmentAnswer
+
+KEY_PREFIX = "exam"
+QUESTION_SET_TIMEOUT = 60 * 60 * 24
+# a session outlives the exam for late answers of a slow network
+SESSION_GRACE = timedelta(hours=1)
+FLUSH_TASK = "job_board.services.exam_session.flush_exam_session"
+
+
+def _version_key(assessment_id):
+    return f"{KEY_PREFIX}:questions:{assessment_id}:version"
+
+
+def _session_key(unique_id):
+    return f"{KEY_PREFIX}:session:{str(unique_id).lower()}"
+
+
+def _dirty_key(unique_id):
+    return f"{KEY_PREFIX}:dirty:{str(unique_id).lower()}"
+
+
+def invalidate_question_set(assessment_id):
+    try:
+        cache.incr(_version_key(assessment_id))
+    except ValueError:
+        cache.add(_version_key(assessment_id), 1, timeout=None)
+
+
+def question_set(assessment_id):
+    """
+    Questions of an assessment with their answers, two queries on a cache miss
+
+    @return dict: {question id: {id, title, type, score, answers: {answer id: {id, title, score}}}}
+    """
+    version = cache.get_or_set(_version_key(assessment_id), 1, timeout=None)
+    key = f"{KEY_PREFIX}:questions:{assessment_id}:v{version}"
+    questions = cache.get(key)
+    if questions is None:
+        questions = {
+            question["id"]: dict(question, answers={})
+            for question in AssessmentQuestion.objects.filter(
+                assessment_id=assessment_id
+            ).values("id", "title", "type", "score")
+        }
+        for answer in (
+            AssessmentAnswer.objects.filter(assessment_question_id__in=questions)
+            .order_by("id")
+            .values("id", "title", "score", "assessment_question_id")
+        ):
+            question_id = answer.pop("assessment_question_id")
+            questions[question_id]["answers"][answer["id"]] = answer
+        cache.set(key, questions, timeout=QUESTION_SET_TIMEOUT)
+    return questions
+
+
+def question_data(question):
+    """The question as AssessmentQuestionSerializer returns it, scores left out"""
+    return {
+        "id": question["id"],
+        "title": question["title"],
+        "type": question["type"],
+        "answers": [
+            {"id": answer["id"], "title": answer["title"]}
+            for answer in question["answers"].values()
+        ],
+    }
+
+
+def _build_session(unique_id):
+    candidate_assessment = (
+        CandidateAssessment.objects.filter(
+            unique_id=unique_id, exam_started_at__isnull=False
+        )
+        .values(
+            "id",
+            "candidate_job_id",
+            "assessment_id",
+            "exam_end_at",
+            "step",
+            "score",
+            assessment_title=F("assessment__title"),
+        )
+        .first()
+    )
+    if candidate_assessment is None or not candidate_assessment["step"]:
+        return None
+    step = candidate_assessment.pop("step")
+    answers = list(
+        CandidateAssessmentAnswer.objects.filter(
+            candidate_job_id=candidate_assessment["candidate_job_id"],
+            question_id__in=step["question_ids"],
+        )
+        .order_by("id")
+        .values_list("question_id", "score_achieve")
+    )
+    # answers written after the last flush are not in the step and the score yet
+    unflushed = answers[step["current_step"]:]
+    return dict(
+        candidate_assessment,
+        question_ids=step["question_ids"],
+        current_step=step["current_step"] + len(unflushed),
+        score=candidate_assessment["score"]
+        + sum(score_achieve for _, score_achieve in unflushed),
+        answered=[question_id for question_id, _ in answers],
+    )
+
+
+def _session_timeout(session):
+    if session["exam_end_at"] is None:
+        return QUESTION_SET_TIMEOUT
+    remaining = session["exam_end_at"] + SESSION_GRACE - timezone.now()
+    return max(int(remaining.total_seconds()), 60)
+
+
+def get_session(unique_id):
+    """
+    @return dict: the exam session, None when the exam has not started
+    """
+    session = cache.get(_session_key(unique_id))
+    if session is None:
+        session = _build_session(unique_id)
+        if session is not None:
+            cache.set(_session_key(unique_id), session, _session_timeout(session))
+    return session
+
+
+def is_time_up(session):
+    return session["exam_end_at"] is not None and session["exam_end_at"] < timezone.now()
+
+
+def current_question(session):
+    """
+    @return dict: the question of the current step, None when every step is answered
+    """
+    if session["current_step"] >= len(session["question_ids"]):
+        return None
+    return question_set(session["assessment_id"]).get(
+        session["question_ids"][session["current_step"]]
+    )
+
+
+def save_answer(unique_id, question, answer_ids):
+    """
+    Record the answer of a question and move the session one step forward
+
+    The answer row is written right away, the step and the score are written
+    behind, at once when the last question is answered.
+
+    @param question: question of question_set
+    @return bool: False when the question has been answered already
+    """
+    session = get_session(unique_id)
+    if question["id"] in session["answered"]:
+        return False
+    # claim the question against a double submit, None when the cache is down
+    claim_key = f"{_session_key(unique_id)}:answer:{question['id']}"
+    if cache.add(claim_key, 1, timeout=_session_timeout(session)) is False:
+        return False
+
+    answers = [
+        question["answers"][answer_id]
+        for answer_id in answer_ids
+        if answer_id in question["answers"]
+    ]
+    score_achieve = sum(answer["score"] for answer in answers)
+    CandidateAssessmentAnswer.objects.create(
+        candidate_job_id=session["candidate_job_id"],
+        question_id=question["id"],
+        answers=[{"id": answer["id"], "title": answer["title"]} for answer in answers],
+        total_score=question["score"],
+        score_achieve=score_achieve,
+    )
+
+    session["answered"].append(question["id"])
+    session["current_step"] += 1
+    session["score"] += score_achieve
+    cache.set(_session_key(unique_id), session, _session_timeout(session))
+    if session["current_step"] >= len(session["question_ids"]):
+        flush_exam_session(unique_id)
+    elif cache.add(_dirty_key(unique_id), 1, timeout=_session_timeout(session)):
+        # one pending flush per session whatever the number of answers meanwhile
+        async_task(FLUSH_TASK, unique_id)
+    return True
+
+
+def flush_exam_session(unique_id):
+    """
+    Write the step and score of a session to its CandidateAssessment
+
+    Both are recomputed from the answer rows under the row lock rather than read
+    from the cached session, where two answers saved at the same time may have
+    overwritten each other. The recomputed session replaces the cached one.
+    """
+    cache.delete(_dirty_key(unique_id))
+    with transaction.atomic():
+        step = (
+            CandidateAssessment.objects.select_for_update()
+            .filter(unique_id=unique_id)
+            .values_list("step", flat=True)
+            .first()
+        )
+        session = _build_session(unique_id)
+        if session is None:
+            return
+        if session["current_step"] > step.get("current_step", 0):
+            CandidateAssessment.objects.filter(id=session["id"]).update(
+                step=dict(step, current_step=session["current_step"]),
+                score=session["score"],
+                updated_at=timezone.now(),
+            )
+    cache.set(_session_key(unique_id), session, _session_timeout(session))
+
+
+@receiver(post_save, sender=AssessmentQuestion, dispatch_uid="exam_question_save")
+@receiver(post_delete, sender=AssessmentQuestion, dispatch_uid="exam_question_delete")
+def invalidate_question(sender, instance, **kwargs):
+    assessment_id = instance.assessment_id
+    transaction.on_commit(lambda: invalidate_question_set(assessment_id))
+
+
+@receiver(post_save, sender=AssessmentAnswer, dispatch_uid="exam_answer_save")
+@receiver(post_delete, sender=AssessmentAnswer, dispatch_uid="exam_answer_delete")
+def invalidate_answer(sender, instance, **kwargs):
+    assessment_id = (
+        AssessmentQuestion.objects.filter(id=instance.assessment_question_id)
+        .values_list("assessment_id", flat=True)
+        .first()
+    )
+    if assessment_id:
+        transaction.on_commit(lambda: invalidate_question_set(assessment_id))
+
+
+@receiver(post_save, sender=CandidateAssessment, dispatch_uid="exam_session_save")
+@receiver(post_delete, sender=CandidateAssessment, dispatch_uid="exam_session_delete")
+def drop_session(sender, instance, **kwargs):
+    # the exam was (re)started, ended early or edited, flushes use update()
+    unique_id = instance.unique_id
+    transaction.on_commit(lambda: cache.delete(_session_key(unique_id)))
@@ -0,0 +1,252 @@
+"""
+Candidate mail campaigns
+
+A campaign stores its recipients and progress in one MailCampaign row. Chunks of
+recipients are sent by run_mail_campaign over one reused connection under the
+MailPipeline rate limit: candidate names are resolved in one query per chunk,
+the template is compiled and the attachments are read once per task run.
+"""
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django_q.tasks import async_task, schedule
+
+from config.utils.mail import (
+    TASK_TIME_BUDGET,
+    MailPipeline,
+    html_email,
+    read_attachments,
+    throttled_chunk_size,
+)
+from job_board.models.candidate import Candidate
+from job_board.models.candidate_email import CandidateEmailAttatchment
+from job_board.models.mail_campaign import MailCampaign
+
+BULK_APPLICATION_CATEGORY = "bulk_application"
+CANDIDATE_EMAIL_CATEGORY = "candidate_email"
+CAMPAIGN_CATEGORIES = {
+    "reopportunity": BULK_APPLICATION_CATEGORY,
+    "candidate_email": CANDIDATE_EMAIL_CATEGORY,
+}
+REOPPORTUNITY_SUBJECT = "Exciting Career Opportunity at Mediusware"
+REOPPORTUNITY_FROM_EMAIL = "Mediusware-HR <hr@mediusware.com>"
+
+MAIL_CAMPAIGN_CHUNK_SIZE = 50
+MAIL_CAMPAIGN_TASK_TIME_BUDGET = TASK_TIME_BUDGET
+MAIL_CAMPAIGN_STALE_AFTER = timedelta(minutes=5)
+# finished campaigns stay in the status reports this long
+MAIL_CAMPAIGN_REPORTED_FOR = timedelta(days=7)
+RUN_TASK = "job_board.services.mail_campaign.run_mail_campaign"
+
+
+def _chunk_size():
+    return throttled_chunk_size(
+        MAIL_CAMPAIGN_CHUNK_SIZE, MAIL_CAMPAIGN_TASK_TIME_BUDGET
+    )
+
+
+def start_mail_campaign(
+    kind, recipients, subject, context=None, candidate_email=None, chunk_interval=0
+):
+    """
+    Create a campaign and enqueue its first chunk once the transaction commits
+
+    @param kind: MailCampaign.KIND_CHOICE key
+    @param recipients: email addresses, duplicates and empty values are dropped
+    @param context: template context shared by every recipient
+    @param candidate_email: CandidateEmail sent by a candidate_email campaign
+    @param chunk_interval: seconds to wait between two chunks
+    @return MailCampaign:
+    """
+    recipients = list(dict.fromkeys(email for email in recipients if email))
+    campaign = MailCampaign.objects.create(
+        kind=kind,
+        subject=subject,
+        context=context or {},
+        candidate_email=candidate_email,
+        recipients=recipients,
+        total_recipients=len(recipients),
+        chunk_size=_chunk_size(),
+        chunk_interval=chunk_interval,
+    )
+    transaction.on_commit(lambda: async_task(RUN_TASK, campaign.id))
+    return campaign
+
+
+class CampaignMessages:
+    """Messages of a campaign, everything shared by its recipients is loaded once"""
+
+    def __init__(self, campaign: MailCampaign):
+        self.campaign = campaign
+        if campaign.kind == "reopportunity":
+            self.template = get_template("mail/reopportunity_mail.html")
+        elif campaign.candidate_email is None:
+            raise ValueError("The candidate email of the campaign was deleted")
+        else:
+            self.attachments = read_attachments(
+                attachment.attachments.path
+                for attachment in CandidateEmailAttatchment.objects.filter(
+                    candidate_email_id=campaign.candidate_email_id
+                )
+                if attachment.attachments
+            )
+
+    def __reopportunity(self, chunk):
+        candidate_names = dict(
+            Candidate.objects.filter(email__in=chunk).values_list("email", "full_name")
+        )
+        context = self.campaign.context
+        for email in chunk:
+            yield html_email(
+                self.campaign.subject,
+                self.template.render(
+                    {
+                        "candidate_name": candidate_names.get(email, "Candidate"),
+                        "job_title": context.get("job_title"),
+                        "opening_positions": context.get("opening_positions", []),
+                        "email": email,
+                    }
+                ),
+                [email],
+                from_email=REOPPORTUNITY_FROM_EMAIL,
+            )
+
+    def __candidate_email(self, chunk):
+        body = self.campaign.candidate_email.body or ""
+        for email in chunk:
+            yield html_email(
+                self.campaign.subject, body, [email], attachments=self.attachments
+            )
+
+    def for_chunk(self, chunk):
+        if self.campaign.kind == "reopportunity":
+            return self.__reopportunity(chunk)
+        return self.__candidate_email(chunk)
+
+
+def _record_chunk(campaign, pipeline):
+    """Add the chunk result to the campaign row and to the campaign instance"""
+    failed = [message.to[0] for message in pipeline.failed]
+    with transaction.atomic():
+        checkpoint = MailCampaign.objects.select_for_update().get(id=campaign.id)
+        checkpoint.sent_count += len(pipeline.sent)
+        checkpoint.failed_count += len(failed)
+        checkpoint.failed_recipients += failed
+        checkpoint.save(
+            update_fields=[
+                "sent_count",
+                "failed_count",
+                "failed_recipients",
+                "updated_at",
+            ]
+        )
+    campaign.sent_count = checkpoint.sent_count
+    campaign.failed_count = checkpoint.failed_count
+    campaign.failed_recipients = checkpoint.failed_recipients
+
+
+def run_mail_campaign(campaign_id):
+    """Send campaign chunks from the last checkpoint
+
+    A chunk is claimed by moving the checkpoint before it is sent, so a killed
+    worker may leave part of a chunk unsent but never mails anyone twice. When
+    the time budget is over, or the campaign waits between chunks, the task
+    enqueues itself to continue with the next chunk.
+    """
+    campaign = MailCampaign.objects.select_related("candidate_email").get(
+        id=campaign_id
+    )
+    # a cancel may arrive while the task waits in the queue, only a pending or
+    # running campaign is picked up
+    if not MailCampaign.objects.filter(
+        id=campaign.id, status__in=["pending", "running"]
+    ).update(status="running", error=None, updated_at=timezone.now()):
+        campaign.refresh_from_db(fields=["status"])
+        return campaign.status
+    campaign.status = "running"
+    campaign.error = None
+
+    started = time.monotonic()
+    try:
+        messages = CampaignMessages(campaign)
+        while not campaign.is_finished:
+            if time.monotonic() - started > MAIL_CAMPAIGN_TASK_TIME_BUDGET:
+                async_task(RUN_TASK, campaign.id)
+                return campaign.status
+
+            index = campaign.processed_chunks
+            with transaction.atomic():
+                # lock the checkpoint row so two workers never claim the same chunk
+                checkpoint = MailCampaign.objects.select_for_update().get(
+                    id=campaign.id
+                )
+                if checkpoint.status != "running" or (
+                    checkpoint.processed_chunks != index
+                ):
+                    return checkpoint.status
+                campaign.processed_chunks += 1
+                campaign.save(update_fields=["processed_chunks", "updated_at"])
+
+            pipeline = MailPipeline(CAMPAIGN_CATEGORIES[campaign.kind])
+            pipeline.send(messages.for_chunk(campaign.get_chunk(index)))
+            _record_chunk(campaign, pipeline)
+
+            if campaign.chunk_interval and not campaign.is_finished:
+                schedule(
+                    RUN_TASK,
+                    campaign.id,
+                    next_run=timezone.now()
+                    + timedelta(seconds=campaign.chunk_interval),
+                )
+                return campaign.status
+    except Exception:
+        campaign.status = "failed"
+        campaign.error = traceback.format_exc()
+        campaign.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    finished_at = timezone.now()
+    if not MailCampaign.objects.filter(id=campaign.id, status="running").update(
+        status="completed", finished_at=finished_at, updated_at=finished_at
+    ):
+        campaign.refresh_from_db(fields=["status"])
+        return campaign.status
+    campaign.status = "completed"
+    campaign.finished_at = finished_at
+    return campaign.status
+
+
+def reported_campaigns(kind):
+    """Campaigns of a kind still sending or finished recently, newest first"""
+    return MailCampaign.objects.filter(
+        Q(status__in=["pending", "running"])
+        | Q(updated_at__gte=timezone.now() - MAIL_CAMPAIGN_REPORTED_FOR),
+        kind=kind,
+    ).order_by("-id")
+
+
+def resume_mail_campaigns():
+    """Re-enqueue mail campaigns whose worker died
+
+    A campaign waiting between chunks is stale once its interval is over too.
+    Scheduled every 5 minutes by job_board migration 0082.
+    """
+    now = timezone.now()
+    for campaign_id, updated_at, chunk_interval in MailCampaign.objects.filter(
+        status__in=["pending", "running"],
+        updated_at__lt=now - MAIL_CAMPAIGN_STALE_AFTER,
+    ).values_list("id", "updated_at", "chunk_interval"):
+        if updated_at > now - MAIL_CAMPAIGN_STALE_AFTER - timedelta(
+            seconds=chunk_interval
+        ):
+            continue
+        # skip a campaign cancelled since it was listed
+        if MailCampaign.objects.filter(
+            id=campaign_id, status__in=["pending", "running"]
+        ).update(status="pending", updated_at=now):
+            async_task(RUN_TASK, campaign_id)
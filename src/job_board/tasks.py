@@ -1,41 +1,64 @@
-import os
+import logging
 
 from django.core import management
 from django.core.mail import EmailMultiAlternatives
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
 from django.template.loader import get_template
 from django_q.tasks import async_task
 
+from config.utils.mail import (
+    MailPipeline,
+    html_email,
+    read_attachments,
+    render_many,
+    send_emails,
+)
 from job_board.admin.candidate_admin import CandidateAssessment
 from job_board.mobile_sms.candidate import CandidateSMS
 from job_board.mobile_sms.exam import ExamSMS
 from job_board.models.candidate import Candidate
 from job_board.models.candidate_email import CandidateEmail
+from job_board.models.mail_campaign import MailCampaign
+from job_board.services.mail_campaign import (
+    BULK_APPLICATION_CATEGORY,
+    REOPPORTUNITY_SUBJECT,
+    CampaignMessages,
+    reported_campaigns,
+    start_mail_campaign,
+)
 
+logger = logging.getLogger(__name__)
 
-def candidates_have_to_reapply():
-    candidates_without_jobs = Candidate.objects.filter(candidatejob__isnull=True)[:30]
-    if candidates_without_jobs.exists():
 
-        candidate_emails = [candidate.email for candidate in candidates_without_jobs]
+def candidates_have_to_reapply():
+    candidates_without_jobs = list(
+        Candidate.objects.filter(candidatejob__isnull=True).values_list("id", "email")[
+            :30
+        ]
+    )
+    if candidates_without_jobs:
+        candidate_emails = [email for _, email in candidates_without_jobs]
         subject = "Request to apply again through the job portal"
-        for email in candidate_emails:
-            async_task("job_board.tasks.candidate_email_to_reapply", email, subject)
-            candidate = Candidate.objects.get(email=email)
-            candidate.delete()
+        async_task(
+            "job_board.tasks.candidate_emails_to_reapply", candidate_emails, subject
+        )
+        Candidate.objects.filter(
+            id__in=[candidate_id for candidate_id, _ in candidates_without_jobs]
+        ).delete()
 
 
 def candidate_email_to_reapply(to_email: str, subject):
+    candidate_emails_to_reapply([to_email], subject)
 
-    email = EmailMultiAlternatives()
-
-    email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
-    email.to = [to_email]
-    email.subject = subject
-    html_template = get_template("mail/re_apply_alert.html")
-    html_content = html_template.render({"candidate": "Applicant"})
-    email.attach_alternative(html_content, "text/html")
 
-    email.send()
+def candidate_emails_to_reapply(to_emails, subject):
+    # the alert is the same for everyone, render it once
+    (html_content,) = render_many("mail/re_apply_alert.html", [{"candidate": "Applicant"}])
+    send_emails(
+        [html_email(subject, html_content, [to_email]) for to_email in to_emails],
+        category="candidate_reapply",
+    )
 
 
 def send_otp(otp, email_address):
@@ -46,7 +69,7 @@ def send_otp(otp, email_address):
     email.attach_alternative(html_content, "text/html")
     email.to = [email_address]
     email.from_email = "Mediusware Ltd. <no-reply@mediusware.com>"
-    email.send()
+    send_emails([email], category="candidate_otp", max_retries=0)
 
 
 def send_exam_url(candidate_assessment: CandidateAssessment):
@@ -66,7 +89,7 @@ def send_exam_url(candidate_assessment: CandidateAssessment):
     email.attach_alternative(html_content, "text/html")
     email.to = [candidate_assessment.candidate_job.candidate.email]
     email.from_email = "Mediusware Ltd. <hr@mediusware.com>"
-    email.send()
+    send_emails([email], category="exam_url")
 
 
 def send_score_review_coding_test_mail(candidate_assessment: CandidateAssessment):
@@ -91,7 +114,7 @@ def send_score_review_coding_test_mail(candidate_assessment: CandidateAssessment
     email.attach_alternative(html_content, "text/html")
     email.to = [candidate_assessment.candidate_job.candidate.email]
     email.from_email = "Mediusware Ltd. <hr@mediusware.com>"
-    email.send()
+    send_emails([email], category="exam_score_review")
 
 
 def send_evaluation_url_to_admin(candidate_assessment: CandidateAssessment):
@@ -105,7 +128,7 @@ def send_evaluation_url_to_admin(candidate_assessment: CandidateAssessment):
     email.attach_alternative(html_content, "text/html")
     email.to = ["hr@mediusware.com"]
     email.from_email = candidate_assessment.candidate_job.candidate.email
-    email.send()
+    send_emails([email], category="exam_evaluation")
 
 
 def send_exam_url_if(passed_exam_id, send_exam_id):
@@ -131,34 +154,33 @@ def employee_sms_promotion(promotion_sms, candidate: Candidate):
 
 
 def send_candidate_email(candidate_email: str, email_content, attachment_paths: str):
-    email = EmailMultiAlternatives()
-    email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
-    email.to = [candidate_email]
-    email.subject = email_content.subject
-    email.attach_alternative(email_content.body, "text/html")
-    for attachment_path in attachment_paths:
-        if attachment_path:
-            attachment_filename = os.path.basename(attachment_path)
-            with open(attachment_path, "rb") as attachment:
-                email.attach(attachment_filename, attachment.read())
-
-    email.send()
+    email = html_email(
+        email_content.subject,
+        email_content.body,
+        [candidate_email],
+        attachments=read_attachments(attachment_paths),
+    )
+    send_emails([email], category="candidate_email")
 
 
 def send_chunked_emails(chunk, candidate_email_instance_id, attachment_paths):
+    """Send a chunk over one connection, the attachments are read once for the chunk"""
     candidate_email_instance = CandidateEmail.objects.get(
         id=candidate_email_instance_id
     )
-
-    print(chunk, end="                  ")
-    for email in chunk:
-        print(email)
-        async_task(
-            "job_board.tasks.send_candidate_email",
-            email,
-            candidate_email_instance,
-            attachment_paths,
-        )
+    attachments = read_attachments(attachment_paths)
+    send_emails(
+        [
+            html_email(
+                candidate_email_instance.subject,
+                candidate_email_instance.body,
+                [email],
+                attachments=attachments,
+            )
+            for email in chunk
+        ],
+        category="candidate_email",
+    )
 
 
 def send_interview_email(candidate_id, interview_datetime):
@@ -184,7 +206,7 @@ def send_interview_email(candidate_id, interview_datetime):
     email.to = [candidate.email]
     email.from_email = "Mediusware-HR <hr@mediusware.com>"
     # Send the email
-    email.send()
+    send_emails([email], category="candidate_interview")
 
 
 def send_shortlisted_email(candidate_id):
@@ -202,7 +224,7 @@ def send_shortlisted_email(candidate_id):
     email.to = [candidate.email]
     email.from_email = "Mediusware-HR <hr@mediusware.com>"
     # Send the email
-    email.send()
+    send_emails([email], category="candidate_shortlisted")
 
 
 def send_cancellation_email(candidate_id):
@@ -218,7 +240,7 @@ def send_cancellation_email(candidate_id):
     email.attach_alternative(html_content, "text/html")
     email.to = [candidate.email]
     email.from_email = "Mediusware-HR <hr@mediusware.com>"
-    email.send()
+    send_emails([email], category="candidate_interview_cancellation")
 
 
 # tasks.py
@@ -239,7 +261,7 @@ def send_waiting_list_email(candidate_id):
         to=[candidate.email],
     )
     email.attach_alternative(html_content, "text/html")
-    email.send()
+    send_emails([email], category="candidate_waiting_list")
 
 
 def send_rejection_email(candidate_id):
@@ -258,8 +280,7 @@ def send_rejection_email(candidate_id):
             to=[candidate.email],
         )
         email.attach_alternative(html_content, "text/html")
-        email.send()
-        return True
+        return send_emails([email], category="candidate_rejection") == 1
     except Exception as e:
         print(f"Error sending rejection email: {str(e)}")
         return False
@@ -296,8 +317,7 @@ def send_reschedule_email(candidate_id):
             to=[candidate.email],
         )
         email.attach_alternative(html_content, "text/html")
-        email.send()
-        return True
+        return send_emails([email], category="candidate_reschedule") == 1
     except Exception as e:
         print(f"Error sending reschedule email: {str(e)}")
         return False
@@ -353,6 +373,26 @@ def send_reschedule_email(candidate_id):
 #         email_message.send()
 
 
+def send_bulk_application_emails(email_list, job_title, opening_positions):
+    """
+    Send opportunity emails right away, without a campaign row
+
+    Returns:
+        dict: sent count and failed addresses
+    """
+    campaign = MailCampaign(
+        kind="reopportunity",
+        subject=REOPPORTUNITY_SUBJECT,
+        context={"job_title": job_title, "opening_positions": opening_positions},
+    )
+    pipeline = MailPipeline(BULK_APPLICATION_CATEGORY)
+    sent = pipeline.send(CampaignMessages(campaign).for_chunk(email_list))
+    return {
+        "sent": sent,
+        "failed": [message.to[0] for message in pipeline.failed],
+    }
+
+
 def send_single_bulk_email(email, job_title, opening_positions):
     """
     Function to send individual email and track success/failure
@@ -363,114 +403,55 @@ def send_single_bulk_email(email, job_title, opening_positions):
     Returns:
         dict: Status of email sending
     """
-    try:
-        # Get candidate name
-        try:
-            candidate = Candidate.objects.get(email=email)
-            candidate_name = candidate.full_name
-        except Candidate.DoesNotExist:
-            candidate_name = "Candidate"
-
-        # Prepare and send email
-        subject = "Exciting Career Opportunity at Mediusware"
-        html_template = get_template("mail/reopportunity_mail.html")
-        html_content = html_template.render(
-            {
-                "candidate_name": candidate_name,
-                "job_title": job_title,
-                "opening_positions": opening_positions,
-                "email": email,
-            }
-        )
-        # raise Http404("Product does not exist")
-
-        email_message = EmailMultiAlternatives(
-            subject=subject,
-            body="",
-            from_email="Mediusware-HR <hr@mediusware.com>",
-            to=[email],
-        )
-        email_message.attach_alternative(html_content, "text/html")
-        email_message.send()
-
-        return {
-            "status": "success",
-            "email": email,
-            "message": f"Email sent successfully to {email}",
-        }
-
-    except Exception as e:
-        error_msg = f"Failed to send email to {email}: {str(e)}"
-        print(f"Error: {error_msg}")  # For logging
+    result = send_bulk_application_emails([email], job_title, opening_positions)
+    if not result["sent"]:
+        error_msg = f"Failed to send email to {email}"
+        logger.error(error_msg)
         raise Exception(error_msg)
-
-
-def email_task_hook(task):
-    """
-    Hook function to process task results
-    Args:
-        task: Django Q task object
-    """
-    from django_q.models import Failure, Success
-
-    task_data = {
-        "name": "Bulk Application Email",
-        "func": "send_single_bulk_email",
-        "started": task.started,
-        "stopped": task.stopped,
-        "group": "Bulk Application Emails",
+    return {
+        "status": "success",
+        "email": email,
+        "message": f"Email sent successfully to {email}",
     }
 
-    if task.success:
-        # Log successful email
-        Success.objects.create(**task_data, result=task.result)
-        print(f"Successfully sent email: {task.result.get('email', 'Unknown')}")
-    else:
-        # Log failed email
-        Failure.objects.create(**task_data, result=str(task.result))
-        print(f"Failed to send email: {str(task.result)}")
-
 
 def send_bulk_application_summary_email(email_list, job_title, opening_positions):
     """
-    Main function that schedules bulk emails using Django Q
+    Start a mail campaign sending the opportunity email to every address
     Args:
         email_list: list of recipient email addresses
         job_title: job title
         opening_positions: list of open positions
+    Returns:
+        MailCampaign
     """
-    for email in email_list:
-        # Schedule each email as a separate task
-        async_task(
-            "job_board.tasks.send_single_bulk_email",  # Adjust the path according to your project structure
-            email,
-            job_title,
-            opening_positions,
-            group="Bulk Application Emails",
-            hook="job_board.tasks.email_task_hook",
-        )
+    return start_mail_campaign(
+        "reopportunity",
+        email_list,
+        REOPPORTUNITY_SUBJECT,
+        context={"job_title": job_title, "opening_positions": opening_positions},
+    )
 
 
-# Optional: Add a function to check email status
 def check_email_status():
     """
     Function to check the status of bulk emails
     Returns:
-        dict: Summary of successful and failed emails
+        dict: Summary of the opportunity campaigns still sending or finished
+        in the last MAIL_CAMPAIGN_REPORTED_FOR
     """
-    from django_q.models import Failure, Success
-
-    successes = Success.objects.filter(group="Bulk Application Emails")
-    failures = Failure.objects.filter(group="Bulk Application Emails")
-
-    successful_emails = [
-        s.result.get("email") for s in successes if isinstance(s.result, dict)
-    ]
-    failed_emails = [f.result for f in failures]
-
+    campaigns = reported_campaigns("reopportunity")
+    totals = campaigns.order_by().aggregate(
+        successful_count=Coalesce(Sum("sent_count"), 0),
+        failed_count=Coalesce(Sum("failed_count"), 0),
+    )
+    failed_emails = []
+    for failed_recipients in campaigns.filter(failed_count__gt=0).values_list(
+        "failed_recipients", flat=True
+    ):
+        failed_emails.extend(failed_recipients)
     return {
-        "successful_count": len(successful_emails),
-        "failed_count": len(failed_emails),
-        "successful_emails": successful_emails,
+        **totals,
         "failed_emails": failed_emails,
+        "campaigns": [campaign.as_dict() for campaign in campaigns],
     }
@@ -1,3 +1,192 @@
-from django.test import TestCase
+from copy import deepcopy
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from job_board.models.assessment import (
+    Assessment,
+    AssessmentAnswer,
+    AssessmentQuestion,
+)
+from job_board.models.candidate import Candidate, CandidateAssessment, CandidateJob
+from job_board.models.job import Job
+from job_board.models.mail_campaign import MailCampaign
+from job_board.services.exam_session import (
+    _session_key,
+    flush_exam_session,
+    get_session,
+    question_set,
+    save_answer,
+)
+from job_board.services.mail_campaign import (
+    MAIL_CAMPAIGN_REPORTED_FOR,
+    run_mail_campaign,
+)
+from job_board.tasks import check_email_status
+
+
+class CheckEmailStatusTest(TestCase):
+    def create_campaign(self, status, sent, failed_recipients=(), age=timedelta()):
+        campaign = MailCampaign.objects.create(
+            kind="reopportunity",
+            subject="Opportunity",
+            status=status,
+            sent_count=sent,
+            failed_count=len(failed_recipients),
+            failed_recipients=list(failed_recipients),
+        )
+        MailCampaign.objects.filter(id=campaign.id).update(
+            updated_at=timezone.now() - age
+        )
+        return campaign
+
+    def test_reports_active_and_recent_campaigns_only(self):
+        old_age = MAIL_CAMPAIGN_REPORTED_FOR + timedelta(days=1)
+        self.create_campaign("completed", 10, ["old@example.com"], age=old_age)
+        stuck = self.create_campaign("running", 3, age=old_age)
+        recent = self.create_campaign("completed", 5, ["new@example.com"])
+
+        status = check_email_status()
+
+        self.assertEqual(
+            [campaign["id"] for campaign in status["campaigns"]], [recent.id, stuck.id]
+        )
+        self.assertEqual(status["successful_count"], 8)
+        self.assertEqual(status["failed_count"], 1)
+        self.assertEqual(status["failed_emails"], ["new@example.com"])
+
+
+def create_assessment_job(*question_scores):
+    """Job with one assessment of questions worth question_scores"""
+    assessment = Assessment.objects.create(
+        title="Python",
+        slug="python",
+        pass_percentage=60,
+        duration=30,
+        description="-",
+    )
+    for score in question_scores:
+        question = AssessmentQuestion.objects.create(
+            assessment=assessment, title="-", score=score, type="single_choice"
+        )
+        AssessmentAnswer.objects.create(
+            assessment_question=question, title="-", score=score, correct=True
+        )
+    job = Job.objects.create(title="Developer", slug="developer")
+    job.assessments.add(assessment)
+    return job, assessment
+
+
+def create_candidate_job(job, name):
+    candidate = Candidate.objects.create(
+        full_name=name,
+        email=f"{name.lower()}@example.com",
+        phone=name[:10],
+        password="-",
+        cv="cv.pdf",
+    )
+    # saving a candidate job creates its assessments
+    return CandidateJob.objects.create(
+        candidate=candidate, job=job, expected_salary=50000
+    )
+
+
+class MarkMeritTest(TestCase):
+    def setUp(self):
+        self.job, self.assessment = create_assessment_job(10)
+
+    def apply(self, name, score, ended_ago=timedelta(hours=1)):
+        candidate_job = create_candidate_job(self.job, name)
+        CandidateAssessment.objects.filter(candidate_job=candidate_job).update(
+            score=score, exam_end_at=timezone.now() - ended_ago
+        )
+        return candidate_job
+
+    def test_marks_passed_finished_assessments_only(self):
+        passed = self.apply("Passed", 6)
+        failed = self.apply("Failed", 5)
+        running = self.apply("Running", 8, ended_ago=-timedelta(hours=1))
+        stdout = StringIO()
+
+        call_command("mark_merit", self.assessment.id, stdout=stdout)
+
+        self.assertEqual(CandidateJob.objects.get(merit=True), passed)
+        for candidate_job in (failed, running):
+            candidate_job.refresh_from_db()
+            self.assertIsNone(candidate_job.merit)
+        self.assertEqual(stdout.getvalue(), "Marked 1 candidate jobs as merit\n")
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class RunMailCampaignTest(TestCase):
+    def setUp(self):
+        self.campaign = MailCampaign.objects.create(
+            kind="reopportunity",
+            subject="Opportunity",
+            recipients=["a@example.com"],
+            total_recipients=1,
+        )
+
+    def test_campaign_cancelled_in_the_queue_is_not_resumed(self):
+        MailCampaign.objects.filter(id=self.campaign.id).update(status="cancelled")
+
+        self.assertEqual(run_mail_campaign(self.campaign.id), "cancelled")
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, "cancelled")
+        self.assertEqual(self.campaign.processed_chunks, 0)
+        self.assertEqual(mail.outbox, [])
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ExamSessionTest(TestCase):
+    def setUp(self):
+        job, self.assessment = create_assessment_job(5, 5)
+        candidate_assessment = CandidateAssessment.objects.get(
+            candidate_job=create_candidate_job(job, "Examinee")
+        )
+        self.question_ids = list(
+            self.assessment.assessmentquestion_set.order_by("id").values_list(
+                "id", flat=True
+            )
+        )
+        CandidateAssessment.objects.filter(id=candidate_assessment.id).update(
+            exam_started_at=timezone.now(),
+            exam_end_at=timezone.now() + timedelta(minutes=30),
+            step={
+                "current_step": 0,
+                "question_ids": self.question_ids,
+                "auto_checked": False,
+            },
+        )
+        self.candidate_assessment = candidate_assessment
+        self.unique_id = candidate_assessment.unique_id
+
+    def answer(self, question_id):
+        question = question_set(self.assessment.id)[question_id]
+        return save_answer(self.unique_id, question, list(question["answers"]))
+
+    @mock.patch("job_board.services.exam_session.async_task")
+    def test_flush_recovers_an_answer_a_racing_save_overwrote(self, async_task):
+        stale_session = deepcopy(get_session(self.unique_id))
+        self.assertTrue(self.answer(self.question_ids[0]))
+        # the second save read the session before the first one wrote it back
+        cache.set(_session_key(self.unique_id), stale_session)
+        self.assertTrue(self.answer(self.question_ids[1]))
+
+        flush_exam_session(self.unique_id)
+
+        self.candidate_assessment.refresh_from_db()
+        self.assertEqual(self.candidate_assessment.step["current_step"], 2)
+        self.assertEqual(self.candidate_assessment.score, 10)
+        session = get_session(self.unique_id)
+        self.assertEqual(session["answered"], self.question_ids)
+        self.assertEqual(session["current_step"], 2)
@@ -1,6 +1,5 @@
 from datetime import timedelta
 
-from django.core.exceptions import BadRequest
 from django.utils import timezone
 from django_q.tasks import async_task
 from rest_framework.generics import GenericAPIView
@@ -11,8 +10,9 @@ from rest_framework.views import APIView
 from job_board.auth.CandidateAuth import CandidateAuth
 from job_board.models.candidate import CandidateAssessment, CandidateJob
 from job_board.serializers.assessment_serializer import GivenAssessmentAnswerSerializer, \
-    CandidateAssessmentSerializer, AssessmentQuestionSerializer, AssessmentEvaluationUrlSerializer
+    CandidateAssessmentSerializer, AssessmentEvaluationUrlSerializer
 from job_board.serializers.candidate_serializer import CandidateJobSerializer
+from job_board.services.exam_session import current_question, get_session, is_time_up, question_data
 
 
 class CandidateAssessmentBase(GenericAPIView):
@@ -104,30 +104,27 @@ class CandidateAssessmentQuestion(APIView):
 
     def get(self, request, *args, **kwargs):
         """
-
+        Question of the current step, read from the exam session cache
         @param request:
         @param args:
         @param kwargs:
         @return:
         """
-        kwargs['exam_started_at__isnull'] = False
-        try:
-            candidate_assessment = CandidateAssessment.objects.filter(**kwargs).first()
-            question_serializer = AssessmentQuestionSerializer(self.get_question(candidate_assessment))
-            if not candidate_assessment.time_spend == 'time_up':
-                return Response(question_serializer.data)
-            return Response({'time_up': 'You have spend all the minutes ! best of luck'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        except BadRequest:
+        session = get_session(kwargs['unique_id'])
+        if session is None:
             return Response({'message': 'Bad Request'}, status=status.HTTP_400_BAD_REQUEST)
-
-    def get_question(self, candidate_assessment: CandidateAssessment):
-        try:
-            question_id = candidate_assessment.step['question_ids'][candidate_assessment.step['current_step']]
-            return candidate_assessment.assessment.assessmentquestion_set.filter(id=question_id).first()
-        except:
+        question = self.get_question(session)
+        if not is_time_up(session):
+            return Response(question_data(question))
+        return Response({'time_up': 'You have spend all the minutes ! best of luck'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    def get_question(self, session):
+        question = current_question(session)
+        if question is None:
             raise serializers.ValidationError(
-                {'out_of_step': f'You have answered all the question we have with {candidate_assessment.assessment}'})
+                {'out_of_step': f'You have answered all the question we have with {session["assessment_title"]}'})
+        return question
 
 
 class SaveAnswerView(GenericAPIView, mixins.CreateModelMixin):
@@ -20,6 +20,7 @@ from config.admin.utils import simple_request_filter
 from employee.admin.employee._forms import DailyUpdateFilterForm
 from employee.models import Employee
 from employee.models.employee_activity import EmployeeProject
+from employee.services.attendance_summary import refresh_daily_update_summaries
 # from employee.models.employee_rating_models import EmployeeRating
 from project_management.admin.project_hour.options import (
     ProjectLeadFilter,
@@ -592,10 +593,10 @@ class DailyProjectUpdateAdmin(admin.ModelAdmin):
             #         "You have pending leave application(s). Please approve first.",
             #     )
 
-            qs_count = queryset.filter(manager_id=request.user.employee.id).update(
-                status="approved"
-            )
+            queryset = queryset.filter(manager_id=request.user.employee.id)
+            qs_count = queryset.update(status="approved")
 
+        refresh_daily_update_summaries(queryset)
         messages.success(request, f"Marked Approved {qs_count} daily update(s).")
 
 # for developers if needed to add dummy data into daily project updates
@@ -725,6 +726,7 @@ class DailyProjectUpdateAdmin(admin.ModelAdmin):
             )
             queryset = queryset.filter(manager_id=request.user.employee.id)
 
+        refresh_daily_update_summaries(queryset)
         messages.success(request, f"Marked Pending {qs_count} daily update(s).")
 
     @admin.action(description="Export selected update(s) in .xlsx file")
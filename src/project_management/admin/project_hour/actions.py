@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.http import HttpResponse
 
 from account.models import Income
+from account.services.ledger import schedule_ledger_refresh
 from employee.models.employee import EmployeeUnderTPM
 from project_management.admin.graph.admin import ExtraUrl
 
@@ -103,3 +104,4 @@ class ProjectHourAction(ExtraUrl, admin.ModelAdmin):
                 )
             )
         Income.objects.bulk_create(income_object)
+        schedule_ledger_refresh([income.date for income in income_object])
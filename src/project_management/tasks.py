@@ -15,6 +15,7 @@ from django_q.tasks import async_task, schedule
 from django.core.mail import EmailMultiAlternatives
 from django.template import Context, loader
 from django.db.models import Q
+from config.utils.mail import render_many, send_emails
 from django.template import Template, Context
 
 def mark_employee_free():
@@ -47,11 +48,13 @@ def send_email_for_empty_weekly_project_hour():
     previous_friday = today - timedelta(days=days_to_subtract)
     projects_with_no_hours = Project.objects.exclude(projecthour__date=previous_friday)
 
-    for project in projects_with_no_hours:
-       lead_or_managers = project.associated_employees.filter(Q(lead=True) | Q(manager=True))
-       for lead_or_manager in lead_or_managers:
-            email_address = lead_or_manager.email
-            async_task('project_management.tasks.send_email_lead_for_weekly_project_hour',email_address,lead_or_manager)
+    lead_or_managers = []
+    for project in projects_with_no_hours.prefetch_related('associated_employees'):
+       for employee in project.associated_employees.all():
+            if employee.lead or employee.manager:
+                lead_or_managers.append(employee)
+    if lead_or_managers:
+        async_task('project_management.tasks.send_email_leads_for_weekly_project_hour',lead_or_managers)
 
        
 
@@ -64,7 +67,23 @@ def send_email_lead_for_weekly_project_hour(email_address, employee):
     context = {'employee': employee}
     html_content = loader.render_to_string('mails/weekly_project_hour_reminder.html', context)
     email.attach_alternative(html_content, "text/html")
-    email.send()
+    send_emails([email], category='weekly_project_hour_reminder')
+
+
+def send_email_leads_for_weekly_project_hour(employees):
+    html_contents = render_many(
+        'mails/weekly_project_hour_reminder.html',
+        [{'employee': employee} for employee in employees],
+    )
+    emails = []
+    for employee, html_content in zip(employees, html_contents):
+        email = EmailMultiAlternatives()
+        email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
+        email.to = [employee.email]
+        email.subject = "Reminder: Weekly Project Hour Submission"
+        email.attach_alternative(html_content, "text/html")
+        emails.append(email)
+    send_emails(emails, category='weekly_project_hour_reminder')
     
 def send_email_project_hourly_rate():
     
@@ -94,48 +113,51 @@ def send_email_project_hourly_rate():
     
     html_content = loader.render_to_string('mails/project_hourly_rate_increase.html', context)
     email.attach_alternative(html_content, "text/html")
-    email.send()
+    send_emails([email], category='project_hourly_rate')
 
 def client_feedback_email(email_content):
    
-    clients = Client.objects.filter(is_need_feedback = True)
+    clients = list(Client.objects.filter(is_need_feedback = True).exclude(email__isnull=True).exclude(email=''))
     if clients:
-        for client in clients:
-            if client.email:
-                client_all_projects = Project.objects.filter(
-                    active=True,
-                    client__id=client.id,
-                    client__is_need_feedback=True
-                ).exclude(
-                    projecttoken__isnull=True
-                ).values_list('title', 'projecttoken__token')
-                
-                projects_with_links = []
-                for title,token in client_all_projects:
-                    feedback_link = f"https://hr.mediusware.xyz/admin/project_management/clientfeedback/client-feedback/{token}/"
-                    projects_with_links.append({'title':title,'feedback_link':feedback_link})
-
-                    # Prepare the email context
-                context = {
+        # every client's project links from one query
+        projects_with_links = {client.id: [] for client in clients}
+        client_all_projects = Project.objects.filter(
+            active=True,
+            client__in=clients,
+            client__is_need_feedback=True
+        ).exclude(
+            projecttoken__isnull=True
+        ).values_list('client_id', 'title', 'projecttoken__token')
+        for client_id, title, token in client_all_projects:
+            feedback_link = f"https://hr.mediusware.xyz/admin/project_management/clientfeedback/client-feedback/{token}/"
+            projects_with_links[client_id].append({'title':title,'feedback_link':feedback_link})
+
+        # Render the email HTML content, the template is compiled once
+        html_contents = render_many(
+            'mails/client_feedback_request.html',
+            [
+                {
                     'client_name': client.name,
-                    'projects_with_links': projects_with_links,
+                    'projects_with_links': projects_with_links[client.id],
                     'email_body': email_content.body,
                 }
-
-                # Render the email HTML content
-                html_content = loader.render_to_string('mails/client_feedback_request.html', context)
-
-                # Send the email
-                email = EmailMultiAlternatives(
-                    subject=email_content.subject,
-                    body=email_content.body,
-                    from_email='"Mediusware-Admin" <admin@mediusware.com>',
-                    to=[client.email]
-                )
-                email.attach_alternative(html_content, "text/html")
-                email.send()
-
-
+                for client in clients
+            ],
+        )
+
+        emails = []
+        for client, html_content in zip(clients, html_contents):
+            email = EmailMultiAlternatives(
+                subject=email_content.subject,
+                body=email_content.body,
+                from_email='"Mediusware-Admin" <admin@mediusware.com>',
+                to=[client.email]
+            )
+            email.attach_alternative(html_content, "text/html")
+            emails.append(email)
+
+        # Send the emails over one connection
+        send_emails(emails, category='client_feedback')
         
 
     # for token in tokens:
@@ -10,6 +10,8 @@ class ProvidentFundAccountAdmin(admin.ModelAdmin):
     list_display = (
         'get_employee',
         'start_date',
+        'balance',
+        'last_tranx_date',
         'active',
     )
     list_filter = (
@@ -28,6 +30,13 @@ class ProvidentFundAccountAdmin(admin.ModelAdmin):
         ('More', {
             'fields': ('note', 'end_date', 'active'),
         }),
+        ('Balance', {
+            'fields': ('balance', 'last_tranx_date'),
+        }),
+    )
+    readonly_fields = (
+        'balance',
+        'last_tranx_date',
     )
     ordering = (
         '-active',
@@ -35,6 +44,7 @@ class ProvidentFundAccountAdmin(admin.ModelAdmin):
     
     date_hierarchy = 'start_date'
     list_per_page = 20
+    list_select_related = ('employee',)
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Account]:
         qs = super().get_queryset(request)
@@ -33,6 +33,7 @@ class ProvidentFundMonthlyEntryAdmin(admin.ModelAdmin):
     
     date_hierarchy = 'tranx_date'
     list_per_page = 20
+    list_select_related = ('account__employee',)
 
     @admin.display(description="Employee", ordering="account__employee__full_name")
     def get_employee(self, obj:MonthlyEntry):
@@ -44,6 +45,12 @@ class ProvidentFundMonthlyEntryAdmin(admin.ModelAdmin):
             return qs.filter(account=request.user.employee.pf_account)
         return qs
     
+    def get_readonly_fields(self, request, obj=None):
+        # the balance of the former account would be left stale
+        if obj is not None:
+            return ('account',)
+        return super().get_readonly_fields(request, obj)
+
     def get_list_filter(self, request):
         list_filter = super().get_list_filter(request)
         if not request.user.is_superuser:
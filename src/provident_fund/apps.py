@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProvidentFundConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'provident_fund'
+
+    def ready(self):
+        from provident_fund.services import posting  # noqa: F401
@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from provident_fund.models import Account
+from provident_fund.services.posting import post_monthly_contributions, refresh_balances
+
+
+class Command(BaseCommand):
+    help = "Post the monthly provident fund contributions, a month is never posted twice"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Salary date of the month, YYYY-MM-DD, default today")
+        parser.add_argument("--account", type=int, action="append", dest="account_ids", help="Account id, repeatable")
+        parser.add_argument("--rebuild-balances", action="store_true", help="Only recompute the account balances")
+
+    def handle(self, *args, **options):
+        if options["rebuild_balances"]:
+            account_ids = options["account_ids"] or Account.objects.values_list("id", flat=True)
+            refresh_balances(account_ids)
+            self.stdout.write(self.style.SUCCESS("Account balances rebuilt"))
+            return
+        salary_date = parse_date(options["date"] or "") or timezone.now().date()
+        posted = post_monthly_contributions(salary_date, options["account_ids"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Posted {posted} provident fund entries for {salary_date:%B %Y}")
+        )
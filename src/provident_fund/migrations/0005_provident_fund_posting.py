@@ -0,0 +1,50 @@
+# Generated by Django 3.2.8 on 2026-10-18 15:40
+
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+
+def backfill_balances(apps, schema_editor):
+    Account = apps.get_model('provident_fund', 'Account')
+    MonthlyEntry = apps.get_model('provident_fund', 'MonthlyEntry')
+    totals = {
+        row['account_id']: row
+        for row in MonthlyEntry.objects.order_by()
+        .values('account_id')
+        .annotate(balance=Sum('amount'), last_tranx_date=Max('tranx_date'))
+    }
+    accounts = list(Account.objects.filter(id__in=totals))
+    for account in accounts:
+        account.balance = totals[account.id]['balance'] or 0.0
+        account.last_tranx_date = totals[account.id]['last_tranx_date']
+    Account.objects.bulk_update(accounts, ['balance', 'last_tranx_date'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('provident_fund', '0004_alter_monthlyentry_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='balance',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='last_tranx_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='monthlyentry',
+            name='posting_month',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyentry',
+            constraint=models.UniqueConstraint(fields=('account', 'posting_month'), name='unique_provident_fund_posting_month'),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
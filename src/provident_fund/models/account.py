@@ -16,6 +16,9 @@ class Account(TimeStampMixin, AuthorMixin):
     note = models.TextField(null=True, blank=True)
     end_date = models.DateField(null=True, blank=True)
     active = models.BooleanField(default=True)
+    # sum of the monthly entries, maintained by provident_fund.services.posting
+    balance = models.FloatField(default=0.0, editable=False)
+    last_tranx_date = models.DateField(null=True, blank=True, editable=False)
     
     def __str__(self):
         return self.employee.full_name
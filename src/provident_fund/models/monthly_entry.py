@@ -14,10 +14,18 @@ class MonthlyEntry(TimeStampMixin, AuthorMixin):
     amount = models.FloatField()
     basic_salary = models.FloatField()
     note = models.TextField(null=True, blank=True)
+    # first day of the month of a posted contribution, empty for manual entries
+    posting_month = models.DateField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Monthly Entry"
         verbose_name_plural = "Monthly Entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "posting_month"],
+                name="unique_provident_fund_posting_month",
+            ),
+        ]
 
     def __str__(self):
         return self.account.__str__() + self.tranx_date.strftime("%b %d, %Y")
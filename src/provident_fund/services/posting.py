@@ -0,0 +1,146 @@
+"""
+Provident fund posting
+
+The contribution of an account for a month is scale percent of the basic
+salary, the basic being pay_scale.basic percent of the salary active at the
+start of the month (the latest salary when none was). Every eligible account
+is computed from a fixed number of queries and posted as one MonthlyEntry per
+(account, month); posting_month is unique per account, so posting a month
+twice never duplicates an entry. Account.balance and last_tranx_date hold the
+sum and the latest date of the entries of an account and are refreshed
+whenever entries are posted, saved or deleted.
+"""
+import calendar
+import datetime
+
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from employee.models import SalaryHistory
+from provident_fund.models import Account, MonthlyEntry
+
+
+def month_start(day):
+    return datetime.date(day.year, day.month, 1)
+
+
+def month_end(day):
+    return datetime.date(day.year, day.month, calendar.monthrange(day.year, day.month)[1])
+
+
+def contributions(salary_date, account_ids=None):
+    """
+    Contribution of every eligible account for the month of salary_date, two queries
+
+    @param account_ids: optionally limit to these accounts
+    @return list of dict: account_id, basic_salary and amount
+    """
+    first_day, last_day = month_start(salary_date), month_end(salary_date)
+    accounts = Account.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=first_day),
+        active=True,
+        start_date__lte=last_day,
+        employee__active=True,
+        employee__pf_eligibility=True,
+    )
+    if account_ids is not None:
+        accounts = accounts.filter(id__in=account_ids)
+    accounts = list(
+        accounts.order_by("id").values_list(
+            "id", "employee_id", "scale", "employee__pay_scale__basic"
+        )
+    )
+
+    month_salary, latest_salary = {}, {}
+    for employee_id, active_from, payable_salary in (
+        SalaryHistory.objects.filter(
+            employee_id__in=[employee_id for _, employee_id, _, _ in accounts]
+        )
+        .order_by("id")
+        .values_list("employee_id", "active_from", "payable_salary")
+    ):
+        latest_salary[employee_id] = payable_salary
+        if active_from <= first_day:
+            month_salary[employee_id] = payable_salary
+
+    rows = []
+    for account_id, employee_id, scale, basic_percent in accounts:
+        payable_salary = month_salary.get(employee_id, latest_salary.get(employee_id))
+        if not payable_salary:
+            continue
+        basic_salary = round(basic_percent * payable_salary / 100, 2)
+        amount = round(basic_salary * scale / 100, 2)
+        if amount > 0:
+            rows.append(
+                {"account_id": account_id, "basic_salary": basic_salary, "amount": amount}
+            )
+    return rows
+
+
+@transaction.atomic
+def post_monthly_contributions(salary_date, account_ids=None):
+    """
+    Insert the MonthlyEntry of every eligible account not posted for the month yet
+
+    @param salary_date: date of the salary sheet, the entries are dated at it
+    @return int: number of entries posted
+    """
+    posting_month = month_start(salary_date)
+    rows = contributions(salary_date, account_ids)
+    posted = set(
+        MonthlyEntry.objects.filter(
+            posting_month=posting_month,
+            account_id__in=[row["account_id"] for row in rows],
+        ).values_list("account_id", flat=True)
+    )
+    note = f"This payment has been made automated when salary sheet generated at {salary_date}"
+    entries = [
+        MonthlyEntry(
+            account_id=row["account_id"],
+            tranx_date=salary_date,
+            posting_month=posting_month,
+            amount=row["amount"],
+            basic_salary=row["basic_salary"],
+            note=note,
+        )
+        for row in rows
+        if row["account_id"] not in posted
+    ]
+    # a concurrent posting of the same month loses on the unique posting_month
+    MonthlyEntry.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+    refresh_balances([entry.account_id for entry in entries])
+    return len(entries)
+
+
+def refresh_balances(account_ids):
+    """Recompute balance and last_tranx_date of the accounts, two queries and one update"""
+    account_ids = set(account_ids)
+    if not account_ids:
+        return
+    totals = {
+        row["account_id"]: row
+        for row in MonthlyEntry.objects.filter(account_id__in=account_ids)
+        .order_by()
+        .values("account_id")
+        .annotate(balance=Sum("amount"), last_tranx_date=Max("tranx_date"))
+    }
+    now = timezone.now()
+    accounts = list(Account.objects.filter(id__in=account_ids).only("id"))
+    for account in accounts:
+        total = totals.get(account.id, {})
+        account.balance = total.get("balance") or 0.0
+        account.last_tranx_date = total.get("last_tranx_date")
+        account.updated_at = now
+    Account.objects.bulk_update(
+        accounts, ["balance", "last_tranx_date", "updated_at"], batch_size=500
+    )
+
+
+@receiver(post_save, sender=MonthlyEntry, dispatch_uid="provident_fund_entry_save")
+@receiver(post_delete, sender=MonthlyEntry, dispatch_uid="provident_fund_entry_delete")
+def refresh_entry_balance(sender, instance, **kwargs):
+    account_id = instance.account_id
+    transaction.on_commit(lambda: refresh_balances([account_id]))
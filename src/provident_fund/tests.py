@@ -1,3 +1,64 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Sum
 from django.test import TestCase
 
-# Create your tests here.
+from employee.models import SalaryHistory
+from employee.tests import create_employee
+from provident_fund.models import Account, MonthlyEntry
+from provident_fund.services.posting import post_monthly_contributions
+
+
+class MonthlyPostingTest(TestCase):
+    def setUp(self):
+        employee = create_employee("Fund Member", pf_eligibility=True)
+        SalaryHistory.objects.create(
+            employee=employee,
+            payable_salary=50000,
+            active_from=datetime.date(2024, 1, 1),
+        )
+        self.account = employee.pf_account
+        Account.objects.filter(id=self.account.id).update(
+            start_date=datetime.date(2024, 1, 1)
+        )
+
+    def assertBalanceMatchesEntries(self):
+        self.account.refresh_from_db()
+        entries = MonthlyEntry.objects.filter(account=self.account)
+        self.assertEqual(
+            self.account.balance, entries.aggregate(total=Sum("amount"))["total"]
+        )
+        self.assertEqual(
+            self.account.last_tranx_date,
+            entries.order_by("-tranx_date").first().tranx_date,
+        )
+
+    def test_posting_a_month_twice_adds_one_entry(self):
+        self.assertEqual(post_monthly_contributions(datetime.date(2024, 2, 29)), 1)
+        self.assertEqual(post_monthly_contributions(datetime.date(2024, 2, 29)), 0)
+        self.assertEqual(post_monthly_contributions(datetime.date(2024, 3, 31)), 1)
+
+        # 10% of the 60% basic of 50000
+        self.assertEqual(
+            list(
+                MonthlyEntry.objects.filter(account=self.account)
+                .order_by("posting_month")
+                .values_list("posting_month", "amount")
+            ),
+            [(datetime.date(2024, 2, 1), 3000), (datetime.date(2024, 3, 1), 3000)],
+        )
+        self.assertBalanceMatchesEntries()
+        self.assertEqual(self.account.balance, 6000)
+
+    def test_rebuild_balances_restores_a_corrupted_balance(self):
+        post_monthly_contributions(datetime.date(2024, 2, 29))
+        Account.objects.filter(id=self.account.id).update(
+            balance=1, last_tranx_date=None
+        )
+
+        call_command("post_provident_fund", "--rebuild-balances", stdout=StringIO())
+
+        self.assertBalanceMatchesEntries()
+        self.assertEqual(self.account.balance, 3000)
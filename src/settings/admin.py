@@ -25,6 +25,7 @@ from account.models import (
     EmployeeSalary,
     TDSChallan,
 )
+from config.utils.mail import throttled_chunk_size
 from config.utils.pdf import PDF
 from employee.models import Employee, EmployeeAttendance
 from project_management.models import Client
@@ -36,6 +37,7 @@ from .models import (
     Designation,
     EmailAnnouncement,
     EmailAnnouncementAttatchment,
+    EmailDeliveryLog,
     # EmployeeFoodAllowance,
     FinancialYear,
     Letter,
@@ -391,10 +393,10 @@ class SuccessfulTask(q_admin.TaskAdmin):
             Employee.objects.filter(active=True).values_list("email", flat=True)
         )
         for announcement in queryset:
-            for employee_email in employee_email_list:
+            for i in range(0, len(employee_email_list), 50):
                 async_task(
-                    "settings.tasks.announcement_mail",
-                    employee_email,
+                    "settings.tasks.announcement_mails",
+                    employee_email_list[i : i + 50],
                     announcement,
                 )
         if queryset:
@@ -418,7 +420,7 @@ class EmailAnnouncementAdmin(admin.ModelAdmin):
 
     @admin.action(description="Send Email To All Employees")
     def send_mail_employee(modeladmin, request, queryset):
-        chunk_size = 50
+        chunk_size = throttled_chunk_size(50)
         hour = 0
         cc_email = request.user.employee.email
         for announcement in queryset:
@@ -446,7 +448,7 @@ class EmailAnnouncementAdmin(admin.ModelAdmin):
 
     @admin.action(description="Send Email To All Clients")
     def send_mail_client(modeladmin, request, queryset):
-        chunk_size = 50
+        chunk_size = throttled_chunk_size(50)
         hour = 0
         cc_email = request.user.employee.email
         for announcement in queryset:
@@ -569,3 +571,17 @@ class FoodAllowanceForm(forms.Form):
 class NoticeAdmin(admin.ModelAdmin):
     list_display = ("title", "start_date", "end_date")
     date_hierarchy = "created_at"
+
+
+@admin.register(EmailDeliveryLog)
+class EmailDeliveryLogAdmin(admin.ModelAdmin):
+    list_display = ("category", "recipients", "subject", "status", "attempts", "created_at")
+    list_filter = ("status", "category")
+    search_fields = ("recipients", "subject")
+    date_hierarchy = "created_at"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0038_auto_20241128_1400'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailDeliveryLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.CharField(db_index=True, max_length=100)),
+                ('subject', models.CharField(max_length=255)),
+                ('recipients', models.TextField()),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed')], max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Email Delivery Log',
+                'verbose_name_plural': 'Email Delivery Logs',
+            },
+        ),
+    ]
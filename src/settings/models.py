@@ -178,3 +178,23 @@ class EmailAnnouncementAttatchment(TimeStampMixin, AuthorMixin):
     attachments = models.FileField(
         upload_to="email_attachments/", null=True, blank=True
     )
+
+
+class EmailDeliveryLog(TimeStampMixin):
+    STATUS_CHOICES = (
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+    category = models.CharField(max_length=100, db_index=True)
+    subject = models.CharField(max_length=255)
+    recipients = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Email Delivery Log"
+        verbose_name_plural = "Email Delivery Logs"
+
+    def __str__(self):
+        return f"{self.category} | {self.recipients} | {self.status}"
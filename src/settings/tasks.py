@@ -1,6 +1,7 @@
 import os
 import requests
 from django.core.mail import EmailMessage
+from config.utils.mail import HR_FROM_EMAIL, read_attachments, send_emails
 from settings.models import (
     Announcement,
     EmailAnnouncement,
@@ -8,10 +9,28 @@ from settings.models import (
 )
 from datetime import timedelta
 from django.utils import timezone
-from django_q.tasks import async_task
 from django.conf import settings
 
 
+def announcement_email(
+    to_email: str, subject: str, html_body: str, attachments=None, cc_email=None
+):
+    """
+    @param attachments: list of tuple(filename, content, mimetype)
+    """
+    email = EmailMessage()
+    email.from_email = HR_FROM_EMAIL
+    email.to = [to_email]
+    if cc_email:
+        email.cc = [cc_email]
+    email.subject = subject
+    email.body = html_body
+    email.content_subtype = "html"
+    for filename, content, mimetype in attachments or []:
+        email.attach(filename, content, mimetype)
+    return email
+
+
 def announcement_all_employee_mail(
     employee_email: str,
     subject: str,
@@ -19,30 +38,52 @@ def announcement_all_employee_mail(
     attachment_paths: str,
     cc_email: str,
 ):
-    email = EmailMessage()
-    email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
-    email.to = [employee_email]
-    email.cc = [cc_email]
-    email.subject = subject
-    email.body = html_body
-    email.content_subtype = "html"
-    for attachment_path in attachment_paths:
-        if attachment_path:
-            attachment_filename = os.path.basename(attachment_path)
-            with open(attachment_path, "rb") as attachment:
-                email.attach(attachment_filename, attachment.read())
-
-    email.send()
+    email = announcement_email(
+        employee_email, subject, html_body, read_attachments(attachment_paths), cc_email
+    )
+    send_emails([email], category="employee_announcement")
 
 
 def announcement_mail(employee_email: str, announcement: Announcement):
-    email = EmailMessage()
-    email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
-    email.to = [employee_email]
-    email.subject = "Announcement!!"
-    email.body = announcement.description
-    email.content_subtype = "html"
-    email.send()
+    announcement_mails([employee_email], announcement)
+
+
+def announcement_mails(employee_emails, announcement: Announcement):
+    send_emails(
+        [
+            announcement_email(email, "Announcement!!", announcement.description)
+            for email in employee_emails
+        ],
+        category="announcement",
+    )
+
+
+def fetch_announcement_attachments(attachment_paths):
+    """
+    Download or read every announcement attachment once
+
+    @param attachment_paths: attachment urls, remote or under MEDIA_URL
+    @return list of tuple(filename, content, mimetype)
+    """
+    attachments = []
+    for attachment in attachment_paths:
+        if not attachment:
+            continue
+        if attachment.__contains__("http"):
+            # Fetch the PDF content from the URL
+            response = requests.get(attachment)
+            attachments.append(
+                (
+                    os.path.basename(attachment),
+                    response.content,
+                    response.headers["Content-Type"],
+                )
+            )
+        else:
+            relative_path = attachment.replace(settings.MEDIA_URL, "")
+            full_file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+            attachments.extend(read_attachments([full_file_path]))
+    return attachments
 
 
 def announcement_all_client_mail(
@@ -52,51 +93,36 @@ def announcement_all_client_mail(
     attachment_paths: str,
     cc_email: str,
 ):
-    email = EmailMessage()
-    email.from_email = '"Mediusware-HR" <hr@mediusware.com>'
-    email.to = [client_email]
-    email.cc = [cc_email]
-    email.subject = subject
-    email.body = html_body
-    email.content_subtype = "html"
-    for attachment in attachment_paths:
-        if attachment:
-            attachment_filename = os.path.basename(attachment)
-            if attachment.__contains__("http"):
-                # Fetch the PDF content from the URL
-                print(attachment, "in the url")
-                response = requests.get(attachment)
-                email.attach(attachment_filename, response.content, response.headers["Content-Type"])
-            else:
-                relative_path = attachment.replace(settings.MEDIA_URL, '')
-                full_file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-                print(full_file_path, "in the path", relative_path)
-                
-                attachment_filename = os.path.basename(full_file_path)
-                with open(full_file_path, "rb") as attachment:
-                    email.attach(attachment_filename, attachment.read())
-
-    email.send()
+    email = announcement_email(
+        client_email,
+        subject,
+        html_body,
+        fetch_announcement_attachments(attachment_paths),
+        cc_email,
+    )
+    send_emails([email], category="client_announcement")
 
 
 def send_chunk_email(chunk_emails, announcement_id, cc_email):
-    print("chanked email has called")
-    for client_email in chunk_emails:
-        email_announcement = EmailAnnouncement.objects.get(id=announcement_id)
-        subject = email_announcement.subject
-        attachmentqueryset = EmailAnnouncementAttatchment.objects.filter(
+    """Send one announcement chunk over one connection, attachments are fetched once"""
+    email_announcement = EmailAnnouncement.objects.get(id=announcement_id)
+    attachment_paths = [
+        attachment.attachments.url
+        for attachment in EmailAnnouncementAttatchment.objects.filter(
             email_announcement=email_announcement
         )
-        attachment_paths = [
-            attachment.attachments.url for attachment in attachmentqueryset
-        ]
-        html_body = email_announcement.body
-
-        async_task(
-            "settings.tasks.announcement_all_client_mail",
-            client_email,
-            subject,
-            html_body,
-            attachment_paths,
-            cc_email,
-        )
+    ]
+    attachments = fetch_announcement_attachments(attachment_paths)
+    send_emails(
+        [
+            announcement_email(
+                email,
+                email_announcement.subject,
+                email_announcement.body,
+                attachments,
+                cc_email,
+            )
+            for email in chunk_emails
+        ],
+        category="email_announcement",
+    )
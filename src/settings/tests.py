@@ -1,3 +1,91 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import EmailMessage, get_connection
+from django.test import TestCase, override_settings
+
+from config.utils.mail import MailPipeline, send_emails, throttled_chunk_size
+from settings.models import EmailDeliveryLog
+
+
+class RefusingConnection:
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("refused")
+
+
+class SilentConnection(RefusingConnection):
+    """A fail_silently backend sends nothing instead of raising"""
+
+    def send_messages(self, messages):
+        return 0
+
+
+def message(to):
+    return EmailMessage("Subject", "Body", to=[to])
+
+
+class MailPipelineTest(TestCase):
+    @override_settings(EMAIL_PIPELINE_PER_MINUTE=0)
+    def test_unthrottled_chunk_keeps_its_size(self):
+        self.assertEqual(throttled_chunk_size(50), 50)
+
+    @override_settings(EMAIL_PIPELINE_PER_MINUTE=30)
+    def test_throttled_chunk_fits_the_task_time_budget(self):
+        # 30 a minute for 40 seconds
+        self.assertEqual(throttled_chunk_size(50), 20)
+        self.assertEqual(throttled_chunk_size(50, time_budget=1), 1)
+
+    def test_failed_message_is_logged(self):
+        pipeline = MailPipeline(
+            "test", max_retries=1, connection=RefusingConnection(), sleep=lambda _: None
+        )
+        with self.assertLogs("config.utils.mail", level="ERROR") as logs:
+            sent = pipeline.send([message("a@example.com")])
+
+        self.assertEqual(sent, 0)
+        self.assertIn("a@example.com", logs.output[0])
+        log = EmailDeliveryLog.objects.get(category="test")
+        self.assertEqual((log.status, log.attempts), ("failed", 2))
+
+    def test_silently_failed_message_is_logged(self):
+        pipeline = MailPipeline(
+            "test", max_retries=0, connection=SilentConnection(), sleep=lambda _: None
+        )
+        with self.assertLogs("config.utils.mail", level="ERROR") as logs:
+            sent = pipeline.send([message("a@example.com")])
+
+        self.assertEqual(sent, 0)
+        self.assertIn("a@example.com", logs.output[0])
+        self.assertEqual(
+            EmailDeliveryLog.objects.get(category="test").status, "failed"
+        )
+
+    @override_settings(
+        EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+        EMAIL_PIPELINE_PER_MINUTE=0,
+    )
+    def test_chunks_are_sent_over_one_connection_each(self):
+        chunks = [["a@example.com", "b@example.com"], ["c@example.com"]]
+        with mock.patch(
+            "config.utils.mail.get_connection", wraps=get_connection
+        ) as connections:
+            sent = [
+                send_emails([message(to) for to in chunk], "test") for chunk in chunks
+            ]
+
+        self.assertEqual(sent, [2, 1])
+        self.assertEqual(connections.call_count, len(chunks))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            [email.to for email in mail.outbox],
+            [["a@example.com"], ["b@example.com"], ["c@example.com"]],
+        )
+        self.assertEqual(
+            EmailDeliveryLog.objects.filter(category="test", status="sent").count(), 3
+        )